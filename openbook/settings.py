@@ -202,6 +202,24 @@ else:
         }
     }
 
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Local to every process unless SIGNED_URLS_CACHE_BACKEND points at a backend shared by the workers
+    'signed_urls': {
+        'BACKEND': os.environ.get('SIGNED_URLS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('SIGNED_URLS_CACHE_LOCATION', 'signed-urls'),
+        'OPTIONS': {
+            # A feed page signs up to a few dozen urls, the default of 300 entries would be culled every few pages
+            'MAX_ENTRIES': int(os.environ.get('SIGNED_URLS_CACHE_MAX_ENTRIES', '20000')),
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -232,7 +250,7 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'openbook_auth.authentication.TokenAuthentication',
     )
 }
 
@@ -297,6 +315,8 @@ USER_MAX_COMMUNITIES = 200
 POST_MAX_LENGTH = 1120
 POST_COMMENT_MAX_LENGTH = 560
 POST_IMAGE_MAX_SIZE = int(os.environ.get('POST_IMAGE_MAX_SIZE', '10485760'))
+POST_VIDEO_MAX_SIZE = int(os.environ.get('POST_VIDEO_MAX_SIZE', '524288000'))
+POST_MEDIA_UPLOAD_CHUNK_MAX_SIZE = int(os.environ.get('POST_MEDIA_UPLOAD_CHUNK_MAX_SIZE', '5242880'))
 PASSWORD_MIN_LENGTH = 10
 PASSWORD_MAX_LENGTH = 100
 CIRCLE_MAX_LENGTH = 100
@@ -319,6 +339,8 @@ COMMUNITY_CATEGORIES_MAX_AMOUNT = 3
 COMMUNITY_CATEGORIES_MIN_AMOUNT = 1
 COMMUNITY_AVATAR_MAX_SIZE = int(os.environ.get('COMMUNITY_AVATAR_MAX_SIZE', '10485760'))
 COMMUNITY_COVER_MAX_SIZE = int(os.environ.get('COMMUNITY_COVER_MAX_SIZE', '10485760'))
+# Uploaded images with more pixels are rejected before being decoded
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', '64000000'))
 TAG_NAME_MAX_LENGTH = 32
 CATEGORY_NAME_MAX_LENGTH = 32
 CATEGORY_TITLE_MAX_LENGTH = 64
@@ -328,6 +350,35 @@ DEVICE_UUID_MAX_LENGTH = 64
 SEARCH_QUERIES_MAX_LENGTH = 120
 FEATURE_VIDEO_POSTS_ENABLED = os.environ.get('FEATURE_VIDEO_POSTS_ENABLED', 'True') == 'True'
 FEATURE_IMPORTER_ENABLED = os.environ.get('FEATURE_IMPORTER_ENABLED', 'True') == 'True'
+FEATURE_MATERIALIZED_TIMELINE_ENABLED = os.environ.get('FEATURE_MATERIALIZED_TIMELINE_ENABLED', 'False') == 'True'
+FEATURE_ASYNC_PUSH_NOTIFICATIONS_ENABLED = os.environ.get('FEATURE_ASYNC_PUSH_NOTIFICATIONS_ENABLED', 'False') == 'True'
+FEATURE_PRECOMPUTED_TRENDING_POSTS_ENABLED = os.environ.get('FEATURE_PRECOMPUTED_TRENDING_POSTS_ENABLED', 'False') == 'True'
+FEATURE_MATERIALIZED_TRENDING_COMMUNITIES_ENABLED = os.environ.get('FEATURE_MATERIALIZED_TRENDING_COMMUNITIES_ENABLED',
+                                                                   'False') == 'True'
+FEATURE_INDEXED_USER_SEARCH_ENABLED = os.environ.get('FEATURE_INDEXED_USER_SEARCH_ENABLED', 'False') == 'True'
+FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED = os.environ.get('FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED', 'False') == 'True'
+FEATURE_IMPORT_JOBS_ENABLED = os.environ.get('FEATURE_IMPORT_JOBS_ENABLED', 'False') == 'True'
+FEATURE_ASYNC_IMAGE_PROCESSING_ENABLED = os.environ.get('FEATURE_ASYNC_IMAGE_PROCESSING_ENABLED', 'False') == 'True'
+# Seconds the cached trending communities are served as is and, after that, while being recomputed
+TRENDING_COMMUNITIES_CACHE_FRESH_FOR = int(os.environ.get('TRENDING_COMMUNITIES_CACHE_FRESH_FOR', '60'))
+TRENDING_COMMUNITIES_CACHE_STALE_FOR = int(os.environ.get('TRENDING_COMMUNITIES_CACHE_STALE_FOR', '600'))
+# Seconds without progress after which a running import job is taken for crashed and claimed again
+IMPORT_JOBS_STALE_AFTER = int(os.environ.get('IMPORT_JOBS_STALE_AFTER', '300'))
+# Attempts at processing a stored image before giving up on it, the first retry waits the delay in seconds,
+# doubled on every failed attempt. A worker has the claim seconds to process the images it claimed.
+PENDING_IMAGES_MAX_ATTEMPTS = int(os.environ.get('PENDING_IMAGES_MAX_ATTEMPTS', '5'))
+PENDING_IMAGES_RETRY_DELAY = int(os.environ.get('PENDING_IMAGES_RETRY_DELAY', '30'))
+PENDING_IMAGES_CLAIM_FOR = int(os.environ.get('PENDING_IMAGES_CLAIM_FOR', '300'))
+# Seconds the signed urls of the private media are cached for, capped to half their expiry
+SIGNED_URLS_CACHE_FOR = int(os.environ.get('SIGNED_URLS_CACHE_FOR', '1800'))
+# Seconds without activity after which a post media upload, finalized or not, is deleted
+POST_MEDIA_UPLOADS_EXPIRE_AFTER = int(os.environ.get('POST_MEDIA_UPLOADS_EXPIRE_AFTER', '86400'))
+# Post media uploads a user can have at once, finalized or not
+POST_MEDIA_UPLOADS_MAX_PER_USER = int(os.environ.get('POST_MEDIA_UPLOADS_MAX_PER_USER', '10'))
+# Display widths the images of feeds and notifications are served for, the smallest derivative covering them is used
+FEED_IMAGE_WIDTH = int(os.environ.get('FEED_IMAGE_WIDTH', '600'))
+FEED_AVATAR_WIDTH = int(os.environ.get('FEED_AVATAR_WIDTH', '100'))
+NOTIFICATION_IMAGE_WIDTH = int(os.environ.get('NOTIFICATION_IMAGE_WIDTH', '200'))
 
 # Email Config
 
@@ -372,3 +423,18 @@ if IS_PRODUCTION:
 # ONE SIGNAL
 ONE_SIGNAL_APP_ID = os.environ.get('ONE_SIGNAL_APP_ID')
 ONE_SIGNAL_API_KEY = os.environ.get('ONE_SIGNAL_API_KEY')
+
+# PUSH NOTIFICATIONS
+# Tests never reach OneSignal, the stub client keeps the notifications in memory
+if TESTING:
+    PUSH_NOTIFICATIONS_CLIENT = 'openbook_notifications.push_notifications.clients.StubPushNotificationsClient'
+else:
+    PUSH_NOTIFICATIONS_CLIENT = os.environ.get('PUSH_NOTIFICATIONS_CLIENT',
+                                               'openbook_notifications.push_notifications.clients.OneSignalPushNotificationsClient')
+PUSH_NOTIFICATIONS_MAX_ATTEMPTS = int(os.environ.get('PUSH_NOTIFICATIONS_MAX_ATTEMPTS', '5'))
+# Seconds before the first retry, doubled on every failed attempt
+PUSH_NOTIFICATIONS_RETRY_DELAY = int(os.environ.get('PUSH_NOTIFICATIONS_RETRY_DELAY', '30'))
+# Seconds a worker has to send the push notifications it claimed before other workers can claim them again
+PUSH_NOTIFICATIONS_CLAIM_FOR = int(os.environ.get('PUSH_NOTIFICATIONS_CLAIM_FOR', '300'))
+# Seconds to wait for OneSignal to accept a push notification
+PUSH_NOTIFICATIONS_HTTP_TIMEOUT = float(os.environ.get('PUSH_NOTIFICATIONS_HTTP_TIMEOUT', '10'))
@@ -1,5 +1,8 @@
+import hashlib
+
 from botocore.config import Config
 from django.conf import settings
+from django.core.cache import caches
 from storages.backends.s3boto3 import S3Boto3Storage
 
 
@@ -35,3 +38,41 @@ class S3PrivateMediaStorage(S3Boto3Storage):
                                  'use_accelerate_endpoint': True},
                              signature_version=self.signature_version)
         super().__init__(*args, **kwargs)
+
+    def url(self, name, parameters=None, expire=None):
+        # Urls signed with their own parameters or expiry are not shared
+        if parameters or expire is not None:
+            return super().url(name, parameters=parameters, expire=expire)
+
+        return self.urls([name])[name]
+
+    def urls(self, names):
+        """
+        Returns the signed urls of the names. The urls signed recently are taken from the signed urls cache,
+        the rest are signed and cached, with a single cache query each way.
+        Urls are cached for at most half their expiry, so a cached url is still valid for a while once served.
+        """
+        cache = caches['signed_urls']
+        keys = {name: self._get_signed_url_cache_key(name) for name in names}
+        cached_urls = cache.get_many(list(keys.values()))
+
+        urls = {}
+        signed_urls = {}
+
+        for name, key in keys.items():
+            url = cached_urls.get(key)
+
+            if url is None:
+                url = super().url(name)
+                signed_urls[key] = url
+
+            urls[name] = url
+
+        if signed_urls:
+            cache.set_many(signed_urls, timeout=min(settings.SIGNED_URLS_CACHE_FOR, self.querystring_expire // 2))
+
+        return urls
+
+    def _get_signed_url_cache_key(self, name):
+        key = '%s/%s' % (self.bucket_name, self._normalize_name(self._clean_name(name)))
+        return 'signed_url:%s' % hashlib.sha256(key.encode('utf-8')).hexdigest()
@@ -43,11 +43,14 @@ from openbook_connections.views import ConnectWithUser, Connections, DisconnectF
 from openbook_devices.views import Devices, DeviceItem
 from openbook_follows.views import Follows, FollowUser, UnfollowUser, UpdateFollowUser
 from openbook_lists.views import Lists, ListItem, ListNameCheck
-from openbook_notifications.views import Notifications, NotificationItem, ReadNotifications, ReadNotification
+from openbook_notifications.views import Notifications, NotificationItem, ReadNotifications, ReadNotification, \
+    UnreadNotificationsCount
 from openbook_posts.views.post.views import PostComments, PostCommentItem, PostItem, PostReactions, PostReactionItem, \
     PostReactionsEmojiCount, PostReactionEmojiGroups, MutePost, UnmutePost
 from openbook_posts.views.posts.views import Posts, TrendingPosts
-from openbook_importer.views import ImportItem
+from openbook_posts.views.uploads.views import PostMediaUploads, PostMediaUploadItem, PostMediaUploadChunks, \
+    FinalizePostMediaUpload
+from openbook_importer.views import ImportItem, ImportJobItem
 
 auth_patterns = [
     path('register/', Register.as_view(), name='register-user'),
@@ -83,11 +86,19 @@ post_patterns = [
     path('reactions/<int:post_reaction_id>/', PostReactionItem.as_view(), name='post-reaction'),
 ]
 
+post_media_upload_patterns = [
+    path('', PostMediaUploadItem.as_view(), name='post-media-upload'),
+    path('chunks/', PostMediaUploadChunks.as_view(), name='post-media-upload-chunks'),
+    path('finalize/', FinalizePostMediaUpload.as_view(), name='finalize-post-media-upload'),
+]
+
 posts_patterns = [
     path('<uuid:post_uuid>/', include(post_patterns)),
     path('', Posts.as_view(), name='posts'),
     path('trending/', TrendingPosts.as_view(), name='trending-posts'),
     path('emojis/groups/', PostReactionEmojiGroups.as_view(), name='posts-emoji-groups'),
+    path('uploads/', PostMediaUploads.as_view(), name='post-media-uploads'),
+    path('uploads/<uuid:upload_uuid>/', include(post_media_upload_patterns)),
 ]
 
 community_administrator_patterns = [
@@ -183,7 +194,8 @@ follows_patterns = [
 ]
 
 importer_patterns = [
-    path('upload/', ImportItem.as_view(), name='uploads')
+    path('upload/', ImportItem.as_view(), name='uploads'),
+    path('<int:job_id>/', ImportJobItem.as_view(), name='import-job'),
 ]
 
 categories_patterns = [
@@ -198,6 +210,7 @@ notification_patterns = [
 notifications_patterns = [
     path('', Notifications.as_view(), name='notifications'),
     path('read/', ReadNotifications.as_view(), name='read-notifications'),
+    path('unread-count/', UnreadNotificationsCount.as_view(), name='unread-notifications-count'),
     path('<int:notification_id>/', include(notification_patterns)),
 ]
 
@@ -0,0 +1,13 @@
+from rest_framework import authentication
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """
+    Token authentication whose authenticated user answers its relationship predicates
+    from a snapshot kept for the request
+    """
+
+    def authenticate_credentials(self, key):
+        user, token = super(TokenAuthentication, self).authenticate_credentials(key)
+        user.enable_relationships_snapshot()
+        return user, token
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_common.utils.model_loaders import get_user_search_token_model
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search tokens of every user. ' \
+           'Must also be run once after enabling FEATURE_INDEXED_USER_SEARCH_ENABLED'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Search tokens to insert per query')
+
+    def handle(self, *args, **options):
+        UserSearchToken = get_user_search_token_model()
+        UserSearchToken.rebuild(batch_size=options['batch_size'])
+        logger.info('Rebuilt {0} users search tokens'.format(UserSearchToken.objects.count()))
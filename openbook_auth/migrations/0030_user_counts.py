@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_auth', '0029_auto_20190311_1752'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='followers count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='following count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='posts count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='public_posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='public posts count'),
+        ),
+    ]
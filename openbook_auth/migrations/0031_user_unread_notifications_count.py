@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_auth', '0030_user_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='unread notifications count'),
+        ),
+    ]
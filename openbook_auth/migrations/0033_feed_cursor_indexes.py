@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_auth', '0032_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='user',
+            index_together={('date_joined', 'id')},
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:52
+
+from django.db import migrations
+import imagekit.models.fields
+import openbook_auth.helpers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_auth', '0033_feed_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_thumbnail',
+            field=imagekit.models.fields.ProcessedImageField(editable=False, null=True, upload_to=openbook_auth.helpers.upload_to_user_avatar_directory, verbose_name='avatar thumbnail'),
+        ),
+    ]
@@ -4,7 +4,7 @@ import re
 import jwt
 import uuid
 from django.contrib.auth.validators import UnicodeUsernameValidator, ASCIIUsernameValidator
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -16,19 +16,23 @@ from imagekit.models import ProcessedImageField
 from pilkit.processors import ResizeToFill, ResizeToFit
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError, NotFound, PermissionDenied, AuthenticationFailed
-from django.db.models import Q
+from django.db.models import Q, Count, Case, When, Value, IntegerField
 from django.core.mail import EmailMultiAlternatives
 
 from openbook.settings import USERNAME_MAX_LENGTH
 from openbook_auth.helpers import upload_to_user_cover_directory, upload_to_user_avatar_directory
-from openbook_common.models import Badge
-from openbook_common.utils.helpers import delete_image_kit_image_field
+from openbook_common.models import Badge, PendingImage
+from openbook_common.utils.helpers import delete_image_kit_image_field, update_count, exclude_counts_from_save
+from openbook_common.utils.images import make_image_processors
 from openbook_common.utils.model_loaders import get_connection_model, get_circle_model, get_follow_model, \
     get_post_model, get_list_model, get_post_comment_model, get_post_reaction_model, \
     get_emoji_group_model, get_user_invite_model, get_community_model, get_community_invite_model, get_tag_model, \
     get_post_comment_notification_model, get_follow_notification_model, get_connection_confirmed_notification_model, \
     get_connection_request_notification_model, get_post_reaction_notification_model, get_device_model, \
-    get_post_mute_model, get_community_invite_notification_model
+    get_post_mute_model, get_community_invite_notification_model, get_timeline_post_model, \
+    get_community_search_token_model
+from openbook_common.utils.search import SEARCH_TOKEN_LENGTH, make_search_tokens, make_search_query_tokens, \
+    paginate_ranked_search_results
 from openbook_common.validators import name_characters_validator
 from openbook_notifications.push_notifications import senders
 
@@ -62,19 +66,33 @@ class User(AbstractUser):
     )
 
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    posts_count = models.PositiveIntegerField(_('posts count'), default=0, editable=False)
+    public_posts_count = models.PositiveIntegerField(_('public posts count'), default=0, editable=False)
+    followers_count = models.PositiveIntegerField(_('followers count'), default=0, editable=False)
+    following_count = models.PositiveIntegerField(_('following count'), default=0, editable=False)
+    unread_notifications_count = models.PositiveIntegerField(_('unread notifications count'), default=0,
+                                                             editable=False)
+
+    COUNTS_FIELDS_NAMES = ('posts_count', 'public_posts_count', 'followers_count', 'following_count',
+                           'unread_notifications_count')
+
     JWT_TOKEN_TYPE_CHANGE_EMAIL = 'CE'
     JWT_TOKEN_TYPE_PASSWORD_RESET = 'PR'
 
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        index_together = (('date_joined', 'id'),)
 
     @classmethod
     def create_user(cls, username, email=None, password=None, name=None, avatar=None, is_of_legal_age=None,
                     badge=None, **extra_fields):
         new_user = cls.objects.create_user(username, email=email, password=password, **extra_fields)
-        user_profile = UserProfile.objects.create(name=name, user=new_user, avatar=avatar,
-                                                  is_of_legal_age=is_of_legal_age)
+        user_profile = UserProfile.objects.create(name=name, user=new_user, is_of_legal_age=is_of_legal_age)
+
+        if avatar:
+            PendingImage.set_image_of_instance(instance=user_profile, field_name='avatar', image=avatar)
+            user_profile.save()
 
         if badge:
             user_profile.badges.add(badge)
@@ -137,9 +155,22 @@ class User(AbstractUser):
 
     @classmethod
     def get_public_users_with_query(cls, query):
-        users_query = Q(username__icontains=query)
-        users_query.add(Q(profile__name__icontains=query), Q.OR)
-        return cls.objects.filter(users_query)
+        users_query = UserSearchToken.make_users_with_query_query(query=query)
+        return cls.objects.filter(users_query).annotate(
+            search_rank=cls._make_search_rank(query=query)).order_by('-search_rank', 'username')
+
+    @classmethod
+    def _make_search_rank(cls, query, linked_to_user=None):
+        """
+        Ranks the exact username match first and then, if a user is given, the users linked to it
+        """
+        ranks = [When(username__iexact=query, then=Value(2))]
+
+        if linked_to_user:
+            linked_users_ids = cls.objects.filter(linked_to_user._make_linked_users_query()).values('id')
+            ranks.append(When(id__in=linked_users_ids, then=Value(1)))
+
+        return Case(*ranks, default=Value(0), output_field=IntegerField())
 
     @classmethod
     def get_user_for_password_reset_token(cls, password_verification_token):
@@ -179,19 +210,17 @@ class User(AbstractUser):
             )
 
     def count_posts(self):
-        return self.posts.count()
+        return self.posts_count
 
     def count_unread_notifications(self):
-        return self.notifications.filter(read=False).count()
+        return self.unread_notifications_count
 
     def count_public_posts(self):
         """
         Count how many public posts has the user created
         :return:
         """
-        world_circle_id = self._get_world_circle_id()
-
-        return self.posts.filter(circles__id=world_circle_id).count()
+        return self.public_posts_count
 
     def count_posts_for_user_with_id(self, id):
         """
@@ -200,18 +229,20 @@ class User(AbstractUser):
         :return: count
         """
         user = User.objects.get(pk=id)
-        if user.is_connected_with_user_with_id(self.pk):
-            count = user.get_posts_for_user_with_username(username=self.username).count()
-        else:
-            count = self.count_public_posts()
-        return count
+
+        if not user.is_connected_with_user_with_id(self.pk):
+            return self.count_public_posts()
+
+        posts_query = user._make_get_posts_query_for_user(self)
+
+        Post = get_post_model()
+        return Post.objects.filter(posts_query).distinct().count()
 
     def count_followers(self):
-        Follow = get_follow_model()
-        return Follow.objects.filter(followed_user__id=self.pk).count()
+        return self.followers_count
 
     def count_following(self):
-        return self.follows.count()
+        return self.following_count
 
     def count_connections(self):
         return self.connections.count()
@@ -222,18 +253,20 @@ class User(AbstractUser):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        exclude_counts_from_save(self, self.COUNTS_FIELDS_NAMES, kwargs)
         return super(User, self).save(*args, **kwargs)
 
     def update_profile_cover(self, cover, save=True):
         if cover is None:
             self.delete_profile_cover(save=False)
         else:
-            self.profile.cover = cover
+            PendingImage.set_image_of_instance(instance=self.profile, field_name='cover', image=cover)
 
         if save:
             self.profile.save()
 
     def delete_profile_cover(self, save=True):
+        PendingImage.discard_pending_images_of_instance(instance=self.profile, field_name='cover')
         delete_image_kit_image_field(self.profile.cover)
         self.profile.cover = None
         self.profile.cover.delete(save=save)
@@ -242,12 +275,15 @@ class User(AbstractUser):
         if avatar is None:
             self.delete_profile_avatar(save=False)
         else:
-            self.profile.avatar = avatar
+            PendingImage.set_image_of_instance(instance=self.profile, field_name='avatar', image=avatar)
 
         if save:
             self.profile.save()
 
     def delete_profile_avatar(self, save=True):
+        PendingImage.discard_pending_images_of_instance(instance=self.profile, field_name='avatar')
+        delete_image_kit_image_field(self.profile.avatar_thumbnail)
+        self.profile.avatar_thumbnail = None
         delete_image_kit_image_field(self.profile.avatar)
         self.profile.avatar = None
         self.profile.avatar.delete(save=save)
@@ -340,6 +376,10 @@ class User(AbstractUser):
         return notifications_settings
 
     def is_fully_connected_with_user_with_id(self, user_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_fully_connected_with_user_with_id(user_id)
+
         if not self.is_connected_with_user_with_id(user_id):
             return False
 
@@ -355,6 +395,10 @@ class User(AbstractUser):
         return False
 
     def is_pending_confirm_connection_for_user_with_id(self, user_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_pending_confirm_connection_for_user_with_id(user_id)
+
         if not self.is_connected_with_user_with_id(user_id):
             return False
 
@@ -367,6 +411,10 @@ class User(AbstractUser):
         return self.is_connected_with_user_with_id(user.pk)
 
     def is_connected_with_user_with_id(self, user_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_connected_with_user_with_id(user_id)
+
         return self.connections.select_related('target_connection__user_id').filter(
             target_connection__user_id=user_id).exists()
 
@@ -379,6 +427,10 @@ class User(AbstractUser):
         return self.is_connected_with_user_with_id_in_circle_with_id(user.pk, circle.pk)
 
     def is_connected_with_user_with_id_in_circle_with_id(self, user_id, circle_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_connected_with_user_with_id_in_circles_with_ids(user_id, [circle_id])
+
         return self.connections.select_related('target_connection__user_id').filter(
             target_connection__user_id=user_id,
             circles__id=circle_id).exists()
@@ -388,6 +440,10 @@ class User(AbstractUser):
         return self.is_connected_with_user_with_id_in_circles_with_ids(user.pk, circles_ids)
 
     def is_connected_with_user_with_id_in_circles_with_ids(self, user_id, circles_ids):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_connected_with_user_with_id_in_circles_with_ids(user_id, circles_ids)
+
         count = self.connections.filter(
             target_connection__user_id=user_id,
             circles__id__in=circles_ids).count()
@@ -397,6 +453,10 @@ class User(AbstractUser):
         return self.is_following_user_with_id(user.pk)
 
     def is_following_user_with_id(self, user_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_following_user_with_id(user_id)
+
         return self.follows.filter(followed_user__id=user_id).exists()
 
     def is_following_user_with_username(self, user_username):
@@ -406,6 +466,10 @@ class User(AbstractUser):
         return self.is_following_user_with_id_in_list_with_id(user.pk, list.pk)
 
     def is_following_user_with_id_in_list_with_id(self, user_id, list_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_following_user_with_id_in_list_with_id(user_id, list_id)
+
         return self.follows.filter(
             followed_user_id=user_id,
             lists__id=list_id).count() == 1
@@ -427,6 +491,10 @@ class User(AbstractUser):
         return self.posts.filter(id=post_id).exists()
 
     def has_muted_post_with_id(self, post_id):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.has_muted_post_with_id(post_id)
+
         return self.post_mutes.filter(post_id=post_id).exists()
 
     def has_circles_with_ids(self, circles_ids):
@@ -440,21 +508,37 @@ class User(AbstractUser):
                                                        community__name=community_name).exists()
 
     def is_administrator_of_community_with_name(self, community_name):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_administrator_of_community_with_name(community_name)
+
         return self.communities_memberships.filter(community__name=community_name, is_administrator=True).exists()
 
     def is_member_of_communities(self):
         return self.communities_memberships.all().exists()
 
     def is_member_of_community_with_name(self, community_name):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_member_of_community_with_name(community_name)
+
         return self.communities_memberships.filter(community__name=community_name).exists()
 
     def is_banned_from_community_with_name(self, community_name):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_banned_from_community_with_name(community_name)
+
         return self.banned_of_communities.filter(name=community_name).exists()
 
     def is_creator_of_community_with_name(self, community_name):
         return self.created_communities.filter(name=community_name).exists()
 
     def is_moderator_of_community_with_name(self, community_name):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            return relationships_snapshot.is_moderator_of_community_with_name(community_name)
+
         return self.communities_memberships.filter(community__name=community_name, is_moderator=True).exists()
 
     def is_invited_to_community_with_name(self, community_name):
@@ -626,37 +710,42 @@ class User(AbstractUser):
         Post = get_post_model()
         post = Post.objects.filter(pk=post_id).get()
         post_comment = post.comment(text=text, commenter=self)
-        post_creator = post.creator
         post_commenter = self
 
-        post_notification_target_users = Post.get_post_comment_notification_target_users(post_id=post.id,
-                                                                                         post_commenter_id=self.pk)
+        post_notification_target_users = list(Post.get_post_comment_notification_target_users(post_id=post.id,
+                                                                                              post_commenter_id=self.pk))
         PostCommentNotification = get_post_comment_notification_model()
+        PostCommentNotification.create_post_comment_notifications(post_comment_id=post_comment.pk,
+                                                                  owners_ids=[post_notification_target_user.pk for
+                                                                              post_notification_target_user in
+                                                                              post_notification_target_users])
 
-        for post_notification_target_user in post_notification_target_users:
-
-            post_notification_target_user_is_post_creator = post_notification_target_user.id == post_creator.id
-            post_notification_target_has_comment_notifications_enabled = post_notification_target_user.has_comment_notifications_enabled_for_post_with_id(
-                post_id=post_comment.post_id)
-
-            if post_notification_target_has_comment_notifications_enabled:
-                PostCommentNotification.create_post_comment_notification(post_comment_id=post_comment.pk,
-                                                                         owner_id=post_notification_target_user.id)
+        post_creator_push_notification_target_users = []
+        post_commenters_push_notification_target_users = []
 
-                if post_notification_target_user_is_post_creator:
-                    notification_message = {
-                        "en": _('@%(post_commenter_username)s commented on your post.') % {
-                            'post_commenter_username': post_commenter.username
-                        }}
-                else:
-                    notification_message = {
-                        "en": _('@%(post_commenter_username)s commented on a post you also commented on.') % {
-                            'post_commenter_username': post_commenter.username
-                        }}
-
-                self._send_post_comment_push_notification(post_comment=post_comment,
-                                                          notification_message=notification_message,
-                                                          notification_target_user=post_notification_target_user)
+        for post_notification_target_user in post_notification_target_users:
+            if post_notification_target_user.pk == post.creator_id:
+                post_creator_push_notification_target_users.append(post_notification_target_user)
+            else:
+                post_commenters_push_notification_target_users.append(post_notification_target_user)
+
+        if post_creator_push_notification_target_users:
+            notification_message = {
+                "en": _('@%(post_commenter_username)s commented on your post.') % {
+                    'post_commenter_username': post_commenter.username
+                }}
+            self._send_post_comment_push_notification(post_comment=post_comment,
+                                                      notification_message=notification_message,
+                                                      notification_target_users=post_creator_push_notification_target_users)
+
+        if post_commenters_push_notification_target_users:
+            notification_message = {
+                "en": _('@%(post_commenter_username)s commented on a post you also commented on.') % {
+                    'post_commenter_username': post_commenter.username
+                }}
+            self._send_post_comment_push_notification(post_comment=post_comment,
+                                                      notification_message=notification_message,
+                                                      notification_target_users=post_commenters_push_notification_target_users)
 
         return post_comment
 
@@ -680,8 +769,15 @@ class User(AbstractUser):
     def delete_circle_with_id(self, circle_id):
         self._check_can_delete_circle_with_id(circle_id)
         circle = self.circles.get(id=circle_id)
+        circle_posts = list(circle.posts.all())
         circle.delete()
 
+        TimelinePost = get_timeline_post_model()
+        for circle_post in circle_posts:
+            TimelinePost.refresh_post_in_timelines(post=circle_post)
+
+        self._clear_relationships_snapshot()
+
     def update_circle(self, circle, **kwargs):
         return self.update_circle_with_id(circle.pk, **kwargs)
 
@@ -697,38 +793,10 @@ class User(AbstractUser):
             circle_to_update.color = color
 
         if isinstance(usernames, list):
-            # TODO This is a goddamn expensive operation. Improve.
-            new_circle_users = []
-
-            circle_users = circle_to_update.users
-            circle_users_by_username = {}
-
-            for circle_user in circle_users:
-                circle_user_username = circle_user.username
-                circle_users_by_username[circle_user_username] = circle_user
-
-            for username in usernames:
-                user = User.objects.get(username=username)
-                user_exists_in_circle = username in circle_users_by_username
-                if user_exists_in_circle:
-                    # The username added might not be same person we had before
-                    new_circle_users.append(circle_users_by_username[username])
-                else:
-                    new_circle_users.append(user)
-
-            circle_users_to_remove = filter(lambda circle_user: circle_user not in new_circle_users, circle_users)
-
-            for user_to_remove in circle_users_to_remove:
-                self.remove_circle_with_id_from_connection_with_user_with_id(user_to_remove.pk, circle_to_update.pk)
-
-            for new_circle_user in new_circle_users:
-                if not self.is_connected_with_user_with_id_in_circle_with_id(new_circle_user.pk, circle_to_update.pk):
-                    if self.is_connected_with_user_with_id(new_circle_user.pk):
-                        self.add_circle_with_id_to_connection_with_user_with_id(new_circle_user.pk, circle_to_update.pk)
-                    else:
-                        self.connect_with_user_with_id(new_circle_user.pk, circles_ids=[circle_to_update.pk])
+            self._update_circle_with_id_users_with_usernames(circle_id=circle_to_update.pk, usernames=usernames)
 
         circle_to_update.save()
+        self._clear_relationships_snapshot()
         return circle_to_update
 
     def remove_circle_with_id_from_connection_with_user_with_id(self, user_id, circle_id):
@@ -736,6 +804,8 @@ class User(AbstractUser):
         self._check_is_connected_with_user_with_id_in_circle_with_id(user_id, circle_id)
         connection = self.get_connection_for_user_with_id(user_id)
         connection.circles.remove(circle_id)
+        self._refresh_timeline_posts_of_user_with_id_for_own_posts(user_id)
+        self._clear_relationships_snapshot()
         return connection
 
     def add_circle_with_id_to_connection_with_user_with_id(self, user_id, circle_id):
@@ -743,6 +813,8 @@ class User(AbstractUser):
         self._check_is_not_connected_with_user_with_id_in_circle_with_id(user_id, circle_id)
         connection = self.get_connection_for_user_with_id(user_id)
         connection.circles.add(circle_id)
+        self._refresh_timeline_posts_of_user_with_id_for_own_posts(user_id)
+        self._clear_relationships_snapshot()
         return connection
 
     def get_circle_with_id(self, circle_id):
@@ -781,6 +853,8 @@ class User(AbstractUser):
                                                categories_names=categories_names,
                                                invites_enabled=invites_enabled)
 
+        self._clear_relationships_snapshot()
+
         return community
 
     def delete_community(self, community):
@@ -792,8 +866,17 @@ class User(AbstractUser):
         Community = get_community_model()
         community = Community.objects.get(name=community_name)
 
+        community_posts_counts = list(
+            community.posts.values('creator_id').annotate(count=Count('id')).order_by())
+
         community.delete()
 
+        for community_posts_count in community_posts_counts:
+            update_count(User.objects.filter(pk=community_posts_count['creator_id']), 'posts_count',
+                         -community_posts_count['count'])
+
+        self._clear_relationships_snapshot()
+
     def update_community(self, community, title=None, name=None, description=None, color=None, type=None,
                          user_adjective=None,
                          users_adjective=None, rules=None):
@@ -824,7 +907,7 @@ class User(AbstractUser):
 
         Community = get_community_model()
         community_to_update_avatar_from = Community.objects.get(name=community_name)
-        community_to_update_avatar_from.avatar = avatar
+        PendingImage.set_image_of_instance(instance=community_to_update_avatar_from, field_name='avatar', image=avatar)
 
         community_to_update_avatar_from.save()
 
@@ -834,6 +917,9 @@ class User(AbstractUser):
         self._check_can_update_community_with_name(community_name)
         Community = get_community_model()
         community_to_delete_avatar_from = Community.objects.get(name=community_name)
+        PendingImage.discard_pending_images_of_instance(instance=community_to_delete_avatar_from, field_name='avatar')
+        delete_image_kit_image_field(community_to_delete_avatar_from.avatar_thumbnail)
+        community_to_delete_avatar_from.avatar_thumbnail = None
         delete_image_kit_image_field(community_to_delete_avatar_from.avatar)
         community_to_delete_avatar_from.avatar = None
         community_to_delete_avatar_from.save()
@@ -846,7 +932,7 @@ class User(AbstractUser):
         Community = get_community_model()
         community_to_update_cover_from = Community.objects.get(name=community_name)
 
-        community_to_update_cover_from.cover = cover
+        PendingImage.set_image_of_instance(instance=community_to_update_cover_from, field_name='cover', image=cover)
 
         community_to_update_cover_from.save()
 
@@ -858,6 +944,7 @@ class User(AbstractUser):
         Community = get_community_model()
         community_to_delete_cover_from = Community.objects.get(name=community_name)
 
+        PendingImage.discard_pending_images_of_instance(instance=community_to_delete_cover_from, field_name='cover')
         delete_image_kit_image_field(community_to_delete_cover_from.cover)
         community_to_delete_cover_from.cover = None
         community_to_delete_cover_from.save()
@@ -871,13 +958,13 @@ class User(AbstractUser):
         return Community.get_community_with_name_members(community_name=community_name, members_max_id=max_id,
                                                          exclude_keywords=exclude_keywords)
 
-    def search_community_with_name_members(self, community_name, query, exclude_keywords=None):
+    def search_community_with_name_members(self, community_name, query, exclude_keywords=None, max_id=None):
         self._check_can_get_community_with_name_members(
             community_name=community_name)
 
         Community = get_community_model()
         return Community.search_community_with_name_members(community_name=community_name, query=query,
-                                                            exclude_keywords=exclude_keywords)
+                                                            exclude_keywords=exclude_keywords, max_id=max_id)
 
     def join_community_with_name(self, community_name):
         self._check_can_join_community_with_name(
@@ -886,12 +973,18 @@ class User(AbstractUser):
         community_to_join = Community.objects.get(name=community_name)
         community_to_join.add_member(self)
 
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.add_community_with_id_posts_to_timeline_of_owner_with_id(community_id=community_to_join.pk,
+                                                                              owner_id=self.pk)
+
         # Clean up any invites
         CommunityInvite = get_community_invite_model()
         CommunityInvite.objects.filter(community__name=community_name, invited_user__username=self.username).delete()
 
         # No need to delete community invite notifications as they are delete cascaded
 
+        self._clear_relationships_snapshot()
+
         return community_to_join
 
     def leave_community_with_name(self, community_name):
@@ -906,6 +999,13 @@ class User(AbstractUser):
 
         community_to_leave.remove_member(self)
 
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.remove_community_with_id_posts_from_timeline_of_owner_with_id(
+            community_id=community_to_leave.pk,
+            owner_id=self.pk)
+
+        self._clear_relationships_snapshot()
+
         return community_to_leave
 
     def invite_user_with_username_to_community_with_name(self, username, community_name):
@@ -943,12 +1043,13 @@ class User(AbstractUser):
         return Community.get_community_with_name_administrators(community_name=community_name,
                                                                 administrators_max_id=max_id)
 
-    def search_community_with_name_administrators(self, community_name, query):
+    def search_community_with_name_administrators(self, community_name, query, max_id=None):
         self._check_can_get_community_with_name_administrators(
             community_name=community_name)
 
         Community = get_community_model()
-        return Community.search_community_with_name_administrators(community_name=community_name, query=query)
+        return Community.search_community_with_name_administrators(community_name=community_name, query=query,
+                                                                   max_id=max_id)
 
     def add_administrator_with_username_to_community_with_name(self, username, community_name):
         self._check_can_add_administrator_with_username_to_community_with_name(
@@ -968,6 +1069,8 @@ class User(AbstractUser):
             self.remove_moderator_with_username_from_community_with_name(username=username,
                                                                          community_name=community_name)
 
+        self._clear_relationships_snapshot()
+
         return community_to_add_administrator_to
 
     def remove_administrator_with_username_from_community_with_name(self, username, community_name):
@@ -984,6 +1087,8 @@ class User(AbstractUser):
         community_to_remove_administrator_from.create_remove_administrator_log(source_user=self,
                                                                                target_user=user_to_remove_as_administrator)
 
+        self._clear_relationships_snapshot()
+
         return community_to_remove_administrator_from
 
     def get_community_with_name_moderators(self, community_name, max_id):
@@ -994,12 +1099,13 @@ class User(AbstractUser):
         return Community.get_community_with_name_moderators(community_name=community_name,
                                                             moderators_max_id=max_id)
 
-    def search_community_with_name_moderators(self, community_name, query):
+    def search_community_with_name_moderators(self, community_name, query, max_id=None):
         self._check_can_get_community_with_name_moderators(
             community_name=community_name)
 
         Community = get_community_model()
-        return Community.search_community_with_name_moderators(community_name=community_name, query=query)
+        return Community.search_community_with_name_moderators(community_name=community_name, query=query,
+                                                               max_id=max_id)
 
     def add_moderator_with_username_to_community_with_name(self, username, community_name):
         self._check_can_add_moderator_with_username_to_community_with_name(
@@ -1016,6 +1122,8 @@ class User(AbstractUser):
         community_to_add_moderator_to.create_add_moderator_log(source_user=self,
                                                                target_user=user_to_add_as_moderator)
 
+        self._clear_relationships_snapshot()
+
         return community_to_add_moderator_to
 
     def remove_moderator_with_username_from_community_with_name(self, username, community_name):
@@ -1032,6 +1140,8 @@ class User(AbstractUser):
         community_to_remove_moderator_from.create_remove_moderator_log(source_user=self,
                                                                        target_user=user_to_remove_as_moderator)
 
+        self._clear_relationships_snapshot()
+
         return community_to_remove_moderator_from
 
     def get_community_with_name_banned_users(self, community_name, max_id):
@@ -1041,12 +1151,13 @@ class User(AbstractUser):
         Community = get_community_model()
         return Community.get_community_with_name_banned_users(community_name=community_name, users_max_id=max_id)
 
-    def search_community_with_name_banned_users(self, community_name, query):
+    def search_community_with_name_banned_users(self, community_name, query, max_id=None):
         self._check_can_get_community_with_name_banned_users(
             community_name=community_name)
 
         Community = get_community_model()
-        return Community.search_community_with_name_banned_users(community_name=community_name, query=query)
+        return Community.search_community_with_name_banned_users(community_name=community_name, query=query,
+                                                                 max_id=max_id)
 
     def ban_user_with_username_from_community_with_name(self, username, community_name):
         self._check_can_ban_user_with_username_from_community_with_name(username=username,
@@ -1092,6 +1203,8 @@ class User(AbstractUser):
         list = self.lists.get(id=list_id)
         list.delete()
 
+        self._clear_relationships_snapshot()
+
     def update_list(self, list, **kwargs):
         return self.update_list_with_id(list.pk, **kwargs)
 
@@ -1107,38 +1220,10 @@ class User(AbstractUser):
             list_to_update.emoji_id = emoji_id
 
         if isinstance(usernames, list):
-            # TODO This is a goddamn expensive operation. Improve.
-            new_list_users = []
-
-            list_users = list_to_update.users
-            list_users_by_username = {}
-
-            for list_user in list_users:
-                list_user_username = list_user.username
-                list_users_by_username[list_user_username] = list_user
-
-            for username in usernames:
-                user = User.objects.get(username=username)
-                user_exists_in_list = username in list_users_by_username
-                if user_exists_in_list:
-                    # The username added might not be same person we had before
-                    new_list_users.append(list_users_by_username[username])
-                else:
-                    new_list_users.append(user)
-
-            list_users_to_remove = filter(lambda list_user: list_user not in new_list_users, list_users)
-
-            for user_to_remove in list_users_to_remove:
-                self.remove_list_with_id_from_follow_for_user_with_id(user_to_remove.pk, list_to_update.pk)
-
-            for new_list_user in new_list_users:
-                if not self.is_following_user_with_id_in_list_with_id(new_list_user.pk, list_to_update.pk):
-                    if self.is_following_user_with_id(new_list_user.pk):
-                        self.add_list_with_id_to_follow_for_user_with_id(new_list_user.pk, list_to_update.pk)
-                    else:
-                        self.follow_user_with_id(new_list_user.pk, lists_ids=[list_to_update.pk])
+            self._update_list_with_id_users_with_usernames(list_id=list_to_update.pk, usernames=usernames)
 
         list_to_update.save()
+        self._clear_relationships_snapshot()
         return list_to_update
 
     def get_list_with_id(self, list_id):
@@ -1147,7 +1232,9 @@ class User(AbstractUser):
 
     def search_users_with_query(self, query):
         # In the future, the user might have blocked users which should not be displayed
-        return User.get_public_users_with_query(query)
+        users_query = UserSearchToken.make_users_with_query_query(query=query)
+        return User.objects.filter(users_query).annotate(
+            search_rank=User._make_search_rank(query=query, linked_to_user=self)).order_by('-search_rank', 'username')
 
     def get_linked_users(self, max_id=None):
         # All users which are connected with us and we have accepted by adding
@@ -1159,17 +1246,17 @@ class User(AbstractUser):
     def search_linked_users_with_query(self, query):
         linked_users_query = self._make_linked_users_query()
 
-        names_query = Q(username__icontains=query)
-        names_query.add(Q(profile__name__icontains=query), Q.OR)
+        names_query = UserSearchToken.make_users_with_query_query(query=query)
 
         linked_users_query.add(names_query, Q.AND)
 
-        return User.objects.filter(linked_users_query).distinct()
+        return User.objects.filter(linked_users_query).annotate(
+            search_rank=User._make_search_rank(query=query)).order_by('-search_rank', 'username').distinct()
 
-    def search_communities_with_query(self, query):
+    def search_communities_with_query(self, query, max_id=None):
         # In the future, the user might have blocked communities which should not be displayed
         Community = get_community_model()
-        return Community.search_communities_with_query(query)
+        return Community.search_communities_with_query(query, max_id=max_id)
 
     def get_community_with_name(self, community_name):
         Community = get_community_model()
@@ -1179,13 +1266,16 @@ class User(AbstractUser):
         Community = get_community_model()
         return Community.objects.filter(memberships__user=self)
 
-    def search_joined_communities_with_query(self, query):
+    def search_joined_communities_with_query(self, query, max_id=None):
+        Community = get_community_model()
+        CommunitySearchToken = get_community_search_token_model()
+
         joined_communities_query = Q(memberships__user=self)
-        joined_communities_name_query = Q(name__icontains=query)
-        joined_communities_name_query.add(Q(title__icontains=query), Q.OR)
+        joined_communities_name_query = CommunitySearchToken.make_communities_with_query_query(query=query)
         joined_communities_query.add(joined_communities_name_query, Q.AND)
-        Community = get_community_model()
-        return Community.objects.filter(joined_communities_query)
+
+        return paginate_ranked_search_results(queryset=Community.objects.filter(joined_communities_query),
+                                              exact_match_query=Q(name__iexact=query), max_id=max_id)
 
     def get_favorite_communities(self):
         return self.favorite_communities.all()
@@ -1224,9 +1314,18 @@ class User(AbstractUser):
     def delete_post_with_id(self, post_id):
         self._check_can_delete_post_with_id(post_id)
         Post = get_post_model()
+        post = Post.objects.get(pk=post_id)
+        is_public_post = post.is_public_post()
+
         # We have to be mindful with using bulk delete as it does not call the delete() method per instance
         Post.objects.filter(id=post_id).delete()
 
+        creator_query = User.objects.filter(pk=post.creator_id)
+        update_count(creator_query, 'posts_count', -1)
+
+        if is_public_post:
+            update_count(creator_query, 'public_posts_count', -1)
+
     def get_posts_for_community_with_name(self, community_name, max_id=None):
         """
         :param community_name:
@@ -1310,41 +1409,23 @@ class User(AbstractUser):
         :param username:
         :return:
         """
-        # If there's no circles or lists filters, add all posts
-        if circles_ids:
-            timeline_posts_query = Q(creator=self.pk, circles__id__in=circles_ids)
-        elif lists_ids:
-            timeline_posts_query = Q()
-        else:
-            timeline_posts_query = Q(creator_id=self.pk)
+        Post = get_post_model()
+        TimelinePost = get_timeline_post_model()
 
-        follows_related_query = self.follows.select_related('followed_user')
+        if TimelinePost.is_enabled() and not circles_ids and not lists_ids:
+            # The timeline is materialized, read it straight from our timeline posts
+            timeline_posts_query = Q(timeline_posts__owner_id=self.pk)
 
-        # If there's lists filters, filter follows with it
-        if lists_ids:
-            follows = follows_related_query.filter(lists__id__in=lists_ids)
-        else:
-            follows = follows_related_query.all()
-
-        for follow in follows:
-            followed_user = follow.followed_user
-            if circles_ids:
-                # Check that the user belongs to the filtered circles
-                if self.is_connected_with_user_with_id_in_circles_with_ids(followed_user.pk, circles_ids):
-                    followed_user_posts_query = self._make_get_posts_query_for_user(followed_user, )
-                    timeline_posts_query.add(followed_user_posts_query, Q.OR)
-            else:
-                followed_user_posts_query = self._make_get_posts_query_for_user(followed_user, )
-                timeline_posts_query.add(followed_user_posts_query, Q.OR)
+            if max_id:
+                timeline_posts_query.add(Q(id__lt=max_id), Q.AND)
 
-        if not circles_ids and not lists_ids:
-            timeline_posts_query.add(Q(community__memberships__user__id=self.pk), Q.OR)
+            return Post.objects.filter(timeline_posts_query)
+
+        timeline_posts_query = self._make_timeline_posts_query(lists_ids=lists_ids, circles_ids=circles_ids)
 
         if max_id:
             timeline_posts_query.add(Q(id__lt=max_id), Q.AND)
 
-        Post = get_post_model()
-
         if not timeline_posts_query.children:
             timeline_posts = Post.objects.none()
         else:
@@ -1370,9 +1451,12 @@ class User(AbstractUser):
 
         Follow = get_follow_model()
         follow = Follow.create_follow(user_id=self.pk, followed_user_id=user_id, lists_ids=lists_ids)
+        self._refresh_timeline_posts_for_user_with_id(user_id)
         self._create_follow_notification(followed_user_id=user_id)
         self._send_follow_push_notification(followed_user_id=user_id)
 
+        self._clear_relationships_snapshot()
+
         return follow
 
     def unfollow_user(self, user):
@@ -1383,6 +1467,9 @@ class User(AbstractUser):
         follow = self.follows.get(followed_user_id=user_id)
         self._delete_follow_notification(followed_user_id=user_id)
         follow.delete()
+        self._refresh_timeline_posts_for_user_with_id(user_id)
+
+        self._clear_relationships_snapshot()
 
     def update_follow_for_user(self, user, lists_ids=None):
         return self.update_follow_for_user_with_id(user.pk, lists_ids=lists_ids)
@@ -1401,6 +1488,8 @@ class User(AbstractUser):
         follow.lists.add(*lists_ids)
         follow.save()
 
+        self._clear_relationships_snapshot()
+
         return follow
 
     def remove_list_with_id_from_follow_for_user_with_id(self, user_id, list_id):
@@ -1408,6 +1497,7 @@ class User(AbstractUser):
         self._check_is_following_user_with_id_in_list_with_id(user_id, list_id)
         follow = self.get_follow_for_user_with_id(user_id)
         follow.lists.remove(list_id)
+        self._clear_relationships_snapshot()
         return follow
 
     def add_list_with_id_to_follow_for_user_with_id(self, user_id, list_id):
@@ -1415,6 +1505,7 @@ class User(AbstractUser):
         self._check_is_not_following_user_with_id_in_list_with_id(user_id, list_id)
         follow = self.get_follow_for_user_with_id(user_id)
         follow.lists.add(list_id)
+        self._clear_relationships_snapshot()
         return follow
 
     def connect_with_user_with_id(self, user_id, circles_ids=None):
@@ -1439,9 +1530,13 @@ class User(AbstractUser):
         if not self.is_following_user_with_id(user_id):
             self.follow_user_with_id(user_id)
 
+        self._refresh_timelines_posts_for_connection_with_user_with_id(user_id)
+
         self._create_connection_request_notification(user_connection_requested_for_id=user_id)
         self._send_connection_request_push_notification(user_connection_requested_for_id=user_id)
 
+        self._clear_relationships_snapshot()
+
         return connection
 
     def confirm_connection_with_user_with_id(self, user_id, circles_ids=None):
@@ -1461,6 +1556,8 @@ class User(AbstractUser):
 
         self._create_connection_confirmed_notification(user_connected_with_id=user_id)
 
+        self._clear_relationships_snapshot()
+
         return connection
 
     def update_connection_with_user_with_id(self, user_id, circles_ids=None):
@@ -1480,6 +1577,10 @@ class User(AbstractUser):
         connection.circles.add(*circles_ids)
         connection.save()
 
+        self._refresh_timelines_posts_for_connection_with_user_with_id(user_id)
+
+        self._clear_relationships_snapshot()
+
         return connection
 
     def disconnect_from_user(self, user):
@@ -1497,6 +1598,10 @@ class User(AbstractUser):
         connection = self.connections.get(target_connection__user_id=user_id)
         connection.delete()
 
+        self._refresh_timelines_posts_for_connection_with_user_with_id(user_id)
+
+        self._clear_relationships_snapshot()
+
         return connection
 
     def get_connection_for_user_with_id(self, user_id):
@@ -1519,13 +1624,20 @@ class User(AbstractUser):
         if max_id:
             notifications_query.add(Q(id__lte=max_id), Q.AND)
 
-        self.notifications.filter(notifications_query).update(read=True)
+        read_notifications_count = self.notifications.filter(notifications_query).update(read=True)
+
+        if read_notifications_count:
+            update_count(User.objects.filter(pk=self.pk), 'unread_notifications_count', -read_notifications_count)
 
     def read_notification_with_id(self, notification_id):
         self._check_can_read_notification_with_id(notification_id)
         notification = self.notifications.get(id=notification_id)
-        notification.read = True
-        notification.save()
+
+        if not notification.read:
+            notification.read = True
+            notification.save()
+            update_count(User.objects.filter(pk=self.pk), 'unread_notifications_count', -1)
+
         return notification
 
     def delete_notification_with_id(self, notification_id):
@@ -1572,6 +1684,7 @@ class User(AbstractUser):
         PostMute = get_post_mute_model()
         PostMute.create_post_mute(post_id=post_id, muter_id=self.pk)
         post = Post.objects.get(pk=post_id)
+        self._clear_relationships_snapshot()
         return post
 
     def unmute_post_with_id(self, post_id):
@@ -1579,6 +1692,7 @@ class User(AbstractUser):
         self.post_mutes.filter(post_id=post_id).delete()
         Post = get_post_model()
         post = Post.objects.get(pk=post_id)
+        self._clear_relationships_snapshot()
         return post
 
     def _generate_password_reset_link(self, token):
@@ -1603,10 +1717,10 @@ class User(AbstractUser):
         email.attach_alternative(html_content, 'text/html')
         email.send()
 
-    def _send_post_comment_push_notification(self, post_comment, notification_message, notification_target_user):
-        senders.send_post_comment_push_notification_with_message(post_comment=post_comment,
-                                                                 message=notification_message,
-                                                                 target_user=notification_target_user)
+    def _send_post_comment_push_notification(self, post_comment, notification_message, notification_target_users):
+        senders.send_post_comment_push_notification_with_message_to_users(post_comment=post_comment,
+                                                                          message=notification_message,
+                                                                          target_users=notification_target_users)
 
     def _delete_post_comment_notification(self, post_comment):
         PostCommentNotification = get_post_comment_notification_model()
@@ -1689,55 +1803,240 @@ class User(AbstractUser):
 
         return linked_users_query
 
+    def enable_relationships_snapshot(self):
+        """
+        Makes the relationship predicates of this user instance answer from a lazily loaded snapshot
+        instead of a query each, used for the authenticated user of a request.
+        """
+        self._relationships_snapshot = UserRelationshipsSnapshot(user=self)
+
+    def _get_relationships_snapshot(self):
+        return getattr(self, '_relationships_snapshot', None)
+
+    def _clear_relationships_snapshot(self):
+        relationships_snapshot = self._get_relationships_snapshot()
+        if relationships_snapshot:
+            relationships_snapshot.clear()
+
+    def _update_circle_with_id_users_with_usernames(self, circle_id, usernames):
+        """
+        Diffs the users of the circle against the given usernames and applies the difference in bulk,
+        connecting with the users we are not connected with yet.
+        """
+        users_ids = set(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+
+        if self.pk in users_ids:
+            raise ValidationError(
+                _('A user cannot connect with itself.'),
+            )
+
+        Connection = get_connection_model()
+        connections = Connection.objects.filter(user_id=self.pk)
+        connected_users_ids = set(connections.values_list('target_user_id', flat=True))
+        circle_users_ids = set(connections.filter(circles__id=circle_id).values_list('target_user_id', flat=True))
+
+        users_ids_to_remove = circle_users_ids - users_ids
+        users_ids_to_add = (users_ids & connected_users_ids) - circle_users_ids
+        users_ids_to_connect = users_ids - connected_users_ids
+
+        ConnectionCircle = Connection.circles.through
+
+        if users_ids_to_remove:
+            ConnectionCircle.objects.filter(circle_id=circle_id, connection__user_id=self.pk,
+                                            connection__target_user_id__in=users_ids_to_remove).delete()
+
+        if users_ids_to_add:
+            connections_ids_to_add = connections.filter(target_user_id__in=users_ids_to_add).values_list('id',
+                                                                                                         flat=True)
+            ConnectionCircle.objects.bulk_create(
+                [ConnectionCircle(circle_id=circle_id, connection_id=connection_id) for connection_id in
+                 connections_ids_to_add])
+
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.refresh_timelines_of_owners_with_ids_for_creator_with_id(
+            owners_ids=users_ids_to_remove | users_ids_to_add, creator_id=self.pk)
+
+        self._connect_with_users_with_ids(users_ids_to_connect, circles_ids=[circle_id, self.connections_circle_id])
+
+    def _update_list_with_id_users_with_usernames(self, list_id, usernames):
+        """
+        Diffs the users of the list against the given usernames and applies the difference in bulk,
+        following the users we do not follow yet.
+        """
+        users_ids = set(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+
+        if self.pk in users_ids:
+            raise ValidationError(
+                _('A user cannot follow itself.'),
+            )
+
+        Follow = get_follow_model()
+        follows = Follow.objects.filter(user_id=self.pk)
+        followed_users_ids = set(follows.values_list('followed_user_id', flat=True))
+        list_users_ids = set(follows.filter(lists__id=list_id).values_list('followed_user_id', flat=True))
+
+        users_ids_to_remove = list_users_ids - users_ids
+        users_ids_to_add = (users_ids & followed_users_ids) - list_users_ids
+        users_ids_to_follow = users_ids - followed_users_ids
+
+        FollowList = Follow.lists.through
+
+        if users_ids_to_remove:
+            FollowList.objects.filter(list_id=list_id, follow__user_id=self.pk,
+                                      follow__followed_user_id__in=users_ids_to_remove).delete()
+
+        if users_ids_to_add:
+            follows_ids_to_add = follows.filter(followed_user_id__in=users_ids_to_add).values_list('id', flat=True)
+            FollowList.objects.bulk_create(
+                [FollowList(list_id=list_id, follow_id=follow_id) for follow_id in follows_ids_to_add])
+
+        self._follow_users_with_ids(users_ids_to_follow, lists_ids=[list_id])
+
+    def _connect_with_users_with_ids(self, users_ids, circles_ids):
+        """
+        Bulk version of connect_with_user_with_id for users we are not connected with
+        """
+        if not users_ids:
+            return
+
+        Connection = get_connection_model()
+        Connection.create_connections(user_id=self.pk, target_users_ids=list(users_ids), circles_ids=circles_ids)
+
+        # Automatically follow users
+        followed_users_ids = set(
+            self.follows.filter(followed_user_id__in=users_ids).values_list('followed_user_id', flat=True))
+        self._follow_users_with_ids(set(users_ids) - followed_users_ids)
+
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.refresh_timeline_of_owner_with_id_for_creators_with_ids(owner_id=self.pk, creators_ids=users_ids)
+        TimelinePost.refresh_timelines_of_owners_with_ids_for_creator_with_id(owners_ids=users_ids, creator_id=self.pk)
+
+        ConnectionRequestNotification = get_connection_request_notification_model()
+        ConnectionRequestNotification.create_connection_request_notifications(connection_requester_id=self.pk,
+                                                                              owners_ids=list(users_ids))
+
+        connection_requested_for_users = User.objects.filter(pk__in=users_ids).select_related('notifications_settings')
+        senders.send_connection_request_push_notification_to_users(
+            connection_requester=self,
+            connection_requested_for_users=list(connection_requested_for_users))
+
+    def _follow_users_with_ids(self, users_ids, lists_ids=None):
+        """
+        Bulk version of follow_user_with_id for users we do not follow
+        """
+        if not users_ids:
+            return
+
+        if self.count_following() + len(users_ids) - 1 > settings.USER_MAX_FOLLOWS:
+            raise ValidationError(
+                _('Maximum number of follows reached.'),
+            )
+
+        Follow = get_follow_model()
+        Follow.create_follows(user_id=self.pk, followed_users_ids=list(users_ids), lists_ids=lists_ids)
+
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.refresh_timeline_of_owner_with_id_for_creators_with_ids(owner_id=self.pk, creators_ids=users_ids)
+
+        FollowNotification = get_follow_notification_model()
+        FollowNotification.create_follow_notifications(follower_id=self.pk, owners_ids=list(users_ids))
+
+        followed_users = User.objects.filter(pk__in=users_ids).select_related('notifications_settings')
+        senders.send_follow_push_notification_to_users(followed_users=list(followed_users), following_user=self)
+
+    def _refresh_timeline_posts_for_user_with_id(self, user_id):
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.refresh_timeline_of_owner_with_id_for_creator_with_id(owner_id=self.pk, creator_id=user_id)
+
+    def _refresh_timeline_posts_of_user_with_id_for_own_posts(self, user_id):
+        TimelinePost = get_timeline_post_model()
+        TimelinePost.refresh_timeline_of_owner_with_id_for_creator_with_id(owner_id=user_id, creator_id=self.pk)
+
+    def _refresh_timelines_posts_for_connection_with_user_with_id(self, user_id):
+        self._refresh_timeline_posts_for_user_with_id(user_id)
+        self._refresh_timeline_posts_of_user_with_id_for_own_posts(user_id)
+
+    def _make_timeline_posts_query(self, lists_ids=None, circles_ids=None):
+        # If there's no circles or lists filters, add all posts
+        if circles_ids:
+            timeline_posts_query = Q(creator=self.pk, circles__id__in=circles_ids)
+        elif lists_ids:
+            timeline_posts_query = Q()
+        else:
+            timeline_posts_query = Q(creator_id=self.pk)
+
+        followed_users_ids = self.follows.values_list('followed_user_id', flat=True)
+
+        # If there's lists filters, filter follows with it
+        if lists_ids:
+            followed_users_ids = followed_users_ids.filter(lists__id__in=lists_ids)
+
+        # If there's circles filters, only keep the followed users we have in them
+        if circles_ids:
+            followed_users_ids = followed_users_ids.filter(followed_user__targeted_connections__user_id=self.pk,
+                                                           followed_user__targeted_connections__circles__id__in=circles_ids)
+
+        followed_users_posts_query = self._make_get_posts_query_for_users_with_ids(followed_users_ids)
+        timeline_posts_query.add(followed_users_posts_query, Q.OR)
+
+        if not circles_ids and not lists_ids:
+            timeline_posts_query.add(Q(community__memberships__user__id=self.pk), Q.OR)
+
+        return timeline_posts_query
+
     def _make_get_post_with_id_query_for_user(self, user, post_id):
         posts_query = self._make_get_posts_query_for_user(user)
         posts_query.add(Q(id=post_id), Q.AND)
         return posts_query
 
     def _make_get_posts_query_for_user(self, user, max_id=None):
-        posts_query = Q()
+        posts_query = self._make_get_posts_query_for_users_with_ids([user.pk])
 
-        # Add the user world circle posts
-        world_circle_id = self._get_world_circle_id()
-        user_world_circle_posts_query = Q(creator_id=user.pk,
-                                          circles__id=world_circle_id)
-        posts_query.add(user_world_circle_posts_query, Q.OR)
-
-        is_fully_connected_with_user = self.is_fully_connected_with_user_with_id(user.pk)
-
-        if is_fully_connected_with_user:
-            # Add the user connections circle posts
-            user_connections_circle_query = Q(creator_id=user.pk,
-                                              circles__id=user.connections_circle_id)
+        if max_id:
+            posts_query.add(Q(id__lt=max_id), Q.AND)
 
-            posts_query.add(user_connections_circle_query, Q.OR)
+        return posts_query
 
-            # Add the user circled posts we're part of
-            Connection = get_connection_model()
+    def _make_get_posts_query_for_users_with_ids(self, users_ids):
+        """
+        Make a single query matching the posts of the given users that we can see.
+        The circles we can see are resolved with one query regardless of the amount of users.
+        :param users_ids: list or queryset of user ids
+        :return: Q
+        """
+        # Add the users world circle posts
+        world_circle_id = self._get_world_circle_id()
+        posts_query = Q(creator_id__in=users_ids, circles__id=world_circle_id)
 
-            connection = Connection.objects.prefetch_related(
-                'target_connection__circles'
-            ).filter(
-                user_id=self.pk,
-                target_connection__user_id=user.pk).get()
+        Connection = get_connection_model()
 
-            target_connection_circles = connection.target_connection.circles.all()
+        # The connections the users made with us. If both connections have circles on them, we're fully connected
+        # and can see the user connections circle posts plus the user circled posts we're part of
+        connections_circles = Connection.objects.filter(
+            user_id__in=users_ids,
+            target_user_id=self.pk,
+            circles__isnull=False,
+            target_connection__circles__isnull=False
+        ).values_list('user_id', 'user__connections_circle_id', 'circles__id').distinct()
 
-            if target_connection_circles:
-                target_connection_circles_ids = [target_connection_circle.pk for target_connection_circle in
-                                                 target_connection_circles]
+        connected_users_ids = set()
+        visible_circles_ids = set()
 
-                user_encircled_posts_query = Q(creator_id=user.pk, circles__id__in=target_connection_circles_ids)
-                posts_query.add(user_encircled_posts_query, Q.OR)
+        for user_id, user_connections_circle_id, circle_id in connections_circles:
+            connected_users_ids.add(user_id)
+            visible_circles_ids.add(user_connections_circle_id)
+            visible_circles_ids.add(circle_id)
 
-        if max_id:
-            posts_query.add(Q(id__lt=max_id), Q.AND)
+        if connected_users_ids:
+            # Circles are owned by their creator, the ids alone scope the posts to each user
+            user_encircled_posts_query = Q(creator_id__in=connected_users_ids, circles__id__in=visible_circles_ids)
+            posts_query.add(user_encircled_posts_query, Q.OR)
 
         return posts_query
 
     def _get_world_circle_id(self):
         Circle = get_circle_model()
-        return Circle.get_world_circle().pk
+        return Circle.get_world_circle_id()
 
     def _get_default_connection_circles(self):
         """
@@ -2521,6 +2820,83 @@ def bootstrap_circles(sender, instance=None, created=False, **kwargs):
         Circle.bootstrap_circles_for_user(instance)
 
 
+class UserSearchToken(models.Model):
+    """
+    A token of the username or profile name of a user, so users can be searched without scanning them all
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=SEARCH_TOKEN_LENGTH, editable=False)
+
+    class Meta:
+        index_together = (('token', 'user'),)
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_INDEXED_USER_SEARCH_ENABLED
+
+    @classmethod
+    def make_users_with_query_query(cls, query):
+        users_query = Q(username__icontains=query)
+        users_query.add(Q(profile__name__icontains=query), Q.OR)
+
+        if not cls.is_enabled():
+            return users_query
+
+        query_tokens = make_search_query_tokens(query)
+
+        if not query_tokens:
+            return users_query
+
+        # Only the users with every token of the query are matched against it. The tokens alone would also
+        # match users having them in different places of their names
+        users_ids = cls.objects.filter(token__in=query_tokens).values('user_id').annotate(
+            tokens_count=Count('token', distinct=True)).filter(tokens_count=len(query_tokens)).values('user_id')
+
+        users_query.add(Q(id__in=users_ids), Q.AND)
+
+        return users_query
+
+    @classmethod
+    def index_user_with_id(cls, user_id):
+        if not cls.is_enabled():
+            return
+
+        username, name = User.objects.filter(pk=user_id).values_list('username', 'profile__name').get()
+
+        tokens = make_search_tokens(username, name)
+        indexed_tokens = set(cls.objects.filter(user_id=user_id).values_list('token', flat=True))
+
+        if tokens == indexed_tokens:
+            return
+
+        cls.objects.filter(user_id=user_id, token__in=indexed_tokens - tokens).delete()
+        cls.objects.bulk_create([cls(user_id=user_id, token=token) for token in tokens - indexed_tokens])
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, batch_size=1000):
+        cls.objects.all().delete()
+
+        search_tokens = []
+
+        for user_id, username, name in User.objects.values_list('id', 'username', 'profile__name').iterator():
+            search_tokens.extend([cls(user_id=user_id, token=token) for token in make_search_tokens(username, name)])
+
+            if len(search_tokens) >= batch_size:
+                cls.objects.bulk_create(search_tokens)
+                search_tokens = []
+
+        cls.objects.bulk_create(search_tokens)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user_search_tokens(sender, instance=None, created=False, **kwargs):
+    """"
+    Keep the search tokens of the user in sync with its username
+    """
+    UserSearchToken.index_user_with_id(user_id=instance.pk)
+
+
 class UserProfile(models.Model):
     name = models.CharField(_('name'), max_length=settings.PROFILE_NAME_MAX_LENGTH, blank=False, null=False,
                             validators=[name_characters_validator])
@@ -2528,16 +2904,26 @@ class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile')
     is_of_legal_age = models.BooleanField(default=False)
     avatar = ProcessedImageField(verbose_name=_('avatar'), blank=False, null=True, format='JPEG',
-                                 options={'quality': 50}, processors=[ResizeToFill(500, 500)],
+                                 options={'quality': 50}, processors=make_image_processors(ResizeToFill(500, 500)),
                                  upload_to=upload_to_user_avatar_directory)
+    avatar_thumbnail = ProcessedImageField(verbose_name=_('avatar thumbnail'), blank=False, null=True, format='JPEG',
+                                           options={'quality': 50},
+                                           processors=make_image_processors(ResizeToFill(100, 100)),
+                                           upload_to=upload_to_user_avatar_directory, editable=False)
     cover = ProcessedImageField(verbose_name=_('cover'), blank=False, null=True, format='JPEG', options={'quality': 50},
                                 upload_to=upload_to_user_cover_directory,
-                                processors=[ResizeToFit(width=1024, upscale=False)])
+                                processors=make_image_processors(ResizeToFit(width=1024, upscale=False)))
     bio = models.CharField(_('bio'), max_length=settings.PROFILE_BIO_MAX_LENGTH, blank=False, null=True)
     url = models.URLField(_('url'), blank=False, null=True)
     followers_count_visible = models.BooleanField(_('followers count visible'), blank=False, null=False, default=False)
     badges = models.ManyToManyField(Badge, related_name='users_profiles')
 
+    # The fields each image is saved through and the width they fit it in, smallest first
+    IMAGE_DERIVATIVES = {
+        'avatar': (('avatar_thumbnail', 100), ('avatar', 500)),
+        'cover': (('cover', 1024),),
+    }
+
     class Meta:
         verbose_name = _('user profile')
         verbose_name_plural = _('users profiles')
@@ -2549,6 +2935,114 @@ class UserProfile(models.Model):
         return self.user.username
 
 
+@receiver(post_save, sender=UserProfile)
+def index_user_profile_search_tokens(sender, instance=None, created=False, **kwargs):
+    """"
+    Keep the search tokens of the user in sync with its profile name
+    """
+    UserSearchToken.index_user_with_id(user_id=instance.user_id)
+
+
+class UserRelationshipsSnapshot:
+    """
+    The follows, connections, communities and muted posts of a user, each kind loaded with a single query
+    the first time it is needed. Writes of the user clear it.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.clear()
+
+    def clear(self):
+        self._follows_lists_ids = None
+        self._connections_circles_ids = None
+        self._confirmed_connections_users_ids = None
+        self._communities_memberships = None
+        self._banned_communities_names = None
+        self._muted_posts_ids = None
+
+    def is_following_user_with_id(self, user_id):
+        return user_id in self._get_follows_lists_ids()
+
+    def is_following_user_with_id_in_list_with_id(self, user_id, list_id):
+        return list_id in self._get_follows_lists_ids().get(user_id, ())
+
+    def is_connected_with_user_with_id(self, user_id):
+        return user_id in self._get_connections_circles_ids()
+
+    def is_connected_with_user_with_id_in_circles_with_ids(self, user_id, circles_ids):
+        connection_circles_ids = self._get_connections_circles_ids().get(user_id, ())
+        return any(circle_id in connection_circles_ids for circle_id in circles_ids)
+
+    def is_fully_connected_with_user_with_id(self, user_id):
+        return bool(self._get_connections_circles_ids().get(user_id)) and \
+               user_id in self._get_confirmed_connections_users_ids()
+
+    def is_pending_confirm_connection_for_user_with_id(self, user_id):
+        connections_circles_ids = self._get_connections_circles_ids()
+        return user_id in connections_circles_ids and not connections_circles_ids[user_id]
+
+    def is_member_of_community_with_name(self, community_name):
+        return community_name in self._get_communities_memberships()
+
+    def is_administrator_of_community_with_name(self, community_name):
+        return self._get_communities_memberships().get(community_name, (False, False))[0]
+
+    def is_moderator_of_community_with_name(self, community_name):
+        return self._get_communities_memberships().get(community_name, (False, False))[1]
+
+    def is_banned_from_community_with_name(self, community_name):
+        return community_name in self._get_banned_communities_names()
+
+    def has_muted_post_with_id(self, post_id):
+        return post_id in self._get_muted_posts_ids()
+
+    def _get_follows_lists_ids(self):
+        if self._follows_lists_ids is None:
+            follows_lists_ids = {}
+            for followed_user_id, list_id in self.user.follows.values_list('followed_user_id', 'lists__id'):
+                follow_lists_ids = follows_lists_ids.setdefault(followed_user_id, set())
+                if list_id:
+                    follow_lists_ids.add(list_id)
+            self._follows_lists_ids = follows_lists_ids
+        return self._follows_lists_ids
+
+    def _get_connections_circles_ids(self):
+        if self._connections_circles_ids is None:
+            connections_circles_ids = {}
+            for target_user_id, circle_id in self.user.connections.values_list('target_user_id', 'circles__id'):
+                connection_circles_ids = connections_circles_ids.setdefault(target_user_id, set())
+                if circle_id:
+                    connection_circles_ids.add(circle_id)
+            self._connections_circles_ids = connections_circles_ids
+        return self._connections_circles_ids
+
+    def _get_confirmed_connections_users_ids(self):
+        if self._confirmed_connections_users_ids is None:
+            self._confirmed_connections_users_ids = set(
+                self.user.connections.filter(target_connection__circles__isnull=False).values_list('target_user_id',
+                                                                                                   flat=True))
+        return self._confirmed_connections_users_ids
+
+    def _get_communities_memberships(self):
+        if self._communities_memberships is None:
+            self._communities_memberships = {
+                community_name: (is_administrator, is_moderator) for community_name, is_administrator, is_moderator
+                in self.user.communities_memberships.values_list('community__name', 'is_administrator',
+                                                                 'is_moderator')}
+        return self._communities_memberships
+
+    def _get_banned_communities_names(self):
+        if self._banned_communities_names is None:
+            self._banned_communities_names = set(self.user.banned_of_communities.values_list('name', flat=True))
+        return self._banned_communities_names
+
+    def _get_muted_posts_ids(self):
+        if self._muted_posts_ids is None:
+            self._muted_posts_ids = set(self.user.post_mutes.values_list('post_id', flat=True))
+        return self._muted_posts_ids
+
+
 class UserNotificationsSettings(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
                                 related_name='notifications_settings')
@@ -11,7 +11,7 @@ from django.contrib.auth.password_validation import validate_password
 
 from openbook_circles.models import Circle
 from openbook_common.models import Emoji, Badge
-from openbook_common.serializers_fields.request import FriendlyUrlField, RestrictedImageFileSizeField
+from openbook_common.serializers_fields.request import FriendlyUrlField, RestrictedImageFileSizeField, CursorField
 from openbook_common.serializers_fields.user import IsFollowingField, IsConnectedField, FollowersCountField, \
     FollowingCountField, PostsCountField, ConnectedCirclesField, FollowListsField, IsFullyConnectedField, \
     IsPendingConnectionConfirmation, CommunitiesMembershipsField, CommunitiesInvitesField, IsMemberOfCommunities, \
@@ -252,6 +252,9 @@ class GetLinkedUsersSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=10
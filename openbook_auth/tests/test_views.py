@@ -4,14 +4,17 @@ import tempfile
 import uuid
 from urllib.parse import urlsplit  # Python 3
 from PIL import Image
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
 from unittest import mock
 from django.core import mail
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import authenticate
-from openbook_auth.models import User, UserProfile
+from openbook_auth.models import User, UserProfile, UserSearchToken
 
 import logging
 import json
@@ -19,7 +22,8 @@ import json
 from openbook_auth.views import UserSettings
 from openbook_circles.models import Circle
 from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, make_user_bio, \
-    make_user_location, make_user_avatar, make_user_cover, make_badge
+    make_user_location, make_user_avatar, make_user_cover, make_badge, make_fake_post_text, make_circle, make_community
+from openbook_common.tests.helpers import get_ids_following_cursor
 from openbook_invitations.models import UserInvite
 
 fake = Faker()
@@ -671,6 +675,43 @@ class AuthenticatedUserAPITests(APITestCase):
         response_username = parsed_response['username']
         self.assertEqual(response_username, user.username)
 
+    def test_retrieves_user_counts(self):
+        """
+        should return the up to date posts, followers and following counts of the authenticated user
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        circle = make_circle(creator=user)
+
+        user.create_public_post(text=make_fake_post_text())
+        user.create_public_post(text=make_fake_post_text())
+        post_to_delete = user.create_encircled_post(text=make_fake_post_text(), circles_ids=[circle.pk])
+        user.create_encircled_post(text=make_fake_post_text(), circles_ids=[circle.pk])
+        user.delete_post_with_id(post_to_delete.pk)
+
+        follower = make_user()
+        follower.follow_user_with_id(user.pk)
+
+        unfollower = make_user()
+        unfollower.follow_user_with_id(user.pk)
+        unfollower.unfollow_user_with_id(user.pk)
+
+        user_to_follow = make_user()
+        user.follow_user_with_id(user_to_follow.pk)
+
+        url = self._get_url()
+
+        response = self.client.get(url, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        parsed_response = json.loads(response.content)
+
+        self.assertEqual(parsed_response['posts_count'], 3)
+        self.assertEqual(parsed_response['followers_count'], 1)
+        self.assertEqual(parsed_response['following_count'], 1)
+
     def test_can_update_user_username(self):
         """
         should be able to update the authenticated user username and return 200
@@ -1081,6 +1122,61 @@ class AuthenticatedUserAPITests(APITestCase):
         return reverse('authenticated-user')
 
 
+@override_settings(FEATURE_ASYNC_IMAGE_PROCESSING_ENABLED=True)
+class AsyncImageProcessingAuthenticatedUserAPITests(APITestCase):
+    """
+    AuthenticatedUserAPI with the uploaded images processed by the process_images worker
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    def test_avatar_is_set_once_processed(self):
+        """
+        should keep the previous avatar until the uploaded one and its thumbnail are processed
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        previous_avatar = user.profile.avatar.name
+
+        response = self.client.patch(self._get_url(), {'avatar': make_user_avatar()}, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        user.profile.refresh_from_db()
+
+        self.assertEqual(user.profile.avatar.name, previous_avatar)
+
+        call_command('process_images', '--once')
+
+        user.profile.refresh_from_db()
+
+        self.assertNotEqual(user.profile.avatar.name, previous_avatar)
+        self.assertTrue(user.profile.avatar_thumbnail)
+        self.assertEqual(user.profile.avatar_thumbnail.width, 100)
+
+    def test_deleting_avatar_discards_pending_avatar(self):
+        """
+        should not set an uploaded avatar deleted before being processed
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        self.client.patch(self._get_url(), {'avatar': make_user_avatar()}, **headers, format='multipart')
+        self.client.patch(self._get_url(), {'avatar': ''}, **headers, format='multipart')
+
+        call_command('process_images', '--once')
+
+        user.profile.refresh_from_db()
+
+        self.assertFalse(user.profile.avatar)
+
+    def _get_url(self):
+        return reverse('authenticated-user')
+
+
 class AuthenticatedUserDeleteTests(APITestCase):
     fixtures = [
         'openbook_circles/fixtures/circles.json'
@@ -1469,6 +1565,117 @@ class VerifyChangeEmailAPITests(APITestCase):
         })
 
 
+@override_settings(FEATURE_INDEXED_USER_SEARCH_ENABLED=True)
+class IndexedUsersSearchAPITests(APITestCase):
+    """
+    UsersAPI and SearchLinkedUsersAPI with the indexed user search enabled
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    # A profile name none of the queries match, the random ones of make_user could
+    PROFILE_NAME = 'Test Person'
+
+    def test_can_query_users_by_any_part_of_their_names(self):
+        """
+        should retrieve the users whose username or profile name contains the query
+        """
+        user = make_user(username='lilwayne', name=self.PROFILE_NAME)
+
+        user_b = make_user(username='waynerooney', name=self.PROFILE_NAME)
+
+        user_c = make_user(username='batman', name='Bruce Wayne')
+
+        make_user(username='wanye', name=self.PROFILE_NAME)
+
+        response_usernames = self._get_users_usernames({'query': 'Wayne'})
+
+        self.assertEqual(sorted(response_usernames), sorted([user.username, user_b.username, user_c.username]))
+
+    def test_short_queries_match_names_starts(self):
+        """
+        should match queries of less than three characters against the start of the usernames and names words
+        """
+        user = make_user(username='livia', name=self.PROFILE_NAME)
+
+        user_b = make_user(username='annaliz', name='Anna Liz')
+
+        make_user(username='olive', name=self.PROFILE_NAME)
+
+        response_usernames = self._get_users_usernames({'query': 'li'})
+
+        self.assertEqual(sorted(response_usernames), sorted([user.username, user_b.username]))
+
+    def test_ranks_exact_username_then_linked_users(self):
+        """
+        should rank the exact username match first and then the users linked to the searching user
+        """
+        user = make_user(username='searcher', name=self.PROFILE_NAME)
+        headers = make_authentication_headers_for_user(user)
+
+        make_user(username='johnathan', name=self.PROFILE_NAME)
+
+        linked_user = make_user(username='johnny', name=self.PROFILE_NAME)
+        linked_user.follow_user_with_id(user.pk)
+
+        exact_user = make_user(username='john', name=self.PROFILE_NAME)
+
+        response_usernames = self._get_users_usernames({'query': 'john'}, headers=headers)
+
+        self.assertEqual(response_usernames, [exact_user.username, linked_user.username, 'johnathan'])
+
+    def test_reindexes_changed_names(self):
+        """
+        should search users by their current names only
+        """
+        user = make_user(username='renamed', name='Old Name')
+
+        user.profile.name = 'Brand New'
+        user.profile.save()
+
+        self.assertEqual(self._get_users_usernames({'query': 'old name'}), [])
+        self.assertEqual(self._get_users_usernames({'query': 'brand'}), [user.username])
+
+    def test_can_search_linked_users(self):
+        """
+        should search the linked users with the index
+        """
+        user = make_user(username='searcher', name=self.PROFILE_NAME)
+        headers = make_authentication_headers_for_user(user)
+
+        linked_user = make_user(username='samantha', name=self.PROFILE_NAME)
+        linked_user.follow_user_with_id(user.pk)
+        make_user(username='samuel', name=self.PROFILE_NAME)
+
+        response = self.client.get(reverse('search-linked-users'), {'query': 'sam'}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user['username'] for user in json.loads(response.content)], [linked_user.username])
+
+    def test_rebuild_users_search_index_command(self):
+        """
+        should index the users created while the indexed search was disabled
+        """
+        with self.settings(FEATURE_INDEXED_USER_SEARCH_ENABLED=False):
+            user = make_user(username='unindexed', name=self.PROFILE_NAME)
+
+        self.assertFalse(UserSearchToken.objects.filter(user=user).exists())
+        self.assertEqual(self._get_users_usernames({'query': 'unindexed'}), [])
+
+        call_command('rebuild_users_search_index')
+
+        self.assertEqual(self._get_users_usernames({'query': 'unindexed'}), [user.username])
+
+    def _get_users_usernames(self, query_params, headers=None):
+        response = self.client.get(reverse('users'), query_params, **(headers or {}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [user['username'] for user in json.loads(response.content)]
+
+
 class LinkedUsersAPITests(APITestCase):
     fixtures = [
         'openbook_circles/fixtures/circles.json'
@@ -1511,6 +1718,26 @@ class LinkedUsersAPITests(APITestCase):
             response_member_id = response_member.get('id')
             self.assertIn(response_member_id, linked_users_ids)
 
+    def test_can_paginate_linked_users_joined_at_once_with_cursor(self):
+        """
+        should retrieve every linked user once when following the next cursor of pages splitting equal date joined
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        linked_users_ids = []
+
+        for i in range(0, 7):
+            linked_user = make_user()
+            linked_user.follow_user_with_id(user.pk)
+            linked_users_ids.append(linked_user.pk)
+
+        User.objects.filter(pk__in=linked_users_ids).update(date_joined=timezone.now())
+
+        response_linked_users_ids = get_ids_following_cursor(self.client, self._get_url(), headers, count=3)
+
+        self.assertEqual(response_linked_users_ids, sorted(linked_users_ids, reverse=True))
+
     def _get_url(self):
         return reverse('linked-users')
 
@@ -1598,3 +1825,79 @@ class SearchLinkedUsersAPITests(APITestCase):
         return reverse('search-linked-users')
 
 
+class UserRelationshipsSnapshotTests(APITestCase):
+    """
+    UserRelationshipsSnapshot
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    def test_snapshot_answers_like_the_database(self):
+        """
+        should answer the relationship predicates like the queries do
+        """
+        user = make_user()
+        followed_user = make_user()
+        connected_user = make_user()
+        pending_user = make_user()
+        circle = make_circle(creator=user)
+
+        list = user.create_list(name=fake.user_name(), emoji_id=None)
+        user.follow_user_with_id(followed_user.pk, lists_ids=[list.pk])
+        user.connect_with_user_with_id(connected_user.pk, circles_ids=[circle.pk])
+        connected_user.confirm_connection_with_user_with_id(user.pk)
+        pending_user.connect_with_user_with_id(user.pk)
+
+        community = make_community(creator=user)
+        post = followed_user.create_public_post(text=make_fake_post_text())
+        user.mute_post_with_id(post.pk)
+
+        snapshot_user = User.objects.get(pk=user.pk)
+        snapshot_user.enable_relationships_snapshot()
+
+        for other_user in [followed_user, connected_user, pending_user]:
+            self.assertEqual(snapshot_user.is_following_user_with_id(other_user.pk),
+                             user.is_following_user_with_id(other_user.pk))
+            self.assertEqual(snapshot_user.is_following_user_with_id_in_list_with_id(other_user.pk, list.pk),
+                             user.is_following_user_with_id_in_list_with_id(other_user.pk, list.pk))
+            self.assertEqual(snapshot_user.is_connected_with_user_with_id(other_user.pk),
+                             user.is_connected_with_user_with_id(other_user.pk))
+            self.assertEqual(snapshot_user.is_connected_with_user_with_id_in_circle_with_id(other_user.pk, circle.pk),
+                             user.is_connected_with_user_with_id_in_circle_with_id(other_user.pk, circle.pk))
+            self.assertEqual(snapshot_user.is_fully_connected_with_user_with_id(other_user.pk),
+                             user.is_fully_connected_with_user_with_id(other_user.pk))
+
+        self.assertTrue(snapshot_user.is_fully_connected_with_user_with_id(connected_user.pk))
+        self.assertTrue(snapshot_user.is_following_user_with_id_in_list_with_id(followed_user.pk, list.pk))
+        self.assertTrue(snapshot_user.is_administrator_of_community_with_name(community.name))
+        self.assertTrue(snapshot_user.is_member_of_community_with_name(community.name))
+        self.assertFalse(snapshot_user.is_banned_from_community_with_name(community.name))
+        self.assertTrue(snapshot_user.has_muted_post_with_id(post.pk))
+
+    def test_snapshot_is_cleared_by_the_user_writes(self):
+        """
+        should not answer from a stale snapshot after the user changes its relationships
+        """
+        user = make_user()
+        user.enable_relationships_snapshot()
+
+        other_user = make_user()
+        community = make_community(creator=other_user)
+
+        self.assertFalse(user.is_following_user_with_id(other_user.pk))
+        self.assertFalse(user.is_connected_with_user_with_id(other_user.pk))
+        self.assertFalse(user.is_member_of_community_with_name(community.name))
+
+        user.follow_user_with_id(other_user.pk)
+        self.assertTrue(user.is_following_user_with_id(other_user.pk))
+
+        user.connect_with_user_with_id(other_user.pk)
+        self.assertTrue(user.is_connected_with_user_with_id(other_user.pk))
+
+        user.join_community_with_name(community.name)
+        self.assertTrue(user.is_member_of_community_with_name(community.name))
+
+        user.disconnect_from_user_with_id(other_user.pk)
+        self.assertFalse(user.is_connected_with_user_with_id(other_user.pk))
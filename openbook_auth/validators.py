@@ -37,6 +37,13 @@ def user_username_exists(username):
         )
 
 
+def users_usernames_exist(usernames):
+    if User.objects.filter(username__in=usernames).count() != len(set(usernames)):
+        raise NotFound(
+            _('No user with the provided username exists.'),
+        )
+
+
 def user_email_exists(email):
     if not User.objects.filter(email=email).exists():
         raise NotFound(
@@ -14,6 +14,7 @@ from rest_framework.authtoken.models import Token
 
 from openbook_common.responses import ApiMessageResponse
 from openbook_common.utils.model_loaders import get_user_invite_model
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
 from .serializers import RegisterSerializer, UsernameCheckSerializer, EmailCheckSerializer, LoginSerializer, \
     GetAuthenticatedUserSerializer, GetUserUserSerializer, UpdateAuthenticatedUserSerializer, GetUserSerializer, \
     GetUsersSerializer, GetUsersUserSerializer, UpdateUserSettingsSerializer, EmailVerifySerializer, \
@@ -321,17 +322,18 @@ class LinkedUsers(APIView):
 
         count = data.get('count', 10)
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
         with_community = data.get('with_community')
 
         user = request.user
-        users = user.get_linked_users(max_id=max_id).order_by(
-            '-id')[:count]
+        users, next_cursor = paginate_with_cursor(user.get_linked_users(), count=count, cursor=cursor, max_id=max_id,
+                                                  created_field='date_joined')
 
         users_serializer = GetLinkedUsersUserSerializer(users, many=True, context={'request': request,
                                                                                    'communities_names': [
                                                                                        with_community]})
 
-        return Response(users_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(users_serializer.data, status=status.HTTP_200_OK), next_cursor)
 
 
 class SearchLinkedUsers(APIView):
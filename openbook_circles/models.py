@@ -55,7 +55,7 @@ class Circle(models.Model):
     @property
     def users(self):
         Connection = get_connection_model()
-        circle_connections = Connection.objects.select_related('target_connection__user').filter(
+        circle_connections = Connection.objects.select_related('target_connection__user__profile').filter(
             circles__id=self.id)
 
         users = []
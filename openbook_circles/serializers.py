@@ -3,7 +3,7 @@ from rest_framework import serializers
 
 from openbook.settings import CIRCLE_MAX_LENGTH, COLOR_ATTR_MAX_LENGTH
 from openbook_auth.models import UserProfile, User
-from openbook_auth.validators import username_characters_validator, user_username_exists
+from openbook_auth.validators import username_characters_validator, users_usernames_exist
 from openbook_circles.models import Circle
 from openbook_circles.validators import circle_id_exists
 from openbook_common.serializers_fields.user import IsFullyConnectedField
@@ -31,7 +31,8 @@ class UpdateCircleSerializer(serializers.Serializer):
         child=serializers.CharField(max_length=settings.USERNAME_MAX_LENGTH,
                                     allow_blank=False,
                                     required=False,
-                                    validators=[username_characters_validator, user_username_exists])
+                                    validators=[username_characters_validator]),
+        validators=[users_usernames_exist]
     )
 
 
@@ -1,4 +1,6 @@
 # Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -12,6 +14,7 @@ import json
 
 from openbook_circles.models import Circle
 from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, make_fake_circle_name
+from openbook_notifications.models import Notification
 
 logger = logging.getLogger(__name__)
 
@@ -254,6 +257,89 @@ class CircleItemAPITests(APITestCase):
 
         self.assertEqual(len(circle.users), 0)
 
+    def test_update_own_circle_users_applies_the_difference(self):
+        """
+        should keep, remove, add and connect the circle users according to the given usernames
+        """
+        user = make_user()
+
+        circle = mixer.blend(Circle, creator=user)
+        circle_id = circle.pk
+
+        user_to_keep = make_user()
+        user.connect_with_user_with_id(user_to_keep.pk, circles_ids=[circle_id])
+
+        user_to_remove = make_user()
+        user.connect_with_user_with_id(user_to_remove.pk, circles_ids=[circle_id])
+
+        user_to_add = make_user()
+        user.connect_with_user_with_id(user_to_add.pk)
+
+        user_to_connect_with = make_user()
+
+        data = {
+            'usernames': ','.join([user_to_keep.username, user_to_add.username, user_to_connect_with.username])
+        }
+
+        url = self._get_url(circle_id)
+        headers = make_authentication_headers_for_user(user)
+        response = self.client.patch(url, data, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertTrue(user.is_connected_with_user_with_id_in_circle_with_id(user_to_keep.pk, circle_id))
+        self.assertFalse(user.is_connected_with_user_with_id_in_circle_with_id(user_to_remove.pk, circle_id))
+        self.assertTrue(user.is_connected_with_user_with_id(user_to_remove.pk))
+        self.assertTrue(user.is_connected_with_user_with_id_in_circle_with_id(user_to_add.pk, circle_id))
+        self.assertTrue(user.is_connected_with_user_with_id_in_circle_with_id(user_to_connect_with.pk, circle_id))
+        self.assertTrue(
+            user.is_connected_with_user_with_id_in_circle_with_id(user_to_connect_with.pk, user.connections_circle_id))
+        self.assertTrue(user.is_following_user_with_id(user_to_connect_with.pk))
+        self.assertTrue(user_to_connect_with.notifications.filter(
+            notification_type=Notification.CONNECTION_REQUEST).exists())
+
+        user_to_connect_with.confirm_connection_with_user_with_id(user.pk)
+        self.assertTrue(user.is_fully_connected_with_user_with_id(user_to_connect_with.pk))
+
+    def test_update_own_circle_users_queries_do_not_grow_with_users(self):
+        """
+        should update the circle users with a constant amount of queries
+        """
+        user = make_user()
+
+        def update_circle_users_with_new_users(amount_of_new_users):
+            circle = mixer.blend(Circle, creator=user)
+            usernames = [make_user().username for i in range(0, amount_of_new_users)]
+
+            with CaptureQueriesContext(connection) as context:
+                user.update_circle_with_id(circle.pk, usernames=usernames)
+
+            self.assertEqual(len(circle.users), amount_of_new_users)
+            return len(context)
+
+        self.assertEqual(update_circle_users_with_new_users(2), update_circle_users_with_new_users(10))
+
+    def test_update_own_circle_users_response_queries_do_not_grow_with_users(self):
+        """
+        should update and return the circle users with a constant amount of queries
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        def update_circle_users_with_new_users(amount_of_new_users):
+            circle = mixer.blend(Circle, creator=user)
+            usernames = [make_user().username for i in range(0, amount_of_new_users)]
+
+            url = self._get_url(circle.pk)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.patch(url, {'usernames': ','.join(usernames)}, **headers)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(json.loads(response.content)['users']), amount_of_new_users)
+            return len(context)
+
+        self.assertEqual(update_circle_users_with_new_users(2), update_circle_users_with_new_users(10))
+
     def test_cannot_update_other_user_circle(self):
         """
         should not be able to update the circle of another user and return 400
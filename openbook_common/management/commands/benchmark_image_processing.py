@@ -0,0 +1,76 @@
+import time
+from io import BytesIO
+
+from PIL import Image
+from django.core.management.base import BaseCommand
+from pilkit.processors import ResizeToFit
+from pilkit.utils import open_image, process_image
+
+from openbook_common.utils.images import DraftDecode, make_image_processors
+
+# Sizes of the photos taken by common phone cameras
+PHONE_IMAGE_SIZES = {
+    3: (2048, 1536),
+    12: (4032, 3024),
+    40: (7296, 5472),
+    48: (8000, 6000),
+}
+
+
+class Command(BaseCommand):
+    help = 'Measures the latency and decoded image memory of resizing phone photos for a post image ' \
+           'decoding them at full and at reduced resolution'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--megapixels', type=int, nargs='+', choices=sorted(PHONE_IMAGE_SIZES.keys()),
+                            default=sorted(PHONE_IMAGE_SIZES.keys()), help='Phone photo sizes to process')
+        parser.add_argument('--width', type=int, default=1024, help='Width the photos are resized to fit')
+        parser.add_argument('--repeat', type=int, default=5, help='Resizes per measurement')
+
+    def handle(self, *args, **options):
+        width = options['width']
+        full_processors = [ResizeToFit(width=width, upscale=False)]
+        draft_processors = make_image_processors(ResizeToFit(width=width, upscale=False))
+
+        self.stdout.write('{0:>6} {1:>12} {2:>10} {3:>12} {4:>10} {5:>12}'.format(
+            'mp', 'size', 'full ms', 'full MB', 'draft ms', 'draft MB'))
+
+        for megapixels in options['megapixels']:
+            size = PHONE_IMAGE_SIZES[megapixels]
+            content = self._make_jpeg(size=size)
+
+            full_ms = self._time_processing(content=content, processors=full_processors, repeat=options['repeat'])
+            draft_ms = self._time_processing(content=content, processors=draft_processors, repeat=options['repeat'])
+
+            full_megabytes = self._get_decoded_megabytes(content=content)
+            draft_megabytes = self._get_decoded_megabytes(content=content, draft=DraftDecode(width=width))
+
+            self.stdout.write('{0:>6} {1:>12} {2:>10.1f} {3:>12.1f} {4:>10.1f} {5:>12.1f}'.format(
+                megapixels, '%sx%s' % size, full_ms, full_megabytes, draft_ms, draft_megabytes))
+
+    def _make_jpeg(self, size):
+        # A gradient compresses and decodes like a photo far better than a flat color
+        image = Image.linear_gradient('L').resize(size).convert('RGB')
+        content = BytesIO()
+        image.save(content, format='JPEG', quality=90)
+        return content.getvalue()
+
+    def _time_processing(self, content, processors, repeat):
+        start = time.perf_counter()
+        for i in range(0, repeat):
+            process_image(open_image(BytesIO(content)), processors=processors, format='JPEG',
+                          options={'quality': 50})
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def _get_decoded_megabytes(self, content, draft=None):
+        """
+        The pixel buffer the decoder allocates, by far the largest allocation of the processing
+        """
+        img = open_image(BytesIO(content))
+
+        if draft:
+            img = draft.process(img)
+
+        img.load()
+
+        return img.size[0] * img.size[1] * len(img.getbands()) / (1024 * 1024)
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_common.models import PendingImage
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Saves the pending uploaded images through their derivative fields'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Pending images to process per batch')
+        parser.add_argument('--workers', type=int, default=4, help='Threads generating the derivatives of an image')
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='Seconds to wait for new pending images when there are none')
+        parser.add_argument('--once', action='store_true', help='Exit once there are no pending images left')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+
+        while True:
+            processed_count = PendingImage.process_pending_images(batch_size=batch_size, workers=workers)
+
+            if processed_count:
+                logger.info('Processed {0} pending images'.format(processed_count))
+                continue
+
+            if options['once']:
+                break
+
+            time.sleep(options['sleep'])
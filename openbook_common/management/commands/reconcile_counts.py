@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_common.utils.helpers import reconcile_count
+from openbook_common.utils.model_loaders import get_post_model, get_post_comment_model, get_post_reaction_model, \
+    get_user_model, get_follow_model, get_community_model, get_community_membership_model, get_circle_model, \
+    get_notification_model
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Reconciles the denormalized counts of posts, users and communities that drifted from their rows'
+
+    def handle(self, *args, **options):
+        Post = get_post_model()
+        PostComment = get_post_comment_model()
+        PostReaction = get_post_reaction_model()
+        User = get_user_model()
+        Follow = get_follow_model()
+        Community = get_community_model()
+        CommunityMembership = get_community_membership_model()
+        Circle = get_circle_model()
+        Notification = get_notification_model()
+
+        counts = (
+            (Post, 'comments_count', PostComment.objects.all(), 'post_id'),
+            (Post, 'reactions_count', PostReaction.objects.all(), 'post_id'),
+            (User, 'posts_count', Post.objects.all(), 'creator_id'),
+            (User, 'public_posts_count', Post.objects.filter(circles__id=Circle.get_world_circle_id()), 'creator_id'),
+            (User, 'followers_count', Follow.objects.all(), 'followed_user_id'),
+            (User, 'following_count', Follow.objects.all(), 'user_id'),
+            (User, 'unread_notifications_count', Notification.objects.filter(read=False), 'owner_id'),
+            (Community, 'members_count', CommunityMembership.objects.all(), 'community_id'),
+        )
+
+        for model, count_field_name, related_queryset, related_field_name in counts:
+            reconciled_count = reconcile_count(model.objects.all(), count_field_name, related_queryset,
+                                               related_field_name)
+            logger.info('Reconciled {0} {1} of {2}'.format(reconciled_count, count_field_name, model.__name__))
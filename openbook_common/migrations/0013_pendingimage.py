@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_common', '0012_auto_20190202_1320'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(editable=False, max_length=100)),
+                ('object_id', models.PositiveIntegerField(editable=False)),
+                ('field_name', models.CharField(editable=False, max_length=64)),
+                ('original', models.CharField(editable=False, max_length=255)),
+                ('created', models.DateTimeField(editable=False)),
+                ('next_attempt', models.DateTimeField(editable=False)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('last_error', models.TextField(editable=False, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pendingimage',
+            index=models.Index(fields=['next_attempt'], name='openbook_co_next_at_d1864d_idx'),
+        ),
+        migrations.AlterIndexTogether(
+            name='pendingimage',
+            index_together={('model', 'object_id', 'field_name')},
+        ),
+    ]
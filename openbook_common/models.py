@@ -1,13 +1,29 @@
 # Create your models here.
 # Create your models here.
-from django.db import models
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from PIL import Image
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 # Create your views here.
 from openbook.settings import COLOR_ATTR_MAX_LENGTH
+from openbook_common.utils.images import save_image_derivatives, get_image_derivatives_fields_names, \
+    is_image_size_allowed
 from openbook_common.validators import hex_color_validator
 
+logger = logging.getLogger(__name__)
+
 
 class EmojiGroup(models.Model):
     keyword = models.CharField(_('keyword'), max_length=32, blank=False, null=False)
@@ -59,3 +75,259 @@ class Badge(models.Model):
         if not self.id:
             self.created = timezone.now()
         return super(Badge, self).save(*args, **kwargs)
+
+
+class OutboxEntry(models.Model):
+    """
+    An entry handled by a worker, retried with exponential backoff until it runs out of attempts. The worker claims
+    a batch of entries at once, pushing their next attempt past the claim so other workers skip them while they're
+    handled. A worker crashing leaves them to be claimed again once the claim runs out.
+    The claim, attempts and delay are read from the settings named after outbox_settings_prefix.
+    """
+    created = models.DateTimeField(editable=False)
+    next_attempt = models.DateTimeField(editable=False)
+    attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    last_error = models.TextField(editable=False, null=True)
+
+    outbox_settings_prefix = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def claim_outbox_entries(cls, entries):
+        """
+        :param entries: the ordered and limited queryset of the due entries to claim, rows being claimed by
+        another worker are skipped
+        :return: the claimed entries
+        """
+        with transaction.atomic():
+            entries = list(entries.select_for_update(skip_locked=True))
+
+            if entries:
+                claimed_until = timezone.now() + timedelta(seconds=cls._get_outbox_setting('CLAIM_FOR'))
+                cls.objects.filter(pk__in=[entry.pk for entry in entries]).update(next_attempt=claimed_until)
+
+        return entries
+
+    @classmethod
+    def _get_outbox_setting(cls, name):
+        return getattr(settings, '%s_%s' % (cls.outbox_settings_prefix, name))
+
+    def mark_as_failed_attempt(self, error):
+        self.attempts += 1
+        self.last_error = str(error)
+
+        if self.attempts >= self._get_outbox_setting('MAX_ATTEMPTS'):
+            self.give_up()
+            return
+
+        # Exponential backoff
+        retry_delay = self._get_outbox_setting('RETRY_DELAY') * (2 ** (self.attempts - 1))
+        self.next_attempt = timezone.now() + timedelta(seconds=retry_delay)
+
+        # Updated rather than saved, the entry may have been deleted meanwhile
+        type(self).objects.filter(pk=self.pk).update(attempts=self.attempts, last_error=self.last_error,
+                                                     next_attempt=self.next_attempt)
+
+    def give_up(self):
+        raise NotImplementedError()
+
+    def save(self, *args, **kwargs):
+        ''' On save, update timestamps '''
+        if not self.id:
+            self.created = timezone.now()
+            self.next_attempt = self.created
+        return super(OutboxEntry, self).save(*args, **kwargs)
+
+
+class PendingImage(OutboxEntry):
+    """
+    An uploaded image stored as it is, until the process_images worker saves it through every derivative field
+    of the image field of its instance. The field keeps its previous image in the meantime.
+    The image is only given up on once it fails to decode or runs out of attempts.
+    """
+    model = models.CharField(max_length=100, editable=False)
+    object_id = models.PositiveIntegerField(editable=False)
+    field_name = models.CharField(max_length=64, editable=False)
+    original = models.CharField(max_length=255, editable=False)
+
+    outbox_settings_prefix = 'PENDING_IMAGES'
+
+    class Meta:
+        index_together = (('model', 'object_id', 'field_name'),)
+        indexes = [
+            models.Index(fields=['next_attempt']),
+        ]
+
+    # The originals stored by the innermost delete_stored_originals_on_error block of every thread
+    _stored_originals = threading.local()
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_ASYNC_IMAGE_PROCESSING_ENABLED
+
+    @classmethod
+    def set_image_of_instance(cls, instance, field_name, image):
+        """
+        Sets the image of the field and clears its derivatives, or with asynchronous processing enabled stores it
+        for the process_images worker, which requires the instance to have been saved before.
+        Saving the instance is up to the caller.
+        """
+        cls.discard_pending_images_of_instance(instance=instance, field_name=field_name)
+
+        if not cls.is_enabled():
+            for derivative_field_name in get_image_derivatives_fields_names(instance, field_name):
+                setattr(instance, derivative_field_name, None)
+            setattr(instance, field_name, image)
+            return
+
+        cls.objects.create(**cls._store_pending_image(instance=instance, field_name=field_name, image=image))
+
+    @classmethod
+    def bulk_create_pending_images(cls, field_name, instances_images):
+        """
+        Stores the images of many saved instances for the process_images worker with a single query
+        :param instances_images: list of (instance, image file) tuples
+        """
+        created = timezone.now()
+
+        cls.objects.bulk_create(
+            [cls(created=created, next_attempt=created,
+                 **cls._store_pending_image(instance=instance, field_name=field_name, image=image))
+             for instance, image in instances_images])
+
+    @classmethod
+    @contextmanager
+    def delete_stored_originals_on_error(cls):
+        """
+        Deletes the originals stored within the block if it raises. Wrapping a transaction, it keeps the pending
+        images it rolls back from leaving their originals behind in the storage.
+        """
+        outer_stored_originals = getattr(cls._stored_originals, 'value', None)
+        stored_originals = []
+        cls._stored_originals.value = stored_originals
+
+        try:
+            yield
+        except BaseException:
+            for storage, original in stored_originals:
+                storage.delete(original)
+            raise
+        else:
+            # An enclosing block can still roll them back
+            if outer_stored_originals is not None:
+                outer_stored_originals.extend(stored_originals)
+        finally:
+            cls._stored_originals.value = outer_stored_originals
+
+    @classmethod
+    def _store_pending_image(cls, instance, field_name, image):
+        storage = instance._meta.get_field(field_name).storage
+        extension = os.path.splitext(image.name)[1].lower()
+        original = storage.save('pending_images/%s%s' % (str(uuid.uuid4()), extension), image)
+
+        stored_originals = getattr(cls._stored_originals, 'value', None)
+        if stored_originals is not None:
+            stored_originals.append((storage, original))
+
+        return {
+            'model': instance._meta.label,
+            'object_id': instance.pk,
+            'field_name': field_name,
+            'original': original,
+        }
+
+    @classmethod
+    def discard_pending_images_of_instance(cls, instance, field_name):
+        if instance.pk is None:
+            return
+
+        pending_images = cls.objects.filter(model=instance._meta.label, object_id=instance.pk, field_name=field_name)
+
+        for pending_image in pending_images:
+            pending_image.delete()
+
+    @classmethod
+    def process_pending_images(cls, batch_size=100, workers=4):
+        """
+        Saves a batch of the pending images through their derivative fields
+        :return: the amount of handled pending images
+        """
+        pending_images = cls.claim_pending_images(limit=batch_size)
+
+        for pending_image in pending_images:
+            try:
+                pending_image.process(workers=workers)
+            except Exception as e:
+                logger.exception('Error processing pending image {0}'.format(pending_image.pk))
+                pending_image.mark_as_failed_attempt(error=e)
+
+        return len(pending_images)
+
+    @classmethod
+    def claim_pending_images(cls, limit):
+        """
+        Claims a batch of the due pending images for the calling worker
+        """
+        return cls.claim_outbox_entries(
+            cls.objects.filter(next_attempt__lte=timezone.now()).order_by('next_attempt')[:limit])
+
+    def give_up(self):
+        logger.error('Giving up on pending image {0} after {1} attempts'.format(self.pk, self.attempts))
+        self.delete()
+
+    def process(self, workers=4):
+        Model = apps.get_model(self.model)
+        instance = Model.objects.filter(pk=self.object_id).first()
+
+        if instance:
+            storage = instance._meta.get_field(self.field_name).storage
+
+            with storage.open(self.original, 'rb') as original:
+                content = original.read()
+
+            if not self._is_decodable(content):
+                # Retrying a broken upload would fail the same way
+                logger.error('Giving up on undecodable pending image {0}'.format(self.pk))
+                self.delete()
+                return
+
+            fields_names = get_image_derivatives_fields_names(instance, self.field_name)
+            save_image_derivatives(instance=instance, fields_names=fields_names, name=self.original,
+                                   content=content, workers=workers)
+
+            update_fields = list(fields_names)
+            for field_name in fields_names:
+                field = instance._meta.get_field(field_name)
+                update_fields.extend(
+                    [dimension_field for dimension_field in (field.width_field, field.height_field) if
+                     dimension_field])
+
+            with transaction.atomic():
+                # A newer upload discards this one, its derivatives are not kept then
+                is_discarded = not type(self).objects.select_for_update().filter(pk=self.pk).exists()
+
+                if not is_discarded:
+                    instance.save(update_fields=update_fields)
+                    self.delete()
+
+            if is_discarded:
+                for field_name in fields_names:
+                    getattr(instance, field_name).delete(save=False)
+        else:
+            self.delete()
+
+    @staticmethod
+    def _is_decodable(content):
+        try:
+            image = Image.open(BytesIO(content))
+            image.verify()
+        except (IOError, SyntaxError, Image.DecompressionBombError):
+            return False
+        return is_image_size_allowed(image.size)
+
+    def delete(self, *args, **kwargs):
+        storage = apps.get_model(self.model)._meta.get_field(self.field_name).storage
+        storage.delete(self.original)
+        return super(PendingImage, self).delete(*args, **kwargs)
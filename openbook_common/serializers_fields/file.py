@@ -0,0 +1,126 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from generic_relations.relations import GenericRelatedField
+from rest_framework.fields import Field, SkipField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+class FileUrlField(Field):
+    """
+    The url of a file. When serializing a list, the urls of the files of all its items are loaded at once,
+    letting storages sign them in batches.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super(FileUrlField, self).__init__(**kwargs)
+
+    def get_file(self, value):
+        return value
+
+    def to_representation(self, value):
+        file = self.get_file(value)
+
+        if not file:
+            return None
+
+        return get_file_url(self, file)
+
+
+def get_file_url(field, file):
+    """
+    Get the absolute url of a file output by the field, loading the urls of the files of everything being
+    serialized if needed.
+    """
+    context = field.context
+
+    files_urls = context.get('files_urls')
+
+    if files_urls is None:
+        files_urls = _load_files_urls(field.root)
+        context['files_urls'] = files_urls
+
+    url = files_urls.get((file.storage, file.name))
+
+    if url is None:
+        url = file.url
+
+    request = context.get('request', None)
+
+    if request is not None:
+        return request.build_absolute_uri(url)
+
+    return url
+
+
+def _load_files_urls(root):
+    if isinstance(root, ListSerializer):
+        serializer, instances = root.child, root.instance
+    else:
+        serializer, instances = root, [root.instance]
+
+    files = []
+
+    for instance in instances or []:
+        _collect_files(serializer, instance, files)
+
+    storages_names = {}
+
+    # Only the storages signing urls in batches are worth loading them for
+    for file in files:
+        if hasattr(file.storage, 'urls'):
+            storages_names.setdefault(file.storage, set()).add(file.name)
+
+    files_urls = {}
+
+    for storage, names in storages_names.items():
+        for name, url in storage.urls(list(names)).items():
+            files_urls[(storage, name)] = url
+
+    return files_urls
+
+
+def _collect_files(serializer, instance, files):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        is_file_field = isinstance(field, FileUrlField)
+        is_nested_field = isinstance(field, (BaseSerializer, GenericRelatedField)) and not isinstance(field,
+                                                                                                     ListSerializer)
+
+        # Relations not loaded yet are left for their fields to sign, rather than queried twice
+        if not (is_file_field or is_nested_field) or not _is_source_loaded(field, instance):
+            continue
+
+        try:
+            attribute = field.get_attribute(instance)
+        except (SkipField, AttributeError, KeyError):
+            continue
+
+        if attribute is None:
+            continue
+
+        if is_file_field:
+            file = field.get_file(attribute)
+            if file:
+                files.append(file)
+        elif isinstance(field, GenericRelatedField):
+            _collect_files(field.get_serializer_for_instance(attribute), attribute, files)
+        else:
+            _collect_files(field, attribute, files)
+
+
+def _is_source_loaded(field, instance):
+    if len(field.source_attrs) != 1 or not isinstance(instance, models.Model):
+        return True
+
+    try:
+        model_field = instance._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return True
+
+    if not model_field.is_relation or model_field.many_to_many or model_field.one_to_many:
+        return True
+
+    return model_field.is_cached(instance)
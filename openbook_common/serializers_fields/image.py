@@ -0,0 +1,18 @@
+from openbook_common.serializers_fields.file import FileUrlField
+from openbook_common.utils.images import get_smallest_image_derivative
+
+
+class ImageDerivativeField(FileUrlField):
+    """
+    The url of the smallest stored derivative of an image field at least as wide as the width it's displayed at.
+    Null while the image is pending processing.
+    """
+
+    def __init__(self, image_field_name, width, **kwargs):
+        self.image_field_name = image_field_name
+        self.width = width
+        kwargs['source'] = '*'
+        super(ImageDerivativeField, self).__init__(**kwargs)
+
+    def get_file(self, instance):
+        return get_smallest_image_derivative(instance, field_name=self.image_field_name, width=self.width)
@@ -1,7 +1,164 @@
+from django.db.models import Count, prefetch_related_objects
 from rest_framework.fields import Field
+from rest_framework.serializers import ListSerializer
 
-from openbook_common.utils.model_loaders import get_post_model
-from openbook_posts.models import PostReaction
+from openbook_common.utils.model_loaders import get_post_model, get_post_reaction_model, get_post_mute_model, \
+    get_post_comment_model, get_community_membership_model, get_circle_model
+
+
+class PostsSerializationContext:
+    """
+    Holds everything the post fields need for the posts being serialized, bulk loaded in a fixed amount of queries.
+    """
+
+    def __init__(self, request_user):
+        self.request_user = request_user
+        self.posts_ids = set()
+        self.reactions = {}
+        self.muted_posts_ids = set()
+        self.comments_counts = {}
+        self.emoji_counts = {}
+        self.circles_ids = {}
+        self.creators_memberships = {}
+
+    def has_post(self, post):
+        return post.pk in self.posts_ids
+
+    def load_posts(self, posts):
+        posts = [post for post in posts if post.pk not in self.posts_ids]
+
+        if not posts:
+            return
+
+        posts_ids = [post.pk for post in posts]
+        self.posts_ids.update(posts_ids)
+
+        prefetch_related_objects(posts, 'creator__profile__badges', 'community', 'image', 'video', 'circles')
+
+        for post in posts:
+            self.circles_ids[post.pk] = {circle.pk for circle in post.circles.all()}
+
+        self._load_comments_counts(posts)
+        self._load_emoji_counts(posts)
+        self._load_creators_memberships(posts)
+
+        if not self.request_user.is_anonymous:
+            self._load_reactions(posts_ids)
+            self._load_muted_posts_ids(posts_ids)
+
+    def get_reaction_for_post(self, post):
+        return self.reactions.get(post.pk)
+
+    def get_comments_count_for_post(self, post):
+        if post.public_comments:
+            return post.comments_count
+
+        # If comments are private, count only own comments
+        if self.request_user.is_anonymous:
+            return None
+
+        return self.comments_counts.get(post.pk, 0)
+
+    def get_emoji_counts_for_post(self, post):
+        return self.emoji_counts.get(post.pk, [])
+
+    def is_post_muted(self, post):
+        return post.pk in self.muted_posts_ids
+
+    def is_post_encircled(self, post):
+        Circle = get_circle_model()
+        is_public_post = Circle.get_world_circle_id() in self.circles_ids.get(post.pk, set())
+        return not is_public_post and not post.community_id
+
+    def get_creator_memberships_for_post(self, post):
+        return self.creators_memberships.get((post.community_id, post.creator_id), [])
+
+    def _load_reactions(self, posts_ids):
+        PostReaction = get_post_reaction_model()
+        reactions = PostReaction.objects.select_related('reactor__profile', 'emoji').filter(
+            reactor_id=self.request_user.pk,
+            post_id__in=posts_ids)
+
+        for reaction in reactions:
+            self.reactions[reaction.post_id] = reaction
+
+    def _load_muted_posts_ids(self, posts_ids):
+        PostMute = get_post_mute_model()
+        self.muted_posts_ids.update(
+            PostMute.objects.filter(muter_id=self.request_user.pk, post_id__in=posts_ids).values_list('post_id',
+                                                                                                      flat=True))
+
+    def _load_comments_counts(self, posts):
+        private_comments_posts_ids = [post.pk for post in posts if not post.public_comments]
+
+        if not private_comments_posts_ids or self.request_user.is_anonymous:
+            return
+
+        PostComment = get_post_comment_model()
+        comments_counts = PostComment.objects.filter(post_id__in=private_comments_posts_ids,
+                                                     commenter_id=self.request_user.pk).values('post_id').annotate(
+            count=Count('id')).order_by()
+
+        for comments_count in comments_counts:
+            self.comments_counts[comments_count['post_id']] = comments_count['count']
+
+    def _load_emoji_counts(self, posts):
+        Post = get_post_model()
+
+        public_reactions_posts_ids = [post.pk for post in posts if post.public_reactions]
+        if public_reactions_posts_ids:
+            self.emoji_counts.update(Post.get_emoji_counts_for_posts_with_ids(posts_ids=public_reactions_posts_ids))
+
+        # If reactions are private count only own reactions
+        private_reactions_posts_ids = [post.pk for post in posts if not post.public_reactions]
+        if private_reactions_posts_ids and not self.request_user.is_anonymous:
+            self.emoji_counts.update(Post.get_emoji_counts_for_posts_with_ids(posts_ids=private_reactions_posts_ids,
+                                                                              reactor_id=self.request_user.pk))
+
+    def _load_creators_memberships(self, posts):
+        community_posts = [post for post in posts if post.community_id]
+
+        if not community_posts:
+            return
+
+        CommunityMembership = get_community_membership_model()
+        memberships = CommunityMembership.objects.filter(
+            community_id__in={post.community_id for post in community_posts},
+            user_id__in={post.creator_id for post in community_posts})
+
+        for membership in memberships:
+            self.creators_memberships.setdefault((membership.community_id, membership.user_id), []).append(membership)
+
+
+def get_posts_serialization_context(field, post):
+    """
+    Get the serialization context shared by the fields of all the posts being serialized, loading it if needed.
+    """
+    context = field.context
+
+    posts_serialization_context = context.get('posts_serialization_context')
+
+    if posts_serialization_context is None:
+        request = context.get('request')
+        posts_serialization_context = PostsSerializationContext(request_user=request.user)
+        context['posts_serialization_context'] = posts_serialization_context
+
+    if not posts_serialization_context.has_post(post):
+        posts_serialization_context.load_posts(_get_posts_being_serialized(field, post))
+
+    return posts_serialization_context
+
+
+def _get_posts_being_serialized(field, post):
+    root = field.root
+
+    if isinstance(root, ListSerializer) and root.instance is not None:
+        Post = get_post_model()
+        posts = [instance for instance in root.instance if isinstance(instance, Post)]
+        if post in posts:
+            return posts
+
+    return [post]
 
 
 class ReactionField(Field):
@@ -18,11 +175,10 @@ class ReactionField(Field):
         serialized_reaction = None
 
         if not request_user.is_anonymous:
-            try:
-                reaction = request_user.get_reaction_for_post_with_id(post.pk)
+            posts_serialization_context = get_posts_serialization_context(self, post)
+            reaction = posts_serialization_context.get_reaction_for_post(post)
+            if reaction:
                 serialized_reaction = self.reaction_serializer(reaction, context={'request': request}).data
-            except PostReaction.DoesNotExist:
-                pass
 
         return serialized_reaction
 
@@ -34,18 +190,9 @@ class CommentsCountField(Field):
         super(CommentsCountField, self).__init__(**kwargs)
 
     def to_representation(self, post):
-        request = self.context.get('request')
-        request_user = request.user
-
-        comments_count = None
-
-        if request_user.is_anonymous:
-            if post.public_comments:
-                comments_count = post.count_comments()
-        else:
-            comments_count = request_user.get_comments_count_for_post_with_id(post.pk)
+        posts_serialization_context = get_posts_serialization_context(self, post)
 
-        return comments_count
+        return posts_serialization_context.get_comments_count_for_post(post)
 
 
 class ReactionsEmojiCountField(Field):
@@ -57,16 +204,9 @@ class ReactionsEmojiCountField(Field):
 
     def to_representation(self, post):
         request = self.context.get('request')
-        request_user = request.user
-
-        reaction_emoji_count = []
 
-        if request_user.is_anonymous:
-            if post.public_reactions:
-                Post = get_post_model()
-                reaction_emoji_count = Post.get_emoji_counts_for_post_with_id(post.pk)
-        else:
-            reaction_emoji_count = request_user.get_emoji_counts_for_post_with_id(post.pk)
+        posts_serialization_context = get_posts_serialization_context(self, post)
+        reaction_emoji_count = posts_serialization_context.get_emoji_counts_for_post(post)
 
         post_reactions_serializer = self.emoji_count_serializer(reaction_emoji_count, many=True,
                                                                 context={"request": request, 'post': post})
@@ -85,7 +225,9 @@ class CirclesField(Field):
         request = self.context.get('request')
         request_user = request.user
         circles = []
-        if request_user.has_post_with_id(post.pk):
+        if post.creator_id == request_user.pk:
+            # Loading the context prefetches the post circles
+            get_posts_serialization_context(self, post)
             circles = post.circles
 
         return self.circle_serializer(circles, many=True, context={"request": request, 'post': post}).data
@@ -102,13 +244,15 @@ class PostCreatorField(Field):
     def to_representation(self, post):
         request = self.context.get('request')
 
+        posts_serialization_context = get_posts_serialization_context(self, post)
+
         post_creator = post.creator
         post_community = post.community
 
         post_creator_serializer = self.post_creator_serializer(post_creator, context={"request": request}).data
 
         if post_community:
-            post_creator_memberships = post_community.memberships.filter(user=post_creator).all()
+            post_creator_memberships = posts_serialization_context.get_creator_memberships_for_post(post)
             post_creator_serializer['communities_memberships'] = self.community_membership_serializer(
                 post_creator_memberships,
                 many=True,
@@ -131,7 +275,8 @@ class IsMutedField(Field):
         is_muted = False
 
         if not request_user.is_anonymous:
-            is_muted = request_user.has_muted_post_with_id(post_id=post.pk)
+            posts_serialization_context = get_posts_serialization_context(self, post)
+            is_muted = posts_serialization_context.is_post_muted(post)
 
         return is_muted
 
@@ -149,6 +294,7 @@ class IsEncircledField(Field):
         is_encircled = False
 
         if not request_user.is_anonymous:
-            is_encircled = post.is_encircled_post()
+            posts_serialization_context = get_posts_serialization_context(self, post)
+            is_encircled = posts_serialization_context.is_post_encircled(post)
 
         return is_encircled
@@ -1,9 +1,13 @@
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import URLField, FileField
+from rest_framework.fields import URLField, FileField, CharField
+from django.conf import settings
 from django.template.defaultfilters import filesizeformat
 from django.utils.translation import ugettext_lazy as _
 from django.forms import ImageField as DjangoImageField
 
+from openbook_common.utils.images import is_image_size_allowed
+from openbook_common.utils.pagination import decode_cursor
+
 
 class FriendlyUrlField(URLField):
     def to_internal_value(self, data):
@@ -48,6 +52,7 @@ class RestrictedImageFileSizeField(RestrictedFileSizeField):
         'invalid_image': _(
             'Upload a valid image. The file you uploaded was either not an image or a corrupted image.'
         ),
+        'image_too_large': _('Please keep the image under %(max_megapixels)s megapixels.'),
     }
 
     def __init__(self, *args, **kwargs):
@@ -61,4 +66,27 @@ class RestrictedImageFileSizeField(RestrictedFileSizeField):
         file_object = super().to_internal_value(data)
         django_field = self._DjangoImageField()
         django_field.error_messages = self.error_messages
-        return django_field.clean(file_object)
+        file_object = django_field.clean(file_object)
+
+        # The size comes from the header, the image is not decoded
+        if not is_image_size_allowed(file_object.image.size):
+            self.fail('image_too_large', max_megapixels=settings.IMAGE_MAX_PIXELS // 1000000)
+
+        return file_object
+
+
+class CursorField(CharField):
+    """
+    An opaque pagination cursor, deserialized into its (created, id) position
+    """
+    default_error_messages = {
+        'invalid_cursor': _('The cursor is not valid.'),
+    }
+
+    def to_internal_value(self, data):
+        cursor = super().to_internal_value(data)
+
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            self.fail('invalid_cursor')
@@ -98,7 +98,7 @@ class FollowersCountField(Field):
         if not user.profile.followers_count_visible and user.pk != request_user.pk:
             return None
 
-        return user.count_followers()
+        return user.followers_count
 
 
 class FollowingCountField(Field):
@@ -108,7 +108,7 @@ class FollowingCountField(Field):
         super(FollowingCountField, self).__init__(**kwargs)
 
     def to_representation(self, value):
-        return value.count_following()
+        return value.following_count
 
 
 class PostsCountField(Field):
@@ -122,10 +122,10 @@ class PostsCountField(Field):
 
         if not request.user.is_anonymous:
             if request.user.pk == value.pk:
-                return value.count_posts()
+                return value.posts_count
             return value.count_posts_for_user_with_id(request.user.pk)
 
-        return value.count_public_posts()
+        return value.public_posts_count
 
 
 class UnreadNotificationsCountField(Field):
@@ -8,6 +8,7 @@ from openbook_auth.models import User, UserProfile
 from openbook_categories.models import Category
 from openbook_circles.models import Circle
 from openbook_common.models import Emoji, EmojiGroup, Badge
+from openbook_common.utils.pagination import NEXT_CURSOR_HEADER
 from openbook_devices.models import Device
 from openbook_notifications.models import Notification
 
@@ -27,13 +28,13 @@ def make_fake_post_comment_text():
     return fake.text(max_nb_chars=settings.POST_COMMENT_MAX_LENGTH)
 
 
-def make_user(username=None):
+def make_user(username=None, name=None):
     if username:
         user = mixer.blend(User, username=username)
     else:
         user = mixer.blend(User)
 
-    profile = make_profile(user)
+    profile = make_profile(user, name=name)
     return user
 
 
@@ -48,7 +49,10 @@ def make_users(amount):
     return users
 
 
-def make_profile(user=None):
+def make_profile(user=None, name=None):
+    if name:
+        return mixer.blend(UserProfile, user=user, name=name)
+
     return mixer.blend(UserProfile, user=user)
 
 
@@ -176,3 +180,25 @@ def make_notification(owner):
 
 def make_device(owner):
     return mixer.blend(Device, owner=owner)
+
+
+def get_ids_following_cursor(client, url, headers, count, query_params=None):
+    """
+    Retrieves every page of the url following the next cursor of each, returning the ids of all their items in order
+    """
+    ids = []
+    cursor = None
+
+    while True:
+        page_query_params = dict(query_params or {}, count=count)
+
+        if cursor:
+            page_query_params['cursor'] = cursor
+
+        response = client.get(url, page_query_params, **headers)
+        ids.extend([item['id'] for item in response.json()])
+
+        cursor = response.get(NEXT_CURSOR_HEADER)
+
+        if not cursor:
+            return ids
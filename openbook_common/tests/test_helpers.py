@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from openbook_auth.models import User
+from openbook_common.tests.helpers import make_user
+from openbook_common.utils.helpers import update_count
+
+
+class UpdateCountTests(TestCase):
+    """
+    update_count
+    """
+
+    def test_adds_amount_to_count(self):
+        """
+        should add the amount to the count of the queryset rows
+        """
+        user = make_user()
+        users = User.objects.filter(pk=user.pk)
+
+        update_count(users, 'posts_count', 3)
+        update_count(users, 'posts_count', -1)
+
+        self.assertEqual(users.get().posts_count, 2)
+
+    def test_clamps_count_to_zero(self):
+        """
+        should set the count to zero instead of subtracting an amount taking it below zero
+        """
+        user = make_user()
+        users = User.objects.filter(pk=user.pk)
+
+        update_count(users, 'posts_count', 2)
+        update_count(users, 'posts_count', -3)
+
+        self.assertEqual(users.get().posts_count, 0)
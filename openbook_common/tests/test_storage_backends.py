@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from openbook.storage_backends import S3PrivateMediaStorage
+
+
+def make_private_media_storage():
+    # Urls are signed locally, no request is made to the bucket
+    return S3PrivateMediaStorage(location='private', bucket_name='bucket', access_key='key', secret_key='secret',
+                                 region_name='eu-west-1')
+
+
+class S3PrivateMediaStorageTests(TestCase):
+    """
+    S3PrivateMediaStorage
+    """
+
+    def setUp(self):
+        caches['signed_urls'].clear()
+
+    def test_url_is_signed(self):
+        """
+        should return the url of the name signed
+        """
+        storage = make_private_media_storage()
+
+        url = storage.url('posts/image.jpg')
+
+        self.assertIn('private/posts/image.jpg', url)
+        self.assertIn('Signature', url)
+
+    def test_url_is_signed_once_while_cached(self):
+        """
+        should sign the url of a name once and serve it from the cache afterwards
+        """
+        storage = make_private_media_storage()
+
+        with mock.patch.object(S3Boto3Storage, 'url', autospec=True, side_effect=S3Boto3Storage.url) as sign_url:
+            url = storage.url('posts/image.jpg')
+            cached_url = storage.url('posts/image.jpg')
+
+        self.assertEqual(url, cached_url)
+        self.assertEqual(sign_url.call_count, 1)
+
+    def test_url_is_cached_across_storages(self):
+        """
+        should serve the url signed by another storage of the same bucket from the cache
+        """
+        url = make_private_media_storage().url('posts/image.jpg')
+
+        with mock.patch.object(S3Boto3Storage, 'url', autospec=True, side_effect=S3Boto3Storage.url) as sign_url:
+            cached_url = make_private_media_storage().url('posts/image.jpg')
+
+        self.assertEqual(url, cached_url)
+        self.assertEqual(sign_url.call_count, 0)
+
+    def test_urls_signs_only_uncached_names(self):
+        """
+        should sign only the names whose urls are not cached, with a single cache query each way
+        """
+        storage = make_private_media_storage()
+        cached_url = storage.url('posts/cached.jpg')
+        cache = caches['signed_urls']
+
+        with mock.patch.object(S3Boto3Storage, 'url', autospec=True, side_effect=S3Boto3Storage.url) as sign_url, \
+                mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            urls = storage.urls(['posts/cached.jpg', 'posts/first.jpg', 'posts/second.jpg'])
+
+        self.assertEqual(urls['posts/cached.jpg'], cached_url)
+        self.assertIn('private/posts/first.jpg', urls['posts/first.jpg'])
+        self.assertIn('private/posts/second.jpg', urls['posts/second.jpg'])
+        self.assertEqual(sign_url.call_count, 2)
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(set_many.call_count, 1)
+
+    def test_url_with_expiry_is_not_cached(self):
+        """
+        should sign the urls with their own expiry every time
+        """
+        storage = make_private_media_storage()
+
+        with mock.patch.object(S3Boto3Storage, 'url', autospec=True, side_effect=S3Boto3Storage.url) as sign_url:
+            storage.url('posts/image.jpg', expire=60)
+            storage.url('posts/image.jpg', expire=60)
+
+        self.assertEqual(sign_url.call_count, 2)
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import TestCase
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from openbook_common.upload_handlers import S3StorageWriter
+
+
+def make_storage_with_mocked_bucket():
+    storage = S3Boto3Storage(location='private', bucket_name='bucket', access_key='key', secret_key='secret',
+                             region_name='eu-west-1', default_acl='private', file_overwrite=True)
+    storage._bucket = mock.MagicMock()
+    multipart_upload = storage._bucket.Object.return_value.initiate_multipart_upload.return_value
+    multipart_upload.Part.return_value.upload.return_value = {'ETag': 'etag'}
+    return storage, multipart_upload
+
+
+class S3StorageWriterTests(TestCase):
+    """
+    S3StorageWriter
+    """
+
+    def test_writes_chunks_as_parts(self):
+        """
+        should upload the written chunks in parts of at least the part size and complete the upload when closed
+        """
+        storage, multipart_upload = make_storage_with_mocked_bucket()
+
+        with mock.patch.object(S3StorageWriter, 'PART_SIZE', 4):
+            writer = S3StorageWriter(storage=storage, name='videos/video.mp4')
+
+            for chunk in (b'012', b'345', b'67', b'89'):
+                writer.write(chunk)
+
+            name = writer.close()
+
+        self.assertEqual(name, 'videos/video.mp4')
+        storage._bucket.Object.assert_called_once_with('private/videos/video.mp4')
+        storage._bucket.Object.return_value.initiate_multipart_upload.assert_called_once_with(
+            ContentType='video/mp4', ACL='private')
+
+        uploaded_parts = [(part_call[0][0], upload_call[1]['Body']) for part_call, upload_call in
+                          zip(multipart_upload.Part.call_args_list,
+                              multipart_upload.Part.return_value.upload.call_args_list)]
+
+        self.assertEqual(uploaded_parts, [(1, b'012345'), (2, b'6789')])
+        multipart_upload.complete.assert_called_once_with(MultipartUpload={'Parts': [
+            {'ETag': 'etag', 'PartNumber': 1},
+            {'ETag': 'etag', 'PartNumber': 2},
+        ]})
+        multipart_upload.abort.assert_not_called()
+
+    def test_aborted_upload_is_not_completed(self):
+        """
+        should abort the multipart upload without completing it
+        """
+        storage, multipart_upload = make_storage_with_mocked_bucket()
+
+        writer = S3StorageWriter(storage=storage, name='videos/video.mp4')
+        writer.write(b'0123')
+        writer.abort()
+
+        multipart_upload.abort.assert_called_once_with()
+        multipart_upload.complete.assert_not_called()
@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -5,7 +6,11 @@ from rest_framework.test import APITestCase
 import logging
 import json
 
-from openbook_common.tests.helpers import make_emoji_group, make_emoji, make_user, make_authentication_headers_for_user
+from openbook_auth.models import User
+from openbook_common.tests.helpers import make_emoji_group, make_emoji, make_user, make_authentication_headers_for_user, \
+    make_fake_post_text, make_community
+from openbook_communities.models import Community
+from openbook_posts.models import Post
 
 logger = logging.getLogger(__name__)
 
@@ -98,3 +103,43 @@ class TestEmojiGroups(APITestCase):
 
     def _get_url(self):
         return reverse('emoji-groups')
+
+
+class ReconcileCountsCommandTests(APITestCase):
+    """
+    ReconcileCountsCommand
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    def test_reconciles_drifted_counts(self):
+        """
+        should set the drifted counts back to the amount of rows
+        """
+        user = make_user()
+        follower = make_user()
+        follower.follow_user_with_id(user.pk)
+
+        post = user.create_public_post(text=make_fake_post_text())
+        follower.comment_post_with_id(post_id=post.pk, text=make_fake_post_text())
+
+        community = make_community(creator=user)
+
+        Post.objects.filter(pk=post.pk).update(comments_count=7)
+        User.objects.filter(pk=user.pk).update(posts_count=0, public_posts_count=4, followers_count=3)
+        Community.objects.filter(pk=community.pk).update(members_count=0)
+
+        call_command('reconcile_counts')
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        user.refresh_from_db()
+        self.assertEqual(user.posts_count, 1)
+        self.assertEqual(user.public_posts_count, 1)
+        self.assertEqual(user.followers_count, 1)
+
+        community.refresh_from_db()
+        self.assertEqual(community.members_count, 1)
@@ -0,0 +1,217 @@
+import mimetypes
+import os
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.template.defaultfilters import filesizeformat
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name, safe_join
+
+
+class StorageUploadHandler(FileUploadHandler):
+    """
+    Streams the file of a field of the request body straight into a storage as it's received, instead of spooling
+    it to memory or disk first. Every chunk is written before the next one is read, so a slow storage slows the
+    upload down rather than buffering it. Files over the maximum size are rejected as soon as they exceed it.
+    The storage name of the file is made by upload_to from the name of the uploaded file.
+    """
+
+    def __init__(self, request, field_name, storage, max_upload_size, upload_to):
+        super(StorageUploadHandler, self).__init__(request=request)
+        self.target_field_name = field_name
+        self.storage = storage
+        self.max_upload_size = max_upload_size
+        self.upload_to = upload_to
+        self.writer = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super(StorageUploadHandler, self).new_file(field_name, file_name, content_type, content_length, charset,
+                                                   content_type_extra)
+
+        if field_name != self.target_field_name:
+            return
+
+        if content_length and content_length > self.max_upload_size:
+            self._reject()
+
+        self.writer = open_storage_writer(storage=self.storage, name=self.upload_to(file_name))
+
+        # The remaining handlers don't get to buffer this file
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.writer:
+            return raw_data
+
+        if start + len(raw_data) > self.max_upload_size:
+            self.writer.abort()
+            self.writer = None
+            self._reject()
+
+        self.writer.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.writer:
+            return None
+
+        name = self.writer.close()
+        self.writer = None
+
+        return StorageUploadedFile(storage=self.storage, storage_name=name, name=self.file_name,
+                                   content_type=self.content_type, size=file_size, charset=self.charset,
+                                   content_type_extra=self.content_type_extra)
+
+    def upload_complete(self):
+        # The body ended or failed to parse halfway through the file
+        if self.writer:
+            self.writer.abort()
+            self.writer = None
+
+    def _reject(self):
+        raise ValidationError({
+            self.target_field_name: [
+                _('Please keep filesize under %s.') % filesizeformat(self.max_upload_size)
+            ]
+        })
+
+
+class StorageUploadedFile(UploadedFile):
+    """
+    A file uploaded straight into a storage. Unless marked as saved by whatever keeps its storage name,
+    it's deleted from the storage once the request finishes.
+    """
+
+    def __init__(self, storage, storage_name, name, content_type, size, charset, content_type_extra=None):
+        super(StorageUploadedFile, self).__init__(file=None, name=name, content_type=content_type, size=size,
+                                                  charset=charset, content_type_extra=content_type_extra)
+        self.storage = storage
+        self.storage_name = storage_name
+        self.saved = False
+
+    def open(self, mode='rb'):
+        self.file = self.storage.open(self.storage_name, mode)
+        return self
+
+    def mark_as_saved(self):
+        self.saved = True
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+        if not self.saved and self.storage_name:
+            self.storage.delete(self.storage_name)
+            self.storage_name = None
+
+
+def open_storage_writer(storage, name):
+    if isinstance(storage, FileSystemStorage):
+        return FileSystemStorageWriter(storage=storage, name=name)
+
+    if isinstance(storage, S3Boto3Storage):
+        return S3StorageWriter(storage=storage, name=name)
+
+    return BufferedStorageWriter(storage=storage, name=name)
+
+
+class FileSystemStorageWriter:
+    """
+    Writes the chunks straight into the file at its final path
+    """
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = storage.get_available_name(name)
+        self.path = storage.path(self.name)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'xb')
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+        return self.name
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+class S3StorageWriter:
+    """
+    Writes the chunks as the parts of a multipart upload, keeping in memory only the part being filled
+    """
+
+    # Every part but the last one must be at least 5MB
+    PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, storage, name):
+        self.name = storage.get_available_name(name)
+
+        parameters = dict(storage.object_parameters)
+        parameters['ContentType'] = mimetypes.guess_type(self.name)[0] or storage.default_content_type
+
+        if storage.encryption:
+            parameters['ServerSideEncryption'] = 'AES256'
+
+        if storage.default_acl:
+            parameters['ACL'] = storage.default_acl
+
+        key = safe_join(storage.location, clean_name(self.name))
+        self.multipart_upload = storage.bucket.Object(key).initiate_multipart_upload(**parameters)
+        self.parts = []
+        self.part = BytesIO()
+
+    def write(self, data):
+        self.part.write(data)
+
+        if self.part.tell() >= self.PART_SIZE:
+            self._upload_part()
+
+    def close(self):
+        # An empty file is uploaded as a single empty part
+        if self.part.tell() or not self.parts:
+            self._upload_part()
+
+        self.multipart_upload.complete(MultipartUpload={'Parts': self.parts})
+        return self.name
+
+    def abort(self):
+        self.multipart_upload.abort()
+
+    def _upload_part(self):
+        part_number = len(self.parts) + 1
+        response = self.multipart_upload.Part(part_number).upload(Body=self.part.getvalue())
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.part = BytesIO()
+
+
+class BufferedStorageWriter:
+    """
+    For other storages, buffers the chunks in a spooled temporary file and saves it once complete
+    """
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+        self.file = SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+                                         dir=settings.FILE_UPLOAD_TEMP_DIR)
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.seek(0)
+        name = self.storage.save(self.name, self.file)
+        self.file.close()
+        return name
+
+    def abort(self):
+        self.file.close()
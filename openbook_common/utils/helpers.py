@@ -1,3 +1,8 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import F, Count, OuterRef, Subquery, IntegerField, Case, When, Value
+from django.db.models.functions import Coalesce
 from django.http import QueryDict
 import secrets
 from imagekit.utils import get_cache
@@ -56,3 +61,75 @@ def delete_image_kit_image_field(image_kit_field):
         image_kit_field.storage.delete(file.name)
 
     image_kit_field.delete()
+
+
+def update_count(queryset, count_field_name, amount=1):
+    """
+    Atomically adds the amount to a denormalized count column of the queryset rows.
+    Counts are clamped to zero rather than going below it, any drift is fixed with the reconcile_counts command.
+    """
+    count = F(count_field_name) + amount
+
+    if amount < 0:
+        # Not subtracted below zero at all, the unsigned columns of MySQL reject it even within an expression
+        count = Case(When(**{'%s__gte' % count_field_name: -amount}, then=count), default=Value(0),
+                     output_field=IntegerField())
+
+    return queryset.update(**{count_field_name: count})
+
+
+def exclude_counts_from_save(instance, counts_fields_names, save_kwargs):
+    """
+    Saving an already stored instance must not overwrite its counts with stale values,
+    these are only written with update_count.
+    """
+    if instance.pk is None or save_kwargs.get('force_insert') or save_kwargs.get('update_fields') is not None:
+        return
+
+    save_kwargs['update_fields'] = [field.name for field in instance._meta.concrete_fields if
+                                    not field.primary_key and field.name not in counts_fields_names]
+
+
+def reconcile_count(queryset, count_field_name, related_queryset, related_field_name):
+    """
+    Sets the count column of the queryset rows that drifted from the amount of related rows pointing to them
+    :param related_queryset: the rows being counted
+    :param related_field_name: the field of the related rows pointing to the queryset rows
+    :return: the amount of reconciled rows
+    """
+    actual_count = Coalesce(Subquery(
+        related_queryset.filter(**{related_field_name: OuterRef('pk')}).order_by().values(
+            related_field_name).annotate(count=Count('pk')).values('count')[:1],
+        output_field=IntegerField()), 0)
+
+    drifted_ids = list(queryset.annotate(actual_count=actual_count).exclude(
+        **{count_field_name: F('actual_count')}).values_list('pk', flat=True))
+
+    if drifted_ids:
+        queryset.model.objects.filter(pk__in=drifted_ids).update(**{count_field_name: actual_count})
+
+    return len(drifted_ids)
+
+
+def get_stale_while_revalidate_cached_value(key, compute_value, fresh_for, stale_for):
+    """
+    Returns the cached value of the key, computing it when missing.
+    Once older than fresh_for seconds the value keeps being returned for stale_for more seconds
+    while the single caller which gets the revalidation lock recomputes it.
+    """
+    cached_value = cache.get(key)
+    now = time.time()
+
+    if cached_value is not None:
+        value, fresh_until = cached_value
+        if now < fresh_until or not cache.add('%s:revalidating' % key, True, stale_for):
+            return value
+
+    # A failing computation must not keep the stale value from being revalidated until it expires
+    try:
+        value = compute_value()
+        cache.set(key, (value, now + fresh_for), fresh_for + stale_for)
+    finally:
+        cache.delete('%s:revalidating' % key)
+
+    return value
@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from imagekit.utils import generate, suggest_extension
+from pilkit.processors import Transpose
+
+EXIF_ORIENTATION_TAG = 0x0112
+# Orientations whose rotation swaps the width and height of the stored image
+EXIF_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def is_image_size_allowed(size):
+    width, height = size
+    return width * height <= settings.IMAGE_MAX_PIXELS
+
+
+class DraftDecode(object):
+    """
+    Makes the JPEG decoder scale the image down by the largest power of two keeping it at least as large as the
+    size it's resized to afterwards, instead of decoding it at full resolution.
+    Images with more pixels than allowed are rejected from their header, before being decoded.
+    """
+
+    def __init__(self, width=None, height=None):
+        self.width = width
+        self.height = height
+
+    def process(self, img):
+        if not is_image_size_allowed(img.size):
+            raise Image.DecompressionBombError('Image size %s exceeds the allowed pixels' % (img.size,))
+
+        if img.format != 'JPEG':
+            return img
+
+        width, height = self.width or 1, self.height or 1
+
+        # The size is for the image once oriented as its EXIF says
+        try:
+            orientation = (img._getexif() or {}).get(EXIF_ORIENTATION_TAG)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            orientation = None
+
+        if orientation in EXIF_TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+
+        img.draft(img.mode, (width, height))
+
+        return img
+
+
+def make_image_processors(resize):
+    """
+    The processors ingesting an upload and resizing it with the resize processor. The image is decoded at reduced
+    resolution when possible and oriented as its EXIF says, the EXIF itself is not kept in the result.
+    """
+    return [DraftDecode(width=resize.width, height=resize.height), Transpose(Transpose.AUTO), resize]
+
+
+def save_image_derivatives(instance, fields_names, name, content, workers=4):
+    """
+    Saves the original image content through every derivative field of the instance, each field processing it with
+    its own processors. Derivatives are generated and stored in parallel, the instance is not saved.
+    """
+    fields = [instance._meta.get_field(field_name) for field_name in fields_names]
+
+    # Upload paths can query the database, so they're made in the calling thread like every other query
+    names = [field.generate_filename(instance, os.path.basename(name)) for field in fields]
+
+    def save_derivative(field, derivative_name):
+        spec = field.get_spec(source=ContentFile(content))
+        derivative_name = '%s%s' % (os.path.splitext(derivative_name)[0],
+                                    suggest_extension(derivative_name, spec.format))
+        return field.storage.save(derivative_name, generate(spec))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        derivatives_names = list(executor.map(save_derivative, fields, names))
+
+    for field, derivative_name in zip(fields, derivatives_names):
+        setattr(instance, field.name, derivative_name)
+        field.update_dimension_fields(instance, force=True)
+
+
+def get_image_derivatives_fields_names(instance, field_name):
+    return [derivative_field_name for derivative_field_name, width in instance.IMAGE_DERIVATIVES[field_name]]
+
+
+def get_smallest_image_derivative(instance, field_name, width):
+    """
+    Returns the smallest stored derivative of the image at least as wide as the width, or the largest one
+    stored if none is. Images pending processing have none.
+    """
+    largest_derivative = None
+
+    for derivative_field_name, derivative_width in instance.IMAGE_DERIVATIVES[field_name]:
+        derivative = getattr(instance, derivative_field_name)
+
+        if not derivative:
+            continue
+
+        if derivative_width >= width:
+            return derivative
+
+        largest_derivative = derivative
+
+    return largest_derivative
@@ -17,10 +17,30 @@ def get_post_model():
     return apps.get_model('openbook_posts.Post')
 
 
+def get_post_image_model():
+    return apps.get_model('openbook_posts.PostImage')
+
+
+def get_post_video_model():
+    return apps.get_model('openbook_posts.PostVideo')
+
+
+def get_post_media_upload_model():
+    return apps.get_model('openbook_posts.PostMediaUpload')
+
+
 def get_post_mute_model():
     return apps.get_model('openbook_posts.PostMute')
 
 
+def get_timeline_post_model():
+    return apps.get_model('openbook_posts.TimelinePost')
+
+
+def get_trending_post_model():
+    return apps.get_model('openbook_posts.TrendingPost')
+
+
 def get_list_model():
     return apps.get_model('openbook_lists.List')
 
@@ -29,6 +49,18 @@ def get_community_model():
     return apps.get_model('openbook_communities.Community')
 
 
+def get_trending_community_model():
+    return apps.get_model('openbook_communities.TrendingCommunity')
+
+
+def get_community_search_token_model():
+    return apps.get_model('openbook_communities.CommunitySearchToken')
+
+
+def get_community_member_search_token_model():
+    return apps.get_model('openbook_communities.CommunityMemberSearchToken')
+
+
 def get_community_invite_model():
     return apps.get_model('openbook_communities.CommunityInvite')
 
@@ -101,9 +133,21 @@ def get_notification_model():
     return apps.get_model('openbook_notifications.Notification')
 
 
+def get_push_notification_model():
+    return apps.get_model('openbook_notifications.PushNotification')
+
+
 def get_device_model():
     return apps.get_model('openbook_devices.Device')
 
 
 def get_user_model():
     return apps.get_model('openbook_auth.User')
+
+
+def get_user_search_token_model():
+    return apps.get_model('openbook_auth.UserSearchToken')
+
+
+def get_pending_image_model():
+    return apps.get_model('openbook_common.PendingImage')
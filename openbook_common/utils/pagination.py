@@ -0,0 +1,71 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+CURSOR_SEPARATOR = '|'
+
+
+def encode_cursor(created, id):
+    """
+    Encodes the position of an item in a feed ordered on (created, id) as an opaque cursor
+    """
+    position = '%s%s%d' % (created.isoformat(), CURSOR_SEPARATOR, id)
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor into its (created, id) position. Raises ValueError if the cursor is not one of ours.
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    except (binascii.Error, UnicodeError):
+        raise ValueError('Malformed cursor')
+
+    created, separator, id = position.rpartition(CURSOR_SEPARATOR)
+    created = parse_datetime(created) if separator else None
+
+    if not created or not id.isdigit():
+        raise ValueError('Malformed cursor')
+
+    return created, int(id)
+
+
+def paginate_with_cursor(queryset, count, cursor=None, max_id=None, created_field='created'):
+    """
+    Returns a page of the queryset ordered newest first on (created, id) and the cursor of the next page,
+    None when there are no more items.
+    The page starts after the decoded cursor or, for clients still paginating with max_id,
+    after the position of the item with that id.
+    """
+    if not cursor and max_id:
+        cursor = queryset.model.objects.filter(pk=max_id).values_list(created_field, 'id').first()
+
+        if not cursor:
+            queryset = queryset.filter(id__lt=max_id)
+
+    if cursor:
+        created, id = cursor
+        # The leading inclusive bound lets the database scan the (created, id) index as a range
+        queryset = queryset.filter(Q(**{'%s__lte' % created_field: created}),
+                                   Q(**{'%s__lt' % created_field: created}) | Q(id__lt=id))
+
+    page = list(queryset.order_by('-%s' % created_field, '-id')[:count])
+
+    next_cursor = None
+
+    if len(page) == count:
+        last_item = page[-1]
+        next_cursor = encode_cursor(getattr(last_item, created_field), last_item.pk)
+
+    return page, next_cursor
+
+
+def add_next_cursor_to_response(response, next_cursor):
+    if next_cursor:
+        response[NEXT_CURSOR_HEADER] = next_cursor
+
+    return response
@@ -0,0 +1,79 @@
+import unicodedata
+
+from django.db.models import Case, When, Value, IntegerField
+
+SEARCH_TOKEN_LENGTH = 3
+SEARCH_PREFIX_MARKER = '^'
+
+
+def normalize_search_text(text):
+    """
+    Lowercases the text and strips its accents
+    """
+    if not text:
+        return ''
+
+    decomposed_text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join([character for character in decomposed_text if not unicodedata.combining(character)]).strip()
+
+
+def make_search_tokens(*texts):
+    """
+    Makes the tokens to index the texts with. These are the trigrams of every text and every word in them,
+    with the start of each text and word marked so queries of one or two characters can match as prefixes.
+    """
+    tokens = set()
+
+    for text in texts:
+        normalized_text = normalize_search_text(text)
+
+        if not normalized_text:
+            continue
+
+        words = normalized_text.split()
+
+        for word in [normalized_text] + words:
+            marked_word = SEARCH_PREFIX_MARKER + word
+            tokens.add(marked_word[:2])
+            tokens.update(_make_trigrams(marked_word))
+
+    return tokens
+
+
+def make_search_query_tokens(query):
+    """
+    Makes the tokens a text must have been indexed with to contain the query.
+    Queries shorter than a trigram only match the start of a text or word.
+    """
+    normalized_query = normalize_search_text(query)
+
+    if not normalized_query:
+        return set()
+
+    if len(normalized_query) < SEARCH_TOKEN_LENGTH:
+        return {SEARCH_PREFIX_MARKER + normalized_query}
+
+    return _make_trigrams(normalized_query)
+
+
+def _make_trigrams(text):
+    return {text[i:i + SEARCH_TOKEN_LENGTH] for i in range(0, len(text) - SEARCH_TOKEN_LENGTH + 1)}
+
+
+def paginate_ranked_search_results(queryset, exact_match_query, max_id=None):
+    """
+    Orders the search results with the exact match first and the rest newest first.
+    The page after max_id has the rest of the results older than it or, when max_id was the exact match,
+    all of them.
+    """
+    if max_id:
+        remaining_queryset = queryset.exclude(exact_match_query)
+
+        if not queryset.filter(exact_match_query, id=max_id).exists():
+            remaining_queryset = remaining_queryset.filter(id__lt=max_id)
+
+        return remaining_queryset.order_by('-id')
+
+    return queryset.annotate(
+        search_rank=Case(When(exact_match_query, then=Value(1)), default=Value(0),
+                         output_field=IntegerField())).order_by('-search_rank', '-id')
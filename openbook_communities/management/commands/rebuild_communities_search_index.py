@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_common.utils.model_loaders import get_community_search_token_model, \
+    get_community_member_search_token_model
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search tokens of every community and community member. ' \
+           'Must also be run once after enabling FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Search tokens to insert per query')
+
+    def handle(self, *args, **options):
+        CommunitySearchToken = get_community_search_token_model()
+        CommunityMemberSearchToken = get_community_member_search_token_model()
+
+        CommunitySearchToken.rebuild(batch_size=options['batch_size'])
+        logger.info('Rebuilt {0} communities search tokens'.format(CommunitySearchToken.objects.count()))
+
+        CommunityMemberSearchToken.rebuild(batch_size=options['batch_size'])
+        logger.info('Rebuilt {0} communities members search tokens'.format(CommunityMemberSearchToken.objects.count()))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_common.utils.model_loaders import get_trending_community_model
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the global and per category trending communities rankings from the communities members counts'
+
+    def handle(self, *args, **options):
+        TrendingCommunity = get_trending_community_model()
+        TrendingCommunity.rebuild()
+        logger.info('Rebuilt {0} trending communities entries'.format(TrendingCommunity.objects.count()))
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:47
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_count(queryset, count_field_name, related_queryset, related_field_name):
+    # The rows of the related queryset pointing to every row of the queryset
+    count = Coalesce(Subquery(
+        related_queryset.filter(**{related_field_name: OuterRef('pk')}).order_by().values(
+            related_field_name).annotate(count=Count('pk')).values('count')[:1],
+        output_field=IntegerField()), 0)
+
+    queryset.update(**{count_field_name: count})
+
+
+def populate_members_count(apps, schema_editor):
+    Community = apps.get_model('openbook_communities', 'Community')
+    CommunityMembership = apps.get_model('openbook_communities', 'CommunityMembership')
+
+    populate_count(Community.objects.all(), 'members_count', CommunityMembership.objects.all(), 'community_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_communities', '0018_auto_20190309_1527'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='members_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='members count'),
+        ),
+        migrations.RunPython(populate_members_count, migrations.RunPython.noop),
+    ]
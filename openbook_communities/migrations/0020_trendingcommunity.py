@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_categories', '0004_category_order'),
+        ('openbook_communities', '0019_community_members_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingCommunity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('members_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('community_created', models.DateTimeField(editable=False)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trending_communities', to='openbook_categories.Category')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_communities', to='openbook_communities.Community')),
+            ],
+            options={
+                'unique_together': {('community', 'category')},
+                'index_together': {('category', 'members_count', 'community_created')},
+            },
+        ),
+    ]
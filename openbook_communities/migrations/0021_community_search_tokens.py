@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('openbook_communities', '0020_trendingcommunity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunitySearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(editable=False, max_length=3)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='openbook_communities.Community')),
+            ],
+            options={
+                'index_together': {('token', 'community')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CommunityMemberSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(editable=False, max_length=3)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members_search_tokens', to='openbook_communities.Community')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='communities_members_search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'index_together': {('community', 'token', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_communities', '0021_community_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='community',
+            index_together={('created', 'id')},
+        ),
+    ]
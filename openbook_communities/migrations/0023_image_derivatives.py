@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:52
+
+from django.db import migrations
+import imagekit.models.fields
+import openbook_communities.helpers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_communities', '0022_feed_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='avatar_thumbnail',
+            field=imagekit.models.fields.ProcessedImageField(editable=False, null=True, upload_to=openbook_communities.helpers.upload_to_community_avatar_directory, verbose_name='avatar thumbnail'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 
 # Create your models here.
 from django.utils import timezone
@@ -7,12 +7,21 @@ from django.db.models import Q
 from django.db.models import Count
 from pilkit.processors import ResizeToFill, ResizeToFit
 
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
 from openbook.settings import COLOR_ATTR_MAX_LENGTH
-from openbook_auth.models import User
+from openbook_auth.models import User, UserProfile, UserSearchToken
 from django.utils.translation import ugettext_lazy as _
 
+from openbook_common.utils.helpers import update_count, exclude_counts_from_save, \
+    get_stale_while_revalidate_cached_value
 from openbook_common.utils.model_loaders import get_community_invite_model, \
     get_community_log_model, get_category_model
+from openbook_common.utils.search import SEARCH_TOKEN_LENGTH, make_search_tokens, make_search_query_tokens, \
+    paginate_ranked_search_results
+from openbook_common.models import PendingImage
+from openbook_common.utils.images import make_image_processors
 from openbook_common.validators import hex_color_validator
 from openbook_communities.helpers import upload_to_community_avatar_directory, upload_to_community_cover_directory
 from openbook_communities.validators import community_name_characters_validator
@@ -31,11 +40,15 @@ class Community(models.Model):
     rules = models.CharField(_('rules'), max_length=settings.COMMUNITY_RULES_MAX_LENGTH, blank=False,
                              null=True)
     avatar = ProcessedImageField(verbose_name=_('avatar'), blank=False, null=True, format='JPEG',
-                                 options={'quality': 60}, processors=[ResizeToFill(500, 500)],
+                                 options={'quality': 60}, processors=make_image_processors(ResizeToFill(500, 500)),
                                  upload_to=upload_to_community_avatar_directory)
+    avatar_thumbnail = ProcessedImageField(verbose_name=_('avatar thumbnail'), blank=False, null=True, format='JPEG',
+                                           options={'quality': 60},
+                                           processors=make_image_processors(ResizeToFill(100, 100)),
+                                           upload_to=upload_to_community_avatar_directory, editable=False)
     cover = ProcessedImageField(verbose_name=_('cover'), blank=False, null=True, format='JPEG', options={'quality': 50},
                                 upload_to=upload_to_community_cover_directory,
-                                processors=[ResizeToFit(width=1024, upscale=False)])
+                                processors=make_image_processors(ResizeToFit(width=1024, upscale=False)))
     created = models.DateTimeField(editable=False)
     starrers = models.ManyToManyField(User, related_name='favorite_communities')
     banned_users = models.ManyToManyField(User, related_name='banned_of_communities')
@@ -53,9 +66,17 @@ class Community(models.Model):
     users_adjective = models.CharField(_('users adjective'), max_length=settings.COMMUNITY_USERS_ADJECTIVE_MAX_LENGTH,
                                        blank=False, null=True)
     invites_enabled = models.BooleanField(_('invites enabled'), default=True)
+    members_count = models.PositiveIntegerField(_('members count'), default=0, editable=False)
+
+    # The fields each image is saved through and the width they fit it in, smallest first
+    IMAGE_DERIVATIVES = {
+        'avatar': (('avatar_thumbnail', 100), ('avatar', 500)),
+        'cover': (('cover', 1024),),
+    }
 
     class Meta:
         verbose_name_plural = 'communities'
+        index_together = (('created', 'id'),)
 
     @classmethod
     def is_user_with_username_invited_to_community_with_name(cls, username, community_name):
@@ -90,13 +111,16 @@ class Community(models.Model):
         return cls.objects.filter(name=community_name, type='T').exists()
 
     @classmethod
-    def search_communities_with_query(cls, query):
-        communities_query = Q(name__icontains=query)
-        communities_query.add(Q(title__icontains=query), Q.OR)
-        return cls.objects.filter(communities_query)
+    def search_communities_with_query(cls, query, max_id=None):
+        communities_query = CommunitySearchToken.make_communities_with_query_query(query=query)
+        return paginate_ranked_search_results(queryset=cls.objects.filter(communities_query),
+                                              exact_match_query=Q(name__iexact=query), max_id=max_id)
 
     @classmethod
     def get_trending_communities(cls, category_name=None):
+        if TrendingCommunity.is_enabled():
+            return TrendingCommunity.get_trending_communities(category_name=category_name)
+
         trending_communities_query = Q()
 
         if category_name:
@@ -116,11 +140,17 @@ class Community(models.Model):
             # The default for this field is not working when passed None?
             invites_enabled = True
 
-        community = cls.objects.create(title=title, name=name, creator=creator, avatar=avatar, cover=cover, color=color,
+        community = cls.objects.create(title=title, name=name, creator=creator, color=color,
                                        user_adjective=user_adjective, users_adjective=users_adjective,
                                        description=description, type=type, rules=rules,
                                        invites_enabled=invites_enabled)
 
+        if avatar:
+            PendingImage.set_image_of_instance(instance=community, field_name='avatar', image=avatar)
+
+        if cover:
+            PendingImage.set_image_of_instance(instance=community, field_name='cover', image=cover)
+
         CommunityMembership.create_membership(user=creator, is_administrator=True, is_moderator=False,
                                               community=community)
 
@@ -128,6 +158,10 @@ class Community(models.Model):
             community.set_categories_with_names(categories_names=categories_names)
 
         community.save()
+        community.refresh_from_db(fields=['members_count'])
+
+        TrendingCommunity.refresh_community(community=community)
+
         return community
 
     @classmethod
@@ -152,11 +186,11 @@ class Community(models.Model):
         return User.objects.filter(community_members_query)
 
     @classmethod
-    def search_community_with_name_members(cls, community_name, query, exclude_keywords=None):
+    def search_community_with_name_members(cls, community_name, query, exclude_keywords=None, max_id=None):
         db_query = Q(communities_memberships__community__name=community_name)
 
-        community_members_query = Q(communities_memberships__user__username__icontains=query)
-        community_members_query.add(Q(communities_memberships__user__profile__name__icontains=query), Q.OR)
+        community_members_query = CommunityMemberSearchToken.make_members_with_query_query(
+            community_name=community_name, query=query)
 
         db_query.add(community_members_query, Q.AND)
 
@@ -165,7 +199,8 @@ class Community(models.Model):
                 cls._get_exclude_members_query_for_keywords(exclude_keywords=exclude_keywords),
                 Q.AND)
 
-        return User.objects.filter(db_query)
+        return paginate_ranked_search_results(queryset=User.objects.filter(db_query),
+                                              exact_match_query=Q(username__iexact=query), max_id=max_id)
 
     @classmethod
     def _get_exclude_members_query_for_keywords(cls, exclude_keywords):
@@ -190,16 +225,17 @@ class Community(models.Model):
         return User.objects.filter(community_administrators_query)
 
     @classmethod
-    def search_community_with_name_administrators(cls, community_name, query):
+    def search_community_with_name_administrators(cls, community_name, query, max_id=None):
         db_query = Q(communities_memberships__community__name=community_name,
                      communities_memberships__is_administrator=True)
 
-        community_members_query = Q(communities_memberships__user__username__icontains=query)
-        community_members_query.add(Q(communities_memberships__user__profile__name__icontains=query), Q.OR)
+        community_members_query = CommunityMemberSearchToken.make_members_with_query_query(
+            community_name=community_name, query=query)
 
         db_query.add(community_members_query, Q.AND)
 
-        return User.objects.filter(db_query)
+        return paginate_ranked_search_results(queryset=User.objects.filter(db_query),
+                                              exact_match_query=Q(username__iexact=query), max_id=max_id)
 
     @classmethod
     def get_community_with_name_moderators(cls, community_name, moderators_max_id=None):
@@ -212,16 +248,17 @@ class Community(models.Model):
         return User.objects.filter(community_moderators_query)
 
     @classmethod
-    def search_community_with_name_moderators(cls, community_name, query):
+    def search_community_with_name_moderators(cls, community_name, query, max_id=None):
         db_query = Q(communities_memberships__community__name=community_name,
                      communities_memberships__is_moderator=True)
 
-        community_members_query = Q(communities_memberships__user__username__icontains=query)
-        community_members_query.add(Q(communities_memberships__user__profile__name__icontains=query), Q.OR)
+        community_members_query = CommunityMemberSearchToken.make_members_with_query_query(
+            community_name=community_name, query=query)
 
         db_query.add(community_members_query, Q.AND)
 
-        return User.objects.filter(db_query)
+        return paginate_ranked_search_results(queryset=User.objects.filter(db_query),
+                                              exact_match_query=Q(username__iexact=query), max_id=max_id)
 
     @classmethod
     def get_community_with_name_banned_users(cls, community_name, users_max_id):
@@ -234,15 +271,12 @@ class Community(models.Model):
         return community.banned_users.filter(community_members_query)
 
     @classmethod
-    def search_community_with_name_banned_users(cls, community_name, query):
+    def search_community_with_name_banned_users(cls, community_name, query, max_id=None):
         community = Community.objects.get(name=community_name)
-        community_banned_users_query = Q(username__icontains=query)
-        community_banned_users_query.add(Q(profile__name__icontains=query), Q.OR)
-        return community.banned_users.filter(community_banned_users_query)
-
-    @property
-    def members_count(self):
-        return self.memberships.all().count()
+        # Banned users are no longer members, the users search index narrows them down instead
+        community_banned_users_query = UserSearchToken.make_users_with_query_query(query=query)
+        return paginate_ranked_search_results(queryset=community.banned_users.filter(community_banned_users_query),
+                                              exact_match_query=Q(username__iexact=query), max_id=max_id)
 
     def is_private(self):
         return self.type is self.COMMUNITY_TYPE_PRIVATE
@@ -283,6 +317,9 @@ class Community(models.Model):
 
         self.save()
 
+        if categories_names is not None:
+            TrendingCommunity.refresh_community(community=self)
+
     def add_moderator(self, user):
         user_membership = self.memberships.get(user=user)
         user_membership.is_moderator = True
@@ -309,11 +346,13 @@ class Community(models.Model):
 
     def add_member(self, user):
         user_membership = CommunityMembership.create_membership(user=user, community=self)
+        self.refresh_from_db(fields=['members_count'])
         return user_membership
 
     def remove_member(self, user):
         user_membership = self.memberships.get(user=user)
         user_membership.delete()
+        self.refresh_from_db(fields=['members_count'])
 
     def set_categories_with_names(self, categories_names):
         self.clear_categories()
@@ -388,6 +427,8 @@ class Community(models.Model):
         if self.users_adjective:
             self.users_adjective = self.users_adjective.title()
 
+        exclude_counts_from_save(self, ('members_count',), kwargs)
+
         return super(Community, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -414,6 +455,10 @@ class CommunityMembership(models.Model):
         membership = cls.objects.create(user=user, community=community, is_administrator=is_administrator,
                                         is_moderator=is_moderator)
 
+        update_count(Community.objects.filter(pk=community.pk), 'members_count')
+        TrendingCommunity.update_members_count_of_community_with_id(community_id=community.pk)
+        CommunityMemberSearchToken.index_member(community_id=community.pk, user_id=user.pk)
+
         return membership
 
     def save(self, *args, **kwargs):
@@ -422,6 +467,288 @@ class CommunityMembership(models.Model):
             self.created = timezone.now()
         return super(CommunityMembership, self).save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        update_count(Community.objects.filter(pk=self.community_id), 'members_count', -1)
+        TrendingCommunity.update_members_count_of_community_with_id(community_id=self.community_id, amount=-1)
+        CommunityMemberSearchToken.remove_member(community_id=self.community_id, user_id=self.user_id)
+        return super(CommunityMembership, self).delete(*args, **kwargs)
+
+
+class TrendingCommunity(models.Model):
+    """
+    A materialized entry of a community in the global trending ranking or, when it has a category,
+    in the ranking of that category. Memberships apply their delta to the members count right away,
+    the refresh_trending_communities command rebuilds the whole table.
+    """
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='trending_communities')
+    category = models.ForeignKey('openbook_categories.Category', on_delete=models.CASCADE,
+                                 related_name='trending_communities', null=True)
+    members_count = models.PositiveIntegerField(editable=False, default=0)
+    community_created = models.DateTimeField(editable=False)
+
+    AMOUNT = 30
+
+    class Meta:
+        unique_together = ('community', 'category',)
+        index_together = (('category', 'members_count', 'community_created'),)
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_MATERIALIZED_TRENDING_COMMUNITIES_ENABLED
+
+    @classmethod
+    def get_trending_communities(cls, category_name=None):
+        communities_ids = get_stale_while_revalidate_cached_value(
+            key='trending_communities:%s' % (category_name or ''),
+            compute_value=lambda: cls._get_trending_communities_ids(category_name=category_name),
+            fresh_for=settings.TRENDING_COMMUNITIES_CACHE_FRESH_FOR,
+            stale_for=settings.TRENDING_COMMUNITIES_CACHE_STALE_FOR)
+
+        communities = Community.objects.in_bulk(communities_ids)
+
+        return [communities[community_id] for community_id in communities_ids if community_id in communities]
+
+    @classmethod
+    def update_members_count_of_community_with_id(cls, community_id, amount=1):
+        if not cls.is_enabled():
+            return
+
+        update_count(cls.objects.filter(community_id=community_id), 'members_count', amount)
+
+    @classmethod
+    def refresh_community(cls, community):
+        if not cls.is_enabled():
+            return
+
+        cls.objects.filter(community_id=community.pk).delete()
+        categories_ids = [None] + list(community.categories.values_list('id', flat=True))
+        cls.objects.bulk_create([cls(community_id=community.pk, category_id=category_id,
+                                     members_count=community.members_count, community_created=community.created)
+                                 for category_id in categories_ids])
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        Category = get_category_model()
+
+        communities = {community_id: (members_count, created) for community_id, members_count, created in
+                       Community.objects.values_list('id', 'members_count', 'created').iterator()}
+        communities_categories = Category.communities.through.objects.values_list('community_id', 'category_id')
+
+        trending_communities = [cls(community_id=community_id, category_id=None, members_count=members_count,
+                                    community_created=created) for community_id, (members_count, created) in
+                                communities.items()]
+
+        for community_id, category_id in communities_categories.iterator():
+            members_count, created = communities[community_id]
+            trending_communities.append(cls(community_id=community_id, category_id=category_id,
+                                            members_count=members_count, community_created=created))
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(trending_communities)
+
+    @classmethod
+    def _get_trending_communities_ids(cls, category_name=None):
+        if category_name:
+            trending_communities_query = Q(category__name=category_name)
+        else:
+            trending_communities_query = Q(category__isnull=True)
+
+        return list(cls.objects.filter(trending_communities_query).order_by(
+            '-members_count', '-community_created').values_list('community_id', flat=True)[:cls.AMOUNT])
+
+
+class CommunitySearchToken(models.Model):
+    """
+    A token of the name or title of a community, so communities can be searched without scanning them all
+    """
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=SEARCH_TOKEN_LENGTH, editable=False)
+
+    class Meta:
+        index_together = (('token', 'community'),)
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED
+
+    @classmethod
+    def make_communities_with_query_query(cls, query):
+        communities_query = Q(name__icontains=query)
+        communities_query.add(Q(title__icontains=query), Q.OR)
+
+        query_tokens = make_search_query_tokens(query)
+
+        if not cls.is_enabled() or not query_tokens:
+            return communities_query
+
+        communities_ids = cls.objects.filter(token__in=query_tokens).values('community_id').annotate(
+            tokens_count=Count('token', distinct=True)).filter(tokens_count=len(query_tokens)).values(
+            'community_id')
+
+        communities_query.add(Q(id__in=communities_ids), Q.AND)
+
+        return communities_query
+
+    @classmethod
+    def index_community_with_id(cls, community_id):
+        if not cls.is_enabled():
+            return
+
+        name, title = Community.objects.filter(pk=community_id).values_list('name', 'title').get()
+
+        tokens = make_search_tokens(name, title)
+        indexed_tokens = set(cls.objects.filter(community_id=community_id).values_list('token', flat=True))
+
+        if tokens == indexed_tokens:
+            return
+
+        cls.objects.filter(community_id=community_id, token__in=indexed_tokens - tokens).delete()
+        cls.objects.bulk_create([cls(community_id=community_id, token=token) for token in tokens - indexed_tokens])
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, batch_size=1000):
+        cls.objects.all().delete()
+
+        search_tokens = []
+
+        for community_id, name, title in Community.objects.values_list('id', 'name', 'title').iterator():
+            search_tokens.extend([cls(community_id=community_id, token=token) for token in
+                                  make_search_tokens(name, title)])
+
+            if len(search_tokens) >= batch_size:
+                cls.objects.bulk_create(search_tokens)
+                search_tokens = []
+
+        cls.objects.bulk_create(search_tokens)
+
+
+class CommunityMemberSearchToken(models.Model):
+    """
+    A token of the username or profile name of a community member, scoped to the community
+    so large communities can be searched without scanning their members
+    """
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='members_search_tokens')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='communities_members_search_tokens')
+    token = models.CharField(max_length=SEARCH_TOKEN_LENGTH, editable=False)
+
+    class Meta:
+        index_together = (('community', 'token', 'user'),)
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED
+
+    @classmethod
+    def make_members_with_query_query(cls, community_name, query):
+        members_query = Q(username__icontains=query)
+        members_query.add(Q(profile__name__icontains=query), Q.OR)
+
+        query_tokens = make_search_query_tokens(query)
+
+        if not cls.is_enabled() or not query_tokens:
+            return members_query
+
+        members_ids = cls.objects.filter(community__name=community_name, token__in=query_tokens).values(
+            'user_id').annotate(tokens_count=Count('token', distinct=True)).filter(
+            tokens_count=len(query_tokens)).values('user_id')
+
+        members_query.add(Q(id__in=members_ids), Q.AND)
+
+        return members_query
+
+    @classmethod
+    def index_member(cls, community_id, user_id):
+        if not cls.is_enabled():
+            return
+
+        cls.objects.bulk_create([cls(community_id=community_id, user_id=user_id, token=token) for token in
+                                 cls._get_tokens_for_user_with_id(user_id=user_id)])
+
+    @classmethod
+    def remove_member(cls, community_id, user_id):
+        if not cls.is_enabled():
+            return
+
+        cls.objects.filter(community_id=community_id, user_id=user_id).delete()
+
+    @classmethod
+    def index_user_with_id(cls, user_id):
+        """
+        Brings the tokens of the user up to date in every community it is a member of
+        """
+        if not cls.is_enabled():
+            return
+
+        tokens = cls._get_tokens_for_user_with_id(user_id=user_id)
+        communities_ids = CommunityMembership.objects.filter(user_id=user_id).values_list('community_id', flat=True)
+        indexed_tokens = set(cls.objects.filter(user_id=user_id).values_list('community_id', 'token'))
+
+        missing_tokens = {(community_id, token) for community_id in communities_ids for token in
+                          tokens} - indexed_tokens
+
+        if any(token not in tokens for community_id, token in indexed_tokens):
+            cls.objects.filter(user_id=user_id).exclude(token__in=tokens).delete()
+
+        cls.objects.bulk_create(
+            [cls(community_id=community_id, user_id=user_id, token=token) for community_id, token in missing_tokens])
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, batch_size=1000):
+        cls.objects.all().delete()
+
+        users_tokens = {}
+        search_tokens = []
+
+        memberships = CommunityMembership.objects.values_list('community_id', 'user_id', 'user__username',
+                                                              'user__profile__name').order_by('user_id')
+
+        for community_id, user_id, username, name in memberships.iterator():
+            if user_id not in users_tokens:
+                # Memberships come ordered by user, only the tokens of the current one are kept
+                users_tokens = {user_id: make_search_tokens(username, name)}
+
+            search_tokens.extend([cls(community_id=community_id, user_id=user_id, token=token) for token in
+                                  users_tokens[user_id]])
+
+            if len(search_tokens) >= batch_size:
+                cls.objects.bulk_create(search_tokens)
+                search_tokens = []
+
+        cls.objects.bulk_create(search_tokens)
+
+    @classmethod
+    def _get_tokens_for_user_with_id(cls, user_id):
+        username, name = User.objects.filter(pk=user_id).values_list('username', 'profile__name').get()
+        return make_search_tokens(username, name)
+
+
+@receiver(post_save, sender=Community)
+def index_community_search_tokens(sender, instance=None, created=False, **kwargs):
+    """"
+    Keep the search tokens of the community in sync with its name and title
+    """
+    CommunitySearchToken.index_community_with_id(community_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def index_user_communities_members_search_tokens(sender, instance=None, created=False, **kwargs):
+    """"
+    Keep the members search tokens of the user in sync with its username
+    """
+    if not created:
+        CommunityMemberSearchToken.index_user_with_id(user_id=instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_user_profile_communities_members_search_tokens(sender, instance=None, created=False, **kwargs):
+    """"
+    Keep the members search tokens of the user in sync with its profile name
+    """
+    CommunityMemberSearchToken.index_user_with_id(user_id=instance.user_id)
+
 
 class CommunityLog(models.Model):
     """
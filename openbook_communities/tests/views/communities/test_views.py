@@ -1,6 +1,9 @@
 # Create your tests here.
 import random
 
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
 from django.conf import settings
 from faker import Faker
@@ -14,7 +17,7 @@ import json
 from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, \
     make_community_avatar, make_community_cover, make_category, make_community_users_adjective, \
     make_community_user_adjective, make_community
-from openbook_communities.models import Community
+from openbook_communities.models import Community, TrendingCommunity
 
 logger = logging.getLogger(__name__)
 fake = Faker()
@@ -541,6 +544,37 @@ class CommunitiesAPITests(APITestCase):
         community = Community.objects.get(name=community_name)
         self.assertTrue(hasattr(community, 'cover'))
 
+    def test_retrieve_communities_pages_alike_with_offset_and_cursor(self):
+        """
+        should return the same pages of joined communities following the next cursor or the offset from a first
+        page without either
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        community_creator = make_user()
+        communities_ids = []
+
+        for i in range(0, 5):
+            community = make_community(creator=community_creator)
+            user.join_community_with_name(community_name=community.name)
+            communities_ids.append(community.pk)
+
+        url = self._get_url()
+        response = self.client.get(url, {'count': 3}, **headers)
+        first_page_ids = [community['id'] for community in json.loads(response.content)]
+
+        cursor_response = self.client.get(url, {'count': 3, 'cursor': response['X-Next-Cursor']}, **headers)
+        offset_response = self.client.get(url, {'count': 3, 'offset': 3}, **headers)
+
+        self.assertEqual(offset_response.status_code, status.HTTP_200_OK)
+
+        cursor_page_ids = [community['id'] for community in json.loads(cursor_response.content)]
+        offset_page_ids = [community['id'] for community in json.loads(offset_response.content)]
+
+        self.assertEqual(offset_page_ids, cursor_page_ids)
+        self.assertEqual(first_page_ids + offset_page_ids, list(reversed(communities_ids)))
+
     def _get_url(self):
         return reverse('communities')
 
@@ -588,7 +622,8 @@ class JoinedCommunities(APITestCase):
             community = make_community(creator=community_creator)
             communities.append(community)
 
-        offsetted_communities = communities[offset: total_amount_of_communities]
+        # Communities are paginated newest first
+        offsetted_communities = list(reversed(communities))[offset: total_amount_of_communities]
         offsetted_communities_ids = [community.pk for community in offsetted_communities]
 
         for community in communities:
@@ -609,6 +644,65 @@ class JoinedCommunities(APITestCase):
             response_community_id = response_community.get('id')
             self.assertIn(response_community_id, offsetted_communities_ids)
 
+    def test_retrieve_joined_communities_with_cursor(self):
+        """
+        should be able to retrieve all own communities newest first following the next cursor and return 200
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        community_creator = make_user()
+        communities_ids = []
+
+        for i in range(0, 5):
+            community = make_community(creator=community_creator)
+            user.join_community_with_name(community_name=community.name)
+            communities_ids.append(community.pk)
+
+        url = self._get_url()
+        response = self.client.get(url, {'count': 3}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_page_ids = [community['id'] for community in json.loads(response.content)]
+
+        response = self.client.get(url, {'count': 3, 'cursor': response['X-Next-Cursor']}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second_page_ids = [community['id'] for community in json.loads(response.content)]
+
+        self.assertEqual(first_page_ids + second_page_ids, list(reversed(communities_ids)))
+        self.assertFalse(response.has_header('X-Next-Cursor'))
+
+    def test_retrieve_joined_communities_pages_alike_with_offset_and_cursor(self):
+        """
+        should return the same pages following the next cursor or the offset from a first page without either
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        community_creator = make_user()
+        communities_ids = []
+
+        for i in range(0, 5):
+            community = make_community(creator=community_creator)
+            user.join_community_with_name(community_name=community.name)
+            communities_ids.append(community.pk)
+
+        url = self._get_url()
+        response = self.client.get(url, {'count': 3}, **headers)
+        first_page_ids = [community['id'] for community in json.loads(response.content)]
+
+        cursor_response = self.client.get(url, {'count': 3, 'cursor': response['X-Next-Cursor']}, **headers)
+        offset_response = self.client.get(url, {'count': 3, 'offset': 3}, **headers)
+
+        self.assertEqual(offset_response.status_code, status.HTTP_200_OK)
+
+        cursor_page_ids = [community['id'] for community in json.loads(cursor_response.content)]
+        offset_page_ids = [community['id'] for community in json.loads(offset_response.content)]
+
+        self.assertEqual(offset_page_ids, cursor_page_ids)
+        self.assertEqual(first_page_ids + offset_page_ids, list(reversed(communities_ids)))
+
     def _get_url(self):
         return reverse('joined-communities')
 
@@ -1071,3 +1165,149 @@ class SearchCommunitiesAPITests(APITestCase):
 
     def _get_url(self):
         return reverse('search-communities')
+
+
+@override_settings(FEATURE_MATERIALIZED_TRENDING_COMMUNITIES_ENABLED=True)
+class MaterializedTrendingCommunitiesAPITests(APITestCase):
+    """
+    TrendingCommunitiesAPI with the materialized trending communities enabled
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_trending_communities_by_members(self):
+        """
+        should retrieve the communities ordered by their amount of members, globally and per category
+        """
+        user = make_user()
+        category = make_category()
+
+        community = make_community(creator=make_user())
+        category_community = user.create_community(name=fake.user_name().lower()[:settings.COMMUNITY_NAME_MAX_LENGTH],
+                                                   title=fake.user_name()[:settings.COMMUNITY_TITLE_MAX_LENGTH],
+                                                   color=fake.hex_color(), type='P',
+                                                   categories_names=[category.name])
+        make_user().join_community_with_name(category_community.name)
+
+        self.assertEqual(self._get_trending_communities_ids(user), [category_community.pk, community.pk])
+        self.assertEqual(self._get_trending_communities_ids(user, category_name=category.name),
+                         [category_community.pk])
+
+    def test_applies_memberships_to_the_ranking(self):
+        """
+        should apply joins and leaves to the members count of the ranking entries
+        """
+        user = make_user()
+        category = make_category()
+
+        community = make_community(creator=make_user())
+        community.update(categories_names=[category.name])
+        other_community = make_community(creator=make_user())
+
+        user.join_community_with_name(community.name)
+        self.assertEqual(self._get_trending_communities_ids(user), [community.pk, other_community.pk])
+
+        user.leave_community_with_name(community.name)
+        make_user().join_community_with_name(other_community.name)
+        cache.clear()
+
+        self.assertEqual(self._get_trending_communities_ids(user), [other_community.pk, community.pk])
+        self.assertEqual(list(TrendingCommunity.objects.filter(community=community).values_list('members_count',
+                                                                                                 flat=True)), [1, 1])
+
+    def test_serves_cached_ranking_while_fresh(self):
+        """
+        should keep returning the cached ranking while fresh and revalidate it once stale
+        """
+        user = make_user()
+
+        community = make_community(creator=make_user())
+        other_community = make_community(creator=make_user())
+        user.join_community_with_name(community.name)
+
+        self.assertEqual(self._get_trending_communities_ids(user), [community.pk, other_community.pk])
+
+        for i in range(0, 2):
+            make_user().join_community_with_name(other_community.name)
+
+        self.assertEqual(self._get_trending_communities_ids(user), [community.pk, other_community.pk])
+
+        cache.clear()
+
+        with self.settings(TRENDING_COMMUNITIES_CACHE_FRESH_FOR=0):
+            self.assertEqual(self._get_trending_communities_ids(user), [other_community.pk, community.pk])
+
+            for i in range(0, 2):
+                make_user().join_community_with_name(community.name)
+
+            self.assertEqual(self._get_trending_communities_ids(user), [community.pk, other_community.pk])
+
+    def test_refresh_trending_communities_command(self):
+        """
+        should rebuild the ranking of the communities created while the feature was disabled
+        """
+        user = make_user()
+
+        with self.settings(FEATURE_MATERIALIZED_TRENDING_COMMUNITIES_ENABLED=False):
+            community = make_community(creator=make_user())
+
+        self.assertEqual(self._get_trending_communities_ids(user), [])
+
+        call_command('refresh_trending_communities')
+        cache.clear()
+
+        self.assertEqual(self._get_trending_communities_ids(user), [community.pk])
+
+    def _get_trending_communities_ids(self, user, category_name=None):
+        headers = make_authentication_headers_for_user(user)
+        data = {'category': category_name} if category_name else {}
+        response = self.client.get(reverse('trending-communities'), data, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [community['id'] for community in json.loads(response.content)]
+
+
+@override_settings(FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED=True)
+class IndexedSearchCommunitiesAPITests(SearchCommunitiesAPITests):
+    """
+    SearchCommunitiesAPITests with the indexed community search enabled
+    """
+
+    def test_ranks_exact_name_first(self):
+        """
+        should retrieve the community with the exact name first and then the other matches newest first
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        older_community = mixer.blend(Community, name='travelers', title='Travelers')
+        exact_community = mixer.blend(Community, name='travel', title='Travel')
+        titled_community = mixer.blend(Community, name='backpacking', title='Time Travel Club')
+        mixer.blend(Community, name='trains', title='Trains')
+
+        response = self.client.get(self._get_url(), {'query': 'travel'}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([community['id'] for community in json.loads(response.content)],
+                         [exact_community.pk, titled_community.pk, older_community.pk])
+
+    def test_can_search_joined_communities(self):
+        """
+        should only retrieve the joined communities matching the query
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        joined_community = make_community(creator=make_user())
+        user.join_community_with_name(joined_community.name)
+        joined_community.update(title='Cooking Club')
+
+        other_community = make_community(creator=make_user())
+        other_community.update(title='Cooking Club')
+
+        response = self.client.get(reverse('search-joined-communities'), {'query': 'cooking'}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([community['id'] for community in json.loads(response.content)], [joined_community.pk])
@@ -1,6 +1,9 @@
 import random
 
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
 from rest_framework import status
 
@@ -9,9 +12,10 @@ import json
 
 from rest_framework.test import APITestCase
 
+from openbook_auth.models import User
 from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, \
-    make_community
-from openbook_communities.models import Community
+    make_community, get_ids_following_cursor
+from openbook_communities.models import Community, CommunityMemberSearchToken
 from openbook_notifications.models import CommunityInviteNotification
 
 logger = logging.getLogger(__name__)
@@ -285,6 +289,28 @@ class CommunityMembersAPITest(APITestCase):
             response_member_id = response_member.get('id')
             self.assertIn(response_member_id, community_members_ids)
 
+    def test_can_paginate_members_joined_at_once_with_cursor(self):
+        """
+        should retrieve every member once when following the next cursor of pages splitting equal date joined
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        community = make_community(creator=user, type='P')
+        community_members_ids = [user.pk]
+
+        for i in range(0, 6):
+            community_member = make_user()
+            community_member.join_community_with_name(community_name=community.name)
+            community_members_ids.append(community_member.pk)
+
+        User.objects.filter(pk__in=community_members_ids).update(date_joined=timezone.now())
+
+        url = self._get_url(community_name=community.name)
+        response_members_ids = get_ids_following_cursor(self.client, url, headers, count=3)
+
+        self.assertEqual(response_members_ids, sorted(community_members_ids, reverse=True))
+
     def _get_url(self, community_name):
         return reverse('community-members', kwargs={
             'community_name': community_name
@@ -849,3 +875,111 @@ class SearchCommunityMembersAPITests(APITestCase):
         return reverse('search-community-members', kwargs={
             'community_name': community_name,
         })
+
+
+@override_settings(FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED=True)
+class IndexedSearchCommunityMembersAPITests(SearchCommunityMembersAPITests):
+    """
+    SearchCommunityMembersAPITests with the indexed community search enabled
+    """
+
+    # A profile name none of the queries match, the random ones of make_user could
+    PROFILE_NAME = 'Test Person'
+
+    def test_ranks_exact_username_first(self):
+        """
+        should retrieve the member with the exact username first and then the other matches newest first
+        """
+        user = make_user(username='searcher', name=self.PROFILE_NAME)
+        headers = make_authentication_headers_for_user(user)
+        community = make_community(creator=user)
+
+        exact_member = make_user(username='peter', name=self.PROFILE_NAME)
+        older_member = make_user(username='peterpan', name=self.PROFILE_NAME)
+        newer_member = make_user(username='spetersen', name=self.PROFILE_NAME)
+
+        for member in [older_member, exact_member, newer_member]:
+            member.join_community_with_name(community_name=community.name)
+
+        make_user(username='peterparker', name=self.PROFILE_NAME)
+
+        response = self.client.get(self._get_url(community_name=community.name), {'query': 'peter'}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([member['id'] for member in json.loads(response.content)],
+                         [exact_member.pk, newer_member.pk, older_member.pk])
+
+    def test_can_paginate_with_max_id(self):
+        """
+        should retrieve every matching member once when paginating with the max_id of the last member
+        """
+        user = make_user(username='searcher', name=self.PROFILE_NAME)
+        headers = make_authentication_headers_for_user(user)
+        community = make_community(creator=user)
+
+        members_ids = []
+
+        for username in ['annabel', 'anna', 'joanna', 'hannah', 'annika']:
+            member = make_user(username=username, name=self.PROFILE_NAME)
+            member.join_community_with_name(community_name=community.name)
+            members_ids.append(member.pk)
+
+        response_members_ids = []
+        max_id = None
+
+        while True:
+            query_params = {'query': 'ann', 'count': 2}
+
+            if max_id:
+                query_params['max_id'] = max_id
+
+            response = self.client.get(self._get_url(community_name=community.name), query_params, **headers)
+            page_members_ids = [member['id'] for member in json.loads(response.content)]
+
+            if not page_members_ids:
+                break
+
+            response_members_ids.extend(page_members_ids)
+            max_id = page_members_ids[-1]
+
+        self.assertEqual(sorted(response_members_ids), sorted(members_ids))
+
+    def test_reindexes_members_on_leave_and_profile_change(self):
+        """
+        should stop retrieving members who left and retrieve members by their current profile name
+        """
+        user = make_user(username='searcher', name=self.PROFILE_NAME)
+        headers = make_authentication_headers_for_user(user)
+        community = make_community(creator=user)
+
+        member = make_user(username='renamed', name=self.PROFILE_NAME)
+        member.join_community_with_name(community_name=community.name)
+        member.profile.name = 'Gandalf Grey'
+        member.profile.save()
+
+        leaving_member = make_user(username='gandalfina', name=self.PROFILE_NAME)
+        leaving_member.join_community_with_name(community_name=community.name)
+        leaving_member.leave_community_with_name(community_name=community.name)
+
+        response = self.client.get(self._get_url(community_name=community.name), {'query': 'gandalf'}, **headers)
+
+        self.assertEqual([member['id'] for member in json.loads(response.content)], [member.pk])
+        self.assertFalse(CommunityMemberSearchToken.objects.filter(user=leaving_member).exists())
+
+    def test_rebuild_communities_search_index_command(self):
+        """
+        should index the members who joined while the indexed search was disabled
+        """
+        user = make_user(username='searcher', name=self.PROFILE_NAME)
+        headers = make_authentication_headers_for_user(user)
+
+        with self.settings(FEATURE_INDEXED_COMMUNITY_SEARCH_ENABLED=False):
+            community = make_community(creator=user)
+            member = make_user(username='unindexed', name=self.PROFILE_NAME)
+            member.join_community_with_name(community_name=community.name)
+
+        call_command('rebuild_communities_search_index')
+
+        response = self.client.get(self._get_url(community_name=community.name), {'query': 'unindexed'}, **headers)
+
+        self.assertEqual([member['id'] for member in json.loads(response.content)], [member.pk])
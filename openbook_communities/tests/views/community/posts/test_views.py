@@ -1,4 +1,5 @@
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -7,7 +8,7 @@ import logging
 import json
 
 from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, \
-    make_community, make_fake_post_text, make_post_image
+    make_community, make_fake_post_text, make_post_image, get_ids_following_cursor
 from openbook_posts.models import Post
 
 logger = logging.getLogger(__name__)
@@ -209,6 +210,25 @@ class CommunityPostsAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertFalse(Post.objects.filter(text=post_text).exists())
 
+    def test_can_paginate_posts_created_at_once_with_cursor(self):
+        """
+        should retrieve every community post once when following the next cursor of pages splitting equal created
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        community = make_community(creator=user, type='P')
+        community_posts_ids = [
+            user.create_community_post(community_name=community.name, text=make_fake_post_text()).pk for i in
+            range(0, 7)]
+
+        Post.objects.filter(community=community).update(created=timezone.now())
+
+        url = self._get_url(community_name=community.name)
+        response_posts_ids = get_ids_following_cursor(self.client, url, headers, count=3)
+
+        self.assertEqual(response_posts_ids, sorted(community_posts_ids, reverse=True))
+
     def _get_url(self, community_name):
         return reverse('community-posts', kwargs={
             'community_name': community_name
@@ -4,7 +4,7 @@ from rest_framework import serializers
 from openbook.settings import COLOR_ATTR_MAX_LENGTH
 from openbook_categories.models import Category
 from openbook_categories.validators import category_name_exists
-from openbook_common.serializers_fields.request import RestrictedImageFileSizeField
+from openbook_common.serializers_fields.request import RestrictedImageFileSizeField, CursorField
 from openbook_common.validators import hex_color_validator
 from openbook_communities.models import Community, CommunityMembership
 from openbook_communities.serializers_fields import IsInvitedField, IsCreatorField, CommunityMembershipsField, \
@@ -55,6 +55,9 @@ class GetJoinedCommunitiesSerializer(serializers.Serializer):
     offset = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
 
 
 class GetModeratedCommunitiesSerializer(serializers.Serializer):
@@ -88,6 +91,9 @@ class GetFavoriteCommunitiesSerializer(serializers.Serializer):
 
 
 class SearchCommunitiesSerializer(serializers.Serializer):
+    max_id = serializers.IntegerField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
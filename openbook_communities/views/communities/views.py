@@ -9,6 +9,7 @@ from django.utils.translation import gettext as _
 from openbook_common.responses import ApiMessageResponse
 from openbook_common.utils.helpers import normalize_list_value_in_request_data, normalise_request_data
 from openbook_common.utils.model_loaders import get_community_model
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
 from openbook_communities.views.communities.serializers import CreateCommunitySerializer, \
     CommunitiesCommunitySerializer, SearchCommunitiesSerializer, CommunityNameCheckSerializer, \
     GetFavoriteCommunitiesSerializer, GetJoinedCommunitiesSerializer, TrendingCommunitiesSerializer, \
@@ -60,16 +61,24 @@ class Communities(APIView):
         data = serializer.validated_data
 
         count = data.get('count', 10)
-        offset = data.get('offset', 0)
+        offset = data.get('offset')
+        cursor = data.get('cursor')
 
         user = request.user
 
-        communities = user.get_joined_communities()[offset:offset + count]
+        if offset is not None and not cursor:
+            # Deprecated, kept for the clients which haven't moved to cursors yet. Ordered as the cursor pages,
+            # so a client paginating from a first page without offset gets no duplicates nor gaps
+            communities = user.get_joined_communities().order_by('-created', '-id')[offset:offset + count]
+            next_cursor = None
+        else:
+            communities, next_cursor = paginate_with_cursor(user.get_joined_communities(), count=count, cursor=cursor)
 
         response_serializer = CommunitiesCommunitySerializer(communities, many=True,
                                                              context={"request": request})
 
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(response_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
 
 class CommunityNameCheck(APIView):
@@ -98,16 +107,24 @@ class JoinedCommunities(APIView):
         data = serializer.validated_data
 
         count = data.get('count', 10)
-        offset = data.get('offset', 0)
+        offset = data.get('offset')
+        cursor = data.get('cursor')
 
         user = request.user
 
-        communities = user.get_joined_communities()[offset:offset + count]
+        if offset is not None and not cursor:
+            # Deprecated, kept for the clients which haven't moved to cursors yet. Ordered as the cursor pages,
+            # so a client paginating from a first page without offset gets no duplicates nor gaps
+            communities = user.get_joined_communities().order_by('-created', '-id')[offset:offset + count]
+            next_cursor = None
+        else:
+            communities, next_cursor = paginate_with_cursor(user.get_joined_communities(), count=count, cursor=cursor)
 
         response_serializer = CommunitiesCommunitySerializer(communities, many=True,
                                                              context={"request": request})
 
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(response_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
 
 class SearchJoinedCommunities(APIView):
@@ -122,10 +139,11 @@ class SearchJoinedCommunities(APIView):
 
         count = data.get('count', 10)
         query = data.get('query')
+        max_id = data.get('max_id')
 
         user = request.user
 
-        communities = user.search_joined_communities_with_query(query=query)[:count]
+        communities = user.search_joined_communities_with_query(query=query, max_id=max_id)[:count]
 
         response_serializer = CommunitiesCommunitySerializer(communities, many=True,
                                                              context={"request": request})
@@ -231,10 +249,11 @@ class SearchCommunities(APIView):
 
         count = data.get('count', 20)
         query = data.get('query')
+        max_id = data.get('max_id')
 
         user = request.user
 
-        communities = user.search_communities_with_query(query=query)[:count]
+        communities = user.search_communities_with_query(query=query, max_id=max_id)[:count]
 
         response_serializer = CommunitiesCommunitySerializer(communities, many=True,
                                                              context={"request": request})
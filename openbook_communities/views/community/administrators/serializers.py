@@ -56,6 +56,9 @@ class GetCommunityAdministratorsUserSerializer(serializers.ModelSerializer):
 
 
 class SearchCommunityAdministratorsSerializer(serializers.Serializer):
+    max_id = serializers.IntegerField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
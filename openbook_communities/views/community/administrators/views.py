@@ -97,11 +97,12 @@ class SearchCommunityAdministrators(APIView):
 
         count = data.get('count', 10)
         query = data.get('query')
+        max_id = data.get('max_id')
 
         user = request.user
 
-        administrators = user.search_community_with_name_administrators(community_name=community_name, query=query)[
-                         :count]
+        administrators = user.search_community_with_name_administrators(community_name=community_name, query=query,
+                                                                        max_id=max_id)[:count]
 
         response_serializer = GetCommunityAdministratorsUserSerializer(administrators, many=True,
                                                                        context={"request": request})
@@ -59,6 +59,9 @@ class GetCommunityBannedUsersUserSerializer(serializers.ModelSerializer):
 
 
 class SearchCommunityBannedUsersSerializer(serializers.Serializer):
+    max_id = serializers.IntegerField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -96,11 +96,12 @@ class SearchCommunityBannedUsers(APIView):
 
         count = data.get('count', 10)
         query = data.get('query')
+        max_id = data.get('max_id')
 
         user = request.user
 
-        banned_users = user.search_community_with_name_banned_users(community_name=community_name, query=query)[
-                       :count]
+        banned_users = user.search_community_with_name_banned_users(community_name=community_name, query=query,
+                                                                    max_id=max_id)[:count]
 
         response_serializer = GetCommunityBannedUsersUserSerializer(banned_users, many=True,
                                                                     context={"request": request})
@@ -3,6 +3,7 @@ from rest_framework import serializers
 
 from openbook_auth.models import User, UserProfile
 from openbook_auth.validators import username_characters_validator, user_username_exists
+from openbook_common.serializers_fields.request import CursorField
 from openbook_common.serializers_fields.user import CommunitiesInvitesField
 from openbook_communities.models import Community, CommunityMembership, CommunityInvite
 from openbook_communities.serializers_fields import CommunityMembershipsField
@@ -34,6 +35,9 @@ class GetCommunityMembersSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -97,6 +101,9 @@ class MembersCommunitySerializer(serializers.ModelSerializer):
 
 
 class SearchCommunityMembersSerializer(serializers.Serializer):
+    max_id = serializers.IntegerField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from openbook_common.utils.helpers import normalise_request_data, normalize_list_value_in_request_data
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
 from openbook_communities.views.community.members.serializers import JoinCommunitySerializer, \
     GetCommunityMembersSerializer, GetCommunityMembersMemberSerializer, LeaveCommunitySerializer, \
     InviteCommunityMemberSerializer, MembersCommunitySerializer, SearchCommunityMembersSerializer, InviteUserSerializer
@@ -25,18 +26,20 @@ class CommunityMembers(APIView):
 
         count = data.get('count', 10)
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
         exclude = data.get('exclude')
 
         user = request.user
 
-        members = user.get_community_with_name_members(community_name=community_name, max_id=max_id,
-                                                       exclude_keywords=exclude).order_by(
-            '-id')[:count]
+        members = user.get_community_with_name_members(community_name=community_name, exclude_keywords=exclude)
+        members, next_cursor = paginate_with_cursor(members, count=count, cursor=cursor, max_id=max_id,
+                                                    created_field='date_joined')
 
         response_serializer = GetCommunityMembersMemberSerializer(members, many=True,
                                                                   context={"request": request})
 
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(response_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
 
 class JoinCommunity(APIView):
@@ -146,12 +149,12 @@ class SearchCommunityMembers(APIView):
         count = data.get('count', 10)
         query = data.get('query')
         exclude = data.get('exclude')
+        max_id = data.get('max_id')
 
         user = request.user
 
         members = user.search_community_with_name_members(community_name=community_name, query=query,
-                                                          exclude_keywords=exclude)[
-                  :count]
+                                                          exclude_keywords=exclude, max_id=max_id)[:count]
 
         response_serializer = GetCommunityMembersMemberSerializer(members, many=True,
                                                                   context={"request": request})
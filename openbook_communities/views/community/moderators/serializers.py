@@ -60,6 +60,9 @@ class GetCommunityModeratorsUserSerializer(serializers.ModelSerializer):
 
 
 class SearchCommunityModeratorsSerializer(serializers.Serializer):
+    max_id = serializers.IntegerField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -95,11 +95,12 @@ class SearchCommunityModerators(APIView):
 
         count = data.get('count', 10)
         query = data.get('query')
+        max_id = data.get('max_id')
 
         user = request.user
 
-        moderators = user.search_community_with_name_moderators(community_name=community_name, query=query)[
-                         :count]
+        moderators = user.search_community_with_name_moderators(community_name=community_name, query=query,
+                                                                max_id=max_id)[:count]
 
         response_serializer = GetCommunityModeratorsUserSerializer(moderators, many=True,
                                                                        context={"request": request})
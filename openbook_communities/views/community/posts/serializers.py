@@ -1,11 +1,15 @@
 from django.conf import settings
 from rest_framework import serializers
+from django.utils.translation import ugettext_lazy as _
 
 from openbook_auth.models import User, UserProfile
 from openbook_common.models import Emoji, Badge
 from openbook_common.serializers_fields.post import ReactionsEmojiCountField, CommentsCountField, PostCreatorField, \
     IsMutedField
-from openbook_common.serializers_fields.request import RestrictedImageFileSizeField
+from openbook_common.serializers_fields.file import FileUrlField
+from openbook_common.serializers_fields.image import ImageDerivativeField
+from openbook_common.serializers_fields.request import RestrictedImageFileSizeField, CursorField, \
+    RestrictedFileSizeField
 from openbook_communities.models import CommunityMembership, Community
 from openbook_communities.validators import community_name_characters_validator, community_name_exists
 from openbook_posts.models import PostImage, PostVideo, Post
@@ -15,6 +19,9 @@ class GetCommunityPostsSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -28,15 +35,24 @@ class CreateCommunityPostSerializer(serializers.Serializer):
     text = serializers.CharField(max_length=settings.POST_MAX_LENGTH, required=False, allow_blank=False)
     image = RestrictedImageFileSizeField(allow_empty_file=False, required=False,
                                          max_upload_size=settings.POST_IMAGE_MAX_SIZE)
-    video = serializers.FileField(allow_empty_file=False, required=False)
+    video = RestrictedFileSizeField(allow_empty_file=False, required=False,
+                                    max_upload_size=settings.POST_VIDEO_MAX_SIZE)
+    # A finalized post media upload, instead of an inline image or video
+    upload_id = serializers.UUIDField(required=False)
     community_name = serializers.CharField(max_length=settings.COMMUNITY_NAME_MAX_LENGTH,
                                            allow_blank=False,
                                            required=True,
                                            validators=[community_name_characters_validator, community_name_exists])
 
+    def validate(self, data):
+        if 'upload_id' in data and ('image' in data or 'video' in data):
+            raise serializers.ValidationError(_('A post must have an upload or an image/video, not both.'))
+
+        return data
+
 
 class CommunityPostImageSerializer(serializers.ModelSerializer):
-    image = serializers.ImageField(read_only=True)
+    image = ImageDerivativeField(image_field_name='image', width=settings.FEED_IMAGE_WIDTH)
 
     class Meta:
         model = PostImage
@@ -57,6 +73,7 @@ class CommunityPostCreatorBadgeSerializer(serializers.ModelSerializer):
 
 
 class CommunityPostCreatorProfileSerializer(serializers.ModelSerializer):
+    avatar = ImageDerivativeField(image_field_name='avatar', width=settings.FEED_AVATAR_WIDTH)
     badges = CommunityPostCreatorBadgeSerializer(many=True)
 
     class Meta:
@@ -81,6 +98,8 @@ class CommunityPostCreatorSerializer(serializers.ModelSerializer):
 
 
 class CommunityPostVideoSerializer(serializers.ModelSerializer):
+    video = FileUrlField()
+
     class Meta:
         model = PostVideo
         fields = (
@@ -116,6 +135,8 @@ class CommunityMembershipSerializer(serializers.ModelSerializer):
 
 
 class CommunityPostCommunitySerializer(serializers.ModelSerializer):
+    avatar = ImageDerivativeField(image_field_name='avatar', width=settings.FEED_AVATAR_WIDTH)
+
     class Meta:
         model = Community
         fields = (
@@ -6,8 +6,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from openbook_common.utils.helpers import normalise_request_data
+from openbook_common.utils.model_loaders import get_post_media_upload_model
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
 from openbook_communities.views.community.posts.serializers import GetCommunityPostsSerializer, CommunityPostSerializer, \
     CreateCommunityPostSerializer
+from openbook_posts.helpers import add_post_video_upload_handler
 
 
 class CommunityPosts(APIView):
@@ -24,18 +27,22 @@ class CommunityPosts(APIView):
 
         count = data.get('count', 10)
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
 
         user = request.user
 
-        posts = user.get_posts_for_community_with_name(community_name=community_name, max_id=max_id).order_by(
-            '-created')[:count]
+        posts = user.get_posts_for_community_with_name(community_name=community_name)
+        posts, next_cursor = paginate_with_cursor(posts, count=count, cursor=cursor, max_id=max_id)
 
         response_serializer = CommunityPostSerializer(posts, many=True,
                                                       context={"request": request})
 
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(response_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
     def put(self, request, community_name):
+        add_post_video_upload_handler(request)
+
         request_data = normalise_request_data(request.data)
         request_data['community_name'] = community_name
 
@@ -47,12 +54,27 @@ class CommunityPosts(APIView):
         image = data.get('image')
         video = data.get('video')
         community_name = data.get('community_name')
+        upload_id = data.get('upload_id')
 
         user = request.user
 
         with transaction.atomic():
+            upload = None
+
+            if upload_id:
+                PostMediaUpload = get_post_media_upload_model()
+                upload = PostMediaUpload.get_finalized_upload_with_uuid_for_user_with_id(upload_uuid=upload_id,
+                                                                                         user_id=user.pk)
+                if upload.is_video():
+                    video = upload.open_media()
+                else:
+                    image = upload.open_media()
+
             post = user.create_community_post(text=text, community_name=community_name, image=image, video=video)
 
+            if upload:
+                upload.delete_with_media(media=image or video)
+
         post_serializer = CommunityPostSerializer(post, context={"request": request})
 
         return Response(post_serializer.data, status=status.HTTP_201_CREATED)
@@ -28,6 +28,38 @@ class Connection(models.Model):
 
         return connection
 
+    @classmethod
+    def create_connections(cls, user_id, target_users_ids, circles_ids):
+        """
+        Bulk version of create_connection, the amount of queries does not grow with the target users
+        """
+        if not target_users_ids:
+            return []
+
+        cls.objects.bulk_create(
+            [cls(user_id=target_user_id, target_user_id=user_id) for target_user_id in target_users_ids])
+        target_connections = cls.objects.filter(user_id__in=target_users_ids, target_user_id=user_id)
+        target_connections_by_user_id = {target_connection.user_id: target_connection for target_connection in
+                                         target_connections}
+
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, target_user_id=target_user_id,
+                 target_connection=target_connections_by_user_id[target_user_id]) for target_user_id in
+             target_users_ids])
+        connections = list(cls.objects.filter(user_id=user_id, target_user_id__in=target_users_ids))
+
+        for connection in connections:
+            target_connections_by_user_id[connection.target_user_id].target_connection = connection
+
+        cls.objects.bulk_update(target_connections_by_user_id.values(), ['target_connection'])
+
+        ConnectionCircle = cls.circles.through
+        ConnectionCircle.objects.bulk_create(
+            [ConnectionCircle(connection_id=connection.pk, circle_id=circle_id) for connection in connections for
+             circle_id in circles_ids])
+
+        return connections
+
     @classmethod
     def connection_exists(cls, user_a_id, user_b_id):
         count = Connection.objects.select_related('target_connection__user_id').filter(user_id=user_a_id,
@@ -2,6 +2,7 @@ from django.db import models
 
 # Create your models here.
 from openbook_auth.models import User
+from openbook_common.utils.helpers import update_count
 
 
 class Follow(models.Model):
@@ -18,4 +19,34 @@ class Follow(models.Model):
         if lists_ids:
             follow.lists.add(*lists_ids)
 
+        update_count(User.objects.filter(pk=user_id), 'following_count')
+        update_count(User.objects.filter(pk=followed_user_id), 'followers_count')
+
         return follow
+
+    @classmethod
+    def create_follows(cls, user_id, followed_users_ids, lists_ids=None):
+        """
+        Bulk version of create_follow, the amount of queries does not grow with the followed users
+        """
+        if not followed_users_ids:
+            return []
+
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, followed_user_id=followed_user_id) for followed_user_id in followed_users_ids])
+        follows = list(cls.objects.filter(user_id=user_id, followed_user_id__in=followed_users_ids))
+
+        if lists_ids:
+            FollowList = cls.lists.through
+            FollowList.objects.bulk_create(
+                [FollowList(follow_id=follow.pk, list_id=list_id) for follow in follows for list_id in lists_ids])
+
+        update_count(User.objects.filter(pk=user_id), 'following_count', len(follows))
+        update_count(User.objects.filter(pk__in=followed_users_ids), 'followers_count')
+
+        return follows
+
+    def delete(self, *args, **kwargs):
+        update_count(User.objects.filter(pk=self.user_id), 'following_count', -1)
+        update_count(User.objects.filter(pk=self.followed_user_id), 'followers_count', -1)
+        return super(Follow, self).delete(*args, **kwargs)
@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 
-from json import loads
+from bisect import bisect_left
+from functools import lru_cache
+from io import TextIOWrapper
+from json import loads, JSONDecoder, JSONDecodeError
+from shutil import copyfileobj
 from yaml import safe_load
 from hashlib import sha3_256
 from zipfile import PyZipFile
-from os import access, R_OK, path
+from os import access, R_OK, path, remove
 from tempfile import TemporaryDirectory
 
 from magic import from_buffer
 
+MIMETYPES_PATH = path.join(path.dirname(path.abspath(__file__)),
+                           'mimetypes.yml')
+
+
+@lru_cache(maxsize=None)
+def _load_mimetypes():
+
+    if not access(MIMETYPES_PATH, R_OK):
+        raise FileNotFoundError(f"{MIMETYPES_PATH} not found")
+
+    with open(MIMETYPES_PATH, 'r') as fd:
+        types = safe_load(fd)
+
+    if 'mimetypes' not in types:
+        raise LookupError('file format incorrect, mimetypes key not found')
+
+    return types['mimetypes']
+
 
 class profile_import(object):
 
@@ -25,48 +47,177 @@ class profile_import(object):
         self.posts = posts
 
 
+class json_array_stream():
+    """
+    Decodes the items of the array under a key of a JSON object one at a
+    time, so no more than one item of the text is held in memory.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fd, key, max_item_size):
+
+        self.fd = fd
+        self.key = key
+        self.max_item_size = max_item_size
+        self.decoder = JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def __iter__(self):
+
+        self._expect('{')
+
+        while not self._consume('}'):
+            name = self._decode()
+            self._expect(':')
+
+            if name == self.key:
+                yield from self._iter_array()
+                return
+
+            # Values of other keys are decoded and thrown away
+            self._decode()
+
+            if not self._consume(','):
+                self._expect('}')
+                break
+
+        raise KeyError(f'key {self.key} not found in json')
+
+    def _iter_array(self):
+
+        self._expect('[')
+
+        if self._consume(']'):
+            return
+
+        while True:
+            yield self._decode()
+
+            if not self._consume(','):
+                self._expect(']')
+                return
+
+    def _decode(self):
+
+        while True:
+            self._skip_whitespace()
+
+            try:
+                value, end = self.decoder.raw_decode(self.buffer,
+                                                     self.position)
+            except JSONDecodeError:
+                if self.eof:
+                    raise
+                self._read()
+                continue
+
+            # A number or literal at the end of the buffer may continue in
+            # the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self._read()
+                continue
+
+            self.position = end
+            return value
+
+    def _consume(self, character):
+
+        self._skip_whitespace()
+
+        if self.buffer[self.position:self.position + 1] == character:
+            self.position += 1
+            return True
+
+        return False
+
+    def _expect(self, character):
+
+        if not self._consume(character):
+            raise JSONDecodeError(f"Expecting '{character}'", self.buffer,
+                                  self.position)
+
+    def _skip_whitespace(self):
+
+        while True:
+            while (self.position < len(self.buffer) and
+                   self.buffer[self.position].isspace()):
+                self.position += 1
+
+            if self.position < len(self.buffer) or self.eof:
+                return
+
+            self._read()
+
+    def _read(self):
+
+        chunk = self.fd.read(self.CHUNK_SIZE)
+
+        if not chunk:
+            self.eof = True
+            return
+
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+        if len(self.buffer) > self.max_item_size:
+            raise BufferError('json item exceeds the maximum size')
+
+
 class zip_parser():
 
     profile = False
 
+    # if size > 1gb
+    MAX_EXTRACTED_SIZE = 1000000000
+    # json documents are read whole, arrays of posts item by item
+    MAX_JSON_DOCUMENT_SIZE = 10 * 1024 * 1024
+    MAX_JSON_ITEM_SIZE = 1024 * 1024
+    MAGIC_BUFFER_SIZE = 2048
+
     def __init__(self, filename):
 
-        zipf = PyZipFile(filename)
-        # test this with corrupt zipfile
-        zipf.testzip()
-        size = self._get_extracted_zipsize(zipf)
+        # The central directory is read once, members are decompressed
+        # lazily and their CRCs checked as they are streamed
+        self.zipf = PyZipFile(filename)
+        self.entries = {entry.filename: entry for entry in
+                        self.zipf.infolist()}
+        self.sorted_names = sorted(self.entries)
+        self.temp = None
 
-        # if size > 1gb
-        if size > 1000000000:
+        size = self._get_extracted_zipsize()
+
+        if size > self.MAX_EXTRACTED_SIZE:
             raise BufferError('filesize exceeds 1GB')
 
-        friends = self._extract_friends(zipf)
-        albums = self._extract_albums(zipf)
-        messages = self._extract_messages(zipf)
-        posts = self._extract_posts(zipf)
+        friends = self._extract_friends()
+        albums = self._extract_albums()
+        messages = self._extract_messages()
+        posts = self._extract_posts()
 
         self.profile = profile_import(friends, albums, messages, posts)
 
-    def _file_access(self, filename):
+    def __enter__(self):
 
-        if not access(filename, R_OK):
-            raise FileNotFoundError(f"{filename} not found")
+        return self
 
-        return True
+    def __exit__(self, *args):
 
-    def _return_mime_magic(self, extension):
+        self.close()
 
-        mpath = 'openbook_importer/facebook_archive_parser'
+    def close(self):
 
-        if not self._file_access(f"{mpath}/mimetypes.yml"):
-            return False
+        if self.temp:
+            self.temp.cleanup()
+            self.temp = None
 
-        types = safe_load(open(f"{mpath}/mimetypes.yml", 'r'))
+        self.zipf.close()
 
-        if 'mimetypes' not in types:
-            raise LookupError('file format incorrect, mimetypes key not found')
+    def _return_mime_magic(self, extension):
 
-        types = types['mimetypes']
+        types = _load_mimetypes()
 
         if extension not in types:
             raise KeyError(f'extension not found, unknown filetype for '
@@ -74,7 +225,7 @@ class zip_parser():
 
         return types[extension]
 
-    def _check_file_magic(self, zipf, name):
+    def _check_file_magic(self, name):
 
         if name.find('.') != -1:
             extension = name.split('.')[-1]
@@ -84,76 +235,111 @@ class zip_parser():
             raise TypeError(f"{name} filenames without extension not "
                             "allowed")
 
-        if from_buffer(zipf.read(name), mime=True) not in mime:
+        with self.zipf.open(name) as member:
+            head = member.read(self.MAGIC_BUFFER_SIZE)
+
+        if from_buffer(head, mime=True) not in mime:
             raise TypeError(f"{name}'s extension does not "
                             f"match mime-type {mime}")
 
-    def _read_file_from_zip(self, zipf, name):
-
-        if name in zipf.namelist():
-            self._check_file_magic(zipf, name)
-            return zipf.read(name)
+    def _check_file_in_zip(self, name):
 
-        else:
+        if name not in self.entries:
             raise FileNotFoundError(f"{name} not found in zip file")
 
-    def _get_extracted_zipsize(self, zipf):
+        self._check_file_magic(name)
+
+    def _read_json_from_zip(self, name):
+
+        self._check_file_in_zip(name)
+
+        if self.entries[name].file_size > self.MAX_JSON_DOCUMENT_SIZE:
+            raise BufferError(f"{name} exceeds the maximum json size")
+
+        return loads(self.zipf.read(name))
+
+    def _stream_json_array_from_zip(self, name, key):
+
+        self._check_file_in_zip(name)
+
+        with self.zipf.open(name) as member:
+            fd = TextIOWrapper(member, encoding='utf-8')
+            yield from json_array_stream(fd, key, self.MAX_JSON_ITEM_SIZE)
+
+    def _get_extracted_zipsize(self):
 
         size = 0
 
-        for entry in zipf.filelist:
+        for entry in self.entries.values():
             size += entry.file_size
 
         return size
 
-    def _get_files_from_directory(self, dir_name, zipf, directory=False,
-                                  filename=False):
+    def _get_files_from_directory(self, dir_name, filename=False):
 
+        prefix = f"{dir_name}/"
         files = set()
-        for entry in zipf.filelist:
+        index = bisect_left(self.sorted_names, prefix)
 
-            if not filename:
-                if not directory and not entry.is_dir():
-                    name = entry.filename
+        while index < len(self.sorted_names):
+            name = self.sorted_names[index]
 
-                elif directory and entry.is_dir():
-                    name = entry.filename
+            if not name.startswith(prefix):
+                break
 
-                else:
-                    name = entry.filename
+            entry = self.entries[name]
 
-                if name[0:len(dir_name)+1] == f"{dir_name}/":
-                    if name != f"{dir_name}/":
-                        files.add(name)
+            if name != prefix:
+                if not filename:
+                    files.add(name)
 
-            else:
-                if filename in entry.filename and not entry.is_dir():
-                    name = entry.filename
+                elif (not entry.is_dir() and
+                      name.split('/')[-1] == filename):
                     files.add(name)
 
+            index += 1
+
         return files
 
-    def _write_file_to_dir(self, dir_name, item, zipf):
+    def _get_temp_dir(self):
+
+        if not self.temp:
+            self.temp = TemporaryDirectory(dir='media')
+
+        return self.temp.name
+
+    def _write_file_to_dir(self, dir_name, item):
 
         i_path = path.join(dir_name, item.split('/')[-1])
 
-        with open(i_path, 'wb+') as fd:
-            fd.write(zipf.read(item))
+        with self.zipf.open(item) as member, open(i_path, 'wb+') as fd:
+            copyfileobj(member, fd)
 
-    def _get_fd_from_file(self, dir_name, itype, item, zipf, mode='r'):
+    def _get_fd_from_file(self, item, mode='r'):
 
-        self._write_file_to_dir(dir_name, item, zipf)
+        dir_name = self._get_temp_dir()
+        self._write_file_to_dir(dir_name, item)
 
         name = item.split('/')[-1]
         fd = open(path.join(dir_name, name), mode)
 
         return((name, fd))
 
-    def _parse_album_json(self, album_json, zipf):
+    def _release_fd_from_file(self, uri):
+
+        name, fd = uri
+        fd.close()
+
+        file_path = path.join(self._get_temp_dir(), name)
+
+        if path.exists(file_path):
+            remove(file_path)
+
+    def _parse_album_json(self, album_json):
 
         photo_attrs = ['uri', 'creation_timestamp', 'comments', 'description']
 
-        json = loads(self._read_file_from_zip(zipf, album_json))
+        json = self._read_json_from_zip(album_json)
 
         album_name = json['name']
         album = {}
@@ -170,35 +356,27 @@ class zip_parser():
 
         return album
 
-    def _extract_albums(self, zipf):
+    def _extract_albums(self):
 
-        album_defs = self._get_files_from_directory('photos_and_videos/album',
-                                                    zipf)
-        albums = []
+        album_defs = self._get_files_from_directory('photos_and_videos/album')
 
-        for album in album_defs:
-            albums.append(self._parse_album_json(album, zipf))
+        for album_def in sorted(album_defs):
+            album = self._parse_album_json(album_def)
 
-        temp = TemporaryDirectory(dir='media')
-
-        for album in albums:
             for value in album.values():
                 for file in (value['photos']):
-                    file['uri'] = self._get_fd_from_file(temp.name,
-                                                         'photos_and_videos',
-                                                         file['uri'], zipf,
+                    file['uri'] = self._get_fd_from_file(file['uri'],
                                                          mode='rb')
 
-        return albums
+            yield album
 
-    def _extract_friends(self, zipf):
+    def _extract_friends(self):
 
-        json = loads(self._read_file_from_zip(zipf, 'friends/friends.json'))
+        json = self._read_json_from_zip('friends/friends.json')
         friends = json['friends']
 
         profile_info = 'profile_information/profile_information.json'
-        profile_info = loads(self._read_file_from_zip(zipf, profile_info)
-                             )['profile']
+        profile_info = self._read_json_from_zip(profile_info)['profile']
         full_name = profile_info['name']['full_name']
 
         sort_string = []
@@ -217,76 +395,85 @@ class zip_parser():
 
         return(friends_hash)
 
-    def _parse_message(self, zipf, message):
-
-        json = loads(self._read_file_from_zip(zipf, message))
+    def _parse_message(self, message):
 
-        temp = TemporaryDirectory(dir='media')
+        json = self._read_json_from_zip(message)
 
         if 'messages' in json.keys():
             for m in json['messages']:
 
                 if 'photos' in m.keys():
                     for p in m['photos']:
-                        p['uri'] = self._get_fd_from_file(temp.name,
-                                                          'messages',
-                                                          p['uri'], zipf)
+                        p['uri'] = self._get_fd_from_file(p['uri'])
         else:
             raise KeyError('key messages not found in json')
 
         return json
 
-    def _extract_messages(self, zipf):
+    def _extract_messages(self):
 
-        message_json = self._get_files_from_directory('messages', zipf,
+        message_json = self._get_files_from_directory('messages',
                                                       filename='message.json')
-        messages = []
-        for message in message_json:
-            messages.append(self._parse_message(zipf, message))
-
-        return messages
-
-    def _has_attachment(self, zipf, post):
-
-        temp = TemporaryDirectory(dir='media')
-
-        if 'attachments' in post.keys():
-            for attachment in post['attachments']:
-                if 'data' in attachment.keys():
-                    for item in attachment['data']:
-                        if 'media' in item.keys():
-                            media = item['media']
-                            uri = self._get_fd_from_file(temp.name,
-                                                         media['uri'].
-                                                         split('/')[0],
-                                                         media['uri'], zipf,
-                                                         mode='rb')
-                            media['uri'] = uri
 
-                            if 'media_metadata' in media:
-                                media.pop('media_metadata')
+        for message in sorted(message_json):
+            yield self._parse_message(message)
 
-                            return post
+    def _get_attachments_media(self, post):
 
-                        else:
-                            return False
+        media = []
 
-    def _extract_posts(self, zipf):
+        for attachment in post.get('attachments', []):
+            for item in attachment.get('data', []):
+                if 'media' in item.keys():
+                    media.append(item['media'])
 
-        json = loads(self._read_file_from_zip(zipf, 'posts/your_posts.json'))
+        return media
 
-        posts = []
+    def get_posts(self, start=0):
 
-        if 'status_updates' in json.keys():
-            for post in json['status_updates']:
-                media = self._has_attachment(zipf, post)
+        return self._extract_posts(start=start)
 
-                if media:
-                    post = media
+    def get_posts_chunks(self, chunk_size, start=0):
+        """
+        Yields lists of up to chunk_size posts with their media extracted to
+        temporary files, which are removed once the next chunk is requested.
+        The first start posts are skipped without extracting their media.
+        """
 
-                posts.append(post)
+        posts = self._stream_json_array_from_zip('posts/your_posts.json',
+                                                 'status_updates')
+        chunk = []
+        chunk_media = []
 
-        else:
-            raise KeyError('key status_updates not found in json')
+        for index, post in enumerate(posts):
+            if index < start:
+                continue
+
+            media = self._get_attachments_media(post)
+
+            for item in media:
+                item['uri'] = self._get_fd_from_file(item['uri'], mode='rb')
+                item.pop('media_metadata', None)
+
+            chunk.append(post)
+            chunk_media.extend(media)
+
+            if len(chunk) == chunk_size:
+                yield chunk
+                self._release_media(chunk_media)
+                chunk = []
+                chunk_media = []
+
+        if chunk:
+            yield chunk
+            self._release_media(chunk_media)
+
+    def _extract_posts(self, start=0):
+
+        for chunk in self.get_posts_chunks(chunk_size=1, start=start):
+            yield chunk[0]
+
+    def _release_media(self, media):
 
-        return posts
+        for item in media:
+            self._release_fd_from_file(item['uri'])
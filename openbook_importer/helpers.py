@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.images import ImageFile
+from django.core.files.storage import get_storage_class
+from django.utils.dateparse import parse_datetime
+
+from openbook_posts.models import Post
+
+
+def get_import_archives_storage():
+    """
+    Archives hold private data, so they're kept in the private storage where there is one
+    """
+    return get_storage_class(getattr(settings, 'PRIVATE_FILE_STORAGE', None))()
+
+
+def make_import_archive_name():
+    return 'imports/%s.zip' % str(uuid.uuid4())
+
+
+def save_post(post, user):
+    """
+    Creates the post of the archive for the user unless it was imported before.
+    :return: whether the post was created
+    """
+    post_data = _get_post_data(post)
+    text = post_data['text']
+    created = post_data['created']
+    image = post_data['image']
+
+    if image:
+        image = ImageFile(image)
+
+    if Post.objects.filter(creator=user.pk, text=text, created=created).exists():
+        return False
+
+    user.create_public_post(text=text, image=image, created=created)
+    return True
+
+
+def save_posts(posts, user):
+    """
+    Creates the posts of the archive for the user in bulk, skipping the ones imported before.
+    :return: the amount of created posts
+    """
+    return Post.bulk_import_public_posts(creator=user, posts_data=[_get_post_data(post) for post in posts])
+
+
+def _get_post_data(post):
+    image = None
+    images = None
+    text = None
+    timestamp = post['timestamp']
+    created = datetime.fromtimestamp(timestamp)
+    created = parse_datetime(created.strftime('%Y-%m-%d %T+00:00'))
+
+    if 'attachments' in post.keys():
+        images = _get_media_content(post)
+
+    if 'data' in post.keys() and len(post['data']) != 0:
+        text = post['data'][0]['post']
+
+    if images:
+        image = images[0]
+
+        if 'text' in image.keys():
+            text = image['text']
+
+        image = image['file']
+
+    return {
+        'text': text,
+        'image': image,
+        'created': created,
+    }
+
+
+def _get_media_content(post):
+    images = []
+    image = {}
+
+    for attachment in post['attachments']:
+        for data in attachment.get('data', []):
+            if 'media' not in data.keys():
+                continue
+
+            image['file'] = data['media']['uri'][1]
+
+            if 'description' in data['media'].keys():
+                image['text'] = data['media']['description']
+
+            images.append(image)
+            image = {}
+
+    return images
@@ -0,0 +1,64 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from openbook_common.utils.model_loaders import get_user_model
+from openbook_importer.helpers import save_post, save_posts
+
+
+class Command(BaseCommand):
+    help = 'Measures the posts per second and queries of importing archive posts one by one and in bulk ' \
+           'for growing amounts of posts. The posts are created in a transaction which is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--volumes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Amounts of posts to import')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Posts per bulk import chunk')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        self.stdout.write('{0:>10} {1:>14} {2:>14} {3:>14} {4:>14}'.format('posts', 'single posts/s', 'single queries',
+                                                                         'bulk posts/s', 'bulk queries'))
+
+        for volume in options['volumes']:
+            posts = self._make_archive_posts(amount=volume)
+
+            single_posts_per_second, single_queries = self._time_import(
+                lambda user: [save_post(post=post, user=user) for post in posts], amount=volume)
+
+            bulk_posts_per_second, bulk_queries = self._time_import(
+                lambda user: [save_posts(posts=posts[i:i + chunk_size], user=user) for i in
+                              range(0, volume, chunk_size)], amount=volume)
+
+            self.stdout.write('{0:>10} {1:>14.0f} {2:>14} {3:>14.0f} {4:>14}'.format(
+                volume, single_posts_per_second, single_queries, bulk_posts_per_second, bulk_queries))
+
+    def _make_archive_posts(self, amount):
+        timestamp = int(timezone.now().timestamp())
+
+        return [{
+            'timestamp': timestamp - i,
+            'data': [{'post': 'benchmark {0}'.format(i)}]
+        } for i in range(0, amount)]
+
+    def _time_import(self, import_posts, amount):
+        User = get_user_model()
+
+        with transaction.atomic():
+            user = User.create_user(username='bench_{0}'.format(uuid.uuid4().hex[:20]),
+                                    email='{0}@benchmark.invalid'.format(uuid.uuid4().hex), name='Benchmark',
+                                    is_of_legal_age=True)
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                import_posts(user)
+                elapsed = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        return amount / elapsed, len(queries)
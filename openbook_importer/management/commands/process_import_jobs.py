@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_importer.models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Processes the pending import jobs and resumes the ones left running by a crashed worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50, help='Posts to import per committed chunk')
+        parser.add_argument('--sleep', type=float, default=5,
+                            help='Seconds to wait for new import jobs when there are none')
+        parser.add_argument('--once', action='store_true', help='Exit once there are no import jobs left')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        while True:
+            import_job = ImportJob.claim_next_import_job()
+
+            if import_job:
+                logger.info('Processing import job {0}'.format(import_job.pk))
+
+                try:
+                    import_job.process(chunk_size=chunk_size)
+                except Exception as e:
+                    logger.exception('Error processing import job {0}'.format(import_job.pk))
+                    import_job.mark_as_failed(error=e)
+
+                continue
+
+            if options['once']:
+                break
+
+            time.sleep(options['sleep'])
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archive', models.CharField(editable=False, max_length=255, null=True)),
+                ('created', models.DateTimeField(editable=False)),
+                ('updated', models.DateTimeField(editable=False)),
+                ('started', models.DateTimeField(editable=False, null=True)),
+                ('finished', models.DateTimeField(editable=False, null=True)),
+                ('processed_posts_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('imported_posts_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('skipped_posts_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('error', models.TextField(editable=False, null=True)),
+                ('claim_token', models.UUIDField(editable=False, null=True)),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('R', 'Running'), ('C', 'Completed'), ('F', 'Failed')], default='P', editable=False, max_length=2)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='importjob',
+            index=models.Index(fields=['status', 'updated'], name='openbook_im_status_498b41_idx'),
+        ),
+    ]
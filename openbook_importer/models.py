@@ -0,0 +1,179 @@
+import logging
+import uuid
+from datetime import timedelta
+from json import JSONDecodeError
+from zipfile import BadZipFile
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import NotFound
+
+from openbook_auth.models import User
+from openbook_common.models import PendingImage
+from openbook_importer.facebook_archive_parser.zipparser import zip_parser
+from openbook_importer.helpers import get_import_archives_storage, make_import_archive_name, save_posts
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobClaimLost(Exception):
+    pass
+
+
+class ImportJob(models.Model):
+    """
+    An archive import, stored on upload and processed in chunks by the process_import_jobs worker.
+    Every chunk of posts is committed together with the progress, so a job resumes after its last committed chunk.
+    Claiming a job gives it a new claim token, progress is only committed by the worker holding the current one.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    archive = models.CharField(max_length=255, editable=False, null=True)
+    created = models.DateTimeField(editable=False)
+    updated = models.DateTimeField(editable=False)
+    started = models.DateTimeField(editable=False, null=True)
+    finished = models.DateTimeField(editable=False, null=True)
+    processed_posts_count = models.PositiveIntegerField(default=0, editable=False)
+    imported_posts_count = models.PositiveIntegerField(default=0, editable=False)
+    skipped_posts_count = models.PositiveIntegerField(default=0, editable=False)
+    error = models.TextField(editable=False, null=True)
+    claim_token = models.UUIDField(editable=False, null=True)
+
+    STATUS_PENDING = 'P'
+    STATUS_RUNNING = 'R'
+    STATUS_COMPLETED = 'C'
+    STATUS_FAILED = 'F'
+
+    STATUSES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    status = models.CharField(max_length=2, choices=STATUSES, default=STATUS_PENDING, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated']),
+        ]
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_IMPORT_JOBS_ENABLED
+
+    @classmethod
+    def create_import_job(cls, user, archive_file):
+        archive = get_import_archives_storage().save(make_import_archive_name(), archive_file)
+        return cls.objects.create(user=user, archive=archive)
+
+    @classmethod
+    def get_import_job_with_id_for_user_with_id(cls, import_job_id, user_id):
+        import_job = cls.objects.filter(pk=import_job_id, user_id=user_id).first()
+
+        if not import_job:
+            raise NotFound(
+                _('The import does not exist.'),
+            )
+
+        return import_job
+
+    @classmethod
+    def claim_next_import_job(cls):
+        """
+        Marks the oldest pending job, or running job whose worker stopped reporting progress, as running
+        :return: the claimed job or None
+        """
+        stale_before = timezone.now() - timedelta(seconds=settings.IMPORT_JOBS_STALE_AFTER)
+
+        with transaction.atomic():
+            import_job = cls.objects.select_for_update().filter(
+                Q(status=cls.STATUS_PENDING) | Q(status=cls.STATUS_RUNNING, updated__lt=stale_before)).order_by(
+                'created').first()
+
+            if not import_job:
+                return None
+
+            if not import_job.started:
+                import_job.started = timezone.now()
+
+            import_job.status = cls.STATUS_RUNNING
+            import_job.claim_token = uuid.uuid4()
+            import_job.save()
+
+        return import_job
+
+    def process(self, chunk_size=50):
+        storage = get_import_archives_storage()
+
+        try:
+            with storage.open(self.archive, 'rb') as archive_file, zip_parser(archive_file) as parser:
+                for posts in parser.get_posts_chunks(chunk_size=chunk_size, start=self.processed_posts_count):
+                    self._process_chunk(posts=posts)
+        except ImportJobClaimLost:
+            # A chunk outlasting IMPORT_JOBS_STALE_AFTER got the job claimed again, the new worker goes on with it
+            logger.warning('Import job %s was claimed by another worker' % self.pk)
+        except TypeError as e:
+            logger.warning('Potentially malicious archive in import job %s: %s' % (self.pk, e))
+            self.mark_as_failed(error=_('invalid archive'))
+        except (FileNotFoundError, KeyError, BufferError, BadZipFile, JSONDecodeError, UnicodeDecodeError) as e:
+            logger.info('Invalid archive in import job %s: %s' % (self.pk, e))
+            self.mark_as_failed(error=_('invalid archive'))
+        else:
+            self._mark_as_completed()
+
+    def _process_chunk(self, posts):
+        with PendingImage.delete_stored_originals_on_error(), transaction.atomic():
+            imported_count = save_posts(posts=posts, user=self.user)
+
+            self.processed_posts_count += len(posts)
+            self.imported_posts_count += imported_count
+            self.skipped_posts_count += len(posts) - imported_count
+            self._save_claimed()
+
+    def _save_claimed(self):
+        """
+        Saves the job unless another worker claimed it meanwhile, rolling back the surrounding transaction then
+        """
+        claim_token = type(self).objects.select_for_update().filter(pk=self.pk).values_list('claim_token',
+                                                                                           flat=True).first()
+
+        if claim_token != self.claim_token:
+            raise ImportJobClaimLost()
+
+        self.save()
+
+    def _mark_as_completed(self):
+        self.status = self.STATUS_COMPLETED
+        self._finish()
+
+    def mark_as_failed(self, error):
+        self.status = self.STATUS_FAILED
+        self.error = str(error)
+        self._finish()
+
+    def _finish(self):
+        self.finished = timezone.now()
+
+        archive = self.archive
+        self.archive = None
+
+        try:
+            with transaction.atomic():
+                self._save_claimed()
+
+                if archive:
+                    get_import_archives_storage().delete(archive)
+        except ImportJobClaimLost:
+            logger.warning('Import job %s was claimed by another worker' % self.pk)
+
+    def save(self, *args, **kwargs):
+        ''' On save, update timestamps '''
+        if not self.id:
+            self.created = timezone.now()
+
+        self.updated = timezone.now()
+
+        return super(ImportJob, self).save(*args, **kwargs)
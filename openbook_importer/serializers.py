@@ -1,7 +1,31 @@
 from rest_framework import serializers
 
+from openbook_importer.models import ImportJob
+
 
 class ZipfileSerializer(serializers.Serializer):
 
     serializers.FileField(max_length=20, required=True,
                           allow_empty_file=False)
+
+
+class GetImportJobSerializer(serializers.Serializer):
+
+    job_id = serializers.IntegerField(required=True)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            'id',
+            'status',
+            'processed_posts_count',
+            'imported_posts_count',
+            'skipped_posts_count',
+            'error',
+            'created',
+            'started',
+            'finished',
+        )
@@ -1,9 +1,23 @@
+from io import StringIO
+from unittest import mock
+
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from openbook_common.tests.helpers import make_user
+from openbook_common.models import PendingImage
+from openbook_common.tests.helpers import make_user, make_post_image
 from openbook_common.tests.helpers import make_authentication_headers_for_user
+from openbook_importer.facebook_archive_parser.zipparser import json_array_stream, zip_parser
+from openbook_importer.helpers import get_import_archives_storage, save_posts
+from openbook_importer.models import ImportJob
+from openbook_posts.models import Post, PostImage
 
 
 class UploadFileTests(APITestCase):
@@ -78,3 +92,290 @@ class UploadFileTests(APITestCase):
 
         response = self.client.get(reverse('posts'), **headers)
         self.assertEqual(len(response.json()), number_of_posts)
+
+
+
+@override_settings(FEATURE_IMPORT_JOBS_ENABLED=True)
+class ImportJobsTests(APITestCase):
+
+    def _upload(self, user, archive='openbook_importer/tests/facebook-jaybeenote5.zip'):
+        headers = make_authentication_headers_for_user(user)
+
+        with open(archive, 'rb') as fd:
+            return self.client.post(reverse('uploads'), {'file': fd}, **headers)
+
+    def _get_import_job(self, user, job_id):
+        headers = make_authentication_headers_for_user(user)
+        return self.client.get(reverse('import-job', kwargs={'job_id': job_id}), **headers)
+
+    def test_upload_queues_job_processed_by_worker(self):
+        """
+        Upload returns the job id right away, the worker imports the 9
+        posts and the job reports them, return 202
+        """
+
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        response = self._upload(user)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.json()['job_id']
+
+        self.assertEqual(len(self.client.get(reverse('posts'), **headers).json()), 0)
+        self.assertEqual(self._get_import_job(user, job_id).json()['status'], ImportJob.STATUS_PENDING)
+
+        call_command('process_import_jobs', '--once')
+
+        response = self._get_import_job(user, job_id)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], ImportJob.STATUS_COMPLETED)
+        self.assertEqual(response.json()['processed_posts_count'], 9)
+        self.assertEqual(response.json()['imported_posts_count'], 9)
+        self.assertEqual(len(self.client.get(reverse('posts'), **headers).json()), 9)
+        self.assertIsNone(ImportJob.objects.get(pk=job_id).archive)
+
+    def test_crashed_job_resumes_from_last_committed_chunk(self):
+        """
+        A job left running by a crashed worker is claimed again and imports
+        the posts after its last committed chunk only
+        """
+
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        job_id = self._upload(user).json()['job_id']
+
+        import_job = ImportJob.claim_next_import_job()
+
+        with get_import_archives_storage().open(import_job.archive, 'rb') as archive_file, \
+                zip_parser(archive_file) as parser:
+            import_job._process_chunk(posts=next(parser.get_posts_chunks(chunk_size=4)))
+
+        self.assertIsNone(ImportJob.claim_next_import_job())
+
+        ImportJob.objects.filter(pk=job_id).update(updated=timezone.now() - timedelta(hours=1))
+
+        call_command('process_import_jobs', '--once', '--chunk-size', '2')
+
+        response = self._get_import_job(user, job_id)
+
+        self.assertEqual(response.json()['status'], ImportJob.STATUS_COMPLETED)
+        self.assertEqual(response.json()['processed_posts_count'], 9)
+        self.assertEqual(response.json()['imported_posts_count'], 9)
+        self.assertEqual(response.json()['skipped_posts_count'], 0)
+        self.assertEqual(len(self.client.get(reverse('posts'), **headers).json()), 9)
+
+    def test_job_claimed_by_another_worker_rolls_back_chunk(self):
+        """
+        A worker whose job was claimed again by another worker does not commit
+        its chunk nor finish the job
+        """
+
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        job_id = self._upload(user).json()['job_id']
+
+        import_job = ImportJob.claim_next_import_job()
+
+        ImportJob.objects.filter(pk=job_id).update(updated=timezone.now() - timedelta(hours=1))
+        ImportJob.claim_next_import_job()
+
+        import_job.process(chunk_size=4)
+
+        import_job = ImportJob.objects.get(pk=job_id)
+
+        self.assertEqual(import_job.status, ImportJob.STATUS_RUNNING)
+        self.assertEqual(import_job.processed_posts_count, 0)
+        self.assertIsNotNone(import_job.archive)
+        self.assertEqual(len(self.client.get(reverse('posts'), **headers).json()), 0)
+
+    def test_invalid_archive_fails_job(self):
+        """
+        A job for an invalid archive fails reporting the error
+        """
+
+        user = make_user()
+
+        job_id = self._upload(user, archive='openbook_importer/tests/invalid.zip').json()['job_id']
+
+        call_command('process_import_jobs', '--once')
+
+        response = self._get_import_job(user, job_id)
+
+        self.assertEqual(response.json()['status'], ImportJob.STATUS_FAILED)
+        self.assertEqual(response.json()['error'], 'invalid archive')
+
+    def test_cant_retrieve_import_job_of_other_user(self):
+        """
+        should not be able to retrieve the import job of another user, return 404
+        """
+
+        user = make_user()
+        job_id = self._upload(user).json()['job_id']
+
+        response = self._get_import_job(make_user(), job_id)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkImportTests(APITestCase):
+
+    def _make_archive_post(self, text, timestamp):
+        return {
+            'timestamp': timestamp,
+            'data': [{'post': text}]
+        }
+
+    def test_reimport_skips_posts_imported_before(self):
+        """
+        Importing the same posts again, also posts imported before the
+        import hash was stored, creates only the new ones
+        """
+
+        user = make_user()
+
+        timestamp = int(timezone.now().timestamp())
+        posts = [self._make_archive_post(text='post %d' % i, timestamp=timestamp - i) for i in range(0, 3)]
+
+        self.assertEqual(save_posts(posts=posts[:2], user=user), 2)
+
+        # A post imported one by one has no import hash
+        legacy_post = Post.objects.get(creator=user, text='post 1')
+        legacy_post.import_hash = None
+        legacy_post.save()
+
+        self.assertEqual(save_posts(posts=posts, user=user), 1)
+
+        user.refresh_from_db()
+
+        self.assertEqual(Post.objects.filter(creator=user).count(), 3)
+        self.assertEqual(user.posts_count, 3)
+        self.assertEqual(Post.objects.filter(creator=user, circles__isnull=False).count(), 3)
+
+    def test_images_are_processed_by_command(self):
+        """
+        Bulk imported images only have their dimensions until process_images
+        runs
+        """
+
+        user = make_user()
+
+        created = timezone.now()
+
+        Post.bulk_import_public_posts(creator=user, posts_data=[{
+            'text': None,
+            'image': make_post_image(),
+            'created': created
+        }])
+
+        post_image = PostImage.objects.get(post__creator=user)
+
+        self.assertFalse(post_image.image)
+        self.assertEqual(post_image.width, 100)
+
+        call_command('process_images', '--once')
+
+        post_image.refresh_from_db()
+
+        self.assertTrue(post_image.image.storage.exists(post_image.image.name))
+        self.assertFalse(PendingImage.objects.exists())
+
+    def test_image_failing_to_be_processed_is_retried(self):
+        """
+        A bulk imported image failing to be processed is kept and retried
+        after a backoff
+        """
+
+        user = make_user()
+
+        Post.bulk_import_public_posts(creator=user, posts_data=[{
+            'text': None,
+            'image': make_post_image(),
+            'created': timezone.now()
+        }])
+
+        with mock.patch.object(PostImage._meta.get_field('image').storage, 'open',
+                               side_effect=IOError('Storage unavailable')):
+            call_command('process_images', '--once')
+
+        pending_image = PendingImage.objects.get()
+
+        self.assertEqual(pending_image.attempts, 1)
+        self.assertTrue(pending_image.next_attempt > timezone.now())
+        self.assertTrue(PostImage._meta.get_field('image').storage.exists(pending_image.original))
+
+        PendingImage.objects.update(next_attempt=timezone.now())
+        call_command('process_images', '--once')
+
+        self.assertFalse(PendingImage.objects.exists())
+        self.assertTrue(PostImage.objects.get(post__creator=user).image)
+
+    def test_rolled_back_chunk_deletes_its_stored_images(self):
+        """
+        The images stored by a chunk of posts are deleted when it rolls back
+        """
+
+        user = make_user()
+
+        with self.assertRaises(ValueError):
+            with PendingImage.delete_stored_originals_on_error(), transaction.atomic():
+                Post.bulk_import_public_posts(creator=user, posts_data=[{
+                    'text': None,
+                    'image': make_post_image(),
+                    'created': timezone.now()
+                }])
+                originals = list(PendingImage.objects.values_list('original', flat=True))
+                raise ValueError()
+
+        self.assertEqual(len(originals), 1)
+        self.assertFalse(PostImage._meta.get_field('image').storage.exists(originals[0]))
+
+
+class JsonArrayStreamTests(TestCase):
+
+    def _stream(self, text, key='status_updates', max_item_size=1024):
+        stream = json_array_stream(StringIO(text), key, max_item_size)
+        stream.CHUNK_SIZE = 3
+        return stream
+
+    def test_streams_array_items_across_chunks(self):
+        """
+        should decode every item of the array under the key, whatever the chunk boundaries
+        """
+
+        text = ('{"other": {"ignored": [1, 2]}, "count": 12345, '
+                '"status_updates": [{"timestamp": 1540041122}, 15400, '
+                '{"data": [{"post": "hi, there"}]}], "after": true}')
+
+        items = list(self._stream(text))
+
+        self.assertEqual(items, [{'timestamp': 1540041122}, 15400,
+                                 {'data': [{'post': 'hi, there'}]}])
+
+    def test_streams_empty_array(self):
+        """
+        should decode no items from an empty array
+        """
+
+        self.assertEqual(list(self._stream('{"status_updates": [ ]}')), [])
+
+    def test_missing_key(self):
+        """
+        should raise a KeyError if the object has no such key
+        """
+
+        with self.assertRaises(KeyError):
+            list(self._stream('{"messages": []}'))
+
+    def test_item_exceeding_max_size(self):
+        """
+        should raise a BufferError instead of buffering an item bigger than the maximum size
+        """
+
+        text = '{"status_updates": [{"post": "%s"}]}' % ('a' * 2048)
+
+        with self.assertRaises(BufferError):
+            list(self._stream(text))
@@ -1,16 +1,18 @@
-from datetime import datetime
 from json import JSONDecodeError
+from zipfile import BadZipFile
+
+from django.db import transaction
 
 from rest_framework import status
-from openbook_posts.models import Post
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.core.files.images import ImageFile
-from django.utils.dateparse import parse_datetime
 from rest_framework.permissions import IsAuthenticated
 from django.utils.translation import ugettext_lazy as _
 
-from openbook_importer.serializers import ZipfileSerializer
+from openbook_common.models import PendingImage
+from openbook_importer.helpers import save_posts
+from openbook_importer.models import ImportJob
+from openbook_importer.serializers import ZipfileSerializer, GetImportJobSerializer, ImportJobSerializer
 from openbook_importer.facebook_archive_parser.zipparser import zip_parser
 
 
@@ -18,74 +20,46 @@ class ImportItem(APIView):
 
     permission_classes = (IsAuthenticated,)
 
+    POSTS_CHUNK_SIZE = 100
+
     def post(self, request):
         serializer = ZipfileSerializer(data=request.FILES)
         serializer.is_valid(raise_exception=True)
 
         zipfile = request.FILES['file']
 
+        if ImportJob.is_enabled():
+            # Only pay for storing the archive, the process_import_jobs worker does the importing
+            import_job = ImportJob.create_import_job(user=request.user, archive_file=zipfile)
+
+            return Response({
+                'message': _('queued'),
+                'job_id': import_job.pk
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # Posts are parsed lazily while they're saved, so parsing errors
+        # can come up halfway and roll the whole import back
         try:
-            p = zip_parser(zipfile)
+            with zip_parser(zipfile) as p, PendingImage.delete_stored_originals_on_error(), transaction.atomic():
+                self.save_posts(p.get_posts_chunks(chunk_size=self.POSTS_CHUNK_SIZE), request.user)
 
-        except FileNotFoundError:
+        except (FileNotFoundError, KeyError, BufferError, BadZipFile):
             return self._return_invalid()
 
-        except JSONDecodeError:
+        except (JSONDecodeError, UnicodeDecodeError):
             return self._return_invalid()
 
         except TypeError:
             return self._return_malicious()
 
-        if p.profile.posts:
-            self.save_posts(p.profile.posts, request.user)
-
         return Response({
             'message': _('done')
         }, status=status.HTTP_200_OK)
 
-    def save_posts(self, posts, user):
-
-        for post in posts:
-            image = None
-            images = None
-            text = None
-            timestamp = post['timestamp']
-            created = datetime.fromtimestamp(timestamp)
-            created = parse_datetime(created.strftime('%Y-%m-%d %T+00:00'))
-
-            if 'attachments' in post.keys():
-                images = self._get_media_content(post)
-
-            if 'data' in post.keys() and len(post['data']) != 0:
-                text = post['data'][0]['post']
-
-            if images:
-                image = images[0]
-
-                if 'text' in image.keys():
-                    text = image['text']
-
-                image = ImageFile(image['file'])
-
-            if not Post.objects.filter(creator=user.pk, text=text, created=created).exists():
-                user.create_public_post(text=text, image=image, created=created)
-
-    def _get_media_content(self, post):
+    def save_posts(self, posts_chunks, user):
 
-        images = []
-        image = {}
-
-        for attachment in post['attachments']:
-            for data in attachment['data']:
-                image['file'] = data['media']['uri'][1]
-
-                if 'description' in data['media'].keys():
-                    image['text'] = data['media']['description']
-
-                images.append(image)
-                image = {}
-
-        return images
+        for posts in posts_chunks:
+            save_posts(posts=posts, user=user)
 
     def _return_invalid(self):
 
@@ -100,3 +74,20 @@ class ImportItem(APIView):
         return Response({
             'message':_('invalid archive')
         }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ImportJobItem(APIView):
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, job_id):
+        serializer = GetImportJobSerializer(data={'job_id': job_id})
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        job_id = data.get('job_id')
+
+        import_job = ImportJob.get_import_job_with_id_for_user_with_id(import_job_id=job_id,
+                                                                       user_id=request.user.pk)
+
+        return Response(ImportJobSerializer(import_job).data, status=status.HTTP_200_OK)
@@ -32,7 +32,7 @@ class List(models.Model):
     @property
     def users(self):
         Follow = get_follow_model()
-        list_follows = Follow.objects.select_related('followed_user').filter(
+        list_follows = Follow.objects.select_related('followed_user__profile').filter(
             lists__id=self.id)
         users = []
         for follow in list_follows:
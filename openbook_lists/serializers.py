@@ -3,7 +3,7 @@ from rest_framework import serializers
 
 from openbook.settings import LIST_MAX_LENGTH
 from openbook_auth.models import UserProfile, User
-from openbook_auth.validators import username_characters_validator, user_username_exists
+from openbook_auth.validators import username_characters_validator, users_usernames_exist
 from openbook_common.models import Emoji
 from openbook_lists.models import List
 from openbook_common.validators import emoji_id_exists
@@ -29,7 +29,8 @@ class UpdateListSerializer(serializers.Serializer):
         child=serializers.CharField(max_length=settings.USERNAME_MAX_LENGTH,
                                     allow_blank=False,
                                     required=False,
-                                    validators=[username_characters_validator, user_username_exists])
+                                    validators=[username_characters_validator]),
+        validators=[users_usernames_exist]
     )
 
 
@@ -1,4 +1,6 @@
 # Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from faker import Faker
 from rest_framework import status
@@ -14,6 +16,7 @@ from openbook_common.models import Emoji
 from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, make_emoji, \
     make_fake_list_name
 from openbook_lists.models import List
+from openbook_notifications.models import Notification
 
 logger = logging.getLogger(__name__)
 fake = Faker()
@@ -231,6 +234,69 @@ class ListItemAPITests(APITestCase):
 
         self.assertEqual(len(list.users), 0)
 
+    def test_update_own_list_users_applies_the_difference(self):
+        """
+        should keep, remove, add and follow the list users according to the given usernames
+        """
+        user = make_user()
+
+        list = mixer.blend(List, creator=user)
+        list_id = list.pk
+
+        user_to_keep = make_user()
+        user.follow_user_with_id(user_to_keep.pk, lists_ids=[list_id])
+
+        user_to_remove = make_user()
+        user.follow_user_with_id(user_to_remove.pk, lists_ids=[list_id])
+
+        user_to_add = make_user()
+        user.follow_user_with_id(user_to_add.pk)
+
+        user_to_follow = make_user()
+
+        data = {
+            'usernames': ','.join([user_to_keep.username, user_to_add.username, user_to_follow.username])
+        }
+
+        url = self._get_url(list_id)
+        headers = make_authentication_headers_for_user(user)
+        response = self.client.patch(url, data, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertTrue(user.is_following_user_with_id_in_list_with_id(user_to_keep.pk, list_id))
+        self.assertFalse(user.is_following_user_with_id_in_list_with_id(user_to_remove.pk, list_id))
+        self.assertTrue(user.is_following_user_with_id(user_to_remove.pk))
+        self.assertTrue(user.is_following_user_with_id_in_list_with_id(user_to_add.pk, list_id))
+        self.assertTrue(user.is_following_user_with_id_in_list_with_id(user_to_follow.pk, list_id))
+        self.assertTrue(user_to_follow.notifications.filter(notification_type=Notification.FOLLOW).exists())
+
+        user.refresh_from_db()
+        user_to_follow.refresh_from_db()
+        self.assertEqual(user.count_following(), 4)
+        self.assertEqual(user_to_follow.count_followers(), 1)
+
+    def test_update_own_list_users_queries_do_not_grow_with_users(self):
+        """
+        should update the list users with a constant amount of queries
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        def update_list_users_with_new_users(amount_of_new_users):
+            list = mixer.blend(List, creator=user)
+            usernames = [make_user().username for i in range(0, amount_of_new_users)]
+            url = self._get_url(list.pk)
+
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.patch(url, {'usernames': ','.join(usernames)}, **headers)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(list.users), amount_of_new_users)
+            return len(context)
+
+        self.assertEqual(update_list_users_with_new_users(2), update_list_users_with_new_users(10))
+
     def test_cannot_update_other_user_list(self):
         """
         should not be able update another user list and return 400
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_notifications.push_notifications.senders import send_pending_push_notifications
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Sends the pending push notifications of the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Push notifications to send per batch')
+        parser.add_argument('--workers', type=int, default=4, help='Threads sending the push notifications')
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='Seconds to wait for new push notifications when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is drained')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+
+        while True:
+            sent_count = send_pending_push_notifications(batch_size=batch_size, workers=workers)
+
+            if sent_count:
+                logger.info('Handled {0} push notifications'.format(sent_count))
+                continue
+
+            if options['once']:
+                break
+
+            time.sleep(options['sleep'])
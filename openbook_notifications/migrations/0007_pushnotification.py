@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('openbook_notifications', '0006_communityinvitenotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PushNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('PR', 'Post Reaction'), ('PC', 'Post Comment'), ('CR', 'Connection Request'), ('CC', 'Connection Confirmed'), ('F', 'Follow'), ('CI', 'Community Invite')], max_length=5, null=True)),
+                ('body', models.TextField(editable=False)),
+                ('created', models.DateTimeField(editable=False)),
+                ('next_attempt', models.DateTimeField(editable=False)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('sent', models.DateTimeField(editable=False, null=True)),
+                ('delivery_latency', models.DurationField(editable=False, null=True)),
+                ('last_error', models.TextField(editable=False, null=True)),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('S', 'Sent'), ('F', 'Failed')], default='P', editable=False, max_length=2)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='push_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pushnotification',
+            index=models.Index(fields=['status', 'next_attempt'], name='openbook_no_status_d7039d_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-16 22:05
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_count(queryset, count_field_name, related_queryset, related_field_name):
+    # The rows of the related queryset pointing to every row of the queryset
+    count = Coalesce(Subquery(
+        related_queryset.filter(**{related_field_name: OuterRef('pk')}).order_by().values(
+            related_field_name).annotate(count=Count('pk')).values('count')[:1],
+        output_field=IntegerField()), 0)
+
+    queryset.update(**{count_field_name: count})
+
+
+def populate_unread_notifications_count(apps, schema_editor):
+    User = apps.get_model('openbook_auth', 'User')
+    Notification = apps.get_model('openbook_notifications', 'Notification')
+
+    populate_count(User.objects.all(), 'unread_notifications_count', Notification.objects.filter(read=False),
+                   'owner_id')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('openbook_notifications', '0007_pushnotification'),
+        ('openbook_auth', '0031_user_unread_notifications_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_unread_notifications_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:31
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('openbook_notifications', '0008_populate_unread_notifications_count'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='notification',
+            index_together={('owner', 'created', 'id')},
+        ),
+    ]
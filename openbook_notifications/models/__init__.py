@@ -5,3 +5,4 @@ from .follow_notification import FollowNotification
 from .post_comment_notification import PostCommentNotification
 from .post_reaction_notification import PostReactionNotification
 from .community_invite_notification import CommunityInviteNotification
+from .push_notification import PushNotification
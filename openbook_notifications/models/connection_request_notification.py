@@ -18,6 +18,13 @@ class ConnectionRequestNotification(models.Model):
                                          owner_id=owner_id)
         return connection_request_notification
 
+    @classmethod
+    def create_connection_request_notifications(cls, connection_requester_id, owners_ids):
+        return Notification.create_notifications_with_content_object_model(type=Notification.CONNECTION_REQUEST,
+                                                                           content_object_model=cls,
+                                                                           owners_ids=owners_ids,
+                                                                           connection_requester_id=connection_requester_id)
+
     @classmethod
     def delete_connection_request_notification_for_users_with_ids(cls, user_a_id, user_b_id):
         notification_query = Q(connection_requester_id=user_a_id, notification__owner_id=user_b_id)
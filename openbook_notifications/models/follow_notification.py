@@ -17,6 +17,13 @@ class FollowNotification(models.Model):
                                          owner_id=owner_id)
         return follow_notification
 
+    @classmethod
+    def create_follow_notifications(cls, follower_id, owners_ids):
+        return Notification.create_notifications_with_content_object_model(type=Notification.FOLLOW,
+                                                                           content_object_model=cls,
+                                                                           owners_ids=owners_ids,
+                                                                           follower_id=follower_id)
+
     @classmethod
     def delete_follow_notification(cls, follower_id, owner_id):
         cls.objects.filter(follower_id=follower_id, notification__owner_id=owner_id).delete()
@@ -1,9 +1,15 @@
+from collections import Counter
+
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import models, connection
+from django.db.models import Max
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
 from openbook_auth.models import User
+from openbook_common.utils.helpers import update_count
 
 
 class Notification(models.Model):
@@ -34,13 +40,104 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
 
+    class Meta:
+        index_together = (('owner', 'created', 'id'),)
+
     @classmethod
     def create_notification(cls, owner_id, type, content_object):
         return cls.objects.create(notification_type=type, content_object=content_object, owner_id=owner_id)
 
+    @classmethod
+    def create_notifications(cls, type, owners_ids_content_objects):
+        """
+        Bulk creates notifications of the given type from (owner_id, content_object) pairs
+        """
+        created = timezone.now()
+        notifications = cls.objects.bulk_create([
+            cls(notification_type=type, content_object=content_object, owner_id=owner_id, created=created) for
+            owner_id, content_object in owners_ids_content_objects])
+
+        # bulk_create sends no post_save signal
+        owners_unread_notifications = Counter(notification.owner_id for notification in notifications)
+        owners_ids_by_amount = {}
+        for owner_id, amount in owners_unread_notifications.items():
+            owners_ids_by_amount.setdefault(amount, []).append(owner_id)
+
+        for amount, owners_ids in owners_ids_by_amount.items():
+            update_count(User.objects.filter(pk__in=owners_ids), 'unread_notifications_count', amount)
+
+        return notifications
+
+    @classmethod
+    def create_notifications_with_content_object_model(cls, type, content_object_model, owners_ids,
+                                                       **content_object_fields):
+        """
+        Bulk creates a content object with the given fields and its notification for each owner
+        """
+        if not owners_ids:
+            return []
+
+        content_objects = [content_object_model(**content_object_fields) for owner_id in owners_ids]
+
+        if connection.features.can_return_ids_from_bulk_insert:
+            content_object_model.objects.bulk_create(content_objects)
+        else:
+            # Bulk created rows don't get their primary keys, they're fetched back as the rows past the last
+            # primary key before they were created, leaving out older rows alike left without a notification
+            last_pk = content_object_model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+            content_object_model.objects.bulk_create(content_objects)
+            content_objects = list(
+                content_object_model.objects.filter(pk__gt=last_pk, notification__isnull=True,
+                                                    **content_object_fields).order_by('pk')[:len(owners_ids)])
+
+        cls.create_notifications(type=type, owners_ids_content_objects=zip(owners_ids, content_objects))
+        return content_objects
+
+    @classmethod
+    def prefetch_content_objects(cls, notifications, content_objects_select_related=None):
+        """
+        Fetches the content objects of the given notifications with one query per content type
+        :param content_objects_select_related: dict of content object model to the relations to select along
+        """
+        content_objects_select_related = content_objects_select_related or {}
+
+        content_types_objects_ids = {}
+        for notification in notifications:
+            content_types_objects_ids.setdefault(notification.content_type_id, set()).add(notification.object_id)
+
+        content_types_objects = {}
+        for content_type_id, objects_ids in content_types_objects_ids.items():
+            content_type_model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if not content_type_model:
+                content_types_objects[content_type_id] = {}
+                continue
+            content_type_queryset = content_type_model._default_manager.select_related(
+                *content_objects_select_related.get(content_type_model, ()))
+            content_types_objects[content_type_id] = content_type_queryset.in_bulk(objects_ids)
+
+        content_object_field = cls._meta.get_field('content_object')
+        for notification in notifications:
+            content_object = content_types_objects[notification.content_type_id].get(notification.object_id)
+            content_object_field.set_cached_value(notification, content_object)
+
+        return notifications
+
     def save(self, *args, **kwargs):
         ''' On save, update timestamps '''
         if not self.id and not self.created:
             self.created = timezone.now()
 
         return super(Notification, self).save(*args, **kwargs)
+
+
+@receiver(post_save, sender=Notification)
+def increment_owner_unread_notifications_count(sender, instance=None, created=False, **kwargs):
+    if created and not instance.read:
+        update_count(User.objects.filter(pk=instance.owner_id), 'unread_notifications_count')
+
+
+@receiver(post_delete, sender=Notification)
+def decrement_owner_unread_notifications_count(sender, instance=None, **kwargs):
+    # Notifications are also deleted in cascade with their content objects, hence the signal
+    if not instance.read:
+        update_count(User.objects.filter(pk=instance.owner_id), 'unread_notifications_count', -1)
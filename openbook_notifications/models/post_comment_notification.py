@@ -17,6 +17,16 @@ class PostCommentNotification(models.Model):
                                          owner_id=owner_id)
         return post_comment_notification
 
+    @classmethod
+    def create_post_comment_notifications(cls, post_comment_id, owners_ids):
+        """
+        Creates the notifications of a post comment for many owners with a constant amount of queries
+        """
+        return Notification.create_notifications_with_content_object_model(type=Notification.POST_COMMENT,
+                                                                           content_object_model=cls,
+                                                                           owners_ids=owners_ids,
+                                                                           post_comment_id=post_comment_id)
+
     @classmethod
     def delete_post_comment_notification(cls, post_comment_id, owner_id):
         cls.objects.filter(post_comment_id=post_comment_id,
@@ -0,0 +1,75 @@
+from django.db import models
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from openbook_auth.models import User
+from openbook_common.models import OutboxEntry
+from openbook_notifications.models.notification import Notification
+
+
+class PushNotification(OutboxEntry):
+    """
+    An outbox entry of a push notification, written in the same transaction as the action
+    triggering it and sent by the send_push_notifications worker.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_notifications')
+    notification_type = models.CharField(max_length=5, choices=Notification.NOTIFICATION_TYPES, null=True)
+    body = models.TextField(editable=False)
+    sent = models.DateTimeField(editable=False, null=True)
+    delivery_latency = models.DurationField(editable=False, null=True)
+
+    STATUS_PENDING = 'P'
+    STATUS_SENT = 'S'
+    STATUS_FAILED = 'F'
+
+    STATUSES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    status = models.CharField(max_length=2, choices=STATUSES, default=STATUS_PENDING, editable=False)
+
+    outbox_settings_prefix = 'PUSH_NOTIFICATIONS'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+    @classmethod
+    def create_push_notification(cls, user_id, body, notification_type=None):
+        return cls.objects.create(user_id=user_id, body=body, notification_type=notification_type)
+
+    @classmethod
+    def create_push_notifications(cls, users_ids, body, notification_type=None):
+        created = timezone.now()
+        return cls.objects.bulk_create(
+            [cls(user_id=user_id, body=body, notification_type=notification_type, created=created,
+                 next_attempt=created) for user_id in users_ids])
+
+    @classmethod
+    def get_pending_push_notifications(cls, limit):
+        return cls.objects.filter(status=cls.STATUS_PENDING, next_attempt__lte=timezone.now()).order_by(
+            'next_attempt')[:limit]
+
+    @classmethod
+    def claim_pending_push_notifications(cls, limit):
+        """
+        Claims a batch of the pending push notifications for the calling worker
+        """
+        push_notifications = cls.claim_outbox_entries(cls.get_pending_push_notifications(limit=limit))
+
+        prefetch_related_objects(push_notifications, 'user')
+
+        return push_notifications
+
+    def mark_as_sent(self):
+        self.status = self.STATUS_SENT
+        self.sent = timezone.now()
+        self.delivery_latency = self.sent - self.created
+        self.save()
+
+    def give_up(self):
+        self.status = self.STATUS_FAILED
+        self.save()
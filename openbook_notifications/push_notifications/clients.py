@@ -0,0 +1,51 @@
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from onesignal import OneSignalError
+from onesignal.constants import ENDPOINTS
+
+
+class OneSignalPushNotificationsClient:
+    """
+    Posts the notifications to the OneSignal API itself, the OneSignal SDK request has no timeout
+    """
+
+    def __init__(self):
+        self.notifications_url = ENDPOINTS['API_ROOT'] + ENDPOINTS['NOTIFICATIONS_PATH']
+
+    def send_notification(self, notification):
+        post_body = dict(notification.post_body)
+        post_body['app_id'] = settings.ONE_SIGNAL_APP_ID
+
+        response = requests.post(self.notifications_url, json=post_body,
+                                 headers={'Authorization': 'Basic %s' % settings.ONE_SIGNAL_API_KEY},
+                                 timeout=settings.PUSH_NOTIFICATIONS_HTTP_TIMEOUT)
+
+        if not response.ok:
+            raise OneSignalError('OneSignal responded with status %s: %s' % (response.status_code, response.text))
+
+        return response
+
+
+class StubPushNotificationsClient:
+    """
+    Keeps the notifications in memory instead of sending them, used in tests and local development
+    """
+
+    def __init__(self):
+        self.sent_notifications = []
+
+    def send_notification(self, notification):
+        self.sent_notifications.append(dict(notification.post_body))
+
+
+push_notifications_clients = {}
+
+
+def get_push_notifications_client():
+    client_path = settings.PUSH_NOTIFICATIONS_CLIENT
+
+    if client_path not in push_notifications_clients:
+        push_notifications_clients[client_path] = import_string(client_path)()
+
+    return push_notifications_clients[client_path]
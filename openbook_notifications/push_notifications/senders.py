@@ -1,10 +1,18 @@
+import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 import onesignal as onesignal_sdk
+import requests
 from django.conf import settings
-from django.db.models import Q
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils.translation import ugettext_lazy as _
 from onesignal import OneSignalError
 
-from openbook_common.utils.model_loaders import get_notification_model, get_user_model, get_post_model
+from openbook_common.utils.model_loaders import get_notification_model, get_user_model, get_post_model, \
+    get_push_notification_model, get_device_model
+from openbook_notifications.push_notifications.clients import get_push_notifications_client
 from openbook_notifications.push_notifications.serializers import PushNotificationsSerializers
 from hashlib import sha256
 
@@ -12,9 +20,6 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-onesignal_client = onesignal_sdk.Client(
-    app={"app_auth_key": settings.ONE_SIGNAL_API_KEY, "app_id": settings.ONE_SIGNAL_APP_ID})
-
 
 def send_post_reaction_push_notification(post_reaction):
     post_creator = post_reaction.post.creator
@@ -47,6 +52,11 @@ def send_post_reaction_push_notification(post_reaction):
 
 
 def send_post_comment_push_notification_with_message(post_comment, message, target_user):
+    send_post_comment_push_notification_with_message_to_users(post_comment=post_comment, message=message,
+                                                              target_users=[target_user])
+
+
+def send_post_comment_push_notification_with_message_to_users(post_comment, message, target_users):
     Notification = get_notification_model()
     NotificationPostCommentSerializer = _get_push_notifications_serializers().NotificationPostCommentSerializer
 
@@ -67,11 +77,18 @@ def send_post_comment_push_notification_with_message(post_comment, message, targ
     one_signal_notification.set_parameter('!thread_id', notification_group)
     one_signal_notification.set_parameter('android_group', notification_group)
 
-    _send_notification_to_user(notification=one_signal_notification, user=target_user)
+    _send_notification_to_users(notification=one_signal_notification, users=target_users)
 
 
 def send_follow_push_notification(followed_user, following_user):
-    if followed_user.has_follow_notifications_enabled():
+    send_follow_push_notification_to_users(followed_users=[followed_user], following_user=following_user)
+
+
+def send_follow_push_notification_to_users(followed_users, following_user):
+    followed_users = [followed_user for followed_user in followed_users if
+                      followed_user.has_follow_notifications_enabled()]
+
+    if followed_users:
         one_signal_notification = onesignal_sdk.Notification(
             contents={"en": _('@%(following_user_username)s started following you') % {
                 'following_user_username': following_user.username
@@ -90,11 +107,20 @@ def send_follow_push_notification(followed_user, following_user):
 
         one_signal_notification.set_parameter('data', notification_data)
 
-        _send_notification_to_user(notification=one_signal_notification, user=followed_user)
+        _send_notification_to_users(notification=one_signal_notification, users=followed_users)
 
 
 def send_connection_request_push_notification(connection_requester, connection_requested_for):
-    if connection_requested_for.has_connection_request_notifications_enabled():
+    send_connection_request_push_notification_to_users(connection_requester=connection_requester,
+                                                       connection_requested_for_users=[connection_requested_for])
+
+
+def send_connection_request_push_notification_to_users(connection_requester, connection_requested_for_users):
+    connection_requested_for_users = [connection_requested_for for connection_requested_for in
+                                      connection_requested_for_users if
+                                      connection_requested_for.has_connection_request_notifications_enabled()]
+
+    if connection_requested_for_users:
         one_signal_notification = onesignal_sdk.Notification(
             contents={"en": _('@%(connection_requester_username)s wants to connect with you.') % {
                 'connection_requester_username': connection_requester.username
@@ -113,7 +139,7 @@ def send_connection_request_push_notification(connection_requester, connection_r
 
         one_signal_notification.set_parameter('data', notification_data)
 
-        _send_notification_to_user(user=connection_requested_for, notification=one_signal_notification, )
+        _send_notification_to_users(users=connection_requested_for_users, notification=one_signal_notification)
 
 
 def send_community_invite_push_notification(community_invite):
@@ -143,24 +169,183 @@ def send_community_invite_push_notification(community_invite):
         _send_notification_to_user(notification=one_signal_notification, user=invited_user)
 
 
+def send_pending_push_notifications(batch_size=100, workers=4):
+    """
+    Send a batch of the pending push notifications of the outbox.
+    The database is only accessed from the calling thread, the workers only talk to the push notifications client.
+    :return: the amount of push notifications handled
+    """
+    PushNotification = get_push_notification_model()
+    push_notifications = PushNotification.claim_pending_push_notifications(limit=batch_size)
+
+    if not push_notifications:
+        return 0
+
+    # Batch by recipient so every user devices are loaded once and its notifications are sent in order
+    users_push_notifications = {}
+    for push_notification in push_notifications:
+        users_push_notifications.setdefault(push_notification.user_id, []).append(push_notification)
+
+    Device = get_device_model()
+    users_devices_uuids = {}
+    for owner_id, device_uuid in Device.objects.filter(owner_id__in=users_push_notifications.keys()).values_list(
+            'owner_id', 'uuid'):
+        users_devices_uuids.setdefault(owner_id, []).append(device_uuid)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        users_results = executor.map(
+            lambda user_push_notifications: _send_push_notifications(
+                push_notifications=user_push_notifications,
+                devices_uuids=users_devices_uuids.get(user_push_notifications[0].user_id, [])),
+            users_push_notifications.values())
+
+        for user_results in list(users_results):
+            for push_notification, error in user_results:
+                if error:
+                    logger.error('Error sending push notification %s to user_id %s with error %s' % (
+                        push_notification.pk, push_notification.user_id, error))
+                    push_notification.mark_as_failed_attempt(error=error)
+                else:
+                    push_notification.mark_as_sent()
+
+    return len(push_notifications)
+
+
+def _send_push_notifications(push_notifications, devices_uuids):
+    results = []
+
+    for push_notification in push_notifications:
+        notification = onesignal_sdk.Notification()
+        notification.post_body = json.loads(push_notification.body)
+
+        # Any error is recorded against its notification, so the rest of the batch is still marked as sent
+        try:
+            _send_notification_to_users_devices(notification=notification,
+                                                users_devices_uuids=[(push_notification.user, devices_uuids)])
+        except Exception as e:
+            results.append((push_notification, e))
+        else:
+            results.append((push_notification, None))
+
+    return results
+
+
 def _send_notification_to_user(user, notification):
-    for device in user.devices.all():
-        notification.set_parameter('ios_badgeType', 'Increase')
-        notification.set_parameter('ios_badgeCount', '1')
+    _send_notification_to_users(users=[user], notification=notification)
+
+
+def _send_notification_to_users(users, notification):
+    notification.set_parameter('ios_badgeType', 'Increase')
+    notification.set_parameter('ios_badgeCount', '1')
+
+    if not users:
+        return
+
+    if settings.FEATURE_ASYNC_PUSH_NOTIFICATIONS_ENABLED:
+        # Only pay for an insert, the send_push_notifications worker does the sending
+        PushNotification = get_push_notification_model()
+        notification_data = notification.post_body.get('data', {})
+        PushNotification.create_push_notifications(users_ids=[user.pk for user in users],
+                                                   body=json.dumps(notification.post_body, cls=DjangoJSONEncoder),
+                                                   notification_type=notification_data.get('type'))
+        return
+
+    users_devices_uuids = {user.pk: [] for user in users}
+
+    Device = get_device_model()
+    for owner_id, device_uuid in Device.objects.filter(owner_id__in=users_devices_uuids.keys()).values_list(
+            'owner_id', 'uuid'):
+        users_devices_uuids[owner_id].append(device_uuid)
+
+    try:
+        _send_notification_to_users_devices(notification=notification,
+                                            users_devices_uuids=[(user, users_devices_uuids[user.pk]) for user in
+                                                                 users])
+    except OneSignalError as e:
+        logger.error('Error sending notification to users_ids %s with error %s' % (
+            ', '.join(str(user.pk) for user in users), e))
 
-        user_id_contents = (str(user.uuid) + str(user.id)).encode('utf-8')
 
-        user_id = sha256(user_id_contents).hexdigest()
+# OneSignal rejects requests with more filter entries than this
+MAX_NOTIFICATION_FILTERS = 200
 
-        notification.set_filters([
-            {"field": "tag", "key": "user_id", "relation": "=", "value": user_id},
-            {"field": "tag", "key": "device_uuid", "relation": "=", "value": device.uuid},
-        ])
+
+def _send_notification_to_users_devices(notification, users_devices_uuids):
+    """
+    Sends the notification to the devices of the given users with as few requests as possible,
+    the devices are targeted by ORing their user_id and device_uuid tags.
+    :param users_devices_uuids: list of (user, devices_uuids) tuples
+    """
+    requests_filters = []
+    request_filters = []
+
+    for user, devices_uuids in users_devices_uuids:
+        user_id = _make_user_id_tag(user=user)
+
+        for device_uuid in devices_uuids:
+            device_filters = [
+                {"field": "tag", "key": "user_id", "relation": "=", "value": user_id},
+                {"field": "tag", "key": "device_uuid", "relation": "=", "value": str(device_uuid)},
+            ]
+
+            if request_filters and len(request_filters) + len(device_filters) + 1 > MAX_NOTIFICATION_FILTERS:
+                requests_filters.append(request_filters)
+                request_filters = []
+
+            if request_filters:
+                request_filters.append({"operator": "OR"})
+
+            request_filters.extend(device_filters)
+
+    if request_filters:
+        requests_filters.append(request_filters)
+
+    push_notifications_client = get_push_notifications_client()
+    notification_type = notification.post_body.get('data', {}).get('type')
+
+    errors = []
+
+    for filters in requests_filters:
+        notification.set_filters(filters)
 
         try:
-            onesignal_client.send_notification(notification)
-        except OneSignalError as e:
-            logger.error('Error sending notification to user_id %s with error %s' % (user.id, e))
+            _count_push_notifications_http_call(notification_type=notification_type)
+            push_notifications_client.send_notification(notification)
+        except (OneSignalError, requests.RequestException) as e:
+            errors.append(e)
+
+    if errors:
+        raise OneSignalError('; '.join(str(error) for error in errors))
+
+
+def _make_user_id_tag(user):
+    user_id_contents = (str(user.uuid) + str(user.id)).encode('utf-8')
+    return sha256(user_id_contents).hexdigest()
+
+
+push_notifications_http_calls = Counter()
+push_notifications_http_calls_lock = threading.Lock()
+
+
+def _count_push_notifications_http_call(notification_type):
+    with push_notifications_http_calls_lock:
+        push_notifications_http_calls[notification_type] += 1
+
+
+def get_push_notifications_http_calls_count(notification_type=None):
+    """
+    Returns the outbound push notifications HTTP calls made by this process,
+    for the given notification type or in total
+    """
+    with push_notifications_http_calls_lock:
+        if notification_type:
+            return push_notifications_http_calls[notification_type]
+        return sum(push_notifications_http_calls.values())
+
+
+def reset_push_notifications_http_calls_count():
+    with push_notifications_http_calls_lock:
+        push_notifications_http_calls.clear()
 
 
 push_notifications_serializers = None
@@ -1,8 +1,12 @@
+from django.conf import settings
 from generic_relations.relations import GenericRelatedField
 from rest_framework import serializers
 
 from openbook_auth.models import User, UserProfile
 from openbook_common.models import Emoji
+from openbook_common.serializers_fields.file import FileUrlField
+from openbook_common.serializers_fields.image import ImageDerivativeField
+from openbook_common.serializers_fields.request import CursorField
 from openbook_communities.models import Community, CommunityInvite
 from openbook_notifications.models import Notification, PostCommentNotification, ConnectionRequestNotification, \
     ConnectionConfirmedNotification, FollowNotification, CommunityInviteNotification
@@ -25,6 +29,9 @@ class GetNotificationsSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
 
 
 class PostCommentCommenterProfileSerializer(serializers.ModelSerializer):
@@ -49,6 +56,8 @@ class PostCommentCommenterSerializer(serializers.ModelSerializer):
 
 
 class PostCommentPostVideoSerializer(serializers.ModelSerializer):
+    video = FileUrlField()
+
     class Meta:
         model = PostVideo
         fields = (
@@ -58,6 +67,8 @@ class PostCommentPostVideoSerializer(serializers.ModelSerializer):
 
 
 class PostCommentPostImageSerializer(serializers.ModelSerializer):
+    image = ImageDerivativeField(image_field_name='image', width=settings.NOTIFICATION_IMAGE_WIDTH)
+
     class Meta:
         model = PostImage
         fields = (
@@ -343,6 +354,25 @@ class CommunityInviteNotificationSerializer(serializers.ModelSerializer):
         )
 
 
+class GetNotificationsNotificationListSerializer(serializers.ListSerializer):
+    content_objects_select_related = {
+        PostCommentNotification: ('post_comment__commenter__profile', 'post_comment__post__creator__profile',
+                                  'post_comment__post__image', 'post_comment__post__video'),
+        PostReactionNotification: ('post_reaction__reactor__profile', 'post_reaction__emoji',
+                                   'post_reaction__post__creator__profile', 'post_reaction__post__image',
+                                   'post_reaction__post__video'),
+        ConnectionRequestNotification: ('connection_requester__profile',),
+        ConnectionConfirmedNotification: ('connection_confirmator__profile',),
+        FollowNotification: ('follower__profile',),
+        CommunityInviteNotification: ('community_invite__creator__profile', 'community_invite__community'),
+    }
+
+    def to_representation(self, data):
+        notifications = Notification.prefetch_content_objects(
+            list(data), content_objects_select_related=self.content_objects_select_related)
+        return super(GetNotificationsNotificationListSerializer, self).to_representation(notifications)
+
+
 class GetNotificationsNotificationSerializer(serializers.ModelSerializer):
     content_object = GenericRelatedField({
         PostCommentNotification: PostCommentNotificationSerializer(),
@@ -355,6 +385,7 @@ class GetNotificationsNotificationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Notification
+        list_serializer_class = GetNotificationsNotificationListSerializer
         fields = (
             'id',
             'notification_type',
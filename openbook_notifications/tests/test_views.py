@@ -1,12 +1,25 @@
 import json
+from unittest import mock
 
+import requests
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
+from onesignal import OneSignalError
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, make_notification
-from openbook_notifications.models import Notification
+from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, make_notification, \
+    make_device, make_fake_post_text, make_fake_post_comment_text, make_emoji, make_reactions_emoji_group, \
+    get_ids_following_cursor
+from openbook_notifications.models import Notification, PushNotification, FollowNotification
+from openbook_notifications.push_notifications.clients import get_push_notifications_client
+from openbook_notifications.push_notifications.senders import get_push_notifications_http_calls_count, \
+    reset_push_notifications_http_calls_count
 
 fake = Faker()
 
@@ -43,6 +56,45 @@ class NotificationsAPITests(APITestCase):
             response_notification_id = response_notification.get('id')
             self.assertIn(response_notification_id, notifications_ids)
 
+    def test_retrieve_notifications_queries_do_not_grow_with_notifications(self):
+        """
+        should retrieve notifications of every type with a constant amount of queries
+        """
+        user = make_user()
+        post = user.create_public_post(text=make_fake_post_text())
+        emoji_group = make_reactions_emoji_group()
+        emoji = make_emoji(group=emoji_group)
+
+        url = self._get_url()
+        headers = make_authentication_headers_for_user(user)
+
+        def make_notifications_of_every_type():
+            foreign_user = make_user()
+            foreign_user.follow_user_with_id(user.pk)
+            foreign_user.connect_with_user_with_id(user.pk)
+            foreign_user.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text())
+            foreign_user.react_to_post_with_id(post_id=post.pk, emoji_id=emoji.pk, emoji_group_id=emoji_group.pk)
+
+        def get_notifications_queries_count():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {'count': 20}, **headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context), json.loads(response.content)
+
+        make_notifications_of_every_type()
+        few_notifications_queries_count, response_notifications = get_notifications_queries_count()
+        self.assertEqual(len(response_notifications), 4)
+
+        for i in range(0, 4):
+            make_notifications_of_every_type()
+
+        many_notifications_queries_count, response_notifications = get_notifications_queries_count()
+        self.assertEqual(len(response_notifications), 20)
+        self.assertEqual(many_notifications_queries_count, few_notifications_queries_count)
+
+        for response_notification in response_notifications:
+            self.assertIsNotNone(response_notification['content_object'])
+
     def test_can_delete_notifications(self):
         """
         should be able to delete all notifications and return 200
@@ -64,6 +116,20 @@ class NotificationsAPITests(APITestCase):
 
         self.assertFalse(Notification.objects.filter(owner=user).exists())
 
+    def test_can_paginate_notifications_created_at_once_with_cursor(self):
+        """
+        should retrieve every notification once when following the next cursor of pages splitting equal created
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        notifications_ids = [make_notification(owner=user).pk for i in range(0, 7)]
+        Notification.objects.filter(owner=user).update(created=timezone.now())
+
+        response_notifications_ids = get_ids_following_cursor(self.client, self._get_url(), headers, count=3)
+
+        self.assertEqual(response_notifications_ids, sorted(notifications_ids, reverse=True))
+
     def _get_url(self):
         return reverse('notifications')
 
@@ -221,3 +287,239 @@ class ReadNotificationAPITests(APITestCase):
         return reverse('read-notification', kwargs={
             'notification_id': notification_id
         })
+
+
+class UnreadNotificationsCountAPITests(APITestCase):
+    """
+    UnreadNotificationsCountAPI
+    """
+
+    def test_retrieves_unread_notifications_count(self):
+        """
+        should retrieve the unread notifications count and return 200
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        amount_of_followers = 3
+        followers = []
+
+        for i in range(0, amount_of_followers):
+            follower = make_user()
+            follower.follow_user_with_id(user.pk)
+            followers.append(follower)
+
+        self.assertEqual(self._get_unread_notifications_count(headers), amount_of_followers)
+
+        user.read_notification_with_id(user.notifications.order_by('id').first().pk)
+        self.assertEqual(self._get_unread_notifications_count(headers), amount_of_followers - 1)
+
+        followers[-1].unfollow_user_with_id(user.pk)
+        self.assertEqual(self._get_unread_notifications_count(headers), amount_of_followers - 2)
+
+        user.read_notifications()
+        self.assertEqual(self._get_unread_notifications_count(headers), 0)
+
+        user.refresh_from_db()
+        self.assertEqual(user.unread_notifications_count, user.notifications.filter(read=False).count())
+
+    def test_bulk_created_notifications_are_counted(self):
+        """
+        should count the notifications created in bulk for the comment fan-out
+        """
+        post_creator = make_user()
+        headers = make_authentication_headers_for_user(post_creator)
+        post = post_creator.create_public_post(text=make_fake_post_text())
+
+        amount_of_commenters = 3
+
+        for i in range(0, amount_of_commenters):
+            commenter = make_user()
+            commenter.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text())
+
+        self.assertEqual(self._get_unread_notifications_count(headers), amount_of_commenters)
+
+    def test_bulk_created_notifications_have_their_own_content_objects(self):
+        """
+        should link the notifications created in bulk to the content objects created with them only
+        """
+        follower = make_user()
+        owner = make_user()
+        orphaned_follow_notification = FollowNotification.objects.create(follower=follower)
+
+        follow_notifications = FollowNotification.create_follow_notifications(follower_id=follower.pk,
+                                                                              owners_ids=[owner.pk])
+
+        self.assertNotEqual(follow_notifications[0].pk, orphaned_follow_notification.pk)
+        self.assertFalse(Notification.objects.filter(object_id=orphaned_follow_notification.pk,
+                                                     notification_type=Notification.FOLLOW).exists())
+        self.assertEqual(owner.notifications.get().content_object, follow_notifications[0])
+
+    def _get_unread_notifications_count(self, headers):
+        url = self._get_url()
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)['unread_notifications_count']
+
+    def _get_url(self):
+        return reverse('unread-notifications-count')
+
+
+class PushNotificationsOutboxTests(APITestCase):
+    """
+    PushNotificationsOutbox
+    """
+
+    def setUp(self):
+        self.push_notifications_client = get_push_notifications_client()
+        self.push_notifications_client.sent_notifications = []
+
+    @override_settings(FEATURE_ASYNC_PUSH_NOTIFICATIONS_ENABLED=True)
+    def test_follow_push_notification_is_queued_and_sent_by_worker(self):
+        """
+        should queue the push notification and send it to the devices of the user from the worker
+        """
+        user = make_user()
+        followed_user = make_user()
+        amount_of_devices = 3
+
+        for i in range(0, amount_of_devices):
+            make_device(owner=followed_user)
+
+        headers = make_authentication_headers_for_user(user)
+        url = reverse('follow-user')
+        response = self.client.post(url, {'username': followed_user.username}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(PushNotification.objects.filter(user=followed_user, notification_type=Notification.FOLLOW,
+                                                        status=PushNotification.STATUS_PENDING).exists())
+        self.assertEqual(len(self.push_notifications_client.sent_notifications), 0)
+
+        call_command('send_push_notifications', '--once')
+
+        push_notification = PushNotification.objects.get(user=followed_user)
+        self.assertEqual(push_notification.status, PushNotification.STATUS_SENT)
+        self.assertIsNotNone(push_notification.delivery_latency)
+        self.assertEqual(len(self.push_notifications_client.sent_notifications), 1)
+
+    @override_settings(FEATURE_ASYNC_PUSH_NOTIFICATIONS_ENABLED=True)
+    def test_failed_push_notification_is_rescheduled(self):
+        """
+        should reschedule a push notification which failed to be sent
+        """
+        user = make_user()
+        make_device(owner=user)
+
+        PushNotification.create_push_notification(user_id=user.pk, body=json.dumps({'contents': {'en': 'Hello'}}))
+
+        with mock.patch.object(self.push_notifications_client, 'send_notification',
+                               side_effect=OneSignalError('Unavailable')):
+            call_command('send_push_notifications', '--once')
+
+        push_notification = PushNotification.objects.get(user=user)
+        self.assertEqual(push_notification.status, PushNotification.STATUS_PENDING)
+        self.assertEqual(push_notification.attempts, 1)
+        self.assertTrue(push_notification.next_attempt > push_notification.created)
+
+    @override_settings(FEATURE_ASYNC_PUSH_NOTIFICATIONS_ENABLED=True)
+    def test_push_notification_failing_to_connect_does_not_stop_the_batch(self):
+        """
+        should reschedule a push notification failing to connect and still send the rest of the batch
+        """
+        failing_user = make_user()
+        make_device(owner=failing_user)
+        user = make_user()
+        make_device(owner=user)
+
+        PushNotification.create_push_notification(user_id=failing_user.pk,
+                                                  body=json.dumps({'contents': {'en': 'Failing'}}))
+        PushNotification.create_push_notification(user_id=user.pk, body=json.dumps({'contents': {'en': 'Hello'}}))
+
+        send_notification = self.push_notifications_client.send_notification
+
+        def send_notification_or_fail_to_connect(notification):
+            if notification.post_body['contents']['en'] == 'Failing':
+                raise requests.ConnectionError('Connection refused')
+            return send_notification(notification)
+
+        with mock.patch.object(self.push_notifications_client, 'send_notification',
+                               side_effect=send_notification_or_fail_to_connect):
+            call_command('send_push_notifications', '--once')
+
+        failed_push_notification = PushNotification.objects.get(user=failing_user)
+        self.assertEqual(failed_push_notification.status, PushNotification.STATUS_PENDING)
+        self.assertEqual(failed_push_notification.attempts, 1)
+        self.assertIn('Connection refused', failed_push_notification.last_error)
+
+        self.assertEqual(PushNotification.objects.get(user=user).status, PushNotification.STATUS_SENT)
+        self.assertEqual(len(self.push_notifications_client.sent_notifications), 1)
+
+    def test_claimed_push_notifications_are_not_claimed_again(self):
+        """
+        should not claim the push notifications already claimed by another worker
+        """
+        user = make_user()
+
+        PushNotification.create_push_notification(user_id=user.pk, body=json.dumps({'contents': {'en': 'Hello'}}))
+
+        self.assertEqual(len(PushNotification.claim_pending_push_notifications(limit=10)), 1)
+        self.assertEqual(len(PushNotification.claim_pending_push_notifications(limit=10)), 0)
+
+
+class PushNotificationsSendersTests(APITestCase):
+    """
+    PushNotificationsSenders
+    """
+
+    def setUp(self):
+        self.push_notifications_client = get_push_notifications_client()
+        self.push_notifications_client.sent_notifications = []
+        reset_push_notifications_http_calls_count()
+
+    def test_sends_one_request_for_all_the_user_devices(self):
+        """
+        should target all the devices of the user in a single request
+        """
+        user = make_user()
+        followed_user = make_user()
+        amount_of_devices = 5
+
+        for i in range(0, amount_of_devices):
+            make_device(owner=followed_user)
+
+        user.follow_user_with_id(followed_user.pk)
+
+        self.assertEqual(get_push_notifications_http_calls_count(notification_type=Notification.FOLLOW), 1)
+        self.assertEqual(len(self.push_notifications_client.sent_notifications), 1)
+
+        filters = self.push_notifications_client.sent_notifications[0]['filters']
+        devices_uuids = set(followed_user.devices.values_list('uuid', flat=True))
+        filtered_devices_uuids = set(device_filter['value'] for device_filter in filters if
+                                     device_filter.get('key') == 'device_uuid')
+
+        self.assertEqual(filtered_devices_uuids, devices_uuids)
+        self.assertEqual(len([device_filter for device_filter in filters if device_filter.get('operator') == 'OR']),
+                         amount_of_devices - 1)
+
+    def test_comment_push_notifications_do_not_grow_with_commenters(self):
+        """
+        should send the comment push notifications of a post with one request per message
+        """
+        post_creator = make_user()
+        make_device(owner=post_creator)
+        post = post_creator.create_public_post(text=make_fake_post_text())
+
+        amount_of_commenters = 5
+
+        for i in range(0, amount_of_commenters):
+            commenter = make_user()
+            make_device(owner=commenter)
+            make_device(owner=commenter)
+            commenter.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text())
+
+        reset_push_notifications_http_calls_count()
+
+        user = make_user()
+        user.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text())
+
+        self.assertEqual(get_push_notifications_http_calls_count(notification_type=Notification.POST_COMMENT), 2)
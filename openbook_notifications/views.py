@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
 from openbook_notifications.serializers import GetNotificationsSerializer, GetNotificationsNotificationSerializer, \
     DeleteNotificationSerializer, ReadNotificationSerializer, ReadNotificationsSerializer
 
@@ -21,15 +22,18 @@ class Notifications(APIView):
 
         count = data.get('count', 10)
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
 
         user = request.user
 
-        notifications = user.get_notifications(max_id=max_id).order_by('-created')[:count]
+        notifications, next_cursor = paginate_with_cursor(user.get_notifications(), count=count, cursor=cursor,
+                                                          max_id=max_id)
 
         response_serializer = GetNotificationsNotificationSerializer(notifications, many=True,
                                                                      context={"request": request})
 
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(response_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
     def delete(self, request):
         user = request.user
@@ -40,6 +44,20 @@ class Notifications(APIView):
         return Response(status=status.HTTP_200_OK)
 
 
+class UnreadNotificationsCount(APIView):
+    """
+    The unread notifications count alone, without serializing the whole authenticated user
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        user = request.user
+
+        return Response({
+            'unread_notifications_count': user.count_unread_notifications()
+        }, status=status.HTTP_200_OK)
+
+
 class ReadNotifications(APIView):
     permission_classes = (IsAuthenticated,)
 
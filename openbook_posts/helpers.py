@@ -1,6 +1,11 @@
 import uuid
 from os.path import splitext
 
+from django.conf import settings
+
+from openbook_common.upload_handlers import StorageUploadHandler
+from openbook_common.utils.model_loaders import get_post_video_model
+
 
 def upload_to_post_image_directory(post_image, filename):
     post = post_image.post
@@ -12,6 +17,27 @@ def upload_to_post_video_directory(post_video, filename):
     return _upload_to_post_directory_directory(post=post, filename=filename)
 
 
+def make_post_video_upload_name(filename):
+    """
+    Post videos are streamed into their storage before their post exists and are kept where they were written,
+    under a directory of their own apart from the temporary uploads
+    """
+    extension = splitext(filename)[1].lower()
+    return 'videos/%(new_filename)s' % {'new_filename': str(uuid.uuid4()) + extension}
+
+
+def add_post_video_upload_handler(request):
+    """
+    Streams the video of the post being created straight into the storage of the post videos.
+    Must be called before the request data is accessed.
+    """
+    PostVideo = get_post_video_model()
+    request.upload_handlers.insert(0, StorageUploadHandler(request=request, field_name='video',
+                                                           storage=PostVideo._meta.get_field('video').storage,
+                                                           max_upload_size=settings.POST_VIDEO_MAX_SIZE,
+                                                           upload_to=make_post_video_upload_name))
+
+
 def _upload_to_post_directory_directory(post, filename):
     extension = splitext(filename)[1].lower()
     new_filename = str(uuid.uuid4()) + extension
@@ -0,0 +1,120 @@
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from openbook.storage_backends import S3PrivateMediaStorage
+from openbook_common.utils.model_loaders import get_post_model, get_post_image_model, get_post_video_model, \
+    get_user_model
+from openbook_posts.views.posts.serializers import AuthenticatedUserPostSerializer
+
+# Urls are signed locally, no request is made to the bucket
+STORAGE_SETTINGS = {
+    'location': 'private',
+    'bucket_name': 'benchmark',
+    'access_key': 'benchmark',
+    'secret_key': 'benchmark',
+    'region_name': 'eu-west-1',
+}
+
+
+class Command(BaseCommand):
+    help = 'Times the serialization of feeds of posts with images and videos in the private media storage, ' \
+           'signing every url and with the signed urls cache as configured in CACHES. The posts are created in a ' \
+           'transaction which is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20, help='Posts per feed, half with an image')
+        parser.add_argument('--repeat', type=int, default=50, help='Serializations per measurement')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        repeat = options['repeat']
+
+        self.stdout.write('Signed urls cache: {0}'.format(settings.CACHES['signed_urls']['BACKEND']))
+        self.stdout.write('{0:>8} {1:>14} {2:>14} {3:>14}'.format('posts', 'unsigned ms', 'cold cache ms',
+                                                                   'warm cache ms'))
+
+        with transaction.atomic():
+            request = self._make_request(posts_creator=self._make_posts(amount=count))
+
+            with self._use_storage(S3Boto3Storage(**STORAGE_SETTINGS)):
+                unsigned_ms = self._time_serialization(request=request, count=count, repeat=repeat)
+
+            with self._use_storage(S3PrivateMediaStorage(**STORAGE_SETTINGS)):
+                cold_cache_ms = self._time_serialization(request=request, count=count, repeat=repeat,
+                                                         clear_cache=True)
+                warm_cache_ms = self._time_serialization(request=request, count=count, repeat=repeat)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write('{0:>8} {1:>14.2f} {2:>14.2f} {3:>14.2f}'.format(count, unsigned_ms, cold_cache_ms,
+                                                                           warm_cache_ms))
+
+    def _make_posts(self, amount):
+        User = get_user_model()
+        Post = get_post_model()
+        PostImage = get_post_image_model()
+        PostVideo = get_post_video_model()
+
+        creator = User.create_user(username='bench_{0}'.format(uuid.uuid4().hex[:20]),
+                                   email='{0}@benchmark.invalid'.format(uuid.uuid4().hex), name='Benchmark',
+                                   is_of_legal_age=True)
+
+        posts = [creator.create_public_post(text='benchmark') for i in range(0, amount)]
+
+        # Only the names of the files are needed to sign their urls
+        PostImage.objects.bulk_create(
+            [PostImage(post=post, image='posts/%s.jpg' % uuid.uuid4(), feed='posts/%s.jpg' % uuid.uuid4(),
+                       thumbnail='posts/%s.jpg' % uuid.uuid4(), width=1024, height=768) for post in
+             posts[::2]])
+        PostVideo.objects.bulk_create(
+            [PostVideo(post=post, video='posts/%s.mp4' % uuid.uuid4()) for post in posts[1::2]])
+
+        return creator
+
+    def _make_request(self, posts_creator):
+        request = RequestFactory().get('/api/posts/')
+        request.user = posts_creator
+        return request
+
+    @contextmanager
+    def _use_storage(self, storage):
+        PostImage = get_post_image_model()
+        PostVideo = get_post_video_model()
+
+        fields = [PostImage._meta.get_field(field_name) for field_name in ('image', 'feed', 'thumbnail')]
+        fields.append(PostVideo._meta.get_field('video'))
+
+        storages = [field.storage for field in fields]
+
+        for field in fields:
+            field.storage = storage
+
+        try:
+            yield
+        finally:
+            for field, field_storage in zip(fields, storages):
+                field.storage = field_storage
+
+    def _time_serialization(self, request, count, repeat, clear_cache=False):
+        Post = get_post_model()
+        elapsed = 0
+
+        for i in range(0, repeat):
+            if clear_cache:
+                caches['signed_urls'].clear()
+
+            posts = list(Post.objects.filter(creator=request.user).order_by('-id')[:count])
+
+            start = time.perf_counter()
+            AuthenticatedUserPostSerializer(posts, many=True, context={'request': request}).data
+            elapsed += time.perf_counter() - start
+
+        return elapsed * 1000 / repeat
@@ -0,0 +1,74 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from openbook_common.utils.model_loaders import get_post_model, get_trending_post_model, get_community_model, \
+    get_user_model, get_post_comment_model
+
+
+class Command(BaseCommand):
+    help = 'Times the trending posts read path with the on the fly query and with the precomputed ranks ' \
+           'for growing amounts of posts. The posts are created in a transaction which is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--volumes', type=int, nargs='+', default=[1000, 10000, 50000],
+                            help='Amounts of posts to time the read path with')
+        parser.add_argument('--repeat', type=int, default=20, help='Reads per measurement')
+
+    def handle(self, *args, **options):
+        self.stdout.write('{0:>10} {1:>14} {2:>14}'.format('posts', 'on the fly ms', 'precomputed ms'))
+
+        for volume in options['volumes']:
+            with transaction.atomic():
+                self._make_posts(amount=volume)
+
+                on_the_fly_ms = self._time_trending_posts(
+                    get_trending_posts=get_post_model().get_trending_posts_by_reactions_count,
+                    repeat=options['repeat'])
+
+                TrendingPost = get_trending_post_model()
+                TrendingPost.compact()
+                precomputed_ms = self._time_trending_posts(get_trending_posts=TrendingPost.get_trending_posts,
+                                                           repeat=options['repeat'])
+
+                transaction.set_rollback(True)
+
+            self.stdout.write('{0:>10} {1:>14.2f} {2:>14.2f}'.format(volume, on_the_fly_ms, precomputed_ms))
+
+    def _make_posts(self, amount):
+        User = get_user_model()
+        Community = get_community_model()
+        Post = get_post_model()
+        PostComment = get_post_comment_model()
+
+        creator = User.create_user(username='bench_{0}'.format(uuid.uuid4().hex[:20]),
+                                   email='{0}@benchmark.invalid'.format(uuid.uuid4().hex), name='Benchmark',
+                                   is_of_legal_age=True)
+        community = Community.objects.create(name=uuid.uuid4().hex[:settings.COMMUNITY_NAME_MAX_LENGTH], title='Benchmark',
+                                             creator=creator, color='#ffffff', type=Community.COMMUNITY_TYPE_PUBLIC)
+
+        now = timezone.now()
+        # Spread evenly over a day so only about half of the posts are inside the trending window
+        day_seconds = 24 * 60 * 60
+        Post.objects.bulk_create(
+            [Post(creator=creator, community=community, text='benchmark',
+                  created=now - timedelta(seconds=i * day_seconds // amount)) for i in range(0, amount)])
+
+        posts_ids = list(Post.objects.filter(community=community).values_list('id', flat=True))
+        # One in ten posts, across the whole day
+        commented_posts_ids = posts_ids[::10]
+
+        PostComment.objects.bulk_create(
+            [PostComment(post_id=post_id, commenter=creator, text='benchmark', created=now) for post_id in
+             commented_posts_ids])
+
+    def _time_trending_posts(self, get_trending_posts, repeat):
+        start = time.perf_counter()
+        for i in range(0, repeat):
+            list(get_trending_posts()[:30])
+        return (time.perf_counter() - start) * 1000 / repeat
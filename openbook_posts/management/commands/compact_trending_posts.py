@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_common.utils.model_loaders import get_trending_post_model
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Drops the trending posts which left the window and recomputes the rank of the remaining ones. ' \
+           'Must also be run once after enabling FEATURE_PRECOMPUTED_TRENDING_POSTS_ENABLED'
+
+    def handle(self, *args, **options):
+        TrendingPost = get_trending_post_model()
+        TrendingPost.compact()
+        logger.info('Compacted trending posts, {0} posts left'.format(TrendingPost.objects.count()))
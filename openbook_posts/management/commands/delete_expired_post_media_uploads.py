@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+import logging
+
+from openbook_posts.models import PostMediaUpload
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deletes the post media uploads abandoned or not used to create a post in time, with their stored files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Expired uploads to delete per batch')
+        parser.add_argument('--sleep', type=float, default=600,
+                            help='Seconds to wait for uploads to expire when there are none')
+        parser.add_argument('--once', action='store_true', help='Exit once there are no expired uploads left')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        while True:
+            deleted_count = PostMediaUpload.delete_expired_uploads(batch_size=batch_size)
+
+            if deleted_count:
+                logger.info('Deleted {0} expired post media uploads'.format(deleted_count))
+                continue
+
+            if options['once']:
+                break
+
+            time.sleep(options['sleep'])
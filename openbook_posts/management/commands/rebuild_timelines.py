@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+import logging
+
+from django.db import transaction
+
+from openbook_common.utils.model_loaders import get_user_model, get_timeline_post_model
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized timeline of every user'
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        TimelinePost = get_timeline_post_model()
+
+        users = User.objects.only('id').iterator()
+        for user in users:
+            with transaction.atomic():
+                TimelinePost.rebuild_timeline_for_owner(owner=user)
+            logger.info('Rebuilt timeline for user with id {0}'.format(user.pk))
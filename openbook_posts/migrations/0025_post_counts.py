@@ -0,0 +1,62 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_count(queryset, count_field_name, related_queryset, related_field_name):
+    # The rows of the related queryset pointing to every row of the queryset
+    count = Coalesce(Subquery(
+        related_queryset.filter(**{related_field_name: OuterRef('pk')}).order_by().values(
+            related_field_name).annotate(count=Count('pk')).values('count')[:1],
+        output_field=IntegerField()), 0)
+
+    queryset.update(**{count_field_name: count})
+
+
+def populate_counts(apps, schema_editor):
+    Post = apps.get_model('openbook_posts', 'Post')
+    PostComment = apps.get_model('openbook_posts', 'PostComment')
+    PostReaction = apps.get_model('openbook_posts', 'PostReaction')
+
+    populate_count(Post.objects.all(), 'comments_count', PostComment.objects.all(), 'post_id')
+    populate_count(Post.objects.all(), 'reactions_count', PostReaction.objects.all(), 'post_id')
+
+
+def populate_users_counts(apps, schema_editor):
+    User = apps.get_model('openbook_auth', 'User')
+    Post = apps.get_model('openbook_posts', 'Post')
+    Follow = apps.get_model('openbook_follows', 'Follow')
+
+    populate_count(User.objects.all(), 'posts_count', Post.objects.all(), 'creator_id')
+    populate_count(User.objects.all(), 'public_posts_count', Post.objects.filter(circles__id=settings.WORLD_CIRCLE_ID),
+                   'creator_id')
+    populate_count(User.objects.all(), 'followers_count', Follow.objects.all(), 'followed_user_id')
+    populate_count(User.objects.all(), 'following_count', Follow.objects.all(), 'user_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_posts', '0024_timelinepost'),
+        ('openbook_auth', '0030_user_counts'),
+        ('openbook_follows', '0007_remove_follow_list'),
+        ('openbook_circles', '0005_circle_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='comments count'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reactions_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='reactions count'),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+        migrations.RunPython(populate_users_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_posts', '0025_post_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(db_index=True, editable=False)),
+                ('rank', models.FloatField(db_index=True, editable=False)),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trending_post', to='openbook_posts.Post')),
+            ],
+        ),
+    ]
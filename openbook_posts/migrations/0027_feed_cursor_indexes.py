@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:31
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_communities', '0022_feed_cursor_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('openbook_posts', '0026_trendingpost'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together={('creator', 'created', 'id'), ('community', 'created', 'id'), ('created', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='postcomment',
+            index_together={('post', 'created', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='postreaction',
+            index_together={('post', 'created', 'id')},
+        ),
+    ]
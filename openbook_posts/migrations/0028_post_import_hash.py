@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('openbook_communities', '0022_feed_cursor_indexes'),
+        ('openbook_posts', '0027_feed_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='import_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together={('creator', 'import_hash'), ('community', 'created', 'id'), ('created', 'id'), ('creator', 'created', 'id')},
+        ),
+    ]
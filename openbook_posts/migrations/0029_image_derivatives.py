@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:52
+
+from django.db import migrations
+import imagekit.models.fields
+import openbook_posts.helpers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openbook_posts', '0028_post_import_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postimage',
+            name='feed',
+            field=imagekit.models.fields.ProcessedImageField(editable=False, null=True, upload_to=openbook_posts.helpers.upload_to_post_image_directory, verbose_name='feed image'),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='thumbnail',
+            field=imagekit.models.fields.ProcessedImageField(editable=False, null=True, upload_to=openbook_posts.helpers.upload_to_post_image_directory, verbose_name='thumbnail'),
+        ),
+    ]
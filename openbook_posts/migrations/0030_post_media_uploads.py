@@ -0,0 +1,48 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('openbook_posts', '0029_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostMediaUpload',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('filename', models.CharField(max_length=255, verbose_name='filename')),
+                ('size', models.PositiveIntegerField(verbose_name='size')),
+                ('checksum', models.CharField(max_length=64, null=True, verbose_name='checksum')),
+                ('received_size', models.PositiveIntegerField(default=0, editable=False)),
+                ('file', models.FileField(editable=False, null=True, upload_to='', verbose_name='file')),
+                ('finalized', models.BooleanField(default=False, editable=False)),
+                ('created', models.DateTimeField(editable=False)),
+                ('updated', models.DateTimeField(db_index=True, editable=False)),
+                ('media_type', models.CharField(choices=[('I', 'Image'), ('V', 'Video')], max_length=2)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posts_media_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostMediaUploadChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('offset', models.PositiveIntegerField(editable=False)),
+                ('size', models.PositiveIntegerField(editable=False)),
+                ('checksum', models.CharField(editable=False, max_length=64)),
+                ('file', models.FileField(editable=False, upload_to='')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='openbook_posts.PostMediaUpload')),
+            ],
+            options={
+                'unique_together': {('upload', 'offset')},
+            },
+        ),
+    ]
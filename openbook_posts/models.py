@@ -1,29 +1,42 @@
 # Create your models here.
+import hashlib
+import logging
+import math
+import os
 import uuid
 from datetime import timedelta
 
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.images import ImageFile
 from django.core.files.storage import default_storage
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.db.models import Count
+from django.template.defaultfilters import filesizeformat
+from openbook_common.utils.helpers import update_count, exclude_counts_from_save
+from openbook_common.utils.images import make_image_processors
 
 # Create your views here.
 from pilkit.processors import ResizeToFit
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, NotFound
 
 from django.conf import settings
 from openbook.storage_backends import S3PrivateMediaStorage
 from openbook_auth.models import User
 
-from openbook_common.models import Emoji
+from openbook_common.models import Emoji, PendingImage
+from openbook_common.serializers_fields.request import RestrictedImageFileSizeField
+from openbook_common.upload_handlers import StorageUploadedFile, open_storage_writer
 from openbook_common.utils.model_loaders import get_post_reaction_model, get_emoji_model, \
-    get_circle_model, get_community_model
+    get_circle_model, get_community_model, get_community_membership_model, get_follow_model
 from imagekit.models import ProcessedImageField
 
-from openbook_posts.helpers import upload_to_post_image_directory, upload_to_post_video_directory
+from openbook_posts.helpers import upload_to_post_image_directory, upload_to_post_video_directory, \
+    make_post_video_upload_name
 
+logger = logging.getLogger(__name__)
 
 class Post(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
@@ -35,6 +48,15 @@ class Post(models.Model):
     community = models.ForeignKey('openbook_communities.Community', on_delete=models.CASCADE, related_name='posts',
                                   null=True,
                                   blank=False)
+    comments_count = models.PositiveIntegerField(_('comments count'), default=0, editable=False)
+    reactions_count = models.PositiveIntegerField(_('reactions count'), default=0, editable=False)
+    # Hash of the content of imported posts, to skip them when imported again
+    import_hash = models.CharField(max_length=64, editable=False, null=True)
+
+    class Meta:
+        # Feeds are paginated with a (created, id) cursor
+        index_together = (('created', 'id'), ('creator', 'created', 'id'), ('community', 'created', 'id'),
+                          ('creator', 'import_hash'),)
 
     @classmethod
     def post_with_id_has_public_comments(cls, post_id):
@@ -70,10 +92,10 @@ class Post(models.Model):
             post.text = text
 
         if image:
-            PostImage.objects.create(image=image, post_id=post.pk)
+            PostImage.create_post_image(post_id=post.pk, image=image)
 
         if video:
-            PostVideo.objects.create(video=video, post_id=post.pk)
+            PostVideo.create_post_video(post_id=post.pk, video=video)
 
         if circles_ids:
             post.circles.add(*circles_ids)
@@ -83,40 +105,139 @@ class Post(models.Model):
 
         post.save()
 
+        creator_query = User.objects.filter(pk=creator.pk)
+        update_count(creator_query, 'posts_count')
+
+        Circle = get_circle_model()
+        if circles_ids and Circle.get_world_circle_id() in circles_ids:
+            update_count(creator_query, 'public_posts_count')
+
+        TimelinePost.add_post_to_timelines(post=post)
+        TrendingPost.add_post(post=post)
+
         return post
 
+    @classmethod
+    def bulk_import_public_posts(cls, creator, posts_data):
+        """
+        Creates the imported public posts of the creator with a query per table, skipping the ones without content
+        and the ones imported before. The images are stored as uploaded and processed later by process_images.
+        :param posts_data: list of dicts with the text, image file and created of every post
+        :return: the amount of created posts
+        """
+        posts_data_by_hash = {}
+
+        for post_data in posts_data:
+            if not post_data.get('text') and not post_data.get('image'):
+                continue
+
+            import_hash = cls.make_import_hash(text=post_data.get('text'), created=post_data['created'])
+            posts_data_by_hash.setdefault(import_hash, post_data)
+
+        if not posts_data_by_hash:
+            return 0
+
+        # Posts imported before the import hash was stored only match on their text and created
+        imported_posts = cls.objects.filter(Q(creator_id=creator.pk),
+                                            Q(import_hash__in=posts_data_by_hash.keys()) | Q(
+                                                import_hash__isnull=True,
+                                                created__in=[post_data['created'] for post_data in
+                                                             posts_data_by_hash.values()])).values_list(
+            'import_hash', 'text', 'created')
+
+        for import_hash, text, created in imported_posts:
+            posts_data_by_hash.pop(import_hash or cls.make_import_hash(text=text, created=created), None)
+
+        if not posts_data_by_hash:
+            return 0
+
+        posts_by_hash = {
+            import_hash: cls(creator=creator, text=post_data.get('text'), created=post_data['created'],
+                              import_hash=import_hash) for import_hash, post_data in posts_data_by_hash.items()}
+        cls.objects.bulk_create(posts_by_hash.values())
+
+        # Not every database returns the primary keys of bulk created rows
+        for import_hash, post_id in cls.objects.filter(creator_id=creator.pk,
+                                                       import_hash__in=posts_by_hash.keys()).values_list(
+            'import_hash', 'id'):
+            posts_by_hash[import_hash].pk = post_id
+
+        PostImage.bulk_create_pending_post_images(
+            [(posts_by_hash[import_hash], post_data['image']) for import_hash, post_data in posts_data_by_hash.items()
+             if post_data.get('image')])
+
+        Circle = get_circle_model()
+        world_circle_id = Circle.get_world_circle_id()
+        posts_ids = [post.pk for post in posts_by_hash.values()]
+
+        cls.circles.through.objects.bulk_create(
+            [cls.circles.through(post_id=post_id, circle_id=world_circle_id) for post_id in posts_ids])
+
+        creator_query = User.objects.filter(pk=creator.pk)
+        update_count(creator_query, 'posts_count', amount=len(posts_ids))
+        update_count(creator_query, 'public_posts_count', amount=len(posts_ids))
+
+        TimelinePost.add_public_posts_with_ids_to_timelines(posts_ids=posts_ids, creator=creator)
+
+        return len(posts_ids)
+
+    @classmethod
+    def make_import_hash(cls, text, created):
+        content = '%s\n%s' % (created.isoformat(), text or '')
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
     @classmethod
     def get_emoji_counts_for_post_with_id(cls, post_id, emoji_id=None, reactor_id=None):
+        emoji_counts = cls.get_emoji_counts_for_posts_with_ids(posts_ids=[post_id], emoji_id=emoji_id,
+                                                               reactor_id=reactor_id)
+        return emoji_counts.get(post_id, [])
+
+    @classmethod
+    def get_emoji_counts_for_posts_with_ids(cls, posts_ids, emoji_id=None, reactor_id=None):
+        """
+        Get the emoji counts of several posts with a single grouped query
+        :return: dict of post id to its emoji counts, sorted by count
+        """
         PostReaction = get_post_reaction_model()
         Emoji = get_emoji_model()
 
-        emoji_query = Q(reactions__post_id=post_id)
+        reactions_query = Q(post_id__in=posts_ids)
 
         if emoji_id:
-            emoji_query.add(Q(reactions__emoji_id=emoji_id), Q.AND)
+            reactions_query.add(Q(emoji_id=emoji_id), Q.AND)
 
-        emojis_reacted_with = Emoji.objects.filter(emoji_query).distinct()
+        count = Count('id', filter=Q(reactor_id=reactor_id)) if reactor_id else Count('id')
 
-        emoji_counts = []
+        reactions_counts = list(PostReaction.objects.filter(reactions_query).values('post_id', 'emoji_id').annotate(
+            count=count).order_by('emoji_id'))
 
-        for emoji in emojis_reacted_with:
-            reaction_query = Q(post_id=post_id, emoji_id=emoji.pk)
+        emojis = Emoji.objects.in_bulk({reactions_count['emoji_id'] for reactions_count in reactions_counts})
 
-            if reactor_id:
-                reaction_query.add(Q(reactor_id=reactor_id), Q.AND)
+        posts_emoji_counts = {}
 
-            emoji_count = PostReaction.objects.filter(reaction_query).count()
-            emoji_counts.append({
-                'emoji': emoji,
-                'count': emoji_count
+        for reactions_count in reactions_counts:
+            posts_emoji_counts.setdefault(reactions_count['post_id'], []).append({
+                'emoji': emojis[reactions_count['emoji_id']],
+                'count': reactions_count['count']
             })
 
-        emoji_counts.sort(key=lambda x: x['count'], reverse=True)
+        for emoji_counts in posts_emoji_counts.values():
+            emoji_counts.sort(key=lambda x: x['count'], reverse=True)
 
-        return emoji_counts
+        return posts_emoji_counts
 
     @classmethod
     def get_trending_posts(cls):
+        if TrendingPost.is_enabled():
+            return TrendingPost.get_trending_posts()
+
+        return cls.get_trending_posts_by_reactions_count()
+
+    @classmethod
+    def get_trending_posts_by_reactions_count(cls):
+        """
+        Ranks the recent public community posts on the fly, by their amount of reactions
+        """
         Community = get_community_model()
 
         trending_posts_query = Q(created__gte=timezone.now() - timedelta(
@@ -133,21 +254,32 @@ class Post(models.Model):
     def get_post_comment_notification_target_users(cls, post_id, post_commenter_id):
         """
         Returns the users that should be notified of a post comment.
-        This includes the post creator and other post commenters
+        This includes the post creator and other post commenters which have comment notifications
+        enabled and did not mute the post
         :param post_id:
         :param post_commenter_id:
         :return:
         """
-        post_notification_target_users_query = Q(posts_comments__post_id=post_id)
-        post_notification_target_users_query.add(Q(posts__id=post_id), Q.OR)
+        post_commenters_ids = PostComment.objects.filter(post_id=post_id).values('commenter_id')
+        post_creator_id = cls.objects.filter(pk=post_id).values('creator_id')
+        post_muters_ids = PostMute.objects.filter(post_id=post_id).values('muter_id')
+
+        post_notification_target_users_query = Q(id__in=post_commenters_ids)
+        post_notification_target_users_query.add(Q(id__in=post_creator_id), Q.OR)
         post_notification_target_users_query.add(~Q(id=post_commenter_id), Q.AND)
+        post_notification_target_users_query.add(~Q(id__in=post_muters_ids), Q.AND)
+        post_notification_target_users_query.add(Q(notifications_settings__post_comment_notifications=True), Q.AND)
 
-        return User.objects.filter(post_notification_target_users_query).distinct()
+        return User.objects.filter(post_notification_target_users_query).only('id', 'uuid', 'username')
 
     def count_comments(self, commenter_id=None):
+        if not commenter_id:
+            return self.comments_count
         return PostComment.count_comments_for_post_with_id(self.pk, commenter_id=commenter_id)
 
     def count_reactions(self, reactor_id=None):
+        if not reactor_id:
+            return self.reactions_count
         return PostReaction.count_reactions_for_post_with_id(self.pk, reactor_id=reactor_id)
 
     def has_text(self):
@@ -186,6 +318,8 @@ class Post(models.Model):
         if not self.id and not self.created:
             self.created = timezone.now()
 
+        exclude_counts_from_save(self, ('comments_count', 'reactions_count'), kwargs)
+
         return super(Post, self).save(*args, **kwargs)
 
 
@@ -199,16 +333,368 @@ class PostImage(models.Model):
                                 width_field='width',
                                 height_field='height',
                                 blank=False, null=True, format='JPEG', options={'quality': 50},
-                                processors=[ResizeToFit(width=1024, upscale=False)])
+                                processors=make_image_processors(ResizeToFit(width=1024, upscale=False)))
+    feed = ProcessedImageField(verbose_name=_('feed image'), storage=post_image_storage,
+                               upload_to=upload_to_post_image_directory, editable=False,
+                               blank=False, null=True, format='JPEG', options={'quality': 50},
+                               processors=make_image_processors(ResizeToFit(width=600, upscale=False)))
+    thumbnail = ProcessedImageField(verbose_name=_('thumbnail'), storage=post_image_storage,
+                                    upload_to=upload_to_post_image_directory, editable=False,
+                                    blank=False, null=True, format='JPEG', options={'quality': 50},
+                                    processors=make_image_processors(ResizeToFit(width=200, upscale=False)))
     width = models.PositiveIntegerField(editable=False, null=False, blank=False)
     height = models.PositiveIntegerField(editable=False, null=False, blank=False)
 
+    # The fields the image is saved through and the width they fit it in, smallest first
+    IMAGE_DERIVATIVES = {
+        'image': (('thumbnail', 200), ('feed', 600), ('image', 1024)),
+    }
+
+    @classmethod
+    def create_post_image(cls, post_id, image):
+        """
+        With asynchronous image processing the image is stored as uploaded, the post image only has the dimensions
+        read from its header until the process_images worker saves its derivatives
+        """
+        if not PendingImage.is_enabled():
+            return cls.objects.create(image=image, post_id=post_id)
+
+        image_file = ImageFile(image)
+        post_image = cls.objects.create(post_id=post_id, width=image_file.width, height=image_file.height)
+        PendingImage.set_image_of_instance(instance=post_image, field_name='image', image=image)
+
+        return post_image
+
+    @classmethod
+    def bulk_create_pending_post_images(cls, posts_images):
+        """
+        Creates the post images with a single query, reading only the dimensions of the images,
+        which are processed by the process_images worker
+        :param posts_images: list of (post, image file) tuples
+        """
+        posts_images = [(post, ImageFile(image)) for post, image in posts_images]
+
+        cls.objects.bulk_create(
+            [cls(post=post, width=image.width, height=image.height) for post, image in posts_images])
+
+        # Not every database returns the primary keys of bulk created rows
+        post_images = cls.objects.filter(post_id__in=[post.pk for post, image in posts_images]).in_bulk(
+            field_name='post_id')
+
+        PendingImage.bulk_create_pending_images(field_name='image', instances_images=[
+            (post_images[post.pk], image) for post, image in posts_images])
+
 
 class PostVideo(models.Model):
     post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='video')
     video = models.FileField(_('video'), blank=False, null=False, storage=post_image_storage,
                              upload_to=upload_to_post_video_directory)
 
+    @classmethod
+    def create_post_video(cls, post_id, video):
+        if isinstance(video, StorageUploadedFile):
+            # Already streamed into the storage of the field, it's kept where it is instead of copied.
+            # Marked as saved once committed, a rolled back post video leaves it to be deleted as not saved.
+            post_video = cls.objects.create(video=video.storage_name, post_id=post_id)
+            transaction.on_commit(video.mark_as_saved)
+            return post_video
+
+        return cls.objects.create(video=video, post_id=post_id)
+
+
+class PostMediaUpload(models.Model):
+    """
+    A post image or video uploaded in chunks over several requests, so an upload interrupted by a dropped
+    connection resumes after its last received chunk instead of starting over. Once finalized, the upload is
+    referenced by its uuid to create a post with its media. Uploads not used in time are deleted by the
+    delete_expired_post_media_uploads worker.
+    """
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts_media_uploads')
+    filename = models.CharField(_('filename'), max_length=255, blank=False, null=False)
+    size = models.PositiveIntegerField(_('size'), blank=False, null=False)
+    # SHA-256 of the whole file, checked when finalized if given
+    checksum = models.CharField(_('checksum'), max_length=64, blank=False, null=True)
+    received_size = models.PositiveIntegerField(default=0, editable=False)
+    file = models.FileField(_('file'), storage=post_image_storage, editable=False, blank=False, null=True)
+    finalized = models.BooleanField(default=False, editable=False)
+    created = models.DateTimeField(editable=False)
+    updated = models.DateTimeField(editable=False, db_index=True)
+
+    MEDIA_TYPE_IMAGE = 'I'
+    MEDIA_TYPE_VIDEO = 'V'
+
+    MEDIA_TYPES = (
+        (MEDIA_TYPE_IMAGE, 'Image'),
+        (MEDIA_TYPE_VIDEO, 'Video'),
+    )
+
+    media_type = models.CharField(max_length=2, choices=MEDIA_TYPES, blank=False, null=False)
+
+    @classmethod
+    def create_upload(cls, creator, media_type, filename, size, checksum=None):
+        if media_type == cls.MEDIA_TYPE_VIDEO and not settings.FEATURE_VIDEO_POSTS_ENABLED:
+            raise ValidationError({'media_type': [_('Video posts are not enabled.')]})
+
+        max_size = cls.get_max_size_for_media_type(media_type=media_type)
+
+        if size > max_size:
+            raise ValidationError({'size': [_('Please keep filesize under %s.') % filesizeformat(max_size)]})
+
+        with transaction.atomic():
+            # Locks the creator, so concurrent uploads don't get past the maximum together
+            User.objects.select_for_update().filter(pk=creator.pk).first()
+
+            if cls.objects.filter(creator=creator).count() >= settings.POST_MEDIA_UPLOADS_MAX_PER_USER:
+                raise ValidationError(
+                    _('You can have up to %d uploads at once, finish or delete one first.') %
+                    settings.POST_MEDIA_UPLOADS_MAX_PER_USER
+                )
+
+            return cls.objects.create(creator=creator, media_type=media_type, filename=filename, size=size,
+                                      checksum=checksum)
+
+    @classmethod
+    def get_max_size_for_media_type(cls, media_type):
+        if media_type == cls.MEDIA_TYPE_VIDEO:
+            return settings.POST_VIDEO_MAX_SIZE
+        return settings.POST_IMAGE_MAX_SIZE
+
+    @classmethod
+    def get_upload_with_uuid_for_user_with_id(cls, upload_uuid, user_id, for_update=False):
+        uploads = cls.objects.filter(uuid=upload_uuid, creator_id=user_id)
+
+        # Locked until the end of the transaction, so chunks of the same upload are added one at a time
+        if for_update:
+            uploads = uploads.select_for_update()
+
+        upload = uploads.first()
+
+        if not upload:
+            raise NotFound(
+                _('The upload does not exist.'),
+            )
+
+        return upload
+
+    @classmethod
+    def get_finalized_upload_with_uuid_for_user_with_id(cls, upload_uuid, user_id):
+        # Locked until the post created with it is committed, so an upload is used by a single post
+        upload = cls.objects.select_for_update().filter(uuid=upload_uuid, creator_id=user_id,
+                                                        finalized=True).first()
+
+        if not upload:
+            raise ValidationError({'upload_id': [_('The upload does not exist or is not finalized.')]})
+
+        return upload
+
+    @classmethod
+    def delete_expired_uploads(cls, batch_size=100):
+        """
+        Deletes the uploads, finalized or not, without activity for longer than POST_MEDIA_UPLOADS_EXPIRE_AFTER
+        together with their stored chunks and files. Uploads in use by a request are skipped, uploads failing to
+        be deleted are kept for the next run.
+        :return: the number of deleted uploads
+        """
+        expired_before = timezone.now() - timedelta(seconds=settings.POST_MEDIA_UPLOADS_EXPIRE_AFTER)
+        expired_uploads = cls.objects.filter(updated__lt=expired_before).order_by('updated')
+        uploads_ids = list(expired_uploads.values_list('pk', flat=True)[:batch_size])
+
+        deleted_count = 0
+
+        for upload_id in uploads_ids:
+            try:
+                with transaction.atomic():
+                    # Checked again once locked, a chunk may have been added meanwhile
+                    upload = cls.objects.select_for_update(skip_locked=True).filter(
+                        pk=upload_id, updated__lt=expired_before).first()
+
+                    if upload:
+                        upload.delete()
+                        deleted_count += 1
+            except Exception:
+                logger.exception('Error deleting expired post media upload {0}'.format(upload_id))
+
+        return deleted_count
+
+    def is_video(self):
+        return self.media_type == self.MEDIA_TYPE_VIDEO
+
+    def add_chunk(self, offset, chunk, checksum):
+        """
+        Chunks are added in order, each starting where the previous one ended. A chunk sent again because its
+        response was lost is acknowledged without being stored twice.
+        """
+        if self.finalized:
+            raise ValidationError(_('The upload is already finalized.'))
+
+        received_chunk = self.chunks.filter(offset=offset).first()
+
+        if received_chunk and received_chunk.size == chunk.size and received_chunk.checksum == checksum:
+            return received_chunk
+
+        if offset != self.received_size:
+            raise ValidationError({'offset': [_('The next chunk starts at offset %d.') % self.received_size]})
+
+        if offset + chunk.size > self.size:
+            raise ValidationError({'chunk': [_('The chunk exceeds the size of the upload.')]})
+
+        chunk_checksum = hashlib.sha256()
+        for data in chunk.chunks():
+            chunk_checksum.update(data)
+
+        if chunk_checksum.hexdigest() != checksum:
+            raise ValidationError({'checksum': [_('The checksum does not match the chunk.')]})
+
+        chunk.seek(0)
+        upload_chunk = PostMediaUploadChunk(upload=self, offset=offset, size=chunk.size, checksum=checksum)
+        upload_chunk.file.save('uploads/chunks/%s/%d' % (str(self.uuid), offset), chunk, save=False)
+        upload_chunk.save()
+
+        self.received_size = offset + chunk.size
+        self.save()
+
+        return upload_chunk
+
+    def finalize(self):
+        """
+        Joins the chunks into the uploaded file, streaming them from and into the storage,
+        and checks it as the same file uploaded inline would be. The upload is locked only to be marked
+        as finalized once joined, a file joined for an upload deleted or finalized meanwhile is deleted.
+        """
+        if self.finalized:
+            return
+
+        if self.received_size != self.size:
+            raise ValidationError(_('The upload is missing %d bytes.') % (self.size - self.received_size))
+
+        name = self._join_chunks()
+
+        with transaction.atomic():
+            upload = type(self).objects.select_for_update().filter(pk=self.pk).first()
+
+            if upload and not upload.finalized:
+                self.file = name
+                self.finalized = True
+                self.save()
+
+        if not self.finalized:
+            self._meta.get_field('file').storage.delete(name)
+
+            if not upload:
+                raise NotFound(
+                    _('The upload does not exist.'),
+                )
+
+            self.refresh_from_db()
+            return
+
+        self._delete_chunks()
+
+    def open_media(self):
+        """
+        The finalized file to create the post media with. A post video keeps the file where it is,
+        marking it as saved once committed, a post image is made from a copy.
+        """
+        return self._open_file(name=self.file.name)
+
+    def delete_with_media(self, media):
+        """
+        Deletes the upload once its media was used to create a post. The file, if the post didn't keep it,
+        is deleted once the post is committed, so a rolled back post leaves the upload as it was.
+        """
+        media.file.close()
+
+        # Runs after a post video keeping the file marked it as saved on commit
+        transaction.on_commit(media.close)
+
+        self.file = None
+        self.delete()
+
+    def _join_chunks(self):
+        storage = self._meta.get_field('file').storage
+
+        # A video is kept where it's joined by the post created with it, an image is copied
+        if self.is_video():
+            name = make_post_video_upload_name(self.filename)
+        else:
+            name = 'uploads/%s%s' % (str(uuid.uuid4()), os.path.splitext(self.filename)[1].lower())
+
+        writer = open_storage_writer(storage=storage, name=name)
+        file_checksum = hashlib.sha256()
+
+        try:
+            for upload_chunk in self.chunks.order_by('offset'):
+                with upload_chunk.file.open('rb') as chunk_file:
+                    for data in chunk_file.chunks():
+                        file_checksum.update(data)
+                        writer.write(data)
+        except Exception:
+            writer.abort()
+            raise
+
+        if self.checksum and file_checksum.hexdigest() != self.checksum:
+            writer.abort()
+            raise ValidationError({'checksum': [_('The checksum does not match the uploaded file.')]})
+
+        name = writer.close()
+
+        if not self.is_video():
+            self._validate_image(name=name)
+
+        return name
+
+    def _open_file(self, name):
+        return StorageUploadedFile(storage=self._meta.get_field('file').storage, storage_name=name,
+                                   name=self.filename, content_type=None, size=self.size, charset=None).open()
+
+    def _validate_image(self, name):
+        image_field = RestrictedImageFileSizeField(max_upload_size=settings.POST_IMAGE_MAX_SIZE)
+        image = self._open_file(name=name)
+
+        try:
+            image_field.run_validation(image)
+        except (ValidationError, DjangoValidationError) as e:
+            # Deletes the joined file, the upload is left as it was before finalized
+            image.close()
+            raise ValidationError({'image': e.detail if isinstance(e, ValidationError) else e.messages})
+
+        image.file.close()
+
+    def _delete_chunks(self):
+        for upload_chunk in self.chunks.all():
+            upload_chunk.file.delete(save=False)
+
+        self.chunks.all().delete()
+
+    def delete(self, *args, **kwargs):
+        self._delete_chunks()
+
+        if self.file:
+            self.file.delete(save=False)
+
+        return super(PostMediaUpload, self).delete(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        ''' On save, update timestamps '''
+        if not self.id:
+            self.created = timezone.now()
+
+        self.updated = timezone.now()
+
+        return super(PostMediaUpload, self).save(*args, **kwargs)
+
+
+class PostMediaUploadChunk(models.Model):
+    upload = models.ForeignKey(PostMediaUpload, on_delete=models.CASCADE, related_name='chunks')
+    offset = models.PositiveIntegerField(editable=False)
+    size = models.PositiveIntegerField(editable=False)
+    checksum = models.CharField(max_length=64, editable=False)
+    file = models.FileField(storage=post_image_storage, editable=False)
+
+    class Meta:
+        unique_together = (('upload', 'offset'),)
+
 
 class PostComment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -216,9 +702,15 @@ class PostComment(models.Model):
     commenter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts_comments')
     text = models.CharField(_('text'), max_length=settings.POST_COMMENT_MAX_LENGTH, blank=False, null=False)
 
+    class Meta:
+        index_together = (('post', 'created', 'id'),)
+
     @classmethod
     def create_comment(cls, text, commenter, post):
-        return PostComment.objects.create(text=text, commenter=commenter, post=post)
+        post_comment = PostComment.objects.create(text=text, commenter=commenter, post=post)
+        update_count(Post.objects.filter(pk=post.pk), 'comments_count')
+        TrendingPost.add_interaction_to_post_with_id(post_id=post.pk, weight=TrendingPost.COMMENT_WEIGHT)
+        return post_comment
 
     @classmethod
     def count_comments_for_post_with_id(cls, post_id, commenter_id=None):
@@ -235,6 +727,10 @@ class PostComment(models.Model):
             self.created = timezone.now()
         return super(PostComment, self).save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        update_count(Post.objects.filter(pk=self.post_id), 'comments_count', -1)
+        return super(PostComment, self).delete(*args, **kwargs)
+
 
 class PostReaction(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='reactions')
@@ -244,10 +740,14 @@ class PostReaction(models.Model):
 
     class Meta:
         unique_together = ('reactor', 'post',)
+        index_together = (('post', 'created', 'id'),)
 
     @classmethod
     def create_reaction(cls, reactor, emoji_id, post):
-        return PostReaction.objects.create(reactor=reactor, emoji_id=emoji_id, post=post)
+        post_reaction = PostReaction.objects.create(reactor=reactor, emoji_id=emoji_id, post=post)
+        update_count(Post.objects.filter(pk=post.pk), 'reactions_count')
+        TrendingPost.add_interaction_to_post_with_id(post_id=post.pk, weight=TrendingPost.REACTION_WEIGHT)
+        return post_reaction
 
     @classmethod
     def count_reactions_for_post_with_id(cls, post_id, reactor_id=None):
@@ -264,6 +764,10 @@ class PostReaction(models.Model):
             self.created = timezone.now()
         return super(PostReaction, self).save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        update_count(Post.objects.filter(pk=self.post_id), 'reactions_count', -1)
+        return super(PostReaction, self).delete(*args, **kwargs)
+
 
 class PostMute(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='mutes')
@@ -275,3 +779,327 @@ class PostMute(models.Model):
     @classmethod
     def create_post_mute(cls, post_id, muter_id):
         return cls.objects.create(post_id=post_id, muter_id=muter_id)
+
+
+class TimelinePost(models.Model):
+    """
+    A materialized entry of a post in the timeline of its owner.
+    Entries are pushed on post creation and refreshed on follow, connection
+    and community membership changes so the timeline can be read with a single indexed query.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_posts')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_posts')
+
+    class Meta:
+        unique_together = ('owner', 'post',)
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_MATERIALIZED_TIMELINE_ENABLED
+
+    @classmethod
+    def add_post_to_timelines(cls, post):
+        if not cls.is_enabled():
+            return
+
+        owners_ids = cls._get_timeline_owners_ids_for_post(post=post)
+        cls._add_posts_with_ids_to_timeline_of_owners_with_ids(posts_ids=[post.pk], owners_ids=owners_ids)
+
+    @classmethod
+    def add_public_posts_with_ids_to_timelines(cls, posts_ids, creator):
+        """
+        Adds many public posts of the same creator at once, their timelines are those of the creator and followers
+        """
+        if not cls.is_enabled() or not posts_ids:
+            return
+
+        owners_ids = {creator.pk}
+        owners_ids.update(creator.followers.values_list('user_id', flat=True))
+        cls._add_posts_with_ids_to_timeline_of_owners_with_ids(posts_ids=posts_ids, owners_ids=owners_ids)
+
+    @classmethod
+    def refresh_post_in_timelines(cls, post):
+        """
+        Removes the post from the timelines that can no longer see it and adds it to the ones that now can
+        :param post:
+        :return:
+        """
+        if not cls.is_enabled():
+            return
+
+        owners_ids = cls._get_timeline_owners_ids_for_post(post=post)
+        cls.objects.filter(post_id=post.pk).exclude(owner_id__in=owners_ids).delete()
+        cls._add_posts_with_ids_to_timeline_of_owners_with_ids(posts_ids=[post.pk], owners_ids=owners_ids)
+
+    @classmethod
+    def refresh_timeline_of_owner_with_id_for_creator_with_id(cls, owner_id, creator_id):
+        """
+        Re-materializes the circle posts of the creator in the timeline of the owner.
+        Must be called whenever the follow or connection between the two users changes.
+        :param owner_id:
+        :param creator_id:
+        :return:
+        """
+        cls.refresh_timeline_of_owner_with_id_for_creators_with_ids(owner_id=owner_id, creators_ids=[creator_id])
+
+    @classmethod
+    def refresh_timeline_of_owner_with_id_for_creators_with_ids(cls, owner_id, creators_ids):
+        if not cls.is_enabled() or not creators_ids:
+            return
+
+        cls.objects.filter(owner_id=owner_id, post__creator_id__in=creators_ids,
+                           post__community__isnull=True).delete()
+
+        owner = User.objects.get(pk=owner_id)
+        followed_creators_ids = list(
+            owner.follows.filter(followed_user_id__in=creators_ids).values_list('followed_user_id', flat=True))
+
+        if not followed_creators_ids:
+            return
+
+        creators_posts_query = owner._make_get_posts_query_for_users_with_ids(followed_creators_ids)
+        posts_ids = Post.objects.filter(creators_posts_query).values_list('id', flat=True).distinct()
+
+        cls._add_posts_with_ids_to_timeline_of_owners_with_ids(posts_ids=posts_ids, owners_ids=[owner_id])
+
+    @classmethod
+    def refresh_timelines_of_owners_with_ids_for_creator_with_id(cls, owners_ids, creator_id):
+        """
+        Re-materializes the circle posts of the creator in the timelines of many owners at once,
+        used when the creator changes the circles of many of its connections.
+        :param owners_ids:
+        :param creator_id:
+        :return:
+        """
+        if not cls.is_enabled() or not owners_ids:
+            return
+
+        cls.objects.filter(owner_id__in=owners_ids, post__creator_id=creator_id, post__community__isnull=True).delete()
+
+        Follow = get_follow_model()
+        following_owners_ids = list(
+            Follow.objects.filter(user_id__in=owners_ids, followed_user_id=creator_id).values_list('user_id',
+                                                                                                   flat=True))
+
+        if not following_owners_ids:
+            return
+
+        Circle = get_circle_model()
+        creator_posts = Post.objects.filter(creator_id=creator_id, community__isnull=True)
+        world_circle_posts_ids = list(
+            creator_posts.filter(circles__id=Circle.get_world_circle_id()).values_list('id', flat=True))
+
+        owners_posts_ids = {owner_id: set(world_circle_posts_ids) for owner_id in following_owners_ids}
+
+        # The posts in the circles the creator has the owners in, when the owners confirmed the connection
+        circles_owners_posts = creator_posts.filter(
+            circles__connections__target_user_id__in=following_owners_ids,
+            circles__connections__target_connection__circles__isnull=False).values_list(
+            'circles__connections__target_user_id', 'id').distinct()
+
+        for owner_id, post_id in circles_owners_posts:
+            owners_posts_ids[owner_id].add(post_id)
+
+        cls.objects.bulk_create(
+            [cls(owner_id=owner_id, post_id=post_id) for owner_id, posts_ids in owners_posts_ids.items() for post_id in
+             posts_ids], ignore_conflicts=True)
+
+    @classmethod
+    def add_community_with_id_posts_to_timeline_of_owner_with_id(cls, community_id, owner_id):
+        if not cls.is_enabled():
+            return
+
+        posts_ids = Post.objects.filter(community_id=community_id).values_list('id', flat=True)
+        cls._add_posts_with_ids_to_timeline_of_owners_with_ids(posts_ids=posts_ids, owners_ids=[owner_id])
+
+    @classmethod
+    def remove_community_with_id_posts_from_timeline_of_owner_with_id(cls, community_id, owner_id):
+        if not cls.is_enabled():
+            return
+
+        # Own community posts stay, the same way they do in the dynamic timeline
+        cls.objects.filter(owner_id=owner_id, post__community_id=community_id).exclude(
+            post__creator_id=owner_id).delete()
+
+    @classmethod
+    def rebuild_timeline_for_owner(cls, owner):
+        cls.objects.filter(owner_id=owner.pk).delete()
+
+        timeline_posts_query = owner._make_timeline_posts_query()
+
+        if not timeline_posts_query.children:
+            return
+
+        posts_ids = Post.objects.filter(timeline_posts_query).values_list('id', flat=True).distinct()
+        cls._add_posts_with_ids_to_timeline_of_owners_with_ids(posts_ids=posts_ids, owners_ids=[owner.pk])
+
+    @classmethod
+    def _add_posts_with_ids_to_timeline_of_owners_with_ids(cls, posts_ids, owners_ids):
+        timeline_posts = [cls(owner_id=owner_id, post_id=post_id) for owner_id in owners_ids for post_id in posts_ids]
+        cls.objects.bulk_create(timeline_posts, ignore_conflicts=True)
+
+    @classmethod
+    def _get_timeline_owners_ids_for_post(cls, post):
+        creator = post.creator
+        owners_ids = {creator.pk}
+
+        if post.community_id:
+            CommunityMembership = get_community_membership_model()
+            owners_ids.update(
+                CommunityMembership.objects.filter(community_id=post.community_id).values_list('user_id', flat=True))
+            return owners_ids
+
+        Circle = get_circle_model()
+        post_circles_ids = list(post.circles.values_list('id', flat=True))
+
+        if not post_circles_ids:
+            return owners_ids
+
+        if Circle.get_world_circle_id() in post_circles_ids:
+            owners_ids.update(creator.followers.values_list('user_id', flat=True))
+            return owners_ids
+
+        # Only followers fully connected with the creator can see encircled posts
+        owners_query = Q(follows__followed_user_id=creator.pk,
+                         connections__target_user_id=creator.pk,
+                         connections__circles__isnull=False,
+                         targeted_connections__user_id=creator.pk)
+
+        if creator.connections_circle_id in post_circles_ids:
+            owners_query.add(Q(targeted_connections__circles__isnull=False), Q.AND)
+        else:
+            owners_query.add(Q(targeted_connections__circles__id__in=post_circles_ids), Q.AND)
+
+        owners_ids.update(User.objects.filter(owners_query).values_list('id', flat=True))
+
+        return owners_ids
+
+
+class TrendingPost(models.Model):
+    """
+    The rolling score of a recent public community post.
+    The post creation, its reactions and its comments add to the score, which halves every HALF_LIFE.
+    Instead of the decaying score, the rank log2(score) + time / HALF_LIFE is stored. It orders the posts
+    like their current scores do and only changes when the post gets a new interaction.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='trending_post')
+    created = models.DateTimeField(editable=False, db_index=True)
+    rank = models.FloatField(editable=False, db_index=True)
+
+    WINDOW = timedelta(hours=12)
+    HALF_LIFE = timedelta(hours=6)
+    POST_WEIGHT = 1
+    REACTION_WEIGHT = 1
+    COMMENT_WEIGHT = 2
+
+    @classmethod
+    def is_enabled(cls):
+        return settings.FEATURE_PRECOMPUTED_TRENDING_POSTS_ENABLED
+
+    @classmethod
+    def get_trending_posts(cls):
+        Community = get_community_model()
+
+        return Post.objects.filter(trending_post__created__gte=timezone.now() - cls.WINDOW,
+                                   community__type=Community.COMMUNITY_TYPE_PUBLIC).order_by(
+            '-trending_post__rank')
+
+    @classmethod
+    def add_post(cls, post):
+        if not cls.is_enabled() or not cls._is_trending_candidate(post=post):
+            return
+
+        cls.objects.create(post_id=post.pk, created=post.created,
+                           rank=cls._add_weight_to_rank(rank=None, weight=cls.POST_WEIGHT, time=post.created))
+
+    @classmethod
+    def add_interaction_to_post_with_id(cls, post_id, weight):
+        if not cls.is_enabled():
+            return
+
+        with transaction.atomic():
+            trending_post = cls.objects.select_for_update().filter(post_id=post_id).first()
+
+            # Posts without a trending entry are either too old or not public
+            if not trending_post:
+                return
+
+            trending_post.rank = cls._add_weight_to_rank(rank=trending_post.rank, weight=weight, time=timezone.now())
+            trending_post.save()
+
+    @classmethod
+    def compact(cls):
+        """
+        Removes the entries which left the window or are no longer public and recomputes the rank of the
+        remaining posts from their reactions and comments, dropping the weight of deleted interactions.
+        The entries are locked before the interactions are read, so interactions added meanwhile wait for the
+        recomputed ranks and add their weight to them. Entries added meanwhile are left as they are.
+        """
+        Community = get_community_model()
+
+        with transaction.atomic():
+            trending_posts = {trending_post.post_id: trending_post for trending_post in
+                              cls.objects.select_for_update().only('id', 'post_id', 'rank')}
+
+            window_start = timezone.now() - cls.WINDOW
+
+            posts = Post.objects.filter(created__gte=window_start,
+                                        community__type=Community.COMMUNITY_TYPE_PUBLIC).values_list('id', 'created')
+            posts_ranks = {}
+
+            for post_id, post_created in posts:
+                posts_ranks[post_id] = (post_created, cls._add_weight_to_rank(rank=None, weight=cls.POST_WEIGHT,
+                                                                              time=post_created))
+
+            interactions = [
+                (PostReaction.objects.filter(post_id__in=posts_ranks.keys()), cls.REACTION_WEIGHT),
+                (PostComment.objects.filter(post_id__in=posts_ranks.keys()), cls.COMMENT_WEIGHT),
+            ]
+
+            for interactions_queryset, weight in interactions:
+                for post_id, interaction_created in interactions_queryset.values_list('post_id',
+                                                                                      'created').iterator():
+                    post_created, rank = posts_ranks[post_id]
+                    posts_ranks[post_id] = (post_created,
+                                            cls._add_weight_to_rank(rank=rank, weight=weight,
+                                                                    time=interaction_created))
+
+            cls.objects.filter(pk__in=[trending_post.pk for post_id, trending_post in trending_posts.items() if
+                                       post_id not in posts_ranks]).delete()
+
+            updated_trending_posts = []
+
+            for post_id, trending_post in trending_posts.items():
+                if post_id in posts_ranks:
+                    trending_post.rank = posts_ranks[post_id][1]
+                    updated_trending_posts.append(trending_post)
+
+            cls.objects.bulk_update(updated_trending_posts, ['rank'], batch_size=500)
+
+            # Posts whose entry was added meanwhile keep it
+            cls.objects.bulk_create([cls(post_id=post_id, created=post_created, rank=rank) for
+                                     post_id, (post_created, rank) in posts_ranks.items() if
+                                     post_id not in trending_posts], ignore_conflicts=True)
+
+    @classmethod
+    def _is_trending_candidate(cls, post):
+        Community = get_community_model()
+
+        return post.community_id and post.community.type == Community.COMMUNITY_TYPE_PUBLIC and \
+               post.created >= timezone.now() - cls.WINDOW
+
+    @classmethod
+    def _add_weight_to_rank(cls, rank, weight, time):
+        """
+        Adds the weight of an interaction which happened at the given time to the rank
+        """
+        time_rank = time.timestamp() / cls.HALF_LIFE.total_seconds()
+
+        if rank is None:
+            return math.log2(weight) + time_rank
+
+        # Both terms are exponentiated relative to the larger one so the sum never overflows
+        larger_rank, smaller_rank = max(rank, time_rank), min(rank, time_rank)
+        larger_weight, smaller_weight = (1, weight) if rank >= time_rank else (weight, 1)
+
+        return larger_rank + math.log2(larger_weight + smaller_weight * 2 ** (smaller_rank - larger_rank))
@@ -1,7 +1,10 @@
 # Create your tests here.
 import json
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -10,7 +13,7 @@ import logging
 
 from openbook_common.tests.helpers import make_authentication_headers_for_user, make_fake_post_text, \
     make_fake_post_comment_text, make_user, make_circle, make_emoji, make_emoji_group, make_reactions_emoji_group, \
-    make_community
+    make_community, get_ids_following_cursor
 from openbook_communities.models import Community
 from openbook_notifications.models import PostCommentNotification, PostReactionNotification
 from openbook_posts.models import Post, PostComment, PostReaction
@@ -692,6 +695,75 @@ class PostCommentsAPITests(APITestCase):
         self.assertFalse(PostCommentNotification.objects.filter(post_comment__text=post_comment_text,
                                                                 notification__owner=foreign_user).exists())
 
+    def test_commenting_in_commented_post_by_foreign_user_not_creates_foreign_notification_when_disabled(self):
+        """
+         should NOT create a notification when a user comments in a post where a foreign user with comment notifications disabled commented
+         """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        post_creator = make_user()
+
+        foreign_user = make_user()
+
+        post = post_creator.create_public_post(text=make_fake_post_text())
+
+        foreign_user.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text())
+
+        foreign_user.update_notifications_settings(post_comment_notifications=False)
+
+        post_comment_text = make_fake_post_comment_text()
+
+        data = self._get_create_post_comment_request_data(post_comment_text)
+
+        url = self._get_url(post)
+        self.client.put(url, data, **headers)
+
+        self.assertFalse(PostCommentNotification.objects.filter(post_comment__text=post_comment_text,
+                                                                notification__owner=foreign_user).exists())
+        self.assertTrue(PostCommentNotification.objects.filter(post_comment__text=post_comment_text,
+                                                               notification__owner=post_creator).exists())
+
+    def test_commenting_queries_do_not_grow_with_commenters(self):
+        """
+         should create the notifications of the post commenters with a constant amount of queries
+         """
+        post_creator = make_user()
+        post = post_creator.create_public_post(text=make_fake_post_text())
+
+        def comment_post_as_new_user():
+            user = make_user()
+            with CaptureQueriesContext(connection) as context:
+                user.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text())
+            return len(context)
+
+        for i in range(0, 2):
+            comment_post_as_new_user()
+
+        few_commenters_queries_count = comment_post_as_new_user()
+
+        for i in range(0, 10):
+            comment_post_as_new_user()
+
+        self.assertEqual(comment_post_as_new_user(), few_commenters_queries_count)
+        self.assertEqual(PostCommentNotification.objects.filter(notification__owner=post_creator).count(), 14)
+
+    def test_can_paginate_post_comments_created_at_once_with_cursor(self):
+        """
+        should retrieve every post comment once when following the next cursor of pages splitting equal created
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        post = user.create_public_post(text=make_fake_post_text())
+
+        post_comments_ids = [
+            user.comment_post_with_id(post_id=post.pk, text=make_fake_post_comment_text()).pk for i in range(0, 7)]
+        PostComment.objects.filter(post=post).update(created=timezone.now())
+
+        response_post_comments_ids = get_ids_following_cursor(self.client, self._get_url(post), headers, count=3)
+
+        self.assertEqual(response_post_comments_ids, sorted(post_comments_ids, reverse=True))
+
     def _get_create_post_comment_request_data(self, post_comment_text):
         return {
             'text': post_comment_text
@@ -1396,6 +1468,31 @@ class PostReactionsAPITests(APITestCase):
         self.assertFalse(PostReactionNotification.objects.filter(post_reaction__emoji__id=post_reaction_emoji_id,
                                                                  notification__owner=user).exists())
 
+    def test_can_paginate_post_reactions_created_at_once_with_cursor(self):
+        """
+        should retrieve every post reaction once when following the next cursor of pages splitting equal created
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        post = user.create_public_post(text=make_fake_post_text())
+
+        emoji_group = make_reactions_emoji_group()
+        emoji = make_emoji(group=emoji_group)
+
+        post_reactions_ids = []
+
+        for i in range(0, 7):
+            reactor = make_user()
+            post_reaction = reactor.react_to_post_with_id(post_id=post.pk, emoji_id=emoji.pk,
+                                                          emoji_group_id=emoji_group.pk)
+            post_reactions_ids.append(post_reaction.pk)
+
+        PostReaction.objects.filter(post=post).update(created=timezone.now())
+
+        response_post_reactions_ids = get_ids_following_cursor(self.client, self._get_url(post), headers, count=3)
+
+        self.assertEqual(response_post_reactions_ids, sorted(post_reactions_ids, reverse=True))
+
     def _get_create_post_reaction_request_data(self, emoji_id, emoji_group_id):
         return {
             'emoji_id': emoji_id,
@@ -1822,6 +1919,35 @@ class PostReactionsEmojiCountAPITests(APITestCase):
             reaction_count = reaction['count']
             self.assertEqual(count, reaction_count)
 
+    def test_reactions_emoji_count_are_sorted_by_count(self):
+        """
+        should retrieve the reactions emoji count sorted by count
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        post = user.create_public_post(text=make_fake_post_text())
+        emoji_group = make_reactions_emoji_group()
+
+        emojis_counts = [1, 4, 2]
+
+        for emoji_count in emojis_counts:
+            emoji = make_emoji(group=emoji_group)
+            for count in range(emoji_count):
+                reactor = make_user()
+                reactor.react_to_post_with_id(post_id=post.pk, emoji_id=emoji.pk, emoji_group_id=emoji_group.pk)
+
+        url = self._get_url(post)
+
+        response = self.client.get(url, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response_emojis_counts = json.loads(response.content)
+
+        response_counts = [response_emoji_count.get('count') for response_emoji_count in response_emojis_counts]
+
+        self.assertEqual(response_counts, sorted(emojis_counts, reverse=True))
+
     def _get_url(self, post):
         return reverse('post-reactions-emoji-count', kwargs={
             'post_uuid': post.uuid
@@ -1,30 +1,50 @@
 # Create your tests here.
 import tempfile
+from unittest import mock
 
 from PIL import Image
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from mixer.backend.django import mixer
 
 from openbook.settings import POST_MAX_LENGTH
 from openbook_auth.models import User
 import random
+from datetime import timedelta
 
 import logging
 import json
 
 from openbook_circles.models import Circle
+from openbook_common.models import PendingImage
+from openbook_common.utils.images import save_image_derivatives
 from openbook_common.tests.helpers import make_user, make_users, make_fake_post_text, \
-    make_authentication_headers_for_user, make_circle, make_community
+    make_authentication_headers_for_user, make_circle, make_community, make_emoji, make_reactions_emoji_group
 from openbook_lists.models import List
+from openbook.storage_backends import S3PrivateMediaStorage
+from openbook_posts.models import Post, TrendingPost, PostVideo, PostImage, TimelinePost
 
 logger = logging.getLogger(__name__)
 fake = Faker()
 
 
+def count_streamed_videos():
+    if not default_storage.exists('videos'):
+        return 0
+    return len(default_storage.listdir('videos')[1])
+
+
 # TODO A lot of setup duplication. Perhaps its a good idea to create a single factory on top of mixer or Factory boy
 
 
@@ -248,6 +268,60 @@ class PostsAPITests(APITestCase):
 
         self.assertTrue(hasattr(created_post, 'image'))
 
+    def test_create_image_post_is_oriented_without_exif(self):
+        """
+        should store the image of a post rotated as its EXIF orientation says and without the EXIF
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        image = Image.new('RGB', (200, 100))
+        # A little endian TIFF header followed by an IFD with the orientation tag, rotated 90 degrees clockwise
+        exif = b'Exif\x00\x00II*\x00\x08\x00\x00\x00\x01\x00' \
+               b'\x12\x01\x03\x00\x01\x00\x00\x00\x06\x00\x00\x00\x00\x00\x00\x00'
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file, exif=exif)
+        tmp_file.seek(0)
+
+        data = {
+            'image': tmp_file,
+            'circle_id': Circle.get_world_circle_id()
+        }
+
+        response = self.client.put(self._get_url(), data, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post_image = Post.objects.get(creator=user).image
+
+        self.assertEqual((post_image.width, post_image.height), (100, 200))
+
+        with Image.open(post_image.image.open('rb')) as stored_image:
+            self.assertFalse(stored_image.info.get('exif'))
+
+    @override_settings(IMAGE_MAX_PIXELS=100 * 100)
+    def test_cant_create_image_post_with_too_many_pixels(self):
+        """
+        should not be able to create a post with an image of more pixels than allowed and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        image = Image.new('RGB', (200, 100))
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file)
+        tmp_file.seek(0)
+
+        data = {
+            'image': tmp_file,
+            'circle_id': Circle.get_world_circle_id()
+        }
+
+        response = self.client.put(self._get_url(), data, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.filter(creator=user).exists())
+
     def test_create_video_post(self):
         """
         should be able to create a video post and return 201
@@ -277,6 +351,47 @@ class PostsAPITests(APITestCase):
 
         self.assertTrue(hasattr(created_post, 'video'))
 
+    @override_settings(POST_VIDEO_MAX_SIZE=8)
+    def test_cant_create_video_post_over_max_size(self):
+        """
+        should not be able to create a post with a video over the maximum size and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        videos_count = count_streamed_videos()
+
+        video = SimpleUploadedFile("file.mp4", b"video_file_content", content_type="video/mp4")
+
+        response = self.client.put(self._get_url(), {'video': video}, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('video', json.loads(response.content))
+        self.assertFalse(Post.objects.filter(creator=user).exists())
+        self.assertEqual(count_streamed_videos(), videos_count)
+
+    def test_streamed_video_of_rejected_post_is_deleted(self):
+        """
+        should delete the streamed video when the post is not created
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        videos_count = count_streamed_videos()
+
+        image = Image.new('RGB', (100, 100))
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file)
+        tmp_file.seek(0)
+
+        video = SimpleUploadedFile("file.mp4", b"video_file_content", content_type="video/mp4")
+
+        response = self.client.put(self._get_url(), {'video': video, 'image': tmp_file}, **headers,
+                                   format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(count_streamed_videos(), videos_count)
+
     def test_create_video_and_text_post(self):
         """
         should be able to create a video and text post and return 201
@@ -626,6 +741,40 @@ class PostsAPITests(APITestCase):
 
         self.assertEqual(post['creator']['id'], user_to_retrieve_posts_from.pk)
 
+    def test_get_posts_signs_private_media_urls_at_once(self):
+        """
+        should sign the urls of the private media of all the retrieved posts in a single batch and return 200
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        posts_creator = make_user()
+
+        for i in range(0, 3):
+            video = SimpleUploadedFile("file.mp4", b"video_file_content", content_type="video/mp4")
+            posts_creator.create_public_post(video=video)
+
+        caches['signed_urls'].clear()
+        storage = S3PrivateMediaStorage(location='private', bucket_name='bucket', access_key='key',
+                                        secret_key='secret', region_name='eu-west-1')
+
+        with mock.patch.object(PostVideo._meta.get_field('video'), 'storage', storage), \
+                mock.patch.object(storage, 'urls', wraps=storage.urls) as sign_urls:
+            response = self.client.get(self._get_url(), {
+                'username': posts_creator.username
+            }, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response_posts = json.loads(response.content)
+
+        self.assertEqual(len(response_posts), 3)
+        self.assertEqual(sign_urls.call_count, 1)
+        self.assertEqual(len(sign_urls.call_args[0][0]), 3)
+
+        for response_post in response_posts:
+            self.assertIn('Signature', response_post['video']['video'])
+
     def test_get_all_public_posts_for_connected_user(self):
         """
         should be able to retrieve all the posts of a connected user
@@ -886,5 +1035,523 @@ class PostsAPITests(APITestCase):
         for post_id in posts_ids:
             self.assertIn(post_id, response_posts_ids)
 
+    def test_get_timeline_posts_queries_do_not_grow_with_follows(self):
+        """
+        should build and retrieve the timeline posts with the same amount of queries regardless of the amount of follows
+        """
+        user = make_user()
+
+        queries_counts = []
+
+        for amount_of_follows in (1, 5):
+            for i in range(amount_of_follows):
+                user_to_connect = make_user()
+                user_to_connect.create_public_post(text=make_fake_post_text())
+                user.connect_with_user_with_id(user_to_connect.pk)
+                user_to_connect.confirm_connection_with_user_with_id(user.pk)
+
+            with CaptureQueriesContext(connection) as context:
+                list(user.get_timeline_posts().values_list('id', flat=True))
+
+            queries_counts.append(len(context.captured_queries))
+
+        self.assertEqual(queries_counts[0], queries_counts[1])
+
+    def test_get_all_posts_queries_do_not_grow_with_posts(self):
+        """
+        should serialize the retrieved posts with the same amount of queries regardless of the amount of posts
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        emoji_group = make_reactions_emoji_group()
+        emoji = make_emoji(group=emoji_group)
+
+        url = self._get_url()
+
+        queries_counts = []
+
+        for amount_of_posts in (1, 5):
+            for i in range(amount_of_posts):
+                user_to_follow = make_user()
+                user.follow_user_with_id(user_to_follow.pk)
+                post = user_to_follow.create_public_post(text=make_fake_post_text())
+                user.comment_post_with_id(post_id=post.pk, text=make_fake_post_text())
+                user.react_to_post_with_id(post_id=post.pk, emoji_id=emoji.pk, emoji_group_id=emoji_group.pk)
+                user.mute_post_with_id(post_id=post.pk)
+
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {'count': 20}, **headers)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            queries_counts.append(len(context.captured_queries))
+
+        self.assertEqual(queries_counts[0], queries_counts[1])
+
+    def test_can_paginate_posts_with_historical_created_with_cursor(self):
+        """
+        should retrieve every post once newest first when following the next cursor of each page
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        now = timezone.now()
+        posts_created = [now - timedelta(days=days) for days in [3, 0, 10, 1, 7, 0.5, 2]]
+        posts = [user.create_public_post(text=make_fake_post_text(), created=created) for created in posts_created]
+        expected_posts_ids = [post.pk for post in sorted(posts, key=lambda post: post.created, reverse=True)]
+
+        url = self._get_url()
+        response_posts_ids = []
+        cursor = None
+
+        while True:
+            query_params = {'count': 3}
+
+            if cursor:
+                query_params['cursor'] = cursor
+
+            response = self.client.get(url, query_params, **headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            response_posts_ids.extend([post['id'] for post in json.loads(response.content)])
+
+            cursor = response.get('X-Next-Cursor')
+
+            if not cursor:
+                break
+
+        self.assertEqual(response_posts_ids, expected_posts_ids)
+
+    def test_max_id_paginates_historical_posts_by_created(self):
+        """
+        should retrieve the posts created before the post with the max_id, whatever their id
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        now = timezone.now()
+        newest_post = user.create_public_post(text=make_fake_post_text(), created=now)
+        imported_post = user.create_public_post(text=make_fake_post_text(), created=now - timedelta(days=300))
+        older_post = user.create_public_post(text=make_fake_post_text(), created=now - timedelta(days=1))
+
+        response = self.client.get(self._get_url(), {'max_id': newest_post.pk}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in json.loads(response.content)], [older_post.pk, imported_post.pk])
+
+    def test_cant_retrieve_posts_with_invalid_cursor(self):
+        """
+        should not be able to retrieve posts with a malformed cursor and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        response = self.client.get(self._get_url(), {'cursor': 'not-a-cursor'}, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def _get_url(self):
         return reverse('posts')
+
+
+@override_settings(FEATURE_ASYNC_IMAGE_PROCESSING_ENABLED=True)
+class AsyncImageProcessingPostsAPITests(APITestCase):
+    """
+    PostsAPI with the uploaded images processed by the process_images worker
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    def test_image_post_has_placeholder_until_processed(self):
+        """
+        should return the dimensions without image until processed and then the feed derivative
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        image = Image.new('RGB', (2000, 1000))
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file)
+        tmp_file.seek(0)
+
+        response = self.client.put(self._get_url(), {'image': tmp_file, 'circle_id': Circle.get_world_circle_id()},
+                                   **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(self._get_url(), **headers)
+        response_image = json.loads(response.content)[0]['image']
+
+        self.assertIsNone(response_image['image'])
+        self.assertEqual(response_image['width'], 2000)
+        self.assertEqual(response_image['height'], 1000)
+
+        call_command('process_images', '--once')
+
+        post_image = Post.objects.get(creator=user).image
+
+        self.assertEqual(post_image.thumbnail.width, 200)
+        self.assertEqual(post_image.feed.width, 600)
+        self.assertEqual(post_image.width, 1024)
+
+        response = self.client.get(self._get_url(), **headers)
+        response_image = json.loads(response.content)[0]['image']
+
+        self.assertTrue(response_image['image'].endswith(post_image.feed.url))
+        self.assertEqual(response_image['width'], 1024)
+
+    def test_image_failing_to_be_processed_is_retried(self):
+        """
+        should keep an image failing to be processed and retry it after a backoff
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        image = Image.new('RGB', (2000, 1000))
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file)
+        tmp_file.seek(0)
+
+        response = self.client.put(self._get_url(), {'image': tmp_file, 'circle_id': Circle.get_world_circle_id()},
+                                   **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with mock.patch.object(default_storage, 'open', side_effect=IOError('Storage unavailable')):
+            call_command('process_images', '--once')
+
+        pending_image = PendingImage.objects.get()
+
+        self.assertEqual(pending_image.attempts, 1)
+        self.assertTrue(pending_image.next_attempt > timezone.now())
+        self.assertTrue(default_storage.exists(pending_image.original))
+
+        PendingImage.objects.update(next_attempt=timezone.now())
+        call_command('process_images', '--once')
+
+        self.assertFalse(PendingImage.objects.exists())
+        self.assertEqual(Post.objects.get(creator=user).image.feed.width, 600)
+
+    def test_image_discarded_while_processed_leaves_no_derivatives(self):
+        """
+        should delete the derivatives of an image discarded by a newer one while it was processed
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        image = Image.new('RGB', (2000, 1000))
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file)
+        tmp_file.seek(0)
+
+        self.client.put(self._get_url(), {'image': tmp_file, 'circle_id': Circle.get_world_circle_id()},
+                        **headers, format='multipart')
+
+        derivatives_names = []
+
+        def save_image_derivatives_and_discard(instance, fields_names, **kwargs):
+            save_image_derivatives(instance=instance, fields_names=fields_names, **kwargs)
+            derivatives_names.extend([getattr(instance, field_name).name for field_name in fields_names])
+            PendingImage.objects.all().delete()
+
+        with mock.patch('openbook_common.models.save_image_derivatives', save_image_derivatives_and_discard):
+            call_command('process_images', '--once')
+
+        self.assertTrue(derivatives_names)
+
+        for derivative_name in derivatives_names:
+            self.assertFalse(default_storage.exists(derivative_name))
+
+        self.assertFalse(Post.objects.get(creator=user).image.feed)
+
+    def test_undecodable_image_is_given_up(self):
+        """
+        should give up on an image which can't be decoded without retrying it
+        """
+        user = make_user()
+        post = user.create_public_post(text=make_fake_post_text())
+        PostImage.objects.create(post=post, width=100, height=100)
+
+        PendingImage.objects.create(model='openbook_posts.PostImage', object_id=post.image.pk, field_name='image',
+                                    original=default_storage.save('pending_images/broken.jpg',
+                                                                  ContentFile(b'not an image')))
+
+        call_command('process_images', '--once')
+
+        self.assertFalse(PendingImage.objects.exists())
+
+    def _get_url(self):
+        return reverse('posts')
+
+
+@override_settings(FEATURE_MATERIALIZED_TIMELINE_ENABLED=True)
+class MaterializedTimelinePostsAPITests(APITestCase):
+    """
+    PostsAPI with the materialized timeline enabled
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    def test_get_own_and_followed_users_posts(self):
+        """
+        should retrieve own posts and the public posts of followed users from the materialized timeline
+        """
+        user = make_user()
+        followed_user = make_user()
+        user.follow_user_with_id(followed_user.pk)
+
+        own_post = user.create_public_post(text=make_fake_post_text())
+        followed_user_post = followed_user.create_public_post(text=make_fake_post_text())
+
+        foreign_user = make_user()
+        foreign_user.create_public_post(text=make_fake_post_text())
+
+        response_posts_ids = self._get_timeline_posts_ids_for_user(user)
+
+        self.assertEqual(sorted(response_posts_ids), sorted([own_post.pk, followed_user_post.pk]))
+
+    def test_follow_adds_existing_posts(self):
+        """
+        should add the existing public posts of a user to the timeline when following it
+        """
+        user = make_user()
+        user_to_follow = make_user()
+        post = user_to_follow.create_public_post(text=make_fake_post_text())
+
+        user.follow_user_with_id(user_to_follow.pk)
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [post.pk])
+
+    def test_unfollow_removes_posts(self):
+        """
+        should remove the posts of a user from the timeline when unfollowing it
+        """
+        user = make_user()
+        followed_user = make_user()
+        user.follow_user_with_id(followed_user.pk)
+        followed_user.create_public_post(text=make_fake_post_text())
+
+        user.unfollow_user_with_id(followed_user.pk)
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [])
+
+    def test_join_and_leave_community(self):
+        """
+        should add community posts to the timeline when joining and remove them when leaving
+        """
+        user = make_user()
+        community_creator = make_user()
+        community = make_community(creator=community_creator, type='P')
+        community_post = community_creator.create_community_post(text=make_fake_post_text(),
+                                                                 community_name=community.name)
+
+        user.join_community_with_name(community_name=community.name)
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [community_post.pk])
+
+        user.leave_community_with_name(community_name=community.name)
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [])
+
+    def test_encircled_posts(self):
+        """
+        should only add encircled posts to the timelines of the users in the circle
+        """
+        user = make_user()
+        connected_user = make_user()
+
+        circle = make_circle(creator=connected_user)
+        other_circle = make_circle(creator=connected_user)
+
+        connected_user.connect_with_user_with_id(user.pk, circles_ids=[circle.pk])
+        user.confirm_connection_with_user_with_id(connected_user.pk)
+
+        post = connected_user.create_encircled_post(text=make_fake_post_text(), circles_ids=[circle.pk])
+        connected_user.create_encircled_post(text=make_fake_post_text(), circles_ids=[other_circle.pk])
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [post.pk])
+
+        connected_user.disconnect_from_user_with_id(user.pk)
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [])
+
+    def test_update_circle_users_refreshes_timelines(self):
+        """
+        should add and remove the encircled posts from the timelines of the users added to and removed from the circle
+        """
+        user = make_user()
+        connected_user = make_user()
+
+        circle = make_circle(creator=connected_user)
+
+        connected_user.connect_with_user_with_id(user.pk)
+        user.confirm_connection_with_user_with_id(connected_user.pk)
+
+        post = connected_user.create_encircled_post(text=make_fake_post_text(), circles_ids=[circle.pk])
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [])
+
+        connected_user.update_circle_with_id(circle.pk, usernames=[user.username])
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [post.pk])
+
+        connected_user.update_circle_with_id(circle.pk, usernames=[])
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [])
+
+    def test_rebuild_timelines_command(self):
+        """
+        should rebuild the timelines from the dynamic timeline query
+        """
+        user = make_user()
+        followed_user = make_user()
+
+        with self.settings(FEATURE_MATERIALIZED_TIMELINE_ENABLED=False):
+            user.follow_user_with_id(followed_user.pk)
+            post = followed_user.create_public_post(text=make_fake_post_text())
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [])
+
+        call_command('rebuild_timelines')
+
+        self.assertEqual(self._get_timeline_posts_ids_for_user(user), [post.pk])
+
+    def _get_timeline_posts_ids_for_user(self, user):
+        headers = make_authentication_headers_for_user(user)
+        response = self.client.get(self._get_url(), **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [post['id'] for post in json.loads(response.content)]
+
+    def _get_url(self):
+        return reverse('posts')
+
+
+@override_settings(FEATURE_PRECOMPUTED_TRENDING_POSTS_ENABLED=True)
+class PrecomputedTrendingPostsAPITests(APITestCase):
+    """
+    TrendingPostsAPI with the precomputed trending posts enabled
+    """
+
+    fixtures = [
+        'openbook_circles/fixtures/circles.json'
+    ]
+
+    def test_ranks_posts_by_their_interactions(self):
+        """
+        should rank the posts by their reactions and comments, comments weighting more
+        """
+        user = make_user()
+        community = make_community(creator=user)
+
+        commented_post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+        reacted_post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+        post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+
+        emoji_group = make_reactions_emoji_group()
+        emoji = make_emoji(group=emoji_group)
+        user.react_to_post_with_id(reacted_post.pk, emoji_id=emoji.pk, emoji_group_id=emoji_group.pk)
+        user.comment_post_with_id(commented_post.pk, text=make_fake_post_text()[:100])
+
+        self.assertEqual(self._get_trending_posts_ids_for_user(user), [commented_post.pk, reacted_post.pk, post.pk])
+
+    def test_excludes_private_community_and_old_posts(self):
+        """
+        should not return posts of private communities nor posts older than the trending window
+        """
+        user = make_user()
+        community = make_community(creator=user)
+        private_community = make_community(creator=user, type='T')
+
+        post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+        user.create_community_post(community_name=private_community.name, text=make_fake_post_text())
+        user.create_community_post(community_name=community.name, text=make_fake_post_text(),
+                                   created=timezone.now() - TrendingPost.WINDOW - timedelta(minutes=1))
+
+        self.assertEqual(self._get_trending_posts_ids_for_user(user), [post.pk])
+
+    def test_compact_trending_posts_command(self):
+        """
+        should drop the posts which left the window and the weight of deleted interactions
+        """
+        user = make_user()
+        community = make_community(creator=user)
+
+        post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+        commented_post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+        post_comment = user.comment_post_with_id(commented_post.pk, text=make_fake_post_text()[:100])
+        old_post = user.create_community_post(community_name=community.name, text=make_fake_post_text())
+
+        user.delete_comment_with_id_for_post_with_id(post_comment.pk, commented_post.pk)
+        old_post_created = timezone.now() - TrendingPost.WINDOW - timedelta(minutes=1)
+        Post.objects.filter(pk=old_post.pk).update(created=old_post_created)
+        TrendingPost.objects.filter(post_id=old_post.pk).update(created=old_post_created)
+
+        self.assertEqual(self._get_trending_posts_ids_for_user(user), [commented_post.pk, post.pk])
+
+        trending_post_id = TrendingPost.objects.get(post_id=post.pk).pk
+
+        call_command('compact_trending_posts')
+
+        self.assertEqual(self._get_trending_posts_ids_for_user(user), [commented_post.pk, post.pk])
+        self.assertFalse(TrendingPost.objects.filter(post_id=old_post.pk).exists())
+        # Kept entries are updated in place rather than recreated
+        self.assertEqual(TrendingPost.objects.get(post_id=post.pk).pk, trending_post_id)
+
+        self.assertEqual(TrendingPost.objects.get(post_id=commented_post.pk).rank,
+                         TrendingPost._add_weight_to_rank(rank=None, weight=TrendingPost.POST_WEIGHT,
+                                                          time=commented_post.created))
+
+    def _get_trending_posts_ids_for_user(self, user):
+        headers = make_authentication_headers_for_user(user)
+        response = self.client.get(reverse('trending-posts'), **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [post['id'] for post in json.loads(response.content)]
+
+
+class StreamedVideoPostsAPITests(APITransactionTestCase):
+    """
+    PostsAPI with the posts created with streamed videos committed
+    """
+
+    def test_create_video_post_streams_video_into_storage(self):
+        """
+        should store the uploaded video where it was streamed to and return 201
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        video = SimpleUploadedFile("file.mp4", b"video_file_content", content_type="video/mp4")
+
+        response = self.client.put(reverse('posts'), {'video': video}, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post_video = Post.objects.get(creator=user).video
+
+        self.assertTrue(post_video.video.name.startswith('videos/'))
+
+        with post_video.video.open('rb') as stored_video:
+            self.assertEqual(stored_video.read(), b"video_file_content")
+
+    def test_streamed_video_of_rolled_back_post_is_deleted(self):
+        """
+        should delete the streamed video when the post created with it is rolled back
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        videos_count = count_streamed_videos()
+
+        video = SimpleUploadedFile("file.mp4", b"video_file_content", content_type="video/mp4")
+
+        # Fails after the post video is created
+        with mock.patch.object(TimelinePost, 'add_post_to_timelines', side_effect=IOError('Database unavailable')):
+            with self.assertRaises(IOError):
+                self.client.put(reverse('posts'), {'video': video}, **headers, format='multipart')
+
+        self.assertFalse(Post.objects.filter(creator=user).exists())
+        self.assertEqual(count_streamed_videos(), videos_count)
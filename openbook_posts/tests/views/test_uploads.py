@@ -0,0 +1,411 @@
+import hashlib
+import json
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from openbook_common.tests.helpers import make_user, make_authentication_headers_for_user, make_community
+from openbook_posts.models import Post, PostMediaUpload, PostMediaUploadChunk
+
+
+class PostMediaUploadsTestsMixin:
+    def _make_upload(self, user, content, media_type=PostMediaUpload.MEDIA_TYPE_VIDEO, checksum=None):
+        filename = 'file.mp4' if media_type == PostMediaUpload.MEDIA_TYPE_VIDEO else 'file.jpg'
+        return PostMediaUpload.create_upload(creator=user, media_type=media_type, filename=filename,
+                                             size=len(content), checksum=checksum)
+
+    def _make_image_content(self):
+        image = Image.new('RGB', (100, 100))
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.jpg')
+        image.save(tmp_file)
+        tmp_file.seek(0)
+        return tmp_file.read()
+
+    def _add_chunk(self, upload, offset, content, headers):
+        return self.client.put(reverse('post-media-upload-chunks', kwargs={'upload_uuid': upload.uuid}), {
+            'offset': offset,
+            'checksum': hashlib.sha256(content).hexdigest(),
+            'chunk': SimpleUploadedFile('chunk', content)
+        }, **headers, format='multipart')
+
+    def _finalize(self, upload, headers):
+        return self.client.post(reverse('finalize-post-media-upload', kwargs={'upload_uuid': upload.uuid}),
+                                **headers)
+
+
+class PostMediaUploadsAPITests(PostMediaUploadsTestsMixin, APITestCase):
+    """
+    PostMediaUploadsAPI
+    """
+
+    def test_can_create_upload(self):
+        """
+        should be able to create an upload and return 201
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        response = self.client.put(reverse('post-media-uploads'), {
+            'media_type': PostMediaUpload.MEDIA_TYPE_VIDEO,
+            'filename': 'file.mp4',
+            'size': 10
+        }, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        parsed_response = json.loads(response.content)
+
+        self.assertEqual(parsed_response['received_size'], 0)
+        self.assertTrue(PostMediaUpload.objects.filter(uuid=parsed_response['uuid'], creator=user).exists())
+
+    def test_cant_create_upload_over_max_size(self):
+        """
+        should not be able to create an upload of an image over the max image size and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        with self.settings(POST_IMAGE_MAX_SIZE=10):
+            response = self.client.put(reverse('post-media-uploads'), {
+                'media_type': PostMediaUpload.MEDIA_TYPE_IMAGE,
+                'filename': 'file.jpg',
+                'size': 11
+            }, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PostMediaUpload.objects.filter(creator=user).exists())
+
+    def test_cant_create_upload_over_max_uploads(self):
+        """
+        should not be able to create an upload having as many as the max uploads per user and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+
+        self._make_upload(user=user, content=b'0123456789')
+
+        with self.settings(POST_MEDIA_UPLOADS_MAX_PER_USER=1):
+            response = self.client.put(reverse('post-media-uploads'), {
+                'media_type': PostMediaUpload.MEDIA_TYPE_VIDEO,
+                'filename': 'file.mp4',
+                'size': 10
+            }, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PostMediaUpload.objects.filter(creator=user).count(), 1)
+
+    def test_can_add_chunks_in_order(self):
+        """
+        should be able to add the chunks of an upload in order and return 200
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        response = self._add_chunk(upload=upload, offset=0, content=b'01234', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self._add_chunk(upload=upload, offset=5, content=b'56789', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(json.loads(response.content)['received_size'], 10)
+        self.assertEqual(PostMediaUploadChunk.objects.filter(upload=upload).count(), 2)
+
+    def test_adding_chunk_again_is_acknowledged(self):
+        """
+        should acknowledge a chunk sent again without storing it twice and return 200
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        self._add_chunk(upload=upload, offset=0, content=b'01234', headers=headers)
+        response = self._add_chunk(upload=upload, offset=0, content=b'01234', headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['received_size'], 5)
+        self.assertEqual(PostMediaUploadChunk.objects.filter(upload=upload).count(), 1)
+
+    def test_cant_add_chunk_out_of_order(self):
+        """
+        should not be able to add a chunk not starting where the received ones end and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        response = self._add_chunk(upload=upload, offset=5, content=b'56789', headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PostMediaUploadChunk.objects.filter(upload=upload).exists())
+
+    def test_cant_add_chunk_with_wrong_checksum(self):
+        """
+        should not be able to add a chunk whose checksum does not match and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        response = self.client.put(reverse('post-media-upload-chunks', kwargs={'upload_uuid': upload.uuid}), {
+            'offset': 0,
+            'checksum': hashlib.sha256(b'56789').hexdigest(),
+            'chunk': SimpleUploadedFile('chunk', b'01234')
+        }, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PostMediaUpload.objects.get(pk=upload.pk).received_size, 0)
+
+    def test_cant_add_chunk_to_upload_of_other_user(self):
+        """
+        should not be able to add a chunk to the upload of another user and return 404
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=make_user(), content=b'0123456789')
+
+        response = self._add_chunk(upload=upload, offset=0, content=b'01234', headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cant_finalize_incomplete_upload(self):
+        """
+        should not be able to finalize an upload missing chunks and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        self._add_chunk(upload=upload, offset=0, content=b'01234', headers=headers)
+
+        response = self._finalize(upload=upload, headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PostMediaUpload.objects.get(pk=upload.pk).finalized)
+
+    def test_cant_finalize_upload_with_wrong_checksum(self):
+        """
+        should not be able to finalize an upload whose file does not match its checksum and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789', checksum=hashlib.sha256(b'x').hexdigest())
+
+        self._add_chunk(upload=upload, offset=0, content=b'0123456789', headers=headers)
+
+        response = self._finalize(upload=upload, headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PostMediaUpload.objects.get(pk=upload.pk).finalized)
+
+    def test_cant_finalize_image_upload_of_invalid_image(self):
+        """
+        should not be able to finalize an image upload which is not an image and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789', media_type=PostMediaUpload.MEDIA_TYPE_IMAGE)
+
+        self._add_chunk(upload=upload, offset=0, content=b'0123456789', headers=headers)
+
+        response = self._finalize(upload=upload, headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PostMediaUpload.objects.get(pk=upload.pk).file)
+
+    def test_upload_deleted_while_finalized_deletes_joined_file(self):
+        """
+        should delete the joined file of an upload deleted while its chunks were joined and return 404
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        content = b'video_file_content'
+        upload = self._make_upload(user=user, content=content)
+
+        self._add_chunk(upload=upload, offset=0, content=content, headers=headers)
+
+        join_chunks = PostMediaUpload._join_chunks
+        joined_files_names = []
+
+        def join_chunks_and_delete_upload(joined_upload):
+            joined_files_names.append(join_chunks(joined_upload))
+            PostMediaUpload.objects.filter(pk=joined_upload.pk).delete()
+            return joined_files_names[0]
+
+        with mock.patch.object(PostMediaUpload, '_join_chunks', join_chunks_and_delete_upload):
+            response = self._finalize(upload=upload, headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(default_storage.exists(joined_files_names[0]))
+
+    def test_can_create_video_post_with_upload(self):
+        """
+        should be able to create a video post with a finalized upload, keeping its file, and return 201
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        content = b'video_file_content'
+        upload = self._make_upload(user=user, content=content, checksum=hashlib.sha256(content).hexdigest())
+
+        self._add_chunk(upload=upload, offset=0, content=content[:5], headers=headers)
+        self._add_chunk(upload=upload, offset=5, content=content[5:], headers=headers)
+
+        response = self._finalize(upload=upload, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        file_name = PostMediaUpload.objects.get(pk=upload.pk).file.name
+
+        response = self.client.put(reverse('posts'), {'upload_id': str(upload.uuid)}, **headers,
+                                   format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post_video = Post.objects.get(creator=user).video
+
+        self.assertEqual(post_video.video.name, file_name)
+
+        with post_video.video.open('rb') as stored_video:
+            self.assertEqual(stored_video.read(), content)
+
+        self.assertFalse(PostMediaUpload.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(PostMediaUploadChunk.objects.filter(upload_id=upload.pk).exists())
+
+    def test_cant_create_post_with_unfinalized_upload(self):
+        """
+        should not be able to create a post with an upload not finalized and return 400
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        response = self.client.put(reverse('posts'), {'upload_id': str(upload.uuid)}, **headers,
+                                   format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.filter(creator=user).exists())
+
+    def test_can_delete_upload(self):
+        """
+        should be able to delete an upload with its chunks and return 200
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        self._add_chunk(upload=upload, offset=0, content=b'01234', headers=headers)
+        chunk_file_name = PostMediaUploadChunk.objects.get(upload=upload).file.name
+
+        response = self.client.delete(reverse('post-media-upload', kwargs={'upload_uuid': upload.uuid}), **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(PostMediaUpload.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(default_storage.exists(chunk_file_name))
+
+    def test_expired_uploads_are_deleted(self):
+        """
+        should delete the uploads without activity for longer than they're kept, with their chunks
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        expired_upload = self._make_upload(user=user, content=b'0123456789')
+        upload = self._make_upload(user=user, content=b'0123456789')
+
+        self._add_chunk(upload=expired_upload, offset=0, content=b'01234', headers=headers)
+        chunk_file_name = PostMediaUploadChunk.objects.get(upload=expired_upload).file.name
+
+        PostMediaUpload.objects.filter(pk=expired_upload.pk).update(updated=timezone.now() - timedelta(days=2))
+
+        with self.settings(POST_MEDIA_UPLOADS_EXPIRE_AFTER=86400):
+            call_command('delete_expired_post_media_uploads', once=True)
+
+        self.assertFalse(PostMediaUpload.objects.filter(pk=expired_upload.pk).exists())
+        self.assertTrue(PostMediaUpload.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(default_storage.exists(chunk_file_name))
+
+    def test_expired_upload_failing_to_be_deleted_is_kept(self):
+        """
+        should keep an expired upload whose chunks fail to be deleted from the storage for the next run
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        expired_upload = self._make_upload(user=user, content=b'0123456789')
+
+        self._add_chunk(upload=expired_upload, offset=0, content=b'01234', headers=headers)
+        chunk_file_name = PostMediaUploadChunk.objects.get(upload=expired_upload).file.name
+
+        PostMediaUpload.objects.filter(pk=expired_upload.pk).update(updated=timezone.now() - timedelta(days=2))
+
+        with self.settings(POST_MEDIA_UPLOADS_EXPIRE_AFTER=86400), \
+             mock.patch.object(PostMediaUploadChunk._meta.get_field('file').storage, 'delete',
+                               side_effect=IOError('Storage unavailable')):
+            call_command('delete_expired_post_media_uploads', once=True)
+
+        self.assertTrue(PostMediaUpload.objects.filter(pk=expired_upload.pk).exists())
+        self.assertTrue(PostMediaUploadChunk.objects.filter(upload_id=expired_upload.pk).exists())
+        self.assertTrue(default_storage.exists(chunk_file_name))
+
+
+class PostMediaUploadsCommitAPITests(PostMediaUploadsTestsMixin, APITransactionTestCase):
+    """
+    PostMediaUploadsAPI with the posts created with uploads committed
+    """
+
+    def test_can_create_community_image_post_with_upload(self):
+        """
+        should be able to create a community image post with a finalized upload, deleting its file, and return 201
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        community = make_community(creator=user)
+        content = self._make_image_content()
+        upload = self._make_upload(user=user, content=content, media_type=PostMediaUpload.MEDIA_TYPE_IMAGE)
+
+        self._add_chunk(upload=upload, offset=0, content=content, headers=headers)
+        self._finalize(upload=upload, headers=headers)
+
+        file_name = PostMediaUpload.objects.get(pk=upload.pk).file.name
+
+        response = self.client.put(reverse('community-posts', kwargs={'community_name': community.name}),
+                                   {'upload_id': str(upload.uuid)}, **headers, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post = Post.objects.get(creator=user, community=community)
+
+        self.assertTrue(post.image.image)
+        self.assertFalse(PostMediaUpload.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(default_storage.exists(file_name))
+
+    def test_rolled_back_post_keeps_upload(self):
+        """
+        should keep the upload and its file when the post created with it is rolled back
+        """
+        user = make_user()
+        headers = make_authentication_headers_for_user(user)
+        community = make_community(creator=user)
+        content = self._make_image_content()
+        upload = self._make_upload(user=user, content=content, media_type=PostMediaUpload.MEDIA_TYPE_IMAGE)
+
+        self._add_chunk(upload=upload, offset=0, content=content, headers=headers)
+        self._finalize(upload=upload, headers=headers)
+
+        file_name = PostMediaUpload.objects.get(pk=upload.pk).file.name
+
+        # Fails after the post is created, when the upload is deleted
+        with mock.patch.object(PostMediaUpload, 'delete', side_effect=IOError('Storage unavailable')):
+            with self.assertRaises(IOError):
+                self.client.put(reverse('community-posts', kwargs={'community_name': community.name}),
+                                {'upload_id': str(upload.uuid)}, **headers, format='multipart')
+
+        self.assertFalse(Post.objects.filter(creator=user, community=community).exists())
+        self.assertTrue(PostMediaUpload.objects.filter(pk=upload.pk, finalized=True).exists())
+        self.assertTrue(default_storage.exists(file_name))
@@ -8,6 +8,7 @@ from openbook_common.models import Emoji, EmojiGroup
 from openbook_common.serializers_fields.post import PostCreatorField, ReactionsEmojiCountField, ReactionField, \
     CommentsCountField, CirclesField, IsMutedField
 from openbook_common.serializers_fields.post_comment import PostCommenterField
+from openbook_common.serializers_fields.request import CursorField
 from openbook_common.validators import emoji_id_exists, emoji_group_id_exists
 from openbook_communities.models import CommunityMembership, Community
 from openbook_communities.serializers_fields import CommunityMembershipsField
@@ -86,6 +87,9 @@ class GetPostCommentsSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -183,6 +187,9 @@ class GetPostReactionsSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -6,6 +6,7 @@ from rest_framework.views import APIView
 from django.utils.translation import ugettext_lazy as _
 
 from openbook_common.utils.model_loaders import get_emoji_group_model, get_post_model
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
 from openbook_posts.views.post.serializers import GetPostCommentsSerializer, PostCommentSerializer, \
     CommentPostSerializer, DeletePostCommentSerializer, DeletePostSerializer, DeletePostReactionSerializer, \
     ReactToPostSerializer, PostReactionSerializer, GetPostReactionsSerializer, PostEmojiCountSerializer, \
@@ -123,18 +124,20 @@ class PostComments(APIView):
 
         data = serializer.validated_data
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
         count = data.get('count', 10)
         post_uuid = data.get('post_uuid')
 
         user = request.user
         post_id = get_post_id_for_post_uuid(post_uuid)
 
-        post_comments = user.get_comments_for_post_with_id(post_id, max_id=max_id).order_by('-created')[
-                        :count]
+        post_comments, next_cursor = paginate_with_cursor(user.get_comments_for_post_with_id(post_id), count=count,
+                                                          cursor=cursor, max_id=max_id)
 
         post_comments_serializer = PostCommentSerializer(post_comments, many=True, context={"request": request})
 
-        return Response(post_comments_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(post_comments_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
     def put(self, request, post_uuid):
         request_data = self._get_request_data(request, post_uuid)
@@ -204,19 +207,19 @@ class PostReactions(APIView):
         post_uuid = data.get('post_uuid')
         emoji_id = data.get('emoji_id')
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
         count = data.get('count', 10)
 
         user = request.user
         post_id = get_post_id_for_post_uuid(post_uuid)
 
-        post_reactions = user.get_reactions_for_post_with_id(post_id=post_id, max_id=max_id,
-                                                             emoji_id=emoji_id).order_by(
-            '-created')[
-                         :count]
+        post_reactions = user.get_reactions_for_post_with_id(post_id=post_id, emoji_id=emoji_id)
+        post_reactions, next_cursor = paginate_with_cursor(post_reactions, count=count, cursor=cursor, max_id=max_id)
 
         post_reactions_serializer = PostReactionSerializer(post_reactions, many=True, context={"request": request})
 
-        return Response(post_reactions_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(post_reactions_serializer.data, status=status.HTTP_200_OK),
+                                           next_cursor)
 
     def put(self, request, post_uuid):
         request_data = self._get_request_data(request, post_uuid)
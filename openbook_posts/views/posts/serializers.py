@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.utils.translation import ugettext_lazy as _
 
 from django.conf import settings
 from openbook_auth.models import User, UserProfile
@@ -9,7 +10,10 @@ from openbook_circles.validators import circle_id_exists
 from openbook_common.models import Emoji
 from openbook_common.serializers_fields.post import ReactionField, CommentsCountField, ReactionsEmojiCountField, \
     CirclesField, PostCreatorField, IsMutedField, IsEncircledField
-from openbook_common.serializers_fields.request import RestrictedImageFileSizeField
+from openbook_common.serializers_fields.file import FileUrlField
+from openbook_common.serializers_fields.image import ImageDerivativeField
+from openbook_common.serializers_fields.request import RestrictedImageFileSizeField, CursorField, \
+    RestrictedFileSizeField
 from openbook_communities.models import Community, CommunityMembership
 from openbook_communities.serializers_fields import CommunityMembershipsField
 from openbook_lists.validators import list_id_exists
@@ -28,6 +32,9 @@ class GetPostsSerializer(serializers.Serializer):
     max_id = serializers.IntegerField(
         required=False,
     )
+    cursor = CursorField(
+        required=False,
+    )
     count = serializers.IntegerField(
         required=False,
         max_value=20
@@ -47,14 +54,24 @@ class CreatePostSerializer(serializers.Serializer):
     text = serializers.CharField(max_length=settings.POST_MAX_LENGTH, required=False, allow_blank=False)
     image = RestrictedImageFileSizeField(allow_empty_file=False, required=False,
                                          max_upload_size=settings.POST_IMAGE_MAX_SIZE)
-    video = serializers.FileField(allow_empty_file=False, required=False)
+    video = RestrictedFileSizeField(allow_empty_file=False, required=False,
+                                    max_upload_size=settings.POST_VIDEO_MAX_SIZE)
+    # A finalized post media upload, instead of an inline image or video
+    upload_id = serializers.UUIDField(required=False)
     circle_id = serializers.ListField(
         required=False,
         child=serializers.IntegerField(validators=[circle_id_exists]),
     )
 
+    def validate(self, data):
+        if 'upload_id' in data and ('image' in data or 'video' in data):
+            raise serializers.ValidationError(_('A post must have an upload or an image/video, not both.'))
+
+        return data
+
 
 class PostCreatorProfileSerializer(serializers.ModelSerializer):
+    avatar = ImageDerivativeField(image_field_name='avatar', width=settings.FEED_AVATAR_WIDTH)
     badges = BadgeSerializer(many=True)
 
     class Meta:
@@ -79,7 +96,7 @@ class PostCreatorSerializer(serializers.ModelSerializer):
 
 
 class PostImageSerializer(serializers.ModelSerializer):
-    image = serializers.ImageField(read_only=True, required=False, allow_empty_file=True)
+    image = ImageDerivativeField(image_field_name='image', width=settings.FEED_IMAGE_WIDTH)
 
     class Meta:
         model = PostImage
@@ -91,6 +108,8 @@ class PostImageSerializer(serializers.ModelSerializer):
 
 
 class PostVideoSerializer(serializers.ModelSerializer):
+    video = FileUrlField()
+
     class Meta:
         model = PostVideo
         fields = (
@@ -157,6 +176,7 @@ class CommunityMembershipSerializer(serializers.ModelSerializer):
 
 
 class PostCommunitySerializer(serializers.ModelSerializer):
+    avatar = ImageDerivativeField(image_field_name='avatar', width=settings.FEED_AVATAR_WIDTH)
     memberships = CommunityMembershipsField(community_membership_serializer=CommunityMembershipSerializer)
 
     class Meta:
@@ -7,7 +7,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from openbook_common.utils.helpers import normalize_list_value_in_request_data
-from openbook_common.utils.model_loaders import get_post_model
+from openbook_common.utils.model_loaders import get_post_model, get_post_media_upload_model
+from openbook_common.utils.pagination import paginate_with_cursor, add_next_cursor_to_response
+from openbook_posts.helpers import add_post_video_upload_handler
 from openbook_posts.permissions import IsGetOrIsAuthenticated
 from openbook_posts.views.posts.serializers import CreatePostSerializer, AuthenticatedUserPostSerializer, \
     GetPostsSerializer, UnauthenticatedUserPostSerializer
@@ -17,6 +19,7 @@ class Posts(APIView):
     permission_classes = (IsGetOrIsAuthenticated,)
 
     def put(self, request):
+        add_post_video_upload_handler(request)
 
         request_data = request.data.dict()
 
@@ -32,14 +35,29 @@ class Posts(APIView):
         image = data.get('image')
         video = data.get('video') if settings.FEATURE_VIDEO_POSTS_ENABLED else None
         circles_ids = data.get('circle_id')
+        upload_id = data.get('upload_id')
         user = request.user
 
         with transaction.atomic():
+            upload = None
+
+            if upload_id:
+                PostMediaUpload = get_post_media_upload_model()
+                upload = PostMediaUpload.get_finalized_upload_with_uuid_for_user_with_id(upload_uuid=upload_id,
+                                                                                         user_id=user.pk)
+                if upload.is_video():
+                    video = upload.open_media()
+                else:
+                    image = upload.open_media()
+
             if circles_ids:
                 post = user.create_encircled_post(text=text, circles_ids=circles_ids, image=image, video=video)
             else:
                 post = user.create_public_post(text=text, image=image, video=video)
 
+            if upload:
+                upload.delete_with_media(media=image or video)
+
         post_serializer = AuthenticatedUserPostSerializer(post, context={"request": request})
 
         return Response(post_serializer.data, status=status.HTTP_201_CREATED)
@@ -61,6 +79,7 @@ class Posts(APIView):
         circles_ids = data.get('circle_id')
         lists_ids = data.get('list_id')
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
         count = data.get('count', 10)
         username = data.get('username')
 
@@ -68,27 +87,25 @@ class Posts(APIView):
 
         if username:
             if username == user.username:
-                posts = user.get_posts(max_id=max_id)
+                posts = user.get_posts()
             elif not user.is_connected_with_user_with_username(username):
                 User = get_user_model()
                 posts = User.get_public_posts_for_user_with_username(
-                    max_id=max_id,
                     username=username
                 )
             else:
-                posts = user.get_posts_for_user_with_username(username, max_id=max_id)
+                posts = user.get_posts_for_user_with_username(username)
         else:
             posts = user.get_timeline_posts(
                 circles_ids=circles_ids,
                 lists_ids=lists_ids,
-                max_id=max_id
             )
 
-        posts = posts.order_by('-created')[:count]
+        posts, next_cursor = paginate_with_cursor(posts, count=count, cursor=cursor, max_id=max_id)
 
         post_serializer = AuthenticatedUserPostSerializer(posts, many=True, context={"request": request})
 
-        return Response(post_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(post_serializer.data, status=status.HTTP_200_OK), next_cursor)
 
     def get_posts_for_unauthenticated_user(self, request):
         query_params = request.query_params.dict()
@@ -98,19 +115,21 @@ class Posts(APIView):
         data = serializer.validated_data
 
         max_id = data.get('max_id')
+        cursor = data.get('cursor')
         count = data.get('count', 10)
         username = data.get('username')
 
         User = get_user_model()
 
         posts = User.get_public_posts_for_user_with_username(
-            max_id=max_id,
             username=username
-        ).order_by('-created')[:count]
+        )
+
+        posts, next_cursor = paginate_with_cursor(posts, count=count, cursor=cursor, max_id=max_id)
 
         post_serializer = UnauthenticatedUserPostSerializer(posts, many=True, context={"request": request})
 
-        return Response(post_serializer.data, status=status.HTTP_200_OK)
+        return add_next_cursor_to_response(Response(post_serializer.data, status=status.HTTP_200_OK), next_cursor)
 
 
 class TrendingPosts(APIView):
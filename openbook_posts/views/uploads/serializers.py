@@ -0,0 +1,48 @@
+from rest_framework import serializers
+
+from django.conf import settings
+from openbook_common.serializers_fields.request import RestrictedFileSizeField
+from openbook_posts.models import PostMediaUpload
+
+SHA256_REGEX = r'^[0-9a-f]{64}$'
+
+
+class CreatePostMediaUploadSerializer(serializers.Serializer):
+    media_type = serializers.ChoiceField(choices=PostMediaUpload.MEDIA_TYPES, required=True)
+    filename = serializers.CharField(max_length=255, required=True, allow_blank=False)
+    size = serializers.IntegerField(min_value=1, required=True)
+    checksum = serializers.RegexField(SHA256_REGEX, required=False)
+
+
+class GetPostMediaUploadSerializer(serializers.Serializer):
+    upload_uuid = serializers.UUIDField(required=True)
+
+
+class DeletePostMediaUploadSerializer(serializers.Serializer):
+    upload_uuid = serializers.UUIDField(required=True)
+
+
+class AddPostMediaUploadChunkSerializer(serializers.Serializer):
+    upload_uuid = serializers.UUIDField(required=True)
+    offset = serializers.IntegerField(min_value=0, required=True)
+    checksum = serializers.RegexField(SHA256_REGEX, required=True)
+    chunk = RestrictedFileSizeField(allow_empty_file=False, required=True,
+                                    max_upload_size=settings.POST_MEDIA_UPLOAD_CHUNK_MAX_SIZE)
+
+
+class FinalizePostMediaUploadSerializer(serializers.Serializer):
+    upload_uuid = serializers.UUIDField(required=True)
+
+
+class PostMediaUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PostMediaUpload
+        fields = (
+            'uuid',
+            'media_type',
+            'filename',
+            'size',
+            'received_size',
+            'finalized',
+            'created',
+        )
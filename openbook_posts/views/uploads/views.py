@@ -0,0 +1,104 @@
+from django.db import transaction
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.utils.translation import ugettext_lazy as _
+
+from openbook_common.utils.model_loaders import get_post_media_upload_model
+from openbook_posts.views.uploads.serializers import CreatePostMediaUploadSerializer, PostMediaUploadSerializer, \
+    GetPostMediaUploadSerializer, DeletePostMediaUploadSerializer, AddPostMediaUploadChunkSerializer, \
+    FinalizePostMediaUploadSerializer
+
+
+class PostMediaUploads(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def put(self, request):
+        serializer = CreatePostMediaUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+
+        PostMediaUpload = get_post_media_upload_model()
+        upload = PostMediaUpload.create_upload(creator=request.user, media_type=data.get('media_type'),
+                                               filename=data.get('filename'), size=data.get('size'),
+                                               checksum=data.get('checksum'))
+
+        return Response(PostMediaUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class PostMediaUploadItem(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, upload_uuid):
+        serializer = GetPostMediaUploadSerializer(data={'upload_uuid': upload_uuid})
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+
+        PostMediaUpload = get_post_media_upload_model()
+        upload = PostMediaUpload.get_upload_with_uuid_for_user_with_id(upload_uuid=data.get('upload_uuid'),
+                                                                       user_id=request.user.pk)
+
+        return Response(PostMediaUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, upload_uuid):
+        serializer = DeletePostMediaUploadSerializer(data={'upload_uuid': upload_uuid})
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+
+        PostMediaUpload = get_post_media_upload_model()
+
+        with transaction.atomic():
+            upload = PostMediaUpload.get_upload_with_uuid_for_user_with_id(upload_uuid=data.get('upload_uuid'),
+                                                                           user_id=request.user.pk,
+                                                                           for_update=True)
+            upload.delete()
+
+        return Response({
+            'message': _('Upload deleted')
+        }, status=status.HTTP_200_OK)
+
+
+class PostMediaUploadChunks(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def put(self, request, upload_uuid):
+        request_data = request.data.dict()
+        request_data['upload_uuid'] = upload_uuid
+
+        serializer = AddPostMediaUploadChunkSerializer(data=request_data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+
+        PostMediaUpload = get_post_media_upload_model()
+
+        with transaction.atomic():
+            upload = PostMediaUpload.get_upload_with_uuid_for_user_with_id(upload_uuid=data.get('upload_uuid'),
+                                                                           user_id=request.user.pk,
+                                                                           for_update=True)
+            upload.add_chunk(offset=data.get('offset'), chunk=data.get('chunk'), checksum=data.get('checksum'))
+
+        return Response(PostMediaUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+
+class FinalizePostMediaUpload(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, upload_uuid):
+        serializer = FinalizePostMediaUploadSerializer(data={'upload_uuid': upload_uuid})
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+
+        PostMediaUpload = get_post_media_upload_model()
+
+        # Not locked while its chunks are joined, it's locked once joined to be marked as finalized
+        upload = PostMediaUpload.get_upload_with_uuid_for_user_with_id(upload_uuid=data.get('upload_uuid'),
+                                                                       user_id=request.user.pk)
+        upload.finalize()
+
+        return Response(PostMediaUploadSerializer(upload).data, status=status.HTTP_200_OK)